@@ -1,10 +1,14 @@
 from django.core.cache import cache
 
 from access_control.models import RoleAccessPermission
+from core.principal import get_principal
+from core.shared_cache import bump_namespace, namespace_version
 
 CACHE_SECONDS = 60 * 5
 
-ACCESS_CONTROL_VERSION_KEY = "access_control:version"
+# Namespace del caché compartido (core.shared_cache): su versión es
+# común a todos los procesos.
+ACCESS_CONTROL_NAMESPACE = "access_control"
 
 
 def normalize_role_name(role_name):
@@ -16,15 +20,10 @@ def get_access_control_version():
     Versión global del cache de permisos.
 
     Cuando cambia la Matrix, subimos esta versión.
-    Así las llaves viejas dejan de usarse sin hacer cache.clear().
+    Así las llaves viejas dejan de usarse sin hacer cache.clear(),
+    en todos los workers a la vez.
     """
-    version = cache.get(ACCESS_CONTROL_VERSION_KEY)
-
-    if version is None:
-        version = 1
-        cache.set(ACCESS_CONTROL_VERSION_KEY, version, None)
-
-    return int(version)
+    return int(namespace_version(ACCESS_CONTROL_NAMESPACE))
 
 
 def bump_access_control_version():
@@ -32,9 +31,7 @@ def bump_access_control_version():
     Invalida solo el cache lógico de Access Control.
     No borra otros caches del sistema.
     """
-    version = get_access_control_version() + 1
-    cache.set(ACCESS_CONTROL_VERSION_KEY, version, None)
-    return version
+    return bump_namespace(ACCESS_CONTROL_NAMESPACE)
 
 
 def get_user_role_names(user):
@@ -45,15 +42,51 @@ def get_user_role_names(user):
     if not user or not getattr(user, "is_authenticated", False):
         return []
 
-    roles = []
+    # Roles memoizados por request (core.principal)
+    return sorted(get_principal(user).role_names)
+
+
+def get_user_permission_keys(user):
+    """
+    Claves de permiso habilitadas para los roles del usuario.
+
+    Una sola consulta (o lectura de cache versionado) por request: el
+    resultado queda en el principal y cada user_can() posterior es una
+    búsqueda en memoria.
+    """
+    principal = get_principal(user)
+
+    if principal.permission_keys is not None:
+        return principal.permission_keys
+
+    role_names = get_user_role_names(user)
+    keys = frozenset()
+
+    if role_names:
+        cache_key = "access_control:v{}:role_keys:{}".format(
+            get_access_control_version(),
+            ",".join(sorted(role_names)),
+        )
 
-    try:
-        if hasattr(user, "roles"):
-            roles = list(user.roles.values_list("nombre", flat=True))
-    except Exception:
-        roles = []
+        cached = cache.get(cache_key)
 
-    return [normalize_role_name(r) for r in roles if normalize_role_name(r)]
+        if cached is None:
+            cached = list(
+                RoleAccessPermission.objects.filter(
+                    permission__is_active=True,
+                    role_name__in=role_names,
+                    enabled=True,
+                )
+                .values_list("permission__key", flat=True)
+                .distinct()
+            )
+            cache.set(cache_key, cached, CACHE_SECONDS)
+
+        keys = frozenset(cached)
+
+    principal.permission_keys = keys
+
+    return keys
 
 
 def user_can(user, permission_key):
@@ -65,6 +98,8 @@ def user_can(user, permission_key):
     - Admin general siempre puede.
     - Si algún rol activo del usuario tiene el permiso enabled=True, puede.
     - Usa cache versionado para que los cambios de Matrix apliquen inmediato.
+    - Los permisos del usuario se cargan una vez por request
+      (get_user_permission_keys).
     """
 
     if not user or not getattr(user, "is_authenticated", False):
@@ -80,33 +115,7 @@ def user_can(user, permission_key):
     if not permission_key:
         return False
 
-    role_names = get_user_role_names(user)
-    if not role_names:
-        return False
-
-    version = get_access_control_version()
-
-    cache_key = "access_control:v{}:user_can:{}:{}:{}".format(
-        version,
-        getattr(user, "pk", "anon"),
-        permission_key,
-        ",".join(sorted(role_names)),
-    )
-
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return bool(cached)
-
-    allowed = RoleAccessPermission.objects.filter(
-        permission__key=permission_key,
-        permission__is_active=True,
-        role_name__in=role_names,
-        enabled=True,
-    ).exists()
-
-    cache.set(cache_key, bool(allowed), CACHE_SECONDS)
-
-    return bool(allowed)
+    return permission_key in get_user_permission_keys(user)
 
 
 def clear_access_control_cache():
@@ -4,9 +4,12 @@ import os
 
 from django.core.cache import cache
 
+from core.shared_cache import bump_namespace, namespaced_key
+
 from .models import ApiFeature
 
 API_FEATURE_CACHE_SECONDS = 30
+API_FEATURES_NAMESPACE = "api_features"
 
 
 DEFAULT_API_FEATURES = [
@@ -104,7 +107,7 @@ def get_api_feature(code):
     if not code:
         return None
 
-    cache_key = f"api_feature:{code}"
+    cache_key = namespaced_key(API_FEATURES_NAMESPACE, code)
     cached_feature = cache.get(cache_key)
 
     if cached_feature is not None:
@@ -149,11 +152,11 @@ def is_api_feature_enabled(code, user=None):
 
 def clear_api_feature_cache(code=None):
     """
-    Clears the cache for one feature or all known default features.
+    Clears the cache for one feature, or for every feature in all
+    processes when no code is given.
     """
     if code:
-        cache.delete(f"api_feature:{code}")
+        cache.delete(namespaced_key(API_FEATURES_NAMESPACE, code))
         return
 
-    for item in DEFAULT_API_FEATURES:
-        cache.delete(f"api_feature:{item['code']}")
+    bump_namespace(API_FEATURES_NAMESPACE)
@@ -1,7 +1,6 @@
 # api/views.py
 
 from django.conf import settings
-from django.db.models import Q
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -9,6 +8,7 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.views import TokenObtainPairView
 
 from operaciones.models import SesionBilling, SesionBillingTecnico
+from operaciones.services.billing_search import search_billing
 
 from .security import is_api_feature_enabled
 
@@ -282,16 +282,6 @@ def api_my_billing_list(request):
     status_filter = (request.GET.get("status") or "").strip()
     limit_raw = request.GET.get("limit") or "50"
 
-    if q:
-        qs = qs.filter(
-            Q(proyecto_id__icontains=q)
-            | Q(cliente__icontains=q)
-            | Q(ciudad__icontains=q)
-            | Q(proyecto__icontains=q)
-            | Q(oficina__icontains=q)
-            | Q(direccion_proyecto__icontains=q)
-        )
-
     if status_filter:
         qs = qs.filter(estado=status_filter)
 
@@ -302,7 +292,13 @@ def api_my_billing_list(request):
 
     limit = max(1, min(limit, 100))
 
-    qs = qs.prefetch_related("tecnicos_sesion__tecnico").order_by("-creado_en")[:limit]
+    # Con búsqueda: índice de SesionBilling, ordenado por relevancia.
+    if q:
+        qs = search_billing(qs, q)
+    else:
+        qs = qs.order_by("-creado_en")
+
+    qs = qs.prefetch_related("tecnicos_sesion__tecnico")[:limit]
 
     results = [_serialize_billing_basic(sesion) for sesion in qs]
 
@@ -353,6 +353,19 @@ class CableEvidence(models.Model):
         validators=[FileExtensionValidator(["jpg", "jpeg", "png", "webp"])],
         max_length=1024,
     )
+    # Derivados generados al subir (operaciones.services.evidence_derivatives)
+    image_report = models.ImageField(
+        storage=wasabi_storage,
+        max_length=1024,
+        blank=True,
+        editable=False,
+    )
+    image_thumb = models.ImageField(
+        storage=wasabi_storage,
+        max_length=1024,
+        blank=True,
+        editable=False,
+    )
     note = models.CharField(max_length=255, blank=True, default="")
     taken_at = models.DateTimeField(default=timezone.now)
 
@@ -398,6 +411,10 @@ class CableEvidence(models.Model):
     def __str__(self):
         return f"Evidence #{self.id} · AR #{self.assignment_requirement_id}"
 
+    @property
+    def thumb_url(self):
+        return (self.image_thumb or self.image).url
+
     @property
     def uploader_name(self):
         tech = getattr(self.assignment_requirement.assignment, "tecnico", None)
@@ -14,6 +14,8 @@ from django.views.decorators.csrf import csrf_protect
 from django.views.decorators.http import require_GET, require_POST
 
 from operaciones.models import SesionBillingTecnico
+from operaciones.services.evidence_derivatives import \
+    schedule_evidence_derivatives
 from usuarios.decoradores import rol_requerido
 
 from .models import CableAssignmentRequirement, CableEvidence
@@ -256,6 +258,7 @@ def _create_evidence_from_key(
     )
     ev.image.name = key.strip()
     ev.save()
+    schedule_evidence_derivatives(ev)
     return ev
 
 
@@ -21,7 +21,7 @@ from django.views.decorators.http import require_GET, require_POST
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
 
-from operaciones.excel_images import tmp_jpeg_from_filefield
+from operaciones.excel_images import report_jpeg_from_filefield
 from operaciones.models import ReporteFotograficoJob, SesionBilling
 from usuarios.decoradores import rol_requerido
 
@@ -1041,11 +1041,9 @@ def _cable_report_note(ev):
 def _xlsx_path_cable_photo_report(
     billing: SesionBilling, progress_cb=None, should_cancel=None
 ):
-    import io
     import tempfile
 
     import xlsxwriter
-    from PIL import Image
 
     evs = list(_cable_report_evidences_qs(billing))
     evs.sort(key=_cable_report_sort_key)
@@ -1139,16 +1137,10 @@ def _xlsx_path_cable_photo_report(
         )
 
         try:
-            ev.image.open("rb")
-            raw = ev.image.read()
-            ev.image.close()
-
-            image_data = io.BytesIO(raw)
-            image_data.seek(0)
-
-            with Image.open(io.BytesIO(raw)) as im:
-                im = im.convert("RGB")
-                w, h = im.size
+            # JPEG de reporte desde el caché de derivados compartido
+            img_path, w, h = report_jpeg_from_filefield(
+                ev.image, derivative=ev.image_report
+            )
 
             sx = max_w_px / float(w)
             sy = max_h_px / float(h)
@@ -1162,9 +1154,8 @@ def _xlsx_path_cable_photo_report(
             ws.insert_image(
                 img_top,
                 c,
-                "image.jpg",
+                img_path,
                 {
-                    "image_data": image_data,
                     "x_scale": scale,
                     "y_scale": scale,
                     "x_offset": x_off,
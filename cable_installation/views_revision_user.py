@@ -10,6 +10,8 @@ from django.views.decorators.csrf import csrf_protect
 from django.views.decorators.http import require_GET, require_POST
 
 from operaciones.models import SesionBillingTecnico
+from operaciones.services.evidence_derivatives import \
+    schedule_evidence_derivatives
 from usuarios.decoradores import rol_requerido
 
 from .models import CableAssignmentRequirement, CableEvidence
@@ -843,6 +845,7 @@ def upload_requirement_evidence_ajax(request, assignment_id):
         gps_accuracy_m=acc,
         shot_type=shot_type or "",
     )
+    schedule_evidence_derivatives(ev)
 
     is_complete = _refresh_row_status(row)
     row.refresh_from_db()
@@ -905,11 +908,13 @@ def delete_own_evidence(request, evidence_id):
             status=403,
         )
 
-    image_name = ev.image.name
+    image_names = [ev.image.name, ev.image_report.name, ev.image_thumb.name]
     try:
         storage = ev.image.storage
         ev.delete()
-        if image_name:
+        for image_name in image_names:
+            if not image_name:
+                continue
             try:
                 storage.delete(image_name)
             except Exception:
@@ -26,6 +26,9 @@ from django.utils import timezone
 from django.utils.text import slugify
 from django.views.decorators.http import require_POST
 
+from core.storage_gateway import read_fieldfile_bytes
+from core.zip_policy import write_zip_entry
+
 from .forms import DeliveryPackageForm
 from .models import (ClientProjectAssignment, DeliveryAccessLog,
                      DeliveryPackage, DeliveryPackageFile, DeliveryZipJob)
@@ -461,8 +464,7 @@ def _fetch_delivery_file_bytes(request_context, package, file_obj):
 
     if file_obj.file:
         try:
-            with file_obj.file.open("rb") as fh:
-                content = fh.read()
+            content = read_fieldfile_bytes(file_obj.file)
 
             content_type = (
                 mimetypes.guess_type(file_obj.file.name)[0]
@@ -769,7 +771,8 @@ def _build_delivery_zip_job(job_id, host, port):
 
                 archive_path = f"{folder_name}/{filename}"
 
-                zip_file.writestr(
+                write_zip_entry(
+                    zip_file,
                     archive_path,
                     result["content"],
                 )
@@ -20,6 +20,7 @@ from client_submissions.models import (ClientSubmission,
                                        ClientSubmissionAttempt,
                                        ClientSubmissionBatch,
                                        ClientSubmissionEvent)
+from core.worker_wakeup import QUEUE_CLIENT_SUBMISSIONS, notify_worker
 from operaciones.views_fotos_zip import (SMARTSHEET_MAX_ZIP_PART_BYTES,
                                          SMARTSHEET_MAX_ZIP_PARTS,
                                          generar_fotos_zip_partes_smartsheet)
@@ -2781,6 +2782,8 @@ def restart_submission_after_pre_submit_verification(
         ]
     )
 
+    notify_worker(QUEUE_CLIENT_SUBMISSIONS)
+
     create_event(
         batch=batch,
         submission=submission,
@@ -2932,6 +2935,8 @@ def complete_submission_after_verification(
         ]
     )
 
+    notify_worker(QUEUE_CLIENT_SUBMISSIONS)
+
     create_event(
         batch=batch,
         submission=submission,
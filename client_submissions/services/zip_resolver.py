@@ -12,9 +12,12 @@ from pathlib import Path
 from typing import Iterator
 from urllib.parse import urlparse
 
-import requests
 from django.utils import timezone
 
+from core.evidence_fetcher import (EvidenceFetcher, EvidenceReadError,
+                                   EvidenceSource)
+from core.zip_policy import write_zip_entry
+
 logger = logging.getLogger(__name__)
 
 
@@ -75,6 +78,10 @@ class ZipTooLargeError(ZipResolverError):
 class ZipEvidenceEntry:
     """
     Describe una evidencia que será incluida en el ZIP.
+
+    public_url solo se completa cuando la evidencia no tiene
+    storage_name; en los demás casos la URL se genera al descargar,
+    únicamente si falla la lectura desde storage.
     """
 
     evidence_id: int
@@ -484,12 +491,15 @@ def build_project_zip_manifest(
             or ""
         ).strip()
 
+        # La URL firmada solo hace falta si no hay storage_name; para el
+        # resto se genera recién si falla la lectura desde storage.
         public_url = ""
 
-        try:
-            public_url = (image_field.url or "").strip()
-        except Exception:
-            public_url = ""
+        if not storage_name:
+            try:
+                public_url = (image_field.url or "").strip()
+            except Exception:
+                public_url = ""
 
         extension = guess_extension(
             storage_name or public_url,
@@ -596,47 +606,22 @@ def read_evidence_bytes(
     pero centralizado para descarga manual y worker.
     """
 
-    if storage is not None and storage_name:
-        try:
-            with storage.open(
-                storage_name,
-                "rb",
-            ) as file_handle:
-                return file_handle.read()
-
-        except Exception as exc:
-            logger.warning(
-                "Client submission ZIP: storage read failed " "for '%s': %s",
-                storage_name,
-                exc,
-            )
-
-    if public_url and (
-        public_url.startswith("http://") or public_url.startswith("https://")
-    ):
-        try:
-            response = requests.get(
-                public_url,
-                timeout=timeout,
-            )
-
-            response.raise_for_status()
-
-            return response.content
-
-        except Exception as exc:
-            logger.warning(
-                "Client submission ZIP: URL download failed " "for '%s': %s",
-                public_url,
-                exc,
+    try:
+        return EvidenceFetcher(
+            max_workers=1,
+            timeout=timeout,
+            log_prefix="Client submission ZIP",
+        ).read(
+            EvidenceSource(
+                key=storage_name,
+                storage=storage,
+                storage_name=storage_name,
+                url=public_url,
             )
-
-    raise ZipEvidenceReadError(
-        (
-            "Could not read evidence from storage or URL. "
-            f"Storage name: {storage_name or 'empty'}"
         )
-    )
+
+    except EvidenceReadError as exc:
+        raise ZipEvidenceReadError(str(exc)) from exc
 
 
 def get_evidence_by_id(
@@ -699,6 +684,9 @@ def generate_project_zip(
         podemos usar fail_if_any_evidence_fails=True
         si decidimos exigir que absolutamente todas las fotos
         estén disponibles antes del envío.
+
+    Las evidencias se descargan en paralelo con EvidenceFetcher y se
+    escriben en el orden del manifest.
     """
 
     manifest = build_project_zip_manifest(billing_session)
@@ -708,66 +696,79 @@ def generate_project_zip(
     added_count = 0
     failed_count = 0
 
-    try:
-        with zipfile.ZipFile(
-            zip_path,
-            mode="w",
-            compression=zipfile.ZIP_DEFLATED,
-            compresslevel=6,
-        ) as zip_file:
+    evidences_by_id = {
+        evidence.pk: evidence
+        for _assignment, evidence in iter_session_evidences(billing_session)
+    }
 
-            for entry in manifest.entries:
-                evidence = get_evidence_by_id(
-                    billing_session,
-                    entry.evidence_id,
-                )
+    def _sources():
+        nonlocal failed_count
 
-                if evidence is None:
-                    failed_count += 1
+        for entry in manifest.entries:
+            evidence = evidences_by_id.get(entry.evidence_id)
 
-                    message = f"Evidence #{entry.evidence_id} " "could not be found."
+            if evidence is None:
+                failed_count += 1
 
-                    logger.warning(message)
+                message = f"Evidence #{entry.evidence_id} " "could not be found."
 
-                    if fail_if_any_evidence_fails:
-                        raise ZipEvidenceReadError(message)
+                logger.warning(message)
 
-                    continue
+                if fail_if_any_evidence_fails:
+                    raise ZipEvidenceReadError(message)
 
-                image_field = getattr(
-                    evidence,
-                    "imagen",
-                    None,
-                )
+                continue
 
-                if not image_field:
-                    failed_count += 1
+            image_field = getattr(
+                evidence,
+                "imagen",
+                None,
+            )
 
-                    message = (
-                        f"Evidence #{entry.evidence_id} " "does not contain an image."
-                    )
+            if not image_field:
+                failed_count += 1
 
-                    if fail_if_any_evidence_fails:
-                        raise ZipEvidenceReadError(message)
+                message = f"Evidence #{entry.evidence_id} " "does not contain an image."
+
+                if fail_if_any_evidence_fails:
+                    raise ZipEvidenceReadError(message)
 
-                    continue
+                continue
 
-                storage = getattr(
+            yield EvidenceSource(
+                key=entry,
+                storage=getattr(
                     image_field,
                     "storage",
                     None,
-                )
+                ),
+                storage_name=entry.storage_name,
+                url=entry.public_url or (lambda field=image_field: field.url),
+            )
+
+    fetcher = EvidenceFetcher(
+        log_prefix="Client submission ZIP",
+    )
+
+    try:
+        with zipfile.ZipFile(
+            zip_path,
+            mode="w",
+            compression=zipfile.ZIP_DEFLATED,
+            compresslevel=6,
+        ) as zip_file:
+
+            for result in fetcher.iter_fetch(_sources()):
+                entry = result.source.key
 
                 try:
-                    data = read_evidence_bytes(
-                        storage=storage,
-                        storage_name=entry.storage_name,
-                        public_url=entry.public_url,
-                    )
+                    if not result.ok:
+                        raise ZipEvidenceReadError(str(result.error))
 
-                    zip_file.writestr(
+                    write_zip_entry(
+                        zip_file,
                         entry.archive_path,
-                        data,
+                        result.data,
                     )
 
                     added_count += 1
@@ -21,6 +21,7 @@ from client_submissions.services.billing_mapper import (
 from client_submissions.services.submission_builder import (
     EmptyBillingSelectionError, InvalidBatchConfigurationError,
     create_submission_batch, revalidate_batch, revalidate_submission)
+from core.worker_wakeup import QUEUE_CLIENT_SUBMISSIONS, notify_worker
 from operaciones.models import SesionBilling
 from usuarios.decoradores import rol_requerido
 
@@ -1967,6 +1968,8 @@ def batch_start(
         },
     )
 
+    notify_worker(QUEUE_CLIENT_SUBMISSIONS)
+
     # ========================================================
     # Resultado
     # ========================================================
@@ -0,0 +1,42 @@
+from django.contrib import admin
+
+from .models import BackgroundTask
+
+# =============================================================================
+# COLA DE TAREAS
+# =============================================================================
+
+
+@admin.register(BackgroundTask)
+class BackgroundTaskAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "func",
+        "queue",
+        "priority",
+        "status",
+        "attempts",
+        "max_attempts",
+        "run_after",
+        "locked_by",
+        "created_at",
+        "finished_at",
+    )
+
+    list_filter = (
+        "status",
+        "queue",
+    )
+
+    search_fields = (
+        "func",
+        "dedupe_key",
+        "locked_by",
+    )
+
+    readonly_fields = (
+        "created_at",
+        "started_at",
+        "finished_at",
+        "heartbeat_at",
+    )
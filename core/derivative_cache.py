@@ -0,0 +1,313 @@
+# core/derivative_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# Entradas usadas hace menos de esto no se desalojan: un reporte en
+# curso puede tener la ruta guardada hasta que cierra el workbook.
+EVICTION_GRACE_SECONDS = 3600
+
+INDEX_NAME = "index.sqlite3"
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def derivative_cache_dir() -> Path:
+    configured = getattr(settings, "DERIVATIVE_CACHE_DIR", None) or os.getenv(
+        "DERIVATIVE_CACHE_DIR",
+        "",
+    )
+
+    if configured:
+        return Path(configured)
+
+    return Path(tempfile.gettempdir()) / "hyperlink_derivatives"
+
+
+def derivative_cache_max_bytes() -> int:
+    value = getattr(settings, "DERIVATIVE_CACHE_MAX_BYTES", None)
+
+    if value is None:
+        value = os.getenv("DERIVATIVE_CACHE_MAX_BYTES", str(DEFAULT_MAX_BYTES))
+
+    try:
+        return max(int(value), 0)
+    except Exception:
+        return DEFAULT_MAX_BYTES
+
+
+def derivative_key(storage_name: str, variant: str) -> str:
+    """
+    Key de un derivado: nombre en storage + variante ("report-jpeg:1600:q75").
+
+    Los nombres en storage no se sobrescriben (AWS_S3_FILE_OVERWRITE =
+    False), así que no hace falta consultar el storage para armar el key.
+    """
+    return hashlib.sha1(f"{storage_name}|{variant}".encode("utf-8")).hexdigest()
+
+
+class DerivativeCache:
+    """
+    Caché en disco de derivados de imágenes (JPEG de reporte, recortes
+    para OCR...), compartido por todos los procesos del host.
+
+    - Archivos: <root>/<key[:2]>/<key><suffix>, escritos en un temporal
+      y publicados con os.replace (nadie ve un archivo a medias).
+    - Índice LRU en SQLite (<root>/index.sqlite3): tamaño, último uso y
+      metadatos (p.ej. ancho/alto) de cada derivado.
+    - Presupuesto max_bytes (0 = sin límite): al superarlo se borran
+      los menos usados, salvo los usados en la última hora.
+    - Métricas de hits/misses acumuladas en el mismo índice (stats()).
+    """
+
+    def __init__(self, root: Path | None = None, max_bytes: int | None = None):
+        self.root = Path(root or derivative_cache_dir())
+        self.max_bytes = (
+            derivative_cache_max_bytes() if max_bytes is None else int(max_bytes)
+        )
+
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        self._local = threading.local()
+
+        with self._db() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL, "
+                "last_used REAL NOT NULL, meta TEXT NOT NULL DEFAULT '{}')"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS counters ("
+                "name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+
+    # ========================================================
+    # Índice
+    # ========================================================
+
+    def _db(self) -> "_Transaction":
+        """
+        Una conexión por hilo; WAL permite lectores y un escritor
+        concurrentes entre procesos.
+        """
+        db = getattr(self._local, "db", None)
+
+        if db is None:
+            db = sqlite3.connect(
+                str(self.root / INDEX_NAME),
+                timeout=30,
+                isolation_level=None,
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+
+            self._local.db = db
+
+        return _Transaction(db)
+
+    def _count(self, db, name: str):
+        db.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    # ========================================================
+    # Lectura / escritura
+    # ========================================================
+
+    def get(self, key: str):
+        """
+        (path, meta) si el derivado existe, o None. Cuenta hit/miss.
+        """
+        now = time.time()
+
+        with self._db() as db:
+            row = db.execute(
+                "SELECT path, meta FROM entries WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+            if row is not None and os.path.exists(row[0]):
+                db.execute(
+                    "UPDATE entries SET last_used = ? WHERE key = ?",
+                    (now, key),
+                )
+                self._count(db, "hits")
+
+                return Path(row[0]), json.loads(row[1] or "{}")
+
+            if row is not None:
+                # Archivo borrado fuera del caché.
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+            self._count(db, "misses")
+
+        return None
+
+    def put(self, key: str, build, suffix: str = ".jpg"):
+        """
+        Genera el derivado con build(tmp_path) -> meta (dict) y lo publica.
+        Devuelve (path, meta).
+        """
+        final_path = self.root / key[:2] / f"{key}{suffix}"
+        final_path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = final_path.with_name(f"{final_path.name}.{uuid.uuid4().hex}.tmp")
+
+        try:
+            meta = build(str(tmp_path)) or {}
+            os.replace(tmp_path, final_path)
+        finally:
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+
+        size = final_path.stat().st_size
+
+        with self._db() as db:
+            db.execute(
+                "INSERT INTO entries (key, path, size, last_used, meta) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET path = excluded.path, "
+                "size = excluded.size, last_used = excluded.last_used, "
+                "meta = excluded.meta",
+                (key, str(final_path), size, time.time(), json.dumps(meta)),
+            )
+
+        self.evict()
+
+        return final_path, meta
+
+    def get_or_create(
+        self,
+        storage_name: str,
+        variant: str,
+        build,
+        suffix: str = ".jpg",
+    ):
+        """
+        Derivado de storage_name para variant; si no existe lo genera
+        con build(tmp_path) -> meta. Devuelve (path, meta).
+
+        Dos workers que generan el mismo derivado a la vez escriben cada
+        uno su temporal; el último os.replace gana y ambos resultados
+        son equivalentes.
+        """
+        key = derivative_key(storage_name, variant)
+
+        found = self.get(key)
+
+        if found is not None:
+            return found
+
+        return self.put(key, build, suffix=suffix)
+
+    # ========================================================
+    # Desalojo y métricas
+    # ========================================================
+
+    def evict(self):
+        if self.max_bytes <= 0:
+            return
+
+        with self._db() as db:
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+            if total <= self.max_bytes:
+                return
+
+            # Se baja al 90% para no desalojar en cada escritura.
+            target = int(self.max_bytes * 0.9)
+            cutoff = time.time() - EVICTION_GRACE_SECONDS
+
+            rows = db.execute(
+                "SELECT key, path, size FROM entries "
+                "WHERE last_used < ? ORDER BY last_used",
+                (cutoff,),
+            ).fetchall()
+
+            for key, path, size in rows:
+                if total <= target:
+                    break
+
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    continue
+
+                db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+
+                self._count(db, "evictions")
+
+    def stats(self) -> dict:
+        with self._db() as db:
+            counters = dict(db.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        }
+
+
+class _Transaction:
+    """
+    BEGIN IMMEDIATE ... COMMIT sobre una conexión en autocommit.
+    """
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+def get_derivative_cache() -> DerivativeCache:
+    """
+    Caché compartido del proceso (uno por directorio configurado).
+    """
+    root = derivative_cache_dir()
+
+    with _caches_lock:
+        cache = _caches.get(root)
+
+        if cache is None:
+            cache = DerivativeCache(root=root)
+            _caches[root] = cache
+
+    return cache
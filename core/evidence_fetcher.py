@@ -0,0 +1,256 @@
+# core/evidence_fetcher.py
+from __future__ import annotations
+
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator
+
+import requests
+from django.conf import settings
+
+from core.storage_gateway import client_for_storage, get_object_bytes, storage_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FETCH_TIMEOUT_SECONDS = 30
+
+
+def evidence_fetch_workers() -> int:
+    """
+    Descargas simultáneas de evidencias desde Wasabi.
+    """
+    value = getattr(settings, "EVIDENCE_FETCH_WORKERS", None) or os.getenv(
+        "EVIDENCE_FETCH_WORKERS",
+        "8",
+    )
+
+    try:
+        return max(int(value), 1)
+    except Exception:
+        return 8
+
+
+class EvidenceReadError(Exception):
+    """
+    No se pudo leer la evidencia ni desde storage ni desde URL.
+    """
+
+
+@dataclass(frozen=True)
+class EvidenceSource:
+    """
+    Evidencia a descargar.
+
+    key:
+        identificador libre del caller (evidencia, entrada del manifest...).
+
+    url:
+        URL pública o callable que la genera. Solo se usa si falla la
+        lectura desde storage, por lo que una URL firmada no se genera
+        para las evidencias que se leen bien.
+    """
+
+    key: object
+    storage: object
+    storage_name: str
+    url: str | Callable[[], str] = ""
+
+    def resolve_url(self) -> str:
+        try:
+            value = self.url() if callable(self.url) else self.url
+        except Exception:
+            return ""
+
+        return (value or "").strip()
+
+
+@dataclass
+class EvidenceFetchResult:
+    source: EvidenceSource
+    data: bytes | None = None
+    error: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.data is not None
+
+
+class EvidenceFetcher:
+    """
+    Descarga evidencias en paralelo con un pool de hilos acotado.
+
+    - Storage S3/Wasabi (django-storages): cliente compartido de
+      core.storage_gateway, con su política de reintentos. Cada
+      evidencia es un GET, sin HEAD (exists/open) previo.
+    - Otros storages: storage.open().
+    - Si la lectura principal falla, se genera la URL y se intenta
+      descargar por HTTP.
+
+    iter_fetch() entrega los resultados en el mismo orden de sources,
+    con a lo sumo `window` descargas en memoria a la vez
+    (2 * max_workers por defecto).
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: int | None = None,
+        timeout: int = DEFAULT_FETCH_TIMEOUT_SECONDS,
+        log_prefix: str = "Evidence fetch",
+        window: int | None = None,
+    ):
+        self.max_workers = max(int(max_workers or evidence_fetch_workers()), 1)
+        self.window = max(int(window or self.max_workers * 2), 1)
+        self.timeout = timeout
+        self.log_prefix = log_prefix
+
+        self._clients = {}
+
+    # ========================================================
+    # Lectura
+    # ========================================================
+
+    def _s3_client(self, storage):
+        """
+        Cliente boto3 del storage, o None si no es un storage S3.
+
+        iter_fetch() lo resuelve en el hilo que lo llama: si el storage
+        no usa las credenciales del proyecto se toma su propia conexión,
+        que en django-storages es por hilo.
+        """
+        if storage is None:
+            return None
+
+        cache_key = id(storage)
+
+        if cache_key not in self._clients:
+            try:
+                client = client_for_storage(storage)
+            except Exception:
+                client = None
+
+            self._clients[cache_key] = client
+
+        return self._clients[cache_key]
+
+    def _read_primary(self, source: EvidenceSource) -> bytes:
+        storage = source.storage
+
+        client = self._s3_client(storage)
+
+        if client is not None:
+            return get_object_bytes(
+                storage_key(storage, source.storage_name),
+                bucket=storage.bucket_name,
+                client=client,
+            )
+
+        with storage.open(
+            source.storage_name,
+            "rb",
+        ) as file_handle:
+            return file_handle.read()
+
+    def _read_url(self, url: str) -> bytes:
+        response = requests.get(
+            url,
+            timeout=self.timeout,
+        )
+
+        response.raise_for_status()
+
+        return response.content
+
+    def read(self, source: EvidenceSource) -> bytes:
+        """
+        Lee una evidencia. Lanza EvidenceReadError si no se pudo.
+        """
+        if source.storage is not None and source.storage_name:
+            try:
+                return self._read_primary(source)
+
+            except Exception as exc:
+                logger.warning(
+                    "%s: storage read failed for '%s': %s",
+                    self.log_prefix,
+                    source.storage_name,
+                    exc,
+                )
+
+        url = source.resolve_url()
+
+        if url.startswith("http://") or url.startswith("https://"):
+            try:
+                return self._read_url(url)
+
+            except Exception as exc:
+                logger.warning(
+                    "%s: URL download failed for '%s': %s",
+                    self.log_prefix,
+                    url,
+                    exc,
+                )
+
+        raise EvidenceReadError(
+            (
+                "Could not read evidence from storage or URL. "
+                f"Storage name: {source.storage_name or 'empty'}"
+            )
+        )
+
+    # ========================================================
+    # Descarga en paralelo
+    # ========================================================
+
+    def _fetch(self, source: EvidenceSource) -> EvidenceFetchResult:
+        try:
+            return EvidenceFetchResult(
+                source=source,
+                data=self.read(source),
+            )
+
+        except Exception as exc:
+            return EvidenceFetchResult(
+                source=source,
+                error=exc,
+            )
+
+    def iter_fetch(
+        self,
+        sources: Iterable[EvidenceSource],
+    ) -> Iterator[EvidenceFetchResult]:
+        window = self.window
+
+        pending = deque()
+
+        executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="evidence_fetch",
+        )
+
+        try:
+            for source in sources:
+                while len(pending) >= window:
+                    yield pending.popleft().result()
+
+                self._s3_client(source.storage)
+
+                pending.append(
+                    executor.submit(
+                        self._fetch,
+                        source,
+                    )
+                )
+
+            while pending:
+                yield pending.popleft().result()
+
+        finally:
+            executor.shutdown(
+                wait=False,
+                cancel_futures=True,
+            )
+
@@ -0,0 +1,585 @@
+# core/facets.py
+"""
+Facetas para los filtros tipo Excel de los listados.
+
+Los dropdowns de filtro tipo Excel necesitan, por columna, los valores
+distintos del listado filtrado. En vez de cargar todas las filas y
+armar sets en Python, FacetSet lo resuelve en SQL:
+
+- Opciones: values(campos).annotate(Count) (GROUP BY) por columna, con
+  cuántas filas tiene cada valor. Las etiquetas se arman sobre los
+  valores distintos (pocos), no sobre las filas.
+- Filtros: las etiquetas elegidas se traducen a los valores crudos que
+  las producen y se filtra en SQL (subconsulta pk__in).
+- Caché: las opciones, por columna y estado de filtros (hash del SQL
+  del queryset), en el caché compartido (core.shared_cache), bajo un
+  namespace que se invalida (una vez por transacción) al guardar o
+  borrar cualquiera de los modelos de origen; de los usuarios solo
+  cuentan los campos que salen en las etiquetas. Los filtros se
+  resuelven siempre sin caché: un .update() masivo no dispara señales
+  y no debe esconder filas.
+
+Las columnas cuya etiqueta se arma con varias filas relacionadas
+también se resuelven en SQL:
+
+- Una etiqueta por fila (p.ej. la lista de técnicos de un billing): una
+  subconsulta con GroupConcat como annotation de la columna.
+- Columnas multivalor (una opción por fila relacionada): related=, que
+  devuelve querysets con facet_pk y facet_label; se agrupan por
+  facet_label y se filtran con subconsultas pk__in. Las filas sin
+  ninguna etiqueta toman "—".
+
+Solo las etiquetas que no se pueden armar en SQL usan rows=: una función
+que devuelve pares (pk, etiqueta) y que se recorre en Python cuando se
+pide o se filtra esa columna.
+
+Las etiquetas vacías ("") no se ofrecen como opción.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Aggregate, Count, F, Func, Q, TextField, Value
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from core.shared_cache import bump_namespace, namespaced_key
+
+EMPTY_LABEL = "—"
+
+# Campos de usuario que forman los nombres de las etiquetas. Un login
+# (update_fields=["last_login"]) no invalida las facetas.
+USER_NAME_FIELDS = ("first_name", "last_name", "username")
+
+
+class GroupConcat(Aggregate):
+    """
+    Concatena los valores del grupo con `delimiter`, en el orden de
+    `ordering`: STRING_AGG en PostgreSQL y GROUP_CONCAT en SQLite (el
+    ORDER BY interno requiere SQLite 3.44+).
+    """
+
+    function = "GROUP_CONCAT"
+    name = "GroupConcat"
+    output_field = TextField()
+
+    def __init__(self, expression, delimiter, *, ordering, **extra):
+        if isinstance(ordering, str):
+            ordering = F(ordering)
+
+        super().__init__(expression, Value(delimiter), ordering, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        expression, delimiter, ordering = self.source_expressions
+
+        expression_sql, expression_params = compiler.compile(expression)
+        delimiter_sql, delimiter_params = compiler.compile(delimiter)
+        ordering_sql, ordering_params = compiler.compile(ordering)
+
+        function = "STRING_AGG" if connection.vendor == "postgresql" else self.function
+
+        return (
+            f"{function}({expression_sql}, {delimiter_sql} ORDER BY {ordering_sql})",
+            (*expression_params, *delimiter_params, *ordering_params),
+        )
+
+
+class StripText(Func):
+    """
+    Quita espacios, tabs y saltos de línea de ambos extremos, como
+    str.strip() (TRIM de SQL solo quita espacios).
+    """
+
+    function = "TRIM"
+    output_field = TextField()
+
+    WHITESPACE = " \t\n\r\x0b\x0c"
+
+    def __init__(self, expression, **extra):
+        super().__init__(expression, Value(self.WHITESPACE), **extra)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function="BTRIM", **extra_context)
+
+
+def facet_cache_seconds() -> int:
+    value = getattr(settings, "FACET_CACHE_SECONDS", None) or os.getenv(
+        "FACET_CACHE_SECONDS", "300"
+    )
+
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return 300
+
+
+def parse_excel_filters(raw_value) -> dict[str, set[str]]:
+    """
+    {columna: {etiquetas}} desde el JSON de excel_filters del GET.
+    Ignora columnas sin valores o con formato inválido.
+    """
+    try:
+        parsed = json.loads(raw_value) if raw_value else {}
+    except Exception:
+        parsed = {}
+
+    excel_filters = {}
+
+    if isinstance(parsed, dict):
+        for key, values in parsed.items():
+            if not isinstance(values, list):
+                continue
+
+            clean_values = {str(v) for v in values if str(v).strip() != ""}
+
+            if clean_values:
+                excel_filters[str(key)] = clean_values
+
+    return excel_filters
+
+
+def instance_labels(model, empty=EMPTY_LABEL):
+    """
+    labels= para una columna FK: str() de cada instancia, con una sola
+    consulta por los ids distintos.
+    """
+
+    def _labels(raw_values):
+        model_cls = apps.get_model(model) if isinstance(model, str) else model
+        ids = {values[0] for values in raw_values if values[0] is not None}
+
+        by_pk = {
+            obj.pk: str(obj)
+            for obj in model_cls._default_manager.filter(pk__in=ids)
+        }
+
+        return [by_pk.get(values[0], empty) for values in raw_values]
+
+    return _labels
+
+
+class FacetColumn:
+    """
+    Una columna filtrable.
+
+    fields:      campos (lookups del ORM o alias de annotations) cuyos
+                 valores distintos definen la columna.
+    label:       f(*valores) -> etiqueta visible. Por defecto
+                 str(valor or "—") del primer campo.
+    labels:      alternativa en lote: f([valores, ...]) -> [etiquetas]
+                 (para resolver etiquetas con una consulta extra).
+    annotations: expresiones a anotar antes de agrupar (p.ej. TruncDate).
+    related:     f(queryset) -> [querysets con facet_pk y facet_label]
+                 para columnas multivalor. Excluye fields.
+    rows:        f(queryset) -> [(pk, etiqueta)] para columnas que no se
+                 pueden armar en SQL. Excluye fields.
+    """
+
+    def __init__(
+        self,
+        key,
+        fields=(),
+        *,
+        label=None,
+        labels=None,
+        annotations=None,
+        related=None,
+        rows=None,
+    ):
+        self.key = str(key)
+        self.fields = (fields,) if isinstance(fields, str) else tuple(fields)
+        self.label = label
+        self.labels = labels
+        self.annotations = dict(annotations or {})
+        self.related = related
+        self.rows = rows
+
+        if [bool(self.fields), bool(related), bool(rows)].count(True) != 1:
+            raise ValueError(
+                f"Facet column {self.key} needs exactly one of fields, related or rows."
+            )
+
+    @property
+    def is_sql(self) -> bool:
+        return bool(self.fields)
+
+    def make_labels(self, raw_values) -> list[str]:
+        if self.labels is not None:
+            return [str(v) for v in self.labels(raw_values)]
+
+        if self.label is not None:
+            return [str(self.label(*values)) for values in raw_values]
+
+        return [str(values[0] or EMPTY_LABEL) for values in raw_values]
+
+    def row_labels(self, qs):
+        for pk, label in self.rows(qs):
+            yield pk, str(label or EMPTY_LABEL)
+
+
+class FacetSet:
+    """
+    Columnas filtrables de un listado, con caché compartido.
+
+    namespace: prefijo de caché; se invalida (bump) al confirmar
+               cualquier escritura de `models`, una sola vez por
+               transacción.
+    models:    modelos de origen ("app.Model" o clases), o pares
+               (modelo, campos): ese modelo solo invalida al borrarse o
+               cuando cambia alguno de los campos.
+    """
+
+    def __init__(
+        self,
+        namespace,
+        columns,
+        *,
+        models=(),
+        timeout=None,
+        sort_key=None,
+    ):
+        self.namespace = f"facets:{namespace}"
+        self.columns = {column.key: column for column in columns}
+        self.timeout = timeout
+        self.sort_key = sort_key or (lambda value: value.lower())
+        self._pending = threading.local()
+
+        for model in models:
+            if isinstance(model, (list, tuple)):
+                model, fields = model
+            else:
+                fields = None
+
+            self._connect_invalidation(model, fields)
+
+    # ------------------------------------------------------------
+    # Invalidación
+    # ------------------------------------------------------------
+
+    def invalidate(self):
+        bump_namespace(self.namespace)
+
+    def _schedule_invalidate(self):
+        # Después del commit: antes, otra request podría recalcular con
+        # los datos viejos y guardarlos con la versión nueva. Varias
+        # escrituras en la misma transacción terminan en un solo bump:
+        # el primer callback lo hace y los siguientes no hacen nada.
+        self._pending.dirty = True
+
+        transaction.on_commit(self._flush_invalidate)
+
+    def _flush_invalidate(self):
+        if not getattr(self._pending, "dirty", False):
+            return
+
+        self._pending.dirty = False
+
+        self.invalidate()
+
+    def _on_write(self, sender, **kwargs):
+        self._schedule_invalidate()
+
+    def _snapshot_key(self):
+        return f"_facet_snapshot:{self.namespace}"
+
+    def _field_values(self, instance, fields):
+        return tuple(getattr(instance, field, None) for field in fields)
+
+    def _connect_invalidation(self, model, fields=None):
+        label = model if isinstance(model, str) else model._meta.label
+        uid = f"core.facets:{self.namespace}:{label}"
+
+        post_delete.connect(
+            self._on_write,
+            sender=model,
+            weak=False,
+            dispatch_uid=f"{uid}:delete",
+        )
+
+        if not fields:
+            post_save.connect(
+                self._on_write,
+                sender=model,
+                weak=False,
+                dispatch_uid=f"{uid}:save",
+            )
+            return
+
+        fields = tuple(fields)
+
+        def _before_save(sender, instance, update_fields=None, **kwargs):
+            # save() completo de una fila existente: se guardan los
+            # valores actuales para ver después si cambió algo.
+            if update_fields is not None or instance._state.adding or instance.pk is None:
+                return
+
+            before = (
+                sender._default_manager.filter(pk=instance.pk)
+                .values_list(*fields)
+                .first()
+            )
+
+            instance.__dict__[self._snapshot_key()] = before
+
+        def _after_save(sender, instance, created, update_fields=None, **kwargs):
+            before = instance.__dict__.pop(self._snapshot_key(), None)
+
+            # Una fila nueva aún no aparece en ninguna etiqueta: lo hará
+            # al guardarse la fila que la referencia.
+            if created:
+                return
+
+            if update_fields is not None:
+                changed = not set(update_fields).isdisjoint(fields)
+            else:
+                changed = before is None or tuple(before) != self._field_values(
+                    instance,
+                    fields,
+                )
+
+            if changed:
+                self._schedule_invalidate()
+
+        pre_save.connect(
+            _before_save,
+            sender=model,
+            weak=False,
+            dispatch_uid=f"{uid}:pre_save",
+        )
+        post_save.connect(
+            _after_save,
+            sender=model,
+            weak=False,
+            dispatch_uid=f"{uid}:save",
+        )
+
+    # ------------------------------------------------------------
+    # Grupos (valores crudos, etiqueta, cantidad)
+    # ------------------------------------------------------------
+
+    def has_column(self, key) -> bool:
+        return str(key) in self.columns
+
+    def _cache_key(self, qs, key) -> str:
+        sql, params = qs.order_by().query.sql_with_params()
+        digest = hashlib.sha1(
+            repr((qs.model._meta.label, sql, params)).encode("utf-8")
+        ).hexdigest()
+
+        return namespaced_key(self.namespace, f"{key}:{digest}")
+
+    def groups(self, qs, key) -> list[tuple]:
+        """
+        [(valores, etiqueta, cantidad)] de una columna para el queryset.
+        """
+        column = self.columns[str(key)]
+
+        if qs.query.is_empty():
+            return []
+
+        cache_key = self._cache_key(qs, column.key)
+
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if column.is_sql:
+            groups = self._sql_groups(column, qs)
+        elif column.related:
+            groups = self._related_groups(column, qs)
+        else:
+            counts = Counter(label for _pk, label in column.row_labels(qs))
+            groups = [((), label, count) for label, count in counts.items()]
+
+        timeout = self.timeout if self.timeout is not None else facet_cache_seconds()
+        cache.set(cache_key, groups, timeout)
+
+        return groups
+
+    def _sql_groups(self, column, qs) -> list[tuple]:
+        base = qs.order_by()
+
+        if column.annotations:
+            base = base.annotate(**column.annotations)
+
+        rows = list(
+            base.values_list(*column.fields)
+            .annotate(_facet_count=Count("pk", distinct=True))
+            .order_by()
+        )
+
+        raw_values = [tuple(row[:-1]) for row in rows]
+        labels = column.make_labels(raw_values)
+
+        return [
+            (values, label, row[-1])
+            for values, label, row in zip(raw_values, labels, rows)
+        ]
+
+    def _related_groups(self, column, qs) -> list[tuple]:
+        counts = Counter()
+        sources = column.related(qs)
+
+        for source in sources:
+            rows = (
+                source.values("facet_label")
+                .annotate(_facet_count=Count("facet_pk", distinct=True))
+                .values_list("facet_label", "_facet_count")
+                .order_by()
+            )
+
+            for label, count in rows:
+                counts[str(label or EMPTY_LABEL)] += count
+
+        empty = qs.order_by().exclude(self._related_cond(sources)).count()
+        if empty:
+            counts[EMPTY_LABEL] += empty
+
+        return [((), label, count) for label, count in counts.items()]
+
+    def _related_cond(self, sources, selected=None):
+        # Filas con alguna etiqueta (de las elegidas, si se indican).
+        cond = Q()
+
+        for source in sources:
+            if selected is not None:
+                source = source.filter(facet_label__in=selected)
+
+            cond |= Q(pk__in=source.values("facet_pk"))
+
+        return cond
+
+    # ------------------------------------------------------------
+    # Opciones
+    # ------------------------------------------------------------
+
+    def options(self, qs, key) -> list[dict]:
+        """
+        [{"value": etiqueta, "count": filas}] ordenados por etiqueta.
+        """
+        merged = {}
+
+        for _values, label, count in self.groups(qs, key):
+            if label:
+                merged[label] = merged.get(label, 0) + count
+
+        return [
+            {"value": label, "count": merged[label]}
+            for label in sorted(merged, key=self.sort_key)
+        ]
+
+    def payload(self, qs, keys=None) -> dict:
+        """
+        Respuesta JSON de los endpoints de opciones: excel_global
+        ({col: [etiquetas]}, el formato que usan las plantillas) y
+        excel_counts ({col: {etiqueta: filas}}).
+        """
+        keys = [str(k) for k in keys] if keys else list(self.columns)
+
+        excel_global = {}
+        excel_counts = {}
+
+        for key in keys:
+            if key not in self.columns:
+                continue
+
+            options = self.options(qs, key)
+
+            excel_global[key] = [o["value"] for o in options]
+            excel_counts[key] = {o["value"]: o["count"] for o in options}
+
+        return {
+            "ok": True,
+            "excel_global": excel_global,
+            "excel_counts": excel_counts,
+        }
+
+    # ------------------------------------------------------------
+    # Filtros
+    # ------------------------------------------------------------
+
+    def filter(self, qs, excel_filters):
+        """
+        Aplica {columna: etiquetas} en SQL. Las columnas que el FacetSet
+        no conoce se ignoran.
+        """
+        base = qs
+
+        for key, selected in (excel_filters or {}).items():
+            column = self.columns.get(str(key))
+            if column is None:
+                continue
+
+            selected = {str(v) for v in selected or ()}
+            if not selected:
+                continue
+
+            if column.related:
+                sources = column.related(base)
+                cond = self._related_cond(sources, selected)
+
+                if EMPTY_LABEL in selected:
+                    cond |= ~self._related_cond(sources)
+
+                qs = qs.filter(cond)
+                continue
+
+            # rows=: etiquetas armadas en Python, se recorre el listado.
+            if not column.is_sql:
+                qs = qs.filter(
+                    pk__in=[
+                        pk for pk, label in column.row_labels(base) if label in selected
+                    ]
+                )
+                continue
+
+            matching = [
+                values for values, label, _count in self._sql_groups(column, base)
+                if label in selected
+            ]
+
+            if not matching:
+                return qs.none()
+
+            qs = qs.filter(pk__in=self._matching_pks(column, qs.model, matching))
+
+        return qs
+
+    def _matching_pks(self, column, model, matching):
+        inner = model._default_manager.all()
+
+        if column.annotations:
+            inner = inner.annotate(**column.annotations)
+
+        def _eq(field, value):
+            if value is None:
+                return Q(**{f"{field}__isnull": True})
+            return Q(**{field: value})
+
+        cond = Q()
+
+        if len(column.fields) == 1:
+            field = column.fields[0]
+            values = {values[0] for values in matching}
+            non_null = [v for v in values if v is not None]
+
+            if non_null:
+                cond |= Q(**{f"{field}__in": non_null})
+            if None in values:
+                cond |= _eq(field, None)
+        else:
+            for values in matching:
+                part = Q()
+                for field, value in zip(column.fields, values):
+                    part &= _eq(field, value)
+                cond |= part
+
+        return inner.filter(cond).values("pk")
@@ -0,0 +1,69 @@
+# core/management/commands/cache_stats.py
+
+from __future__ import annotations
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+
+from core.shared_cache import TieredCache, cache_stats
+
+
+class Command(BaseCommand):
+    """
+    Muestra las métricas del caché compartido (core/shared_cache.py).
+
+    "all processes" es el acumulado que cada worker vuelca en la tabla
+    del caché cada STATS_FLUSH_SECONDS; "this process" solo cuenta las
+    operaciones de este comando.
+    """
+
+    help = "Shows hit/miss statistics of the shared cache."
+
+    def add_arguments(
+        self,
+        parser,
+    ):
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Reset the shared counters after printing them.",
+        )
+
+    def handle(
+        self,
+        *args,
+        **options,
+    ):
+        cache = caches["default"]
+        stats = cache_stats()
+
+        if not isinstance(cache, TieredCache):
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Default cache is {stats['backend']}; no shared statistics."
+                )
+            )
+            return
+
+        self.stdout.write(f"Backend: {stats['backend']} (L2: {stats['l2']})")
+
+        for label, key in (
+            ("All processes", "all_processes"),
+            ("This process", "process"),
+        ):
+            values = stats[key]
+            ratio = values.get("hit_ratio")
+
+            self.stdout.write(
+                (
+                    f"{label}: L1 hits {values['l1_hits']}, "
+                    f"L2 hits {values['l2_hits']}, misses {values['misses']}, "
+                    f"sets {values['sets']}, deletes {values['deletes']}, "
+                    f"errors {values['errors']}, "
+                    f"hit ratio {'-' if ratio is None else f'{ratio:.1%}'}."
+                )
+            )
+
+        if options.get("reset"):
+            cache.reset_shared_stats()
+            self.stdout.write(self.style.SUCCESS("Shared counters reset."))
@@ -0,0 +1,214 @@
+# core/management/commands/run_task_worker.py
+
+from __future__ import annotations
+
+import logging
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from core.task_queue import (claim_task, default_worker_id, execute_task,
+                             purge_finished_tasks, task_lease_seconds)
+from core.worker_wakeup import QUEUE_TASKS, WorkerWakeupListener
+
+logger = logging.getLogger(__name__)
+
+# Limpieza de tareas terminadas: una vez por hora.
+PURGE_INTERVAL_SECONDS = 3600
+
+
+class Command(BaseCommand):
+    """
+    Worker de la cola durable de tareas (core/task_queue.py).
+
+    Ejecuta las BackgroundTask de a una, fuera del proceso web:
+    reportes fotográficos, backfill de light levels, derivados de
+    evidencias...
+
+    - Reclama con lease y lo renueva (heartbeat) mientras la tarea
+      corre; si este proceso muere, otro worker la retoma al vencer
+      el lease.
+    - Una tarea que falla se reprograma con backoff exponencial hasta
+      agotar max_attempts.
+    - SIGTERM/SIGINT: termina la tarea en curso y sale (deploys).
+
+    Para más capacidad se levantan más procesos; cada uno toma
+    tareas distintas.
+    """
+
+    help = "Runs the durable background task queue worker."
+
+    def add_arguments(
+        self,
+        parser,
+    ):
+        parser.add_argument(
+            "--queue",
+            action="append",
+            dest="queues",
+            default=[],
+            help=(
+                "Queue to consume. Repeat for several queues. "
+                "Default: all queues."
+            ),
+        )
+
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=10.0,
+            help=(
+                "Safety-net polling interval when the queue is empty. New "
+                "tasks wake the worker immediately. Default: 10 seconds."
+            ),
+        )
+
+        parser.add_argument(
+            "--lease",
+            type=int,
+            default=0,
+            help=(
+                "Lease seconds per claimed task, renewed while it runs. "
+                "Default: TASK_QUEUE_LEASE_SECONDS (120)."
+            ),
+        )
+
+        parser.add_argument(
+            "--max-tasks",
+            type=int,
+            default=0,
+            help="Exit after this many tasks (0 = run forever).",
+        )
+
+        parser.add_argument(
+            "--keep-days",
+            type=int,
+            default=7,
+            help="Days finished tasks are kept before purging. Default: 7.",
+        )
+
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run every ready task once and exit.",
+        )
+
+    def handle(
+        self,
+        *args,
+        **options,
+    ):
+        queues = [q for q in options.get("queues") or [] if q]
+        sleep_seconds = max(float(options.get("sleep") or 10.0), 0.5)
+        lease_seconds = int(options.get("lease") or 0) or task_lease_seconds()
+        max_tasks = max(int(options.get("max_tasks") or 0), 0)
+        keep_days = max(int(options.get("keep_days") or 7), 1)
+        run_only_once = bool(options.get("once", False))
+
+        worker_id = default_worker_id()
+
+        self._stopping = False
+
+        def _request_stop(signum, frame):
+            self._stopping = True
+            self.stdout.write(
+                self.style.WARNING(
+                    "Stop requested. Finishing the current task before exiting."
+                )
+            )
+
+        signal.signal(signal.SIGTERM, _request_stop)
+        signal.signal(signal.SIGINT, _request_stop)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Task worker {worker_id} started.")
+        )
+
+        self.stdout.write(
+            (
+                f"Queues: {', '.join(queues) if queues else 'all'}. "
+                f"Lease: {lease_seconds}s. "
+                f"Idle sleep: {sleep_seconds}s."
+            )
+        )
+
+        processed = 0
+        last_purge = 0.0
+
+        wakeup = WorkerWakeupListener(queues=[QUEUE_TASKS]).start()
+
+        try:
+            while not self._stopping:
+                close_old_connections()
+
+                if time.monotonic() - last_purge > PURGE_INTERVAL_SECONDS:
+                    last_purge = time.monotonic()
+
+                    try:
+                        purge_finished_tasks(keep_days)
+                    except Exception:
+                        logger.exception("Could not purge finished tasks.")
+
+                try:
+                    task = claim_task(
+                        worker_id,
+                        queues=queues,
+                        lease_seconds=lease_seconds,
+                    )
+                except Exception:
+                    logger.exception("Could not claim a task.")
+                    task = None
+
+                if task is None:
+                    if run_only_once:
+                        break
+
+                    # Una notificación de tarea nueva corta la espera.
+                    wakeup.wait(sleep_seconds)
+                    continue
+
+                self.stdout.write(
+                    (
+                        f"[{timezone.now()}] Task #{task.pk} {task.func} "
+                        f"(attempt {task.attempts}/{task.max_attempts})."
+                    )
+                )
+
+                started = time.monotonic()
+
+                ok = execute_task(task, lease_seconds=lease_seconds)
+
+                close_old_connections()
+
+                elapsed = time.monotonic() - started
+
+                if ok:
+                    self.stdout.write(
+                        self.style.SUCCESS(
+                            f"[{timezone.now()}] Task #{task.pk} done in {elapsed:.1f}s."
+                        )
+                    )
+                else:
+                    self.stderr.write(
+                        self.style.ERROR(
+                            f"[{timezone.now()}] Task #{task.pk} failed after "
+                            f"{elapsed:.1f}s."
+                        )
+                    )
+
+                processed += 1
+
+                if max_tasks and processed >= max_tasks:
+                    break
+
+        finally:
+            wakeup.close()
+
+            close_old_connections()
+
+        self.stdout.write(
+            self.style.WARNING(f"Task worker {worker_id} stopped ({processed} tasks).")
+        )
@@ -0,0 +1,137 @@
+from django.db import models
+from django.utils import timezone
+
+# =============================================================================
+# COLA DE TAREAS EN SEGUNDO PLANO
+# =============================================================================
+
+
+class BackgroundTask(models.Model):
+    """
+    Tarea de la cola durable (core/task_queue.py).
+
+    La ejecuta `manage.py run_task_worker` fuera del proceso web. Un
+    worker la reclama con un lease (locked_until) que renueva mientras
+    corre; si el worker muere (deploy, reciclaje), el lease vence y
+    otro worker la vuelve a tomar.
+    """
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    PRIORITY_LOW = -10
+    PRIORITY_NORMAL = 0
+    PRIORITY_HIGH = 10
+
+    queue = models.CharField(
+        max_length=50,
+        default="default",
+    )
+
+    # Ruta importable de la función, p.ej.
+    # "usuarios.schedulers.procesar_reporte_fotografico_job".
+    func = models.CharField(
+        max_length=255,
+    )
+
+    args = models.JSONField(
+        default=list,
+        blank=True,
+    )
+
+    kwargs = models.JSONField(
+        default=dict,
+        blank=True,
+    )
+
+    # Evita encolar dos veces el mismo trabajo mientras está pendiente
+    # (equivalente al id + replace_existing de APScheduler).
+    dedupe_key = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        db_index=True,
+    )
+
+    priority = models.SmallIntegerField(
+        default=PRIORITY_NORMAL,
+    )
+
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        db_index=True,
+    )
+
+    run_after = models.DateTimeField(
+        default=timezone.now,
+    )
+
+    attempts = models.PositiveIntegerField(
+        default=0,
+    )
+
+    max_attempts = models.PositiveIntegerField(
+        default=3,
+    )
+
+    locked_by = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+    )
+
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+    )
+
+    heartbeat_at = models.DateTimeField(
+        null=True,
+        blank=True,
+    )
+
+    last_error = models.TextField(
+        blank=True,
+        default="",
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+    )
+
+    started_at = models.DateTimeField(
+        null=True,
+        blank=True,
+    )
+
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ("-id",)
+        indexes = [
+            models.Index(
+                fields=["status", "queue", "priority", "run_after"],
+                name="core_task_claim_idx",
+            ),
+            models.Index(
+                fields=["status", "locked_until"],
+                name="core_task_lease_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Task #{self.pk} {self.func} ({self.status})"
@@ -8,7 +8,9 @@ from django.conf import settings
 from django.core.cache import cache
 from django.db import models
 from django.db import models as dj_models
-from django.utils import timezone
+
+from core.principal import get_principal
+from core.shared_cache import bump_namespace, namespaced_key
 
 # Intentamos ubicar modelos sin acoplar el proyecto
 try:
@@ -35,11 +37,8 @@ ACCESS_CONTROL_CACHE_SECONDS = 60 * 5
 
 
 def _user_has_role(user, role_names: Iterable[str]) -> bool:
-    # Soporta M2M 'roles' (modelo Rol con nombre)
-    try:
-        return user.roles.filter(nombre__in=list(role_names)).exists()
-    except Exception:
-        return False
+    # Roles del principal de la request (una consulta por request)
+    return get_principal(user).has_role(list(role_names))
 
 
 def user_has_global_bypass(user) -> bool:
@@ -47,13 +46,7 @@ def user_has_global_bypass(user) -> bool:
     Bypass global si es superuser o tiene alguno de los roles en CORE_BYPASS_ROLES.
     Por defecto, solo 'admin' (además de superuser).
     """
-    if not getattr(user, "is_authenticated", False):
-        return False
-    if getattr(user, "is_superuser", False):
-        return True
-    if BYPASS_ROLES and _user_has_role(user, BYPASS_ROLES):
-        return True
-    return False
+    return get_principal(user).has_global_bypass
 
 
 def user_has_project_access(user, proyecto_id: Optional[int]) -> bool:
@@ -70,40 +63,16 @@ def user_has_project_access(user, proyecto_id: Optional[int]) -> bool:
     if proyecto_id is None:
         # Si no hay proyecto específico, no negamos (se valida en decorador/middleware solo si existe param)
         return True
-    if user_has_global_bypass(user):
+    principal = get_principal(user)
+    if principal.has_global_bypass:
         return True
 
-    # A través de ProyectoAsignacion
-    if ProyectoAsignacion is not None:
-        now = timezone.now()
-        try:
-            exists = (
-                ProyectoAsignacion.objects.filter(
-                    usuario=user,
-                    proyecto_id=proyecto_id,
-                )
-                .filter(
-                    models.Q(include_history=True)
-                    | models.Q(include_history=False, start_at__lte=now)
-                )
-                .exists()
-            )
-            if exists:
-                return True
-        except Exception:
-            pass
-
-    # M2M directo en el usuario
+    # user.proyectos es el M2M a través de ProyectoAsignacion: cualquier
+    # asignación da acceso; las ventanas se aplican en los listados.
     try:
-        if (
-            hasattr(user, "proyectos")
-            and user.proyectos.filter(id=proyecto_id).exists()
-        ):
-            return True
-    except Exception:
-        pass
-
-    return False
+        return int(proyecto_id) in principal.assigned_project_ids
+    except (TypeError, ValueError):
+        return False
 
 
 def projects_ids_for_user(user) -> Set[int]:
@@ -115,35 +84,17 @@ def projects_ids_for_user(user) -> Set[int]:
     if not getattr(user, "is_authenticated", False):
         return ids
 
+    principal = get_principal(user)
+
     # Bypass => todos los proyectos si es posible
-    if user_has_global_bypass(user) and Proyecto is not None:
+    if principal.has_global_bypass and Proyecto is not None:
         try:
             return set(Proyecto.objects.values_list("id", flat=True))
         except Exception:
             pass
 
-    # Through ProyectoAsignacion
-    if ProyectoAsignacion is not None:
-        now = timezone.now()
-        try:
-            asign_ids = (
-                ProyectoAsignacion.objects.filter(usuario=user)
-                .filter(
-                    models.Q(include_history=True)
-                    | models.Q(include_history=False, start_at__lte=now)
-                )
-                .values_list("proyecto_id", flat=True)
-            )
-            ids.update(asign_ids)
-        except Exception:
-            pass
-
-    # M2M directo
-    try:
-        if hasattr(user, "proyectos"):
-            ids.update(user.proyectos.values_list("id", flat=True))
-    except Exception:
-        pass
+    # Asignaciones del principal (user.proyectos usa el mismo through)
+    ids.update(principal.assigned_project_ids)
 
     return ids
 
@@ -325,6 +276,58 @@ def filter_queryset_by_assignment_history(
     return qs.filter(cond)
 
 
+def filter_queryset_by_project_window(
+    qs,
+    user,
+    project_field: str = "proyecto_ref",
+    date_field: str = "creado_en",
+    by_date: bool = False,
+):
+    """
+    Restringe un queryset por proyecto con la ventana de ProyectoAsignacion,
+    en SQL (un EXISTS contra las asignaciones del usuario):
+      - include_history=True o sin start_at -> todo el historial
+      - include_history=False -> solo registros con date_field >= start_at
+
+    Sin asignaciones, se limita a projects_ids_for_user (bypass o M2M).
+
+    project_field: FK al proyecto en el modelo de qs (ej: 'proyecto_ref')
+    date_field:    campo fecha/hora del registro (ej: 'creado_en')
+    by_date:       compara por día (hora local) en vez de por fecha y hora
+    """
+    if not getattr(user, "is_authenticated", False):
+        return qs.none()
+
+    if ProyectoAsignacion is None:
+        return filter_queryset_by_access(qs, user, project_field)
+
+    asignaciones = ProyectoAsignacion.objects.filter(usuario=user)
+
+    if not get_principal(user).assignments:
+        if user_has_global_bypass(user):
+            return qs.filter(**{f"{project_field}__isnull": False})
+
+        allowed = projects_ids_for_user(user)
+        if not allowed:
+            return qs.none()
+        return qs.filter(**{f"{project_field}__in": list(allowed)})
+
+    if by_date:
+        window = models.Q(start_at__date__lte=models.OuterRef(f"{date_field}__date"))
+    else:
+        window = models.Q(start_at__lte=models.OuterRef(date_field))
+
+    return qs.filter(
+        models.Exists(
+            asignaciones.filter(proyecto=models.OuterRef(project_field)).filter(
+                models.Q(include_history=True)
+                | models.Q(start_at__isnull=True)
+                | window
+            )
+        )
+    )
+
+
 # ==========================================================
 # Access Matrix permissions
 # ==========================================================
@@ -342,24 +345,7 @@ def get_user_access_role_names(user):
     if not user or not getattr(user, "is_authenticated", False):
         return []
 
-    role_names = []
-
-    try:
-        if hasattr(user, "roles"):
-            for role in user.roles.all():
-                name = (
-                    getattr(role, "nombre", None)
-                    or getattr(role, "name", None)
-                    or str(role)
-                )
-                name = normalize_access_role_name(name)
-
-                if name:
-                    role_names.append(name)
-    except Exception:
-        role_names = []
-
-    return role_names
+    return sorted(get_principal(user).role_names)
 
 
 def user_can(user, permission_key):
@@ -390,10 +376,13 @@ def user_can(user, permission_key):
     if not role_names:
         return False
 
-    cache_key = "access_control:user_can:{}:{}:{}".format(
-        getattr(user, "pk", "anon"),
-        permission_key,
-        ",".join(sorted(role_names)),
+    cache_key = namespaced_key(
+        "access_control",
+        "user_can:{}:{}:{}".format(
+            getattr(user, "pk", "anon"),
+            permission_key,
+            ",".join(sorted(role_names)),
+        ),
     )
 
     cached = cache.get(cache_key)
@@ -419,4 +408,5 @@ def user_can(user, permission_key):
 
 
 def clear_access_control_cache():
-    cache.clear()
+    # Solo el namespace de Access Control, en todos los procesos.
+    bump_namespace("access_control")
@@ -0,0 +1,178 @@
+# core/principal.py
+"""
+Principal de la request: roles, asignaciones a proyectos y bypass del
+usuario, cargados una sola vez.
+
+Una página típica pregunta por los roles muchas veces (rol_requerido,
+CustomUser.tiene_rol / es_*, context processors, ProjectAccessMiddleware,
+user_can...). Todos consultan get_principal(user), que se guarda en la
+instancia del usuario: como AuthenticationMiddleware carga un usuario
+nuevo por request, el principal vive lo mismo que la request.
+
+PrincipalMiddleware además lo deja en request.principal.
+"""
+
+from __future__ import annotations
+
+from functools import cached_property
+
+from django.utils.functional import SimpleLazyObject
+
+PRINCIPAL_ATTR = "_request_principal"
+
+
+def _normalize(name) -> str:
+    return str(name or "").strip().lower()
+
+
+class Principal:
+    """
+    Vista memoizada de los permisos de un usuario.
+
+    - raw_role_names: 1 consulta, la primera vez que se pide;
+      role_names son los mismos normalizados (strip + minúsculas).
+    - assignments: 1 consulta, solo si se pregunta por proyectos.
+    - permission_keys: permisos habilitados de la Access Matrix
+      (los llena access_control.services).
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.is_authenticated = bool(getattr(user, "is_authenticated", False))
+        self.is_superuser = bool(getattr(user, "is_superuser", False))
+        self.permission_keys: frozenset[str] | None = None
+
+    # ------------------------------------------------------------
+    # Roles
+    # ------------------------------------------------------------
+
+    @cached_property
+    def raw_role_names(self) -> frozenset[str]:
+        """
+        Rol.nombre tal como está en la base.
+        """
+        if not self.is_authenticated or not hasattr(self.user, "roles"):
+            return frozenset()
+
+        try:
+            names = self.user.roles.values_list("nombre", flat=True)
+            return frozenset(n for n in names if n)
+        except Exception:
+            return frozenset()
+
+    @cached_property
+    def role_names(self) -> frozenset[str]:
+        return frozenset(
+            _normalize(n) for n in self.raw_role_names if _normalize(n)
+        )
+
+    def has_role(self, *roles, ignore_case=False) -> bool:
+        """
+        True si el usuario tiene alguno de los roles. Compara el nombre
+        exacto, como roles.filter(nombre__in=...); con ignore_case=True
+        compara normalizado (CustomUser.tiene_rol).
+        Acepta has_role("admin", "pm") o has_role(["admin"]).
+        """
+        if len(roles) == 1 and isinstance(roles[0], (list, tuple, set, frozenset)):
+            roles = tuple(roles[0])
+
+        if ignore_case:
+            wanted = {_normalize(r) for r in roles if _normalize(r)}
+            names = self.role_names
+        else:
+            wanted = {str(r) for r in roles if r}
+            names = self.raw_role_names
+
+        return bool(wanted) and not names.isdisjoint(wanted)
+
+    @cached_property
+    def has_global_bypass(self) -> bool:
+        """
+        Superuser o algún rol de CORE_BYPASS_ROLES (por defecto 'admin').
+        """
+        if not self.is_authenticated:
+            return False
+
+        if self.is_superuser:
+            return True
+
+        from core.permissions import BYPASS_ROLES
+
+        return bool(BYPASS_ROLES) and self.has_role(BYPASS_ROLES)
+
+    # ------------------------------------------------------------
+    # Proyectos
+    # ------------------------------------------------------------
+
+    @cached_property
+    def assignments(self) -> list[tuple]:
+        """
+        [(proyecto_id, include_history, start_at)] de ProyectoAsignacion.
+        """
+        if not self.is_authenticated:
+            return []
+
+        try:
+            from usuarios.models import ProyectoAsignacion
+
+            return list(
+                ProyectoAsignacion.objects.filter(usuario=self.user).values_list(
+                    "proyecto_id",
+                    "include_history",
+                    "start_at",
+                )
+            )
+        except Exception:
+            return []
+
+    @cached_property
+    def assigned_project_ids(self) -> frozenset[int]:
+        return frozenset(pid for pid, _history, _start in self.assignments)
+
+
+def get_principal(user) -> Principal:
+    """
+    Principal memoizado en la instancia del usuario (uno por request).
+    """
+    if user is None:
+        return Principal(None)
+
+    principal = getattr(user, PRINCIPAL_ATTR, None)
+
+    if principal is None:
+        principal = Principal(user)
+
+        try:
+            setattr(user, PRINCIPAL_ATTR, principal)
+        except Exception:
+            pass
+
+    return principal
+
+
+def reset_principal(user):
+    """
+    Descarta el principal memoizado (p.ej. tras cambiar los roles del
+    propio usuario dentro de la misma request).
+    """
+    try:
+        delattr(user, PRINCIPAL_ATTR)
+    except Exception:
+        pass
+
+
+class PrincipalMiddleware:
+    """
+    Expone request.principal (perezoso: no consulta nada hasta usarse).
+    Va después de AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.principal = SimpleLazyObject(
+            lambda: get_principal(getattr(request, "user", None))
+        )
+
+        return self.get_response(request)
@@ -0,0 +1,445 @@
+# core/shared_cache.py
+"""
+Caché compartido entre procesos (workers de gunicorn y run_task_worker)
+sin servicios externos.
+
+TieredCache es un backend de Django con dos niveles:
+
+- L1: LocMemCache del proceso con TTL corto (L1_TIMEOUT, 5 s).
+- L2: otro alias de CACHES que ven todos los procesos; por defecto
+  "shared", un DatabaseCache en la tabla core_cache.
+
+Lo que un proceso escribe o borra lo ven los demás, a más tardar, en
+L1_TIMEOUT segundos. Para invalidar al instante en todos los procesos
+están los contadores de versión por namespace (namespaced_key /
+bump_namespace): la versión vive en L2 y su copia en L1 dura solo
+L1_VERSION_TIMEOUT (1 s); al subirla, las keys viejas dejan de usarse.
+
+Lo que no puede servirse viejo después de un delete (tokens de un solo
+uso) va directo a L2 con shared_cache().
+
+Métricas (cache_stats): hits de L1 y L2, misses, escrituras y errores
+de L2 por proceso, acumulados en L2 cada STATS_FLUSH_SECONDS para ver
+el total de todos los procesos (`manage.py cache_stats`).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_L2_ALIAS = "shared"
+DEFAULT_L1_TIMEOUT = 5.0
+DEFAULT_L1_VERSION_TIMEOUT = 1.0
+DEFAULT_L1_MAX_ENTRIES = 1000
+
+STATS_FLUSH_SECONDS = 30
+STATS_KEY_PREFIX = "core_cache_stats:"
+STATS_FIELDS = ("l1_hits", "l2_hits", "misses", "sets", "deletes", "errors")
+
+NAMESPACE_KEY_PREFIX = "core_cache_ns:"
+
+_MISSING = object()
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals = dict.fromkeys(STATS_FIELDS, 0)
+        self.pending = dict.fromkeys(STATS_FIELDS, 0)
+        self.last_flush = time.monotonic()
+
+    def add(self, field: str, n: int = 1):
+        with self._lock:
+            self.totals[field] += n
+            self.pending[field] += n
+
+    def take_pending(self) -> dict:
+        """
+        Deltas pendientes de acumular en L2, o {} si aún no toca.
+        """
+        with self._lock:
+            if time.monotonic() - self.last_flush < STATS_FLUSH_SECONDS:
+                return {}
+
+            self.last_flush = time.monotonic()
+            pending = {k: v for k, v in self.pending.items() if v}
+            self.pending = dict.fromkeys(STATS_FIELDS, 0)
+
+        return pending
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.totals)
+
+
+class TieredCache(BaseCache):
+    """
+    L1 en memoria del proceso delante de un caché compartido (L2).
+
+    OPTIONS:
+      L2                  alias del caché compartido ("shared")
+      L1_TIMEOUT          segundos máximos de una copia en L1 (5)
+      L1_VERSION_TIMEOUT  segundos de una versión de namespace en L1 (1)
+      L1_MAX_ENTRIES      entradas en L1 (1000)
+
+    Si L2 falla (p.ej. falta la tabla), se registra y se sigue solo con
+    L1: el caché nunca rompe una request.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+
+        options = params.get("OPTIONS", {}) or {}
+
+        self.l2_alias = options.get("L2", DEFAULT_L2_ALIAS)
+        self.l1_timeout = float(options.get("L1_TIMEOUT", DEFAULT_L1_TIMEOUT))
+        self.l1_version_timeout = float(
+            options.get("L1_VERSION_TIMEOUT", DEFAULT_L1_VERSION_TIMEOUT)
+        )
+
+        self.l1 = LocMemCache(
+            f"core-shared-cache-l1:{location or 'default'}",
+            {
+                "TIMEOUT": self.l1_timeout,
+                "OPTIONS": {
+                    "MAX_ENTRIES": int(
+                        options.get("L1_MAX_ENTRIES", DEFAULT_L1_MAX_ENTRIES)
+                    ),
+                },
+            },
+        )
+
+        self.stats = _Stats()
+
+    @property
+    def l2(self) -> BaseCache:
+        # caches[...] ya es una instancia por hilo.
+        return caches[self.l2_alias]
+
+    # ------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------
+
+    def _l1_ttl(self, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+
+        if timeout is None:
+            return self.l1_timeout
+
+        return min(float(timeout), self.l1_timeout)
+
+    def _l2_call(self, method: str, *args, default=None, **kwargs):
+        try:
+            return getattr(self.l2, method)(*args, **kwargs)
+        except Exception:
+            self.stats.add("errors")
+            logger.warning("Shared cache %s failed.", method, exc_info=True)
+            return default
+
+    def _after_op(self):
+        pending = self.stats.take_pending()
+
+        for field, delta in pending.items():
+            key = f"{STATS_KEY_PREFIX}{field}"
+
+            try:
+                if not self.l2.add(key, delta, timeout=None):
+                    self.l2.incr(key, delta)
+            except Exception:
+                logger.debug("Could not flush cache stats.", exc_info=True)
+                return
+
+    # ------------------------------------------------------------
+    # API de BaseCache
+    # ------------------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        value = self.l1.get(key, _MISSING, version=version)
+
+        if value is not _MISSING:
+            self.stats.add("l1_hits")
+            return value
+
+        value = self._l2_call("get", key, _MISSING, version=version, default=_MISSING)
+
+        if value is _MISSING:
+            self.stats.add("misses")
+            self._after_op()
+            return default
+
+        self.stats.add("l2_hits")
+        self.l1.set(key, value, self.l1_timeout, version=version)
+        self._after_op()
+
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+
+        for key in keys:
+            value = self.l1.get(key, _MISSING, version=version)
+
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+
+        self.stats.add("l1_hits", len(found))
+
+        if missing:
+            from_l2 = self._l2_call("get_many", missing, version=version, default={})
+
+            for key, value in from_l2.items():
+                self.l1.set(key, value, self.l1_timeout, version=version)
+
+            found.update(from_l2)
+
+            self.stats.add("l2_hits", len(from_l2))
+            self.stats.add("misses", len(missing) - len(from_l2))
+            self._after_op()
+
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._l2_call("set", key, value, timeout=timeout, version=version)
+
+        l1_ttl = self._l1_ttl(timeout)
+        if l1_ttl > 0:
+            self.l1.set(key, value, l1_ttl, version=version)
+        else:
+            self.l1.delete(key, version=version)
+
+        self.stats.add("sets")
+        self._after_op()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self._l2_call(
+            "set_many",
+            data,
+            timeout=timeout,
+            version=version,
+            default=list(data),
+        )
+
+        l1_ttl = self._l1_ttl(timeout)
+        for key, value in data.items():
+            if l1_ttl > 0:
+                self.l1.set(key, value, l1_ttl, version=version)
+
+        self.stats.add("sets", len(data))
+        self._after_op()
+
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self._l2_call(
+            "add",
+            key,
+            value,
+            timeout=timeout,
+            version=version,
+            default=False,
+        )
+
+        if added:
+            l1_ttl = self._l1_ttl(timeout)
+            if l1_ttl > 0:
+                self.l1.set(key, value, l1_ttl, version=version)
+            self.stats.add("sets")
+        else:
+            self.l1.delete(key, version=version)
+
+        self._after_op()
+
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._l2_call("touch", key, timeout=timeout, version=version, default=False)
+
+    def delete(self, key, version=None):
+        self.l1.delete(key, version=version)
+        deleted = self._l2_call("delete", key, version=version, default=False)
+
+        self.stats.add("deletes")
+        self._after_op()
+
+        return deleted
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+
+        self.l1.delete_many(keys, version=version)
+        self._l2_call("delete_many", keys, version=version)
+
+        self.stats.add("deletes", len(keys))
+        self._after_op()
+
+    def has_key(self, key, version=None):
+        if self.l1.has_key(key, version=version):
+            return True
+
+        return bool(self._l2_call("has_key", key, version=version, default=False))
+
+    def incr(self, key, delta=1, version=None):
+        self.l1.delete(key, version=version)
+
+        # ValueError (key inexistente) se propaga como en cualquier backend.
+        return self.l2.incr(key, delta, version=version)
+
+    def clear(self):
+        self.l1.clear()
+        self._l2_call("clear")
+
+    def close(self, **kwargs):
+        # L2 es otro alias de CACHES: Django ya lo cierra.
+        pass
+
+    # ------------------------------------------------------------
+    # Versiones por namespace
+    # ------------------------------------------------------------
+
+    def namespace_version(self, namespace: str) -> int:
+        key = f"{NAMESPACE_KEY_PREFIX}{namespace}"
+
+        version = self.l1.get(key)
+        if version is not None:
+            return version
+
+        version = self._l2_call("get", key)
+
+        if version is None:
+            # Versión inicial; si otro proceso se adelantó, gana la suya.
+            version = time.time_ns()
+            if not self._l2_call("add", key, version, timeout=None, default=False):
+                version = self._l2_call("get", key) or version
+
+        self.l1.set(key, version, self.l1_version_timeout)
+
+        return version
+
+    def bump_namespace(self, namespace: str) -> int:
+        key = f"{NAMESPACE_KEY_PREFIX}{namespace}"
+
+        # Timestamp y no incr(): dos bumps simultáneos no pueden dejar la
+        # versión anterior (DatabaseCache.incr no es atómico).
+        version = time.time_ns()
+
+        self._l2_call("set", key, version, timeout=None)
+        self.l1.set(key, version, self.l1_version_timeout)
+
+        return version
+
+    def shared_stats(self) -> dict:
+        stats = dict.fromkeys(STATS_FIELDS, 0)
+
+        values = self._l2_call(
+            "get_many",
+            [f"{STATS_KEY_PREFIX}{f}" for f in STATS_FIELDS],
+            default={},
+        )
+
+        for key, value in values.items():
+            stats[key[len(STATS_KEY_PREFIX):]] = int(value or 0)
+
+        return stats
+
+    def reset_shared_stats(self):
+        self._l2_call("delete_many", [f"{STATS_KEY_PREFIX}{f}" for f in STATS_FIELDS])
+
+
+# ============================================================
+# Helpers
+# ============================================================
+
+
+def _default_cache():
+    return caches["default"]
+
+
+def shared_cache() -> BaseCache:
+    """
+    Caché sin L1 (el L2 de TieredCache, o el caché por defecto si no es
+    TieredCache): un delete se ve al instante en todos los procesos.
+    """
+    cache = _default_cache()
+
+    if isinstance(cache, TieredCache):
+        return cache.l2
+
+    return cache
+
+
+def namespace_version(namespace: str) -> int:
+    """
+    Versión actual del namespace (compartida por todos los procesos).
+    """
+    cache = _default_cache()
+
+    if isinstance(cache, TieredCache):
+        return cache.namespace_version(namespace)
+
+    key = f"{NAMESPACE_KEY_PREFIX}{namespace}"
+    version = cache.get(key)
+
+    if version is None:
+        version = time.time_ns()
+        cache.set(key, version, None)
+
+    return version
+
+
+def bump_namespace(namespace: str) -> int:
+    """
+    Invalida todas las keys del namespace en todos los procesos.
+    """
+    cache = _default_cache()
+
+    if isinstance(cache, TieredCache):
+        return cache.bump_namespace(namespace)
+
+    version = time.time_ns()
+    cache.set(f"{NAMESPACE_KEY_PREFIX}{namespace}", version, None)
+
+    return version
+
+
+def namespaced_key(namespace: str, key: str) -> str:
+    """
+    Key versionada: "<namespace>:v<versión>:<key>".
+    """
+    return f"{namespace}:v{namespace_version(namespace)}:{key}"
+
+
+def cache_stats() -> dict:
+    """
+    Métricas del caché: las de este proceso y el acumulado de todos.
+    """
+    cache = _default_cache()
+
+    if not isinstance(cache, TieredCache):
+        return {"backend": type(cache).__name__}
+
+    def _ratio(stats):
+        lookups = stats["l1_hits"] + stats["l2_hits"] + stats["misses"]
+        hits = stats["l1_hits"] + stats["l2_hits"]
+        return round(hits / lookups, 4) if lookups else None
+
+    process = cache.stats.snapshot()
+    shared = cache.shared_stats()
+
+    return {
+        "backend": type(cache).__name__,
+        "l2": cache.l2_alias,
+        "process": {**process, "hit_ratio": _ratio(process)},
+        "all_processes": {**shared, "hit_ratio": _ratio(shared)},
+    }
@@ -0,0 +1,392 @@
+# core/storage_gateway.py
+from __future__ import annotations
+
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Partes de 8 MB para descargas por rangos.
+DEFAULT_RANGE_PART_BYTES = 8 * 1024 * 1024
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _setting(name: str, default: str) -> str:
+    return str(getattr(settings, name, None) or os.getenv(name, default))
+
+
+def storage_max_attempts() -> int:
+    try:
+        return max(int(_setting("STORAGE_GATEWAY_MAX_ATTEMPTS", "4")), 1)
+    except Exception:
+        return 4
+
+
+def storage_backoff_base() -> float:
+    try:
+        return max(float(_setting("STORAGE_GATEWAY_BACKOFF_BASE", "0.5")), 0.0)
+    except Exception:
+        return 0.5
+
+
+def storage_max_pool_connections() -> int:
+    try:
+        return max(int(_setting("STORAGE_GATEWAY_MAX_POOL_CONNECTIONS", "32")), 1)
+    except Exception:
+        return 32
+
+
+# ============================================================
+# Cliente compartido
+# ============================================================
+
+
+def get_s3_client():
+    """
+    Cliente boto3 de Wasabi/S3 compartido por todo el proceso.
+
+    Los clientes boto3 son thread-safe: todos los hilos reutilizan el
+    mismo pool de conexiones HTTPS (keep-alive), por lo que las
+    credenciales y el handshake TLS se resuelven una sola vez.
+
+    Misma configuración que django-storages: endpoint regional,
+    firma s3v4 y path-style.
+    """
+    global _client
+
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None:
+            import boto3
+            from botocore.client import Config
+
+            _client = boto3.session.Session().client(
+                "s3",
+                endpoint_url=getattr(
+                    settings,
+                    "AWS_S3_ENDPOINT_URL",
+                    "https://s3.us-east-1.wasabisys.com",
+                ),
+                region_name=getattr(settings, "AWS_S3_REGION_NAME", "us-east-1"),
+                aws_access_key_id=getattr(settings, "AWS_ACCESS_KEY_ID", None),
+                aws_secret_access_key=getattr(settings, "AWS_SECRET_ACCESS_KEY", None),
+                config=Config(
+                    signature_version="s3v4",
+                    s3={"addressing_style": "path"},
+                    max_pool_connections=storage_max_pool_connections(),
+                    connect_timeout=5,
+                    read_timeout=60,
+                    tcp_keepalive=True,
+                    # botocore reintenta errores de la API (throttling,
+                    # 5xx); retry_call() cubre además los cortes mientras
+                    # se lee el body, que botocore no reintenta.
+                    retries={"max_attempts": 3, "mode": "standard"},
+                ),
+                verify=getattr(settings, "AWS_S3_VERIFY", True),
+            )
+
+    return _client
+
+
+def default_bucket() -> str:
+    return getattr(settings, "AWS_STORAGE_BUCKET_NAME", "") or ""
+
+
+def client_for_storage(storage):
+    """
+    Cliente para un storage de django-storages, o None si no es S3.
+
+    Los storages configurados con las credenciales del proyecto usan el
+    cliente compartido; cualquier otro, el cliente propio del storage.
+    """
+    if storage is None or not getattr(storage, "bucket_name", None):
+        return None
+
+    if not hasattr(storage, "_normalize_name"):
+        return None
+
+    same_account = getattr(storage, "access_key", None) == getattr(
+        settings,
+        "AWS_ACCESS_KEY_ID",
+        None,
+    ) and (getattr(storage, "endpoint_url", None) or None) == (
+        getattr(settings, "AWS_S3_ENDPOINT_URL", None) or None
+    )
+
+    if same_account:
+        return get_s3_client()
+
+    try:
+        return storage.connection.meta.client
+    except Exception:
+        return None
+
+
+def storage_key(storage, name: str) -> str:
+    """
+    Key real en el bucket (incluye el location del storage).
+    """
+    from storages.utils import clean_name
+
+    return storage._normalize_name(clean_name(name))
+
+
+# ============================================================
+# Reintentos
+# ============================================================
+
+# Errores definitivos: reintentar no cambia el resultado.
+_NON_RETRYABLE_CODES = {
+    "NoSuchKey",
+    "NoSuchBucket",
+    "NotFound",
+    "404",
+    "AccessDenied",
+    "403",
+    "InvalidRange",
+    "416",
+}
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (FileNotFoundError, PermissionError, ValueError)):
+        return False
+
+    response = getattr(exc, "response", None)
+
+    if isinstance(response, dict):
+        code = str((response.get("Error") or {}).get("Code") or "")
+
+        if code in _NON_RETRYABLE_CODES:
+            return False
+
+    return True
+
+
+def retry_call(
+    func,
+    *args,
+    attempts: int | None = None,
+    backoff_base: float | None = None,
+    max_delay: float = 30.0,
+    label: str = "storage call",
+    **kwargs,
+):
+    """
+    Política única de reintentos: backoff exponencial con jitter.
+
+    Espera backoff_base * 2^(intento-1) (con tope max_delay) entre
+    intentos y relanza la última excepción al agotarlos. Los errores
+    definitivos (objeto inexistente, acceso denegado) no se reintentan.
+    """
+    attempts = max(int(attempts or storage_max_attempts()), 1)
+
+    if backoff_base is None:
+        backoff_base = storage_backoff_base()
+
+    for attempt in range(1, attempts + 1):
+        try:
+            return func(*args, **kwargs)
+
+        except Exception as exc:
+            if attempt >= attempts or not _is_retryable(exc):
+                raise
+
+            delay = min(max_delay, backoff_base * (2 ** (attempt - 1)))
+            delay *= random.uniform(0.5, 1.0)
+
+            logger.warning(
+                "%s failed (attempt %s/%s): %s. Retrying in %.1fs.",
+                label,
+                attempt,
+                attempts,
+                exc,
+                delay,
+            )
+
+            time.sleep(delay)
+
+
+# ============================================================
+# Lectura
+# ============================================================
+
+
+def _get_object_once(client, bucket, key, byte_range=None) -> bytes:
+    params = {"Bucket": bucket, "Key": key}
+
+    if byte_range is not None:
+        start, end = byte_range
+        params["Range"] = f"bytes={start}-{end}"
+
+    return client.get_object(**params)["Body"].read()
+
+
+def get_object_bytes(
+    key: str,
+    *,
+    bucket: str | None = None,
+    client=None,
+    byte_range: tuple[int, int] | None = None,
+    attempts: int | None = None,
+    backoff_base: float | None = None,
+) -> bytes:
+    """
+    GET de un objeto (o del rango inclusivo byte_range) con reintentos.
+    """
+    return retry_call(
+        _get_object_once,
+        client or get_s3_client(),
+        bucket or default_bucket(),
+        key,
+        byte_range,
+        attempts=attempts,
+        backoff_base=backoff_base,
+        label=f"GET {key}",
+    )
+
+
+def get_object_bytes_parallel(
+    key: str,
+    *,
+    bucket: str | None = None,
+    client=None,
+    part_bytes: int = DEFAULT_RANGE_PART_BYTES,
+    max_workers: int = 4,
+    attempts: int | None = None,
+) -> bytes:
+    """
+    Descarga un objeto grande con GETs por rangos en paralelo.
+
+    Objetos de una sola parte se descargan con un GET normal. Cada
+    rango se reintenta por separado.
+    """
+    client = client or get_s3_client()
+    bucket = bucket or default_bucket()
+
+    size = retry_call(
+        client.head_object,
+        Bucket=bucket,
+        Key=key,
+        attempts=attempts,
+        label=f"HEAD {key}",
+    )["ContentLength"]
+
+    if size <= part_bytes:
+        return get_object_bytes(key, bucket=bucket, client=client, attempts=attempts)
+
+    ranges = [
+        (start, min(start + part_bytes, size) - 1)
+        for start in range(0, size, part_bytes)
+    ]
+
+    with ThreadPoolExecutor(
+        max_workers=max(min(max_workers, len(ranges)), 1),
+        thread_name_prefix="storage_range",
+    ) as executor:
+        parts = executor.map(
+            lambda byte_range: get_object_bytes(
+                key,
+                bucket=bucket,
+                client=client,
+                byte_range=byte_range,
+                attempts=attempts,
+            ),
+            ranges,
+        )
+
+        return b"".join(parts)
+
+
+def read_storage_bytes(
+    storage,
+    name: str,
+    *,
+    attempts: int | None = None,
+    backoff_base: float | None = None,
+) -> bytes:
+    """
+    Lee name desde un storage de Django con la política de reintentos.
+
+    Storages S3: un solo GET con el cliente compartido (sin el HEAD de
+    storage.open()). Otros storages: storage.open().
+    """
+    client = client_for_storage(storage)
+
+    if client is not None:
+        return get_object_bytes(
+            storage_key(storage, name),
+            bucket=storage.bucket_name,
+            client=client,
+            attempts=attempts,
+            backoff_base=backoff_base,
+        )
+
+    def _open_and_read():
+        with storage.open(name, "rb") as fh:
+            return fh.read()
+
+    return retry_call(
+        _open_and_read,
+        attempts=attempts,
+        backoff_base=backoff_base,
+        label=f"open {name}",
+    )
+
+
+def read_fieldfile_bytes(
+    fieldfile,
+    *,
+    attempts: int | None = None,
+    backoff_base: float | None = None,
+) -> bytes:
+    """
+    read_storage_bytes() para un FieldFile/ImageFieldFile.
+    """
+    return read_storage_bytes(
+        fieldfile.storage,
+        fieldfile.name,
+        attempts=attempts,
+        backoff_base=backoff_base,
+    )
+
+
+def map_fieldfiles_bytes(
+    fieldfiles,
+    *,
+    max_workers: int = 8,
+    attempts: int | None = None,
+):
+    """
+    Descarga varios FieldFile en paralelo sobre el cliente compartido.
+
+    Devuelve una lista en el mismo orden con bytes o la excepción
+    de cada archivo.
+    """
+
+    def _read(fieldfile):
+        try:
+            return read_fieldfile_bytes(fieldfile, attempts=attempts)
+        except Exception as exc:
+            return exc
+
+    fieldfiles = list(fieldfiles)
+
+    if not fieldfiles:
+        return []
+
+    with ThreadPoolExecutor(
+        max_workers=max(min(max_workers, len(fieldfiles)), 1),
+        thread_name_prefix="storage_get",
+    ) as executor:
+        return list(executor.map(_read, fieldfiles))
@@ -0,0 +1,396 @@
+# core/task_queue.py
+from __future__ import annotations
+
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.worker_wakeup import QUEUE_TASKS, notify_worker
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = "default"
+
+MODE_QUEUE = "queue"
+MODE_SCHEDULER = "scheduler"
+
+_current = threading.local()
+
+
+def _setting(name: str, default: str) -> str:
+    return str(getattr(settings, name, None) or os.getenv(name, default))
+
+
+def background_tasks_mode() -> str:
+    """
+    "queue": tareas en la tabla BackgroundTask, las ejecuta
+    run_task_worker. "scheduler": APScheduler/hilos dentro del
+    proceso web (solo desarrollo).
+    """
+    mode = _setting("BACKGROUND_TASKS_MODE", MODE_QUEUE).strip().lower()
+
+    return MODE_SCHEDULER if mode == MODE_SCHEDULER else MODE_QUEUE
+
+
+def task_queue_enabled() -> bool:
+    return background_tasks_mode() == MODE_QUEUE
+
+
+def task_lease_seconds() -> int:
+    try:
+        return max(int(_setting("TASK_QUEUE_LEASE_SECONDS", "120")), 10)
+    except Exception:
+        return 120
+
+
+def task_max_attempts() -> int:
+    try:
+        return max(int(_setting("TASK_QUEUE_MAX_ATTEMPTS", "3")), 1)
+    except Exception:
+        return 3
+
+
+def task_retry_backoff() -> float:
+    try:
+        return max(float(_setting("TASK_QUEUE_RETRY_BACKOFF", "30")), 0.0)
+    except Exception:
+        return 30.0
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+# ============================================================
+# Contexto de la tarea en ejecución
+# ============================================================
+
+
+def current_task():
+    """
+    BackgroundTask que se está ejecutando en este hilo, o None.
+    """
+    return getattr(_current, "task", None)
+
+
+def is_task_retry() -> bool:
+    """
+    True si la tarea actual ya se intentó antes (falló o su worker murió
+    a mitad). Los jobs que marcan su propio estado "procesando" lo usan
+    para retomar en vez de salir.
+    """
+    task = current_task()
+
+    return task is not None and task.attempts > 1
+
+
+# ============================================================
+# Encolar
+# ============================================================
+
+
+def _func_path(func) -> str:
+    if isinstance(func, str):
+        return func
+
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+def enqueue_task(
+    func,
+    *args,
+    kwargs: dict | None = None,
+    queue: str = DEFAULT_QUEUE,
+    priority: int | None = None,
+    dedupe_key: str = "",
+    max_attempts: int | None = None,
+    delay_seconds: float = 0,
+):
+    """
+    Encola func(*args, **kwargs) en la cola durable.
+
+    func es una función de nivel de módulo (o su ruta importable);
+    args y kwargs deben ser serializables a JSON.
+
+    Con dedupe_key, si ya hay una tarea pendiente con el mismo key no
+    se crea otra y se devuelve la existente.
+
+    Dentro de una transacción el worker se despierta recién al commit.
+    """
+    from core.models import BackgroundTask
+
+    with transaction.atomic():
+        if dedupe_key:
+            existing = (
+                BackgroundTask.objects.select_for_update()
+                .filter(
+                    dedupe_key=dedupe_key,
+                    status=BackgroundTask.STATUS_PENDING,
+                )
+                .first()
+            )
+
+            if existing is not None:
+                return existing
+
+        task = BackgroundTask.objects.create(
+            queue=queue or DEFAULT_QUEUE,
+            func=_func_path(func),
+            args=list(args),
+            kwargs=dict(kwargs or {}),
+            dedupe_key=dedupe_key or "",
+            priority=(
+                BackgroundTask.PRIORITY_NORMAL if priority is None else int(priority)
+            ),
+            max_attempts=max_attempts or task_max_attempts(),
+            run_after=timezone.now() + timedelta(seconds=max(delay_seconds, 0)),
+        )
+
+    notify_worker(QUEUE_TASKS)
+
+    return task
+
+
+# ============================================================
+# Reclamar / terminar
+# ============================================================
+
+
+def claim_task(
+    worker_id: str,
+    *,
+    queues=None,
+    lease_seconds: int | None = None,
+):
+    """
+    Reclama la próxima tarea lista: mayor prioridad primero y, dentro
+    de la misma prioridad, la más antigua.
+
+    También recupera tareas "running" cuyo lease venció (su worker
+    murió). select_for_update(skip_locked=True) evita que dos workers
+    tomen la misma fila.
+    """
+    from core.models import BackgroundTask
+
+    lease_seconds = lease_seconds or task_lease_seconds()
+    now = timezone.now()
+
+    with transaction.atomic():
+        qs = BackgroundTask.objects.select_for_update(skip_locked=True).filter(
+            Q(status=BackgroundTask.STATUS_PENDING, run_after__lte=now)
+            | Q(status=BackgroundTask.STATUS_RUNNING, locked_until__lt=now)
+        )
+
+        if queues:
+            qs = qs.filter(queue__in=list(queues))
+
+        for task in qs.order_by("-priority", "run_after", "id")[:10]:
+            if (
+                task.status == BackgroundTask.STATUS_RUNNING
+                and task.attempts >= task.max_attempts
+            ):
+                # El worker murió durante el último intento.
+                task.status = BackgroundTask.STATUS_FAILED
+                task.finished_at = now
+                task.locked_until = None
+                task.last_error = (
+                    f"Lease expired on {task.locked_by} "
+                    f"(attempt {task.attempts}/{task.max_attempts})."
+                )
+                task.save(
+                    update_fields=[
+                        "status",
+                        "finished_at",
+                        "locked_until",
+                        "last_error",
+                    ]
+                )
+                continue
+
+            if task.status == BackgroundTask.STATUS_RUNNING:
+                logger.warning(
+                    "Reclaiming task #%s from %s (lease expired).",
+                    task.pk,
+                    task.locked_by,
+                )
+
+            task.status = BackgroundTask.STATUS_RUNNING
+            task.attempts += 1
+            task.locked_by = worker_id
+            task.locked_until = now + timedelta(seconds=lease_seconds)
+            task.heartbeat_at = now
+            task.started_at = now
+            task.finished_at = None
+            task.save(
+                update_fields=[
+                    "status",
+                    "attempts",
+                    "locked_by",
+                    "locked_until",
+                    "heartbeat_at",
+                    "started_at",
+                    "finished_at",
+                ]
+            )
+
+            return task
+
+    return None
+
+
+def complete_task(task):
+    from core.models import BackgroundTask
+
+    BackgroundTask.objects.filter(pk=task.pk, locked_by=task.locked_by).update(
+        status=BackgroundTask.STATUS_DONE,
+        finished_at=timezone.now(),
+        locked_until=None,
+        last_error="",
+    )
+
+
+def fail_task(task, error: str):
+    """
+    Reprograma la tarea con backoff exponencial (con jitter) o la marca
+    como fallida si agotó sus intentos.
+    """
+    from core.models import BackgroundTask
+
+    now = timezone.now()
+    updates = {
+        "locked_until": None,
+        "last_error": (error or "")[-10000:],
+    }
+
+    if task.attempts < task.max_attempts:
+        delay = task_retry_backoff() * (2 ** (task.attempts - 1))
+        delay *= random.uniform(0.5, 1.0)
+
+        updates.update(
+            status=BackgroundTask.STATUS_PENDING,
+            run_after=now + timedelta(seconds=delay),
+            locked_by="",
+        )
+    else:
+        updates.update(
+            status=BackgroundTask.STATUS_FAILED,
+            finished_at=now,
+        )
+
+    BackgroundTask.objects.filter(pk=task.pk, locked_by=task.locked_by).update(
+        **updates
+    )
+
+
+class TaskHeartbeat:
+    """
+    Renueva el lease de la tarea desde un hilo mientras se ejecuta.
+
+    Renueva cada lease/3 segundos: una pausa larga (GC, I/O lento)
+    no alcanza a dejar vencer el lease de una tarea viva.
+    """
+
+    def __init__(self, task, lease_seconds: int | None = None):
+        self.task = task
+        self.lease_seconds = lease_seconds or task_lease_seconds()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(
+            target=self._run,
+            name=f"task_heartbeat_{self.task.pk}",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join(timeout=10)
+
+    def _run(self):
+        from core.models import BackgroundTask
+
+        interval = max(self.lease_seconds / 3.0, 1.0)
+
+        try:
+            while not self._stop.wait(interval):
+                now = timezone.now()
+
+                try:
+                    updated = BackgroundTask.objects.filter(
+                        pk=self.task.pk,
+                        locked_by=self.task.locked_by,
+                        status=BackgroundTask.STATUS_RUNNING,
+                    ).update(
+                        locked_until=now + timedelta(seconds=self.lease_seconds),
+                        heartbeat_at=now,
+                    )
+                except Exception:
+                    logger.warning(
+                        "Heartbeat failed for task #%s.",
+                        self.task.pk,
+                        exc_info=True,
+                    )
+                    continue
+
+                if not updated:
+                    logger.warning(
+                        "Task #%s is no longer leased by %s.",
+                        self.task.pk,
+                        self.task.locked_by,
+                    )
+                    return
+        finally:
+            connection.close()
+
+
+def execute_task(task, *, lease_seconds: int | None = None) -> bool:
+    """
+    Ejecuta una tarea ya reclamada, con heartbeat, y registra el
+    resultado. Devuelve True si terminó sin error.
+    """
+    _current.task = task
+
+    try:
+        with TaskHeartbeat(task, lease_seconds):
+            func = import_string(task.func)
+            func(*(task.args or []), **(task.kwargs or {}))
+
+    except Exception:
+        logger.exception("Task #%s (%s) failed.", task.pk, task.func)
+        fail_task(task, traceback.format_exc())
+        return False
+
+    finally:
+        _current.task = None
+
+    complete_task(task)
+
+    return True
+
+
+def purge_finished_tasks(older_than_days: int = 7) -> int:
+    """
+    Borra tareas terminadas (done) más antiguas que older_than_days.
+    Las fallidas se conservan para revisarlas.
+    """
+    from core.models import BackgroundTask
+
+    deleted, _ = BackgroundTask.objects.filter(
+        status=BackgroundTask.STATUS_DONE,
+        finished_at__lt=timezone.now() - timedelta(days=older_than_days),
+    ).delete()
+
+    return deleted
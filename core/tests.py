@@ -0,0 +1,273 @@
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import BackgroundTask
+from core.principal import get_principal
+from core.shared_cache import TieredCache, shared_cache
+from core.task_queue import (claim_task, current_task, enqueue_task,
+                             execute_task, fail_task, is_task_retry)
+
+CALLS = []
+
+
+def _ok_task(value):
+    CALLS.append((value, current_task().pk, is_task_retry()))
+
+
+def _failing_task():
+    raise RuntimeError("boom")
+
+
+@override_settings(TASK_QUEUE_RETRY_BACKOFF=30)
+class TaskQueueTests(TestCase):
+    """
+    Cola durable: reclamo, lease vencido, reintentos con backoff.
+    """
+
+    def setUp(self):
+        CALLS.clear()
+
+    def _expire_lease(self, task):
+        BackgroundTask.objects.filter(pk=task.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1),
+        )
+
+    def test_claim_orders_by_priority_then_age(self):
+        low = enqueue_task(_ok_task, 1, priority=BackgroundTask.PRIORITY_LOW)
+        first = enqueue_task(_ok_task, 2)
+        high = enqueue_task(_ok_task, 3, priority=BackgroundTask.PRIORITY_HIGH)
+        second = enqueue_task(_ok_task, 4)
+
+        claimed = [claim_task("w1").pk for _ in range(4)]
+
+        self.assertEqual(claimed, [high.pk, first.pk, second.pk, low.pk])
+        self.assertIsNone(claim_task("w1"))
+
+        task = BackgroundTask.objects.get(pk=high.pk)
+        self.assertEqual(task.status, BackgroundTask.STATUS_RUNNING)
+        self.assertEqual(task.attempts, 1)
+        self.assertEqual(task.locked_by, "w1")
+
+    def test_claim_filters_queue_and_waits_for_run_after(self):
+        enqueue_task(_ok_task, 1, queue="reports")
+        delayed = enqueue_task(_ok_task, 2, delay_seconds=60)
+
+        self.assertIsNone(claim_task("w1", queues=["default"]))
+        self.assertIsNotNone(claim_task("w1", queues=["reports"]))
+
+        BackgroundTask.objects.filter(pk=delayed.pk).update(
+            run_after=timezone.now(),
+        )
+        self.assertEqual(claim_task("w1").pk, delayed.pk)
+
+    def test_dedupe_key_reuses_pending_task(self):
+        task = enqueue_task(_ok_task, 1, dedupe_key="report:1")
+
+        self.assertEqual(enqueue_task(_ok_task, 2, dedupe_key="report:1").pk, task.pk)
+        self.assertEqual(BackgroundTask.objects.count(), 1)
+
+    def test_expired_lease_is_reclaimed(self):
+        task = enqueue_task(_ok_task, 1)
+        claim_task("dead-worker")
+
+        self.assertIsNone(claim_task("w2"))
+
+        self._expire_lease(task)
+
+        reclaimed = claim_task("w2")
+
+        self.assertEqual(reclaimed.pk, task.pk)
+        self.assertEqual(reclaimed.attempts, 2)
+        self.assertEqual(reclaimed.locked_by, "w2")
+
+    def test_expired_lease_on_last_attempt_fails_task(self):
+        task = enqueue_task(_ok_task, 1, max_attempts=1)
+        claim_task("dead-worker")
+        self._expire_lease(task)
+
+        self.assertIsNone(claim_task("w2"))
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, BackgroundTask.STATUS_FAILED)
+        self.assertIn("Lease expired on dead-worker", task.last_error)
+
+    def test_fail_task_backs_off_exponentially(self):
+        enqueue_task(_ok_task, 1)
+
+        for attempt, (low, high) in enumerate([(15, 30), (30, 60)], start=1):
+            with self.subTest(attempt=attempt):
+                BackgroundTask.objects.update(run_after=timezone.now())
+                task = claim_task("w1")
+                self.assertEqual(task.attempts, attempt)
+
+                before = timezone.now()
+                fail_task(task, "boom")
+
+                task.refresh_from_db()
+                delay = (task.run_after - before).total_seconds()
+
+                self.assertEqual(task.status, BackgroundTask.STATUS_PENDING)
+                self.assertEqual(task.locked_by, "")
+                self.assertGreaterEqual(delay, low - 1)
+                self.assertLessEqual(delay, high + 1)
+
+        BackgroundTask.objects.update(run_after=timezone.now())
+        fail_task(claim_task("w1"), "boom")
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, BackgroundTask.STATUS_FAILED)
+        self.assertIsNotNone(task.finished_at)
+
+    def test_execute_task_success(self):
+        task = enqueue_task("core.tests._ok_task", "a")
+
+        self.assertTrue(execute_task(claim_task("w1")))
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, BackgroundTask.STATUS_DONE)
+        self.assertEqual(CALLS, [("a", task.pk, False)])
+        self.assertIsNone(current_task())
+
+    def test_execute_task_failure_schedules_retry(self):
+        task = enqueue_task(_failing_task)
+
+        with mock.patch("core.task_queue.logger"):
+            self.assertFalse(execute_task(claim_task("w1")))
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, BackgroundTask.STATUS_PENDING)
+        self.assertGreater(task.run_after, timezone.now())
+        self.assertIn("RuntimeError: boom", task.last_error)
+
+    def test_retry_is_visible_to_the_job(self):
+        task = enqueue_task(_ok_task, "b")
+        claim_task("dead-worker")
+        self._expire_lease(task)
+
+        execute_task(claim_task("w2"))
+
+        self.assertEqual(CALLS, [("b", task.pk, True)])
+
+
+class PrincipalRoleTests(TestCase):
+    """
+    has_role compara el nombre exacto (como roles.filter(nombre__in=...));
+    tiene_rol no distingue mayúsculas.
+    """
+
+    def setUp(self):
+        from usuarios.models import Rol
+
+        self.user = get_user_model().objects.create(username="role-user")
+        self.user.roles.add(Rol.objects.get_or_create(nombre="Admin ")[0])
+
+    def test_has_role_is_exact(self):
+        principal = get_principal(self.user)
+
+        self.assertTrue(principal.has_role("Admin "))
+        self.assertFalse(principal.has_role("admin"))
+        self.assertFalse(principal.has_global_bypass)
+
+    def test_ignore_case_normalizes(self):
+        principal = get_principal(self.user)
+
+        self.assertTrue(principal.has_role("admin", ignore_case=True))
+        self.assertTrue(self.user.tiene_rol("ADMIN"))
+        self.assertEqual(principal.role_names, {"admin"})
+        self.assertEqual(principal.raw_role_names, {"Admin "})
+
+
+class SharedCacheTests(TestCase):
+    """
+    shared_cache() no pasa por L1: un delete de otro proceso se ve al
+    instante.
+    """
+
+    def test_delete_from_other_process_is_visible_at_once(self):
+        other_process = TieredCache("other-process", {"OPTIONS": {"L2": "shared"}})
+
+        shared_cache().set("core-tests:token", "abc", 60)
+        self.assertEqual(shared_cache().get("core-tests:token"), "abc")
+
+        other_process.delete("core-tests:token")
+
+        self.assertIsNone(shared_cache().get("core-tests:token"))
+
+
+class FacetInvalidationTests(TestCase):
+    """
+    Las facetas se invalidan una vez por transacción y solo cuando
+    cambia algo que aparece en sus etiquetas.
+    """
+
+    def setUp(self):
+        from facturacion.facets import CARTOLA_FACETS, INVOICE_FACETS
+        from operaciones.services.billing_facets import BILLING_FACETS
+
+        self.namespaces = {
+            facets.namespace
+            for facets in (BILLING_FACETS, CARTOLA_FACETS, INVOICE_FACETS)
+        }
+
+        self.user = get_user_model().objects.create(username="facet-user")
+
+        bump = mock.patch("core.facets.bump_namespace")
+        self.bump = bump.start()
+        self.addCleanup(bump.stop)
+
+    def _bumped(self):
+        return Counter(
+            call.args[0] for call in self.bump.call_args_list
+            if call.args[0] in self.namespaces
+        )
+
+    def test_many_writes_bump_once_per_namespace(self):
+        from operaciones.models import SesionBilling
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for n in range(5):
+                    SesionBilling.objects.create(proyecto_id=f"F-{n}")
+
+        self.assertEqual(
+            self._bumped(),
+            {"facets:operaciones_billing": 1, "facets:facturacion_invoices": 1},
+        )
+
+    def test_login_does_not_invalidate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.last_login = timezone.now()
+            self.user.save(update_fields=["last_login"])
+
+        self.assertEqual(self._bumped(), {})
+
+    def test_full_save_without_name_change_does_not_invalidate(self):
+        user = get_user_model().objects.get(pk=self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.email = "facet@example.com"
+            user.save()
+
+        self.assertEqual(self._bumped(), {})
+
+    def test_rename_invalidates_every_facet_set(self):
+        user = get_user_model().objects.get(pk=self.user.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.first_name = "Renamed"
+            user.save()
+
+        self.assertEqual(self._bumped(), dict.fromkeys(self.namespaces, 1))
+
+    def test_identidad_change_only_invalidates_cartola(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.identidad = "12.345.678-9"
+            self.user.save(update_fields=["identidad"])
+
+        self.assertEqual(self._bumped(), {"facets:facturacion_cartola": 1})
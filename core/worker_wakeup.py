@@ -0,0 +1,341 @@
+# core/worker_wakeup.py
+from __future__ import annotations
+
+import logging
+import os
+import select
+import socket
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# Canal compartido por todas las colas del worker de Hyperlink.
+WORKER_WAKEUP_CHANNEL = "hyperlink_worker_wakeup"
+
+QUEUE_PLAN_READER = "plan_reader"
+QUEUE_CLIENT_SUBMISSIONS = "client_submissions"
+QUEUE_TASKS = "tasks"
+
+
+def _is_postgresql() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def _signal_path() -> Path:
+    """
+    Ruta base del socket/archivo de señal usado cuando no hay PostgreSQL.
+
+    Web y worker deben compartir el mismo host (desarrollo con SQLite).
+    """
+    configured = getattr(settings, "WORKER_WAKEUP_SIGNAL_PATH", "") or os.getenv(
+        "WORKER_WAKEUP_SIGNAL_PATH", ""
+    )
+
+    if configured:
+        return Path(configured)
+
+    return Path(tempfile.gettempdir()) / "hyperlink_worker_wakeup.sock"
+
+
+def _listener_socket_path(base: Path | None = None) -> Path:
+    """
+    Socket propio de cada listener (<base>.<pid>.sock): varios workers
+    en el mismo host no se quitan la ruta entre sí.
+    """
+    base = base or _signal_path()
+
+    return base.with_name(f"{base.stem}.{os.getpid()}.sock")
+
+
+def _listener_socket_paths() -> list[Path]:
+    base = _signal_path()
+
+    return sorted(base.parent.glob(f"{base.stem}.*.sock"))
+
+
+def _send_local_signal(queue: str) -> None:
+    path = _signal_path()
+    sent = False
+
+    if hasattr(socket, "AF_UNIX"):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+            sock.setblocking(False)
+
+            # Como el canal de PostgreSQL: todos los listeners reciben
+            # la señal y cada uno descarta las colas que no atiende.
+            for target in _listener_socket_paths():
+                try:
+                    sock.sendto(queue.encode("utf-8"), str(target))
+                    sent = True
+                except ConnectionRefusedError:
+                    # Socket de un worker que murió sin cerrarlo.
+                    try:
+                        target.unlink()
+                    except OSError:
+                        pass
+                except OSError:
+                    # Buffer lleno: el listener ya tiene señales pendientes.
+                    sent = True
+
+    if sent:
+        return
+
+    try:
+        path.with_suffix(".signal").touch()
+    except OSError:
+        pass
+
+
+def _send_notification(queue: str) -> None:
+    try:
+        if _is_postgresql():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_notify(%s, %s)",
+                    [WORKER_WAKEUP_CHANNEL, queue],
+                )
+        else:
+            _send_local_signal(queue)
+
+    except Exception:
+        # Despertar al worker es una optimización: el polling del
+        # worker sigue siendo la red de seguridad.
+        logger.warning("Could not wake up the background worker.", exc_info=True)
+
+
+def notify_worker(queue: str = "") -> None:
+    """
+    Despierta al worker compartido apenas se confirma la transacción.
+
+    Se llama en los puntos donde se encola trabajo, por ejemplo:
+    - PlanReaderJob pasa a PENDING;
+    - ClientSubmissionBatch pasa a PENDING;
+    - se encola una BackgroundTask (core/task_queue.py).
+
+    Dentro de una transacción espera al commit para que el worker
+    encuentre la fila ya visible.
+    """
+    transaction.on_commit(lambda: _send_notification(queue or ""))
+
+
+class WorkerWakeupListener:
+    """
+    Espera notificaciones de trabajo nuevo para el worker.
+
+    PostgreSQL:
+        conexión dedicada con LISTEN sobre WORKER_WAKEUP_CHANNEL.
+
+    Otros motores (SQLite en desarrollo):
+        socket Unix de datagramas; si no existe AF_UNIX, se revisa la
+        fecha de modificación de un archivo de señal.
+
+    wait(timeout) vuelve apenas llega una notificación o al cumplirse
+    el timeout, que actúa como intervalo de polling de seguridad.
+
+    queues: colas (QUEUE_*) que atiende el worker; las notificaciones
+    de otras colas no lo despiertan. None = todas.
+    """
+
+    def __init__(self, queues=None):
+        self.queues = frozenset(queues) if queues else None
+        self._pg_conn = None
+        self._socket = None
+        self._socket_path = None
+        self._signal_file = None
+        self._signal_mtime = None
+        self.mode = "sleep"
+
+    # ========================================================
+    # Ciclo de vida
+    # ========================================================
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def start(self):
+        try:
+            if _is_postgresql():
+                self._start_postgresql()
+            else:
+                self._start_local()
+        except Exception:
+            logger.warning(
+                "Worker wakeup listener unavailable. Falling back to polling.",
+                exc_info=True,
+            )
+            self.close()
+            self.mode = "sleep"
+
+        return self
+
+    def _start_postgresql(self):
+        params = connection.get_connection_params()
+        raw = connection.get_new_connection(params)
+        raw.autocommit = True
+
+        with raw.cursor() as cursor:
+            cursor.execute(f'LISTEN "{WORKER_WAKEUP_CHANNEL}"')
+
+        self._pg_conn = raw
+        self.mode = "postgresql"
+
+    def _start_local(self):
+        path = _signal_path()
+
+        if hasattr(socket, "AF_UNIX"):
+            socket_path = _listener_socket_path(path)
+
+            try:
+                socket_path.unlink()
+            except FileNotFoundError:
+                pass
+
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.bind(str(socket_path))
+            sock.setblocking(False)
+
+            self._socket = sock
+            self._socket_path = socket_path
+            self.mode = "socket"
+            return
+
+        self._signal_file = path.with_suffix(".signal")
+        self._signal_mtime = self._current_signal_mtime()
+        self.mode = "file"
+
+    def close(self):
+        if self._pg_conn is not None:
+            try:
+                self._pg_conn.close()
+            except Exception:
+                pass
+
+            self._pg_conn = None
+
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except Exception:
+                pass
+
+            self._socket = None
+
+            try:
+                self._socket_path.unlink()
+            except OSError:
+                pass
+
+            self._socket_path = None
+
+    # ========================================================
+    # Espera
+    # ========================================================
+
+    def _wants(self, queue) -> bool:
+        # Sin cola (notify_worker()) despierta a todos.
+        return self.queues is None or not queue or queue in self.queues
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Retorna True si llegó una notificación, False si venció el timeout.
+        """
+        timeout = max(float(timeout or 0), 0.0)
+
+        try:
+            if self.mode == "postgresql":
+                return self._wait_postgresql(timeout)
+
+            if self.mode == "socket":
+                return self._wait_socket(timeout)
+
+            if self.mode == "file":
+                return self._wait_file(timeout)
+
+        except Exception:
+            logger.warning(
+                "Worker wakeup listener failed. Reconnecting on next wait.",
+                exc_info=True,
+            )
+            self.close()
+            self.start()
+
+        time.sleep(timeout)
+        return False
+
+    def _wait_postgresql(self, timeout):
+        raw = self._pg_conn
+
+        # psycopg 3
+        if callable(getattr(raw, "notifies", None)):
+            received = False
+
+            for notify in raw.notifies(timeout=timeout, stop_after=1):
+                received = self._wants(notify.payload)
+
+            # Descarta notificaciones acumuladas: un solo ciclo las atiende.
+            for notify in raw.notifies(timeout=0):
+                received = received or self._wants(notify.payload)
+
+            return received
+
+        # psycopg2
+        readable, _, _ = select.select([raw], [], [], timeout)
+
+        if not readable:
+            return False
+
+        raw.poll()
+        received = any(self._wants(n.payload) for n in raw.notifies)
+        raw.notifies.clear()
+
+        return received
+
+    def _wait_socket(self, timeout):
+        readable, _, _ = select.select([self._socket], [], [], timeout)
+
+        if not readable:
+            return False
+
+        received = False
+
+        while True:
+            try:
+                queue = self._socket.recv(1024).decode("utf-8", "ignore")
+            except BlockingIOError:
+                break
+
+            received = received or self._wants(queue)
+
+        return received
+
+    def _current_signal_mtime(self):
+        try:
+            return self._signal_file.stat().st_mtime
+        except OSError:
+            return None
+
+    def _wait_file(self, timeout):
+        deadline = time.monotonic() + timeout
+
+        while True:
+            current = self._current_signal_mtime()
+
+            if current != self._signal_mtime:
+                self._signal_mtime = current
+                return True
+
+            remaining = deadline - time.monotonic()
+
+            if remaining <= 0:
+                return False
+
+            time.sleep(min(0.5, remaining))
@@ -0,0 +1,270 @@
+# core/zip_artifact_cache.py
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+def zip_artifact_cache_dir() -> Path:
+    configured = getattr(settings, "ZIP_ARTIFACT_CACHE_DIR", None) or os.getenv(
+        "ZIP_ARTIFACT_CACHE_DIR",
+        "",
+    )
+
+    if configured:
+        return Path(configured)
+
+    return Path(tempfile.gettempdir()) / "hyperlink_zip_cache"
+
+
+def zip_artifact_cache_max_bytes() -> int:
+    """
+    Tamaño máximo del caché en disco. 0 desactiva el caché.
+    """
+    value = getattr(settings, "ZIP_ARTIFACT_CACHE_MAX_BYTES", None)
+
+    if value is None:
+        value = os.getenv(
+            "ZIP_ARTIFACT_CACHE_MAX_BYTES",
+            str(DEFAULT_MAX_BYTES),
+        )
+
+    try:
+        return max(int(value), 0)
+    except Exception:
+        return DEFAULT_MAX_BYTES
+
+
+def zip_fingerprint(*parts) -> str:
+    """
+    SHA-256 de una estructura serializable a JSON (filas de evidencias,
+    parámetros de layout, versión del formato...).
+    """
+    payload = json.dumps(
+        parts,
+        default=str,
+        separators=(",", ":"),
+    )
+
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ZipArtifact:
+    """
+    ZIP (o partes de ZIP) guardado en el caché.
+
+    files:
+        lista de dicts con path, filename y los metadatos que haya
+        guardado el productor (size_bytes, photo_count...).
+    """
+
+    fingerprint: str
+    files: list
+    meta: dict
+
+
+class ZipArtifactWriter:
+    """
+    Escritura de un artefacto nuevo.
+
+    Los archivos se escriben en un directorio temporal dentro del caché
+    y commit() lo publica con un rename atómico: un lector nunca ve un
+    artefacto a medias. abort() descarta lo escrito.
+    """
+
+    def __init__(self, cache: "ZipArtifactCache", fingerprint: str):
+        self.cache = cache
+        self.fingerprint = fingerprint
+
+        self.directory = cache.root / f".tmp-{fingerprint[:16]}-{uuid.uuid4().hex}"
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._files = []
+
+    def add_file(self, filename: str, source_file, **meta) -> Path:
+        """
+        Copia source_file (posicionado al inicio) al artefacto.
+        Deja source_file otra vez al inicio.
+        """
+        path = self.directory / f"{len(self._files):02d}.zip"
+
+        source_file.seek(0)
+
+        with path.open("wb") as destination:
+            shutil.copyfileobj(source_file, destination, 1024 * 1024)
+
+        source_file.seek(0)
+
+        self._files.append({"filename": filename, **meta})
+
+        return path
+
+    def open_file(self, filename: str, **meta):
+        """
+        Archivo nuevo del artefacto para escribir de a poco (streaming).
+        """
+        path = self.directory / f"{len(self._files):02d}.zip"
+
+        self._files.append({"filename": filename, **meta})
+
+        return path.open("wb")
+
+    def commit(self, **meta) -> bool:
+        target = self.cache.root / self.fingerprint
+
+        manifest = {
+            "fingerprint": self.fingerprint,
+            "created_at": time.time(),
+            "files": self._files,
+            "meta": meta,
+        }
+
+        try:
+            with (self.directory / MANIFEST_NAME).open("w", encoding="utf-8") as fh:
+                json.dump(manifest, fh, default=str)
+
+            os.rename(self.directory, target)
+
+        except OSError:
+            # Otro proceso publicó el mismo artefacto primero.
+            self.abort()
+            return False
+
+        self.cache.evict()
+
+        return True
+
+    def abort(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class ZipArtifactCache:
+    """
+    Caché en disco local de ZIP terminados, indexado por fingerprint.
+
+    Cada artefacto es un directorio <root>/<fingerprint>/ con los ZIP y
+    un manifest.json. La fecha de modificación del manifest marca el
+    último uso: get() la actualiza y evict() borra primero los menos
+    usados hasta quedar bajo max_bytes (LRU por tamaño).
+
+    El fingerprint lo calcula el productor e incluye todo lo que cambia
+    el contenido del ZIP; por eso un artefacto nunca se invalida, solo
+    deja de pedirse y termina desalojado.
+    """
+
+    def __init__(self, root: Path | None = None, max_bytes: int | None = None):
+        self.root = Path(root or zip_artifact_cache_dir())
+
+        self.max_bytes = (
+            zip_artifact_cache_max_bytes() if max_bytes is None else int(max_bytes)
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, fingerprint: str) -> ZipArtifact | None:
+        if not self.enabled:
+            return None
+
+        directory = self.root / fingerprint
+        manifest_path = directory / MANIFEST_NAME
+
+        try:
+            with manifest_path.open("r", encoding="utf-8") as fh:
+                manifest = json.load(fh)
+
+            files = []
+
+            for index, file_meta in enumerate(manifest.get("files") or []):
+                path = directory / f"{index:02d}.zip"
+
+                if not path.is_file():
+                    return None
+
+                files.append({**file_meta, "path": path})
+
+            os.utime(manifest_path)
+
+        except (OSError, ValueError):
+            return None
+
+        return ZipArtifact(
+            fingerprint=fingerprint,
+            files=files,
+            meta=manifest.get("meta") or {},
+        )
+
+    def writer(self, fingerprint: str) -> ZipArtifactWriter | None:
+        if not self.enabled:
+            return None
+
+        try:
+            return ZipArtifactWriter(self, fingerprint)
+        except OSError:
+            logger.warning("ZIP artifact cache unavailable at %s.", self.root)
+            return None
+
+    # ========================================================
+    # Desalojo
+    # ========================================================
+
+    def _entries(self):
+        entries = []
+
+        try:
+            children = list(self.root.iterdir())
+        except OSError:
+            return entries
+
+        for child in children:
+            if not child.is_dir():
+                continue
+
+            try:
+                if child.name.startswith(".tmp-"):
+                    # Escrituras abandonadas (proceso muerto) de más de un día.
+                    if time.time() - child.stat().st_mtime > 86400:
+                        shutil.rmtree(child, ignore_errors=True)
+                    continue
+
+                last_used = (child / MANIFEST_NAME).stat().st_mtime
+                size = sum(f.stat().st_size for f in child.iterdir())
+
+            except OSError:
+                continue
+
+            entries.append((last_used, size, child))
+
+        return entries
+
+    def evict(self):
+        entries = self._entries()
+
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, directory in sorted(entries, key=lambda entry: entry[0]):
+            if total <= self.max_bytes:
+                break
+
+            # Los archivos abiertos por un lector siguen siendo legibles
+            # después de borrados (POSIX).
+            shutil.rmtree(directory, ignore_errors=True)
+            total -= size
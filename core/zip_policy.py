@@ -0,0 +1,129 @@
+# core/zip_policy.py
+from __future__ import annotations
+
+import os
+import zipfile
+
+# Formatos que ya vienen comprimidos: DEFLATE no reduce su tamaño y
+# solo consume CPU. Se guardan con ZIP_STORED.
+ZIP_STORED_EXTENSIONS = {
+    ".jpg",
+    ".jpeg",
+    ".png",
+    ".gif",
+    ".webp",
+    ".heic",
+    ".heif",
+    ".avif",
+    ".mp4",
+    ".mov",
+    ".m4v",
+    ".mp3",
+    ".m4a",
+    ".zip",
+    ".kmz",
+    ".gz",
+    ".7z",
+    ".rar",
+}
+
+# Documentos Office/OpenDocument: por dentro también son ZIP (firma
+# PK\x03\x04), pero sus partes XML se reducen bastante con DEFLATE.
+ZIP_DEFLATED_EXTENSIONS = {
+    ".xlsx",
+    ".xlsm",
+    ".docx",
+    ".docm",
+    ".pptx",
+    ".pptm",
+    ".odt",
+    ".ods",
+    ".odp",
+}
+
+# Firmas de archivo para entradas sin extensión o con extensión genérica.
+_COMPRESSED_SIGNATURES = (
+    b"\xff\xd8\xff",  # JPEG
+    b"\x89PNG\r\n\x1a\n",  # PNG
+    b"GIF8",  # GIF
+    b"PK\x03\x04",  # ZIP / KMZ
+    b"\x1f\x8b",  # GZIP
+)
+
+# Marcas ISO-BMFF (bytes 8-12 de la caja ftyp): HEIC/HEIF/AVIF, MP4, MOV.
+_COMPRESSED_FTYP_BRANDS = {
+    b"heic",
+    b"heix",
+    b"hevc",
+    b"mif1",
+    b"msf1",
+    b"avif",
+    b"isom",
+    b"iso2",
+    b"mp41",
+    b"mp42",
+    b"M4V ",
+    b"qt  ",
+}
+
+
+def _looks_compressed(data: bytes | None) -> bool:
+    if not data:
+        return False
+
+    head = bytes(data[:16])
+
+    if head.startswith(_COMPRESSED_SIGNATURES):
+        return True
+
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return True
+
+    return head[4:8] == b"ftyp" and head[8:12] in _COMPRESSED_FTYP_BRANDS
+
+
+def zip_compress_type(
+    arcname: str,
+    data: bytes | None = None,
+) -> int:
+    """
+    Método de compresión para una entrada de ZIP.
+
+    - Fotos, video y archivos comprimidos (por extensión o por firma
+      de los primeros bytes): ZIP_STORED.
+    - Todo lo demás (txt, csv, xml, json, xlsx, pdf...): ZIP_DEFLATED,
+      incluidos los documentos Office aunque su firma sea la de un ZIP.
+    """
+    _, extension = os.path.splitext(
+        str(arcname or "").lower(),
+    )
+
+    if extension in ZIP_DEFLATED_EXTENSIONS:
+        return zipfile.ZIP_DEFLATED
+
+    if extension in ZIP_STORED_EXTENSIONS or _looks_compressed(data):
+        return zipfile.ZIP_STORED
+
+    return zipfile.ZIP_DEFLATED
+
+
+def write_zip_entry(
+    zip_file: zipfile.ZipFile,
+    arcname: str,
+    data,
+):
+    """
+    zip_file.writestr() aplicando zip_compress_type() a la entrada.
+
+    El nivel de DEFLATE sigue siendo el compresslevel del ZipFile.
+    """
+    payload = data.encode("utf-8") if isinstance(data, str) else data
+
+    zip_file.writestr(
+        arcname,
+        payload,
+        compress_type=zip_compress_type(
+            arcname,
+            payload,
+        ),
+    )
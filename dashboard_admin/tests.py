@@ -1,3 +1,29 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
 
-# Create your tests here.
+from core.principal import get_principal
+from dashboard_admin.views import _reset_principal_after_edit
+from usuarios.models import Rol
+
+
+class ResetPrincipalAfterEditTests(TestCase):
+    """
+    Editar roles no debe dejar un principal memoizado desactualizado.
+    """
+
+    def test_self_edit_refreshes_request_user_roles(self):
+        user = get_user_model().objects.create(username="self-editor")
+        user.roles.add(Rol.objects.get_or_create(nombre="admin")[0])
+
+        request = RequestFactory().post("/")
+        request.user = user
+        self.assertTrue(get_principal(request.user).has_role("admin"))
+
+        usuario = get_user_model().objects.get(pk=user.pk)
+        get_principal(usuario).role_names  # memoizado antes del cambio
+        usuario.roles.set([Rol.objects.get_or_create(nombre="pm")[0]])
+
+        _reset_principal_after_edit(request, usuario)
+
+        self.assertEqual(get_principal(request.user).role_names, {"pm"})
+        self.assertEqual(get_principal(usuario).role_names, {"pm"})
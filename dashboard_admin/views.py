@@ -29,6 +29,7 @@ from docx.oxml import OxmlElement  # 👈 para cantSplit
 from docx.shared import Inches, Pt, RGBColor
 
 from core.permissions import filter_queryset_by_access
+from core.principal import reset_principal
 from dashboard.models import ProduccionTecnico
 from facturacion.models import Proyecto
 from operaciones.models import SesionBilling
@@ -50,6 +51,14 @@ except Exception:
 User = get_user_model()
 
 
+def _reset_principal_after_edit(request, usuario):
+    # Roles/proyectos cambiaron: descartar el principal memoizado
+    # (también el de request.user si se editó a sí mismo).
+    reset_principal(usuario)
+    if usuario.pk == request.user.pk:
+        reset_principal(request.user)
+
+
 @login_required(login_url='usuarios:login')
 def admin_dashboard_view(request):
     # Cargar datos para la plantilla principal del admin dashboard
@@ -255,6 +264,7 @@ def editar_usuario_view(request, user_id):
         password2 = request.POST.get('password2') or ''
         if password1 or password2:
             if password1 != password2:
+                _reset_principal_after_edit(request, usuario)
                 messages.error(request, 'Passwords do not match.')
                 # Re-render con lo que el usuario marcó
                 return render(request, 'dashboard_admin/editar_usuario.html', {
@@ -300,6 +310,8 @@ def editar_usuario_view(request, user_id):
         elif hasattr(usuario, 'proyectos'):
             usuario.proyectos.set(proy_ids)
 
+        _reset_principal_after_edit(request, usuario)
+
         messages.success(request, "User updated successfully.")
         return redirect('dashboard_admin:listar_usuarios')
 
@@ -445,6 +457,8 @@ def crear_usuario_view(request, identidad=None):
             elif hasattr(usuario, 'proyectos'):
                 usuario.proyectos.set(proy_ids)
 
+            _reset_principal_after_edit(request, usuario)
+
             messages.success(request, 'User updated successfully.')
         else:
             # Creación
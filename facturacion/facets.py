@@ -0,0 +1,317 @@
+# facturacion/facets.py
+"""
+Filtros tipo Excel de Cartola (listar_cartola) e Invoices (invoices_list),
+sobre core.facets.
+
+Las etiquetas son las mismas que se mostraban antes en cada panel; las
+vacías de Invoices se muestran como "(Vacías)". En Invoices, técnicos (5)
+y comentarios (18) son columnas multivalor: una opción por técnico o
+comentario. Técnicos agrupa por el join con SesionBillingTecnico;
+comentarios junta las asignaciones comentadas y la nota de Finanzas
+(related=), todo en SQL.
+"""
+
+from __future__ import annotations
+
+from datetime import timezone as dt_timezone
+from functools import partial
+
+from django.db.models import F, TextField, Value
+from django.db.models.functions import (Coalesce, Concat, NullIf, TruncDate,
+                                        TruncMinute)
+
+from core.facets import (EMPTY_LABEL, USER_NAME_FIELDS, FacetColumn, FacetSet,
+                         StripText, instance_labels)
+from facturacion.models import CartolaMovimiento
+from operaciones.services.billing_facets import project_labels, status_label
+
+VACIAS = "(Vacías)"
+
+
+# ============================================================
+# Cartola
+# ============================================================
+
+
+def format_clp(n) -> str:
+    try:
+        return f"${int(n or 0):,}".replace(",", ".")
+    except Exception:
+        return "$0"
+
+
+def _dash_label(value) -> str:
+    return (value or EMPTY_LABEL).strip() or EMPTY_LABEL
+
+
+def _cartola_date_label(value) -> str:
+    return value.strftime("%d-%m-%Y") if value else ""
+
+
+def _cartola_status_label(status) -> str:
+    return dict(CartolaMovimiento.ESTADOS).get(status, status) if status else ""
+
+
+_CARTOLA_DATE = {
+    "excel_fecha": TruncDate("fecha", tzinfo=dt_timezone.utc),
+}
+
+CARTOLA_FACETS = FacetSet(
+    "facturacion_cartola",
+    [
+        FacetColumn(
+            "0",
+            "usuario",
+            labels=instance_labels("usuarios.CustomUser", ""),
+        ),
+        FacetColumn(
+            "1",
+            "excel_fecha",
+            annotations=_CARTOLA_DATE,
+            label=_cartola_date_label,
+        ),
+        # "Fecha real del gasto": la tabla usa la misma fecha del movimiento.
+        FacetColumn(
+            "2",
+            "excel_fecha",
+            annotations=_CARTOLA_DATE,
+            label=_cartola_date_label,
+        ),
+        FacetColumn(
+            "3",
+            "proyecto",
+            labels=instance_labels("facturacion.Proyecto", ""),
+        ),
+        FacetColumn("4", "tipo__categoria", label=lambda c: (c or "").title()),
+        FacetColumn(
+            "5",
+            "tipo",
+            labels=instance_labels("facturacion.TipoGasto", ""),
+        ),
+        FacetColumn("6", "rut_factura", label=_dash_label),
+        FacetColumn("7", "tipo_doc", label=_dash_label),
+        FacetColumn("8", "numero_doc", label=_dash_label),
+        FacetColumn("9", "observaciones", label=lambda v: (v or "").strip()),
+        FacetColumn("10", "numero_transferencia", label=_dash_label),
+        FacetColumn(
+            "11",
+            "comprobante",
+            label=lambda v: "Ver" if v else EMPTY_LABEL,
+        ),
+        FacetColumn("12", "cargos", label=format_clp),
+        FacetColumn("13", "abonos", label=format_clp),
+        FacetColumn("14", "status", label=_cartola_status_label),
+    ],
+    models=[
+        "facturacion.CartolaMovimiento",
+        "facturacion.Proyecto",
+        "facturacion.TipoGasto",
+        # str(usuario) también muestra la identidad.
+        ("usuarios.CustomUser", (*USER_NAME_FIELDS, "identidad")),
+    ],
+)
+
+
+# ============================================================
+# Invoices
+# ============================================================
+
+
+INVOICE_FINANCE_STATUS_LABELS = {
+    "review_discount": "Review discount",
+    "discount_applied": "Discount applied",
+    "sent": "Pending to send to client",
+    "sent_to_client": "Sent to client",
+    "pending_invoice": "Pending invoicing",
+    "invoiced": "Invoiced",
+    "in_review": "In review",
+    "rejected": "Rejected",
+    "pending": "Pending payment",
+    "paid": "Collected",
+}
+
+
+def invoice_money_label(n) -> str:
+    try:
+        return f"${float(n or 0):.2f}"
+    except Exception:
+        return "$0.00"
+
+
+def _vacias_label(value) -> str:
+    return str(value or "") or VACIAS
+
+
+def _invoice_real_label(real) -> str:
+    return EMPTY_LABEL if real is None else invoice_money_label(real)
+
+
+def _invoice_diff_label(subtotal, real) -> str:
+    # Invoices muestra subtotal - real (al revés que Billing List).
+    if real is None or subtotal is None:
+        return EMPTY_LABEL
+
+    try:
+        diff = float(subtotal or 0) - float(real or 0)
+    except Exception:
+        return EMPTY_LABEL
+
+    if diff > 0:
+        return f"+ ${abs(diff):.2f}"
+
+    if diff < 0:
+        return f"- ${abs(diff):.2f}"
+
+    return "$0.00"
+
+
+def _invoice_week_label(real, discount, projected) -> str:
+    return (
+        (real or "").strip()
+        or (discount or "").strip()
+        or (projected or "").strip()
+        or EMPTY_LABEL
+    )
+
+
+INVOICE_TECHNICIAN_FIELDS = (
+    "tecnicos_sesion__tecnico__first_name",
+    "tecnicos_sesion__tecnico__last_name",
+    "tecnicos_sesion__tecnico__username",
+    "tecnicos_sesion__porcentaje",
+)
+
+
+def _technician_name(first_name, last_name, username) -> str:
+    return f"{first_name} {last_name}".strip() or username
+
+
+def _invoice_technician_label(first_name, last_name, username, porcentaje) -> str:
+    """
+    "Técnico (NN.NN%)"; "—" si la sesión no tiene técnicos.
+    """
+    if username is None:
+        return EMPTY_LABEL
+
+    name = _technician_name(first_name, last_name, username)
+
+    return f"{name} ({porcentaje:.2f}%)"
+
+
+def invoice_comment_sources(qs):
+    """
+    related= de comentarios: "Técnico: comentario" por asignación
+    comentada y "Finance note: nota" por sesión con nota.
+    """
+    from operaciones.models import SesionBilling, SesionBillingTecnico
+
+    ids = qs.order_by().values("pk")
+
+    name = Coalesce(
+        NullIf(
+            StripText(
+                Concat("tecnico__first_name", Value(" "), "tecnico__last_name"),
+            ),
+            Value(""),
+            output_field=TextField(),
+        ),
+        "tecnico__username",
+        output_field=TextField(),
+    )
+
+    comments = (
+        SesionBillingTecnico.objects.filter(sesion__in=ids)
+        .annotate(excel_comment=StripText("tecnico_comentario"))
+        .exclude(excel_comment="")
+        .annotate(
+            facet_pk=F("sesion_id"),
+            facet_label=Concat(
+                name,
+                Value(": "),
+                "excel_comment",
+                output_field=TextField(),
+            ),
+        )
+    )
+
+    notes = (
+        SesionBilling.objects.filter(pk__in=ids)
+        .annotate(excel_note=StripText("finance_note"))
+        .exclude(excel_note="")
+        .annotate(
+            facet_pk=F("pk"),
+            facet_label=Concat(
+                Value("Finance note: "),
+                "excel_note",
+                output_field=TextField(),
+            ),
+        )
+    )
+
+    return [comments, notes]
+
+
+INVOICE_FACETS = FacetSet(
+    "facturacion_invoices",
+    [
+        FacetColumn(
+            "0",
+            "excel_created_minute",
+            annotations={
+                "excel_created_minute": TruncMinute(
+                    "creado_en",
+                    tzinfo=dt_timezone.utc,
+                ),
+            },
+            label=lambda d: d.strftime("%Y-%m-%d %H:%M") if d else VACIAS,
+        ),
+        FacetColumn("1", "proyecto_id", label=_vacias_label),
+        FacetColumn("2", "direccion_proyecto", label=_vacias_label),
+        FacetColumn("3", "semana_pago_proyectada"),
+        FacetColumn("4", ("is_direct_discount", "estado"), label=status_label),
+        FacetColumn(
+            "5",
+            INVOICE_TECHNICIAN_FIELDS,
+            label=_invoice_technician_label,
+        ),
+        FacetColumn("6", "cliente", label=_vacias_label),
+        FacetColumn("7", "ciudad", label=_vacias_label),
+        FacetColumn(
+            "8",
+            ("proyecto", "proyecto_id"),
+            labels=partial(project_labels, empty=VACIAS),
+        ),
+        FacetColumn("9", "oficina", label=_vacias_label),
+        FacetColumn("10", "subtotal_tecnico", label=invoice_money_label),
+        FacetColumn("11", "subtotal_empresa", label=invoice_money_label),
+        FacetColumn("12", "finance_daily_number"),
+        FacetColumn(
+            "13",
+            "finance_finish_date",
+            label=lambda d: d.strftime("%Y-%m-%d") if d else EMPTY_LABEL,
+        ),
+        FacetColumn("14", "real_company_billing", label=_invoice_real_label),
+        FacetColumn(
+            "15",
+            ("subtotal_empresa", "real_company_billing"),
+            label=_invoice_diff_label,
+        ),
+        FacetColumn(
+            "16",
+            "finance_status",
+            label=lambda v: INVOICE_FINANCE_STATUS_LABELS.get(v, EMPTY_LABEL),
+        ),
+        FacetColumn(
+            "17",
+            ("semana_pago_real", "discount_week", "semana_pago_proyectada"),
+            label=_invoice_week_label,
+        ),
+        FacetColumn("18", related=invoice_comment_sources),
+    ],
+    models=[
+        "operaciones.SesionBilling",
+        "operaciones.SesionBillingTecnico",
+        "facturacion.Proyecto",
+        ("usuarios.CustomUser", USER_NAME_FIELDS),
+    ],
+)
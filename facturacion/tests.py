@@ -1,3 +1,309 @@
+from collections import Counter
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from facturacion.facets import (CARTOLA_FACETS, INVOICE_FACETS,
+                                INVOICE_FINANCE_STATUS_LABELS, VACIAS,
+                                format_clp, invoice_money_label)
+from facturacion.models import CartolaMovimiento, Proyecto, TipoGasto
+from operaciones.models import SesionBilling, SesionBillingTecnico
+from operaciones.services.billing_facets import (
+    resolve_project_labels_for_sessions, status_label)
+
+
+class FacetParityMixin:
+    """
+    Compara un FacetSet con las etiquetas que el listado armaba antes
+    fila por fila: {pk: {columna: [etiquetas]}}.
+    """
+
+    facets = None
+
+    def setUp(self):
+        self.facets.invalidate()
+
+    def assertFacetsMatch(self, qs, expected):
+        for key in self.facets.columns:
+            with self.subTest(column=key):
+                counts = Counter(
+                    label
+                    for labels in expected.values()
+                    for label in set(labels[key])
+                    if label
+                )
+
+                self.assertEqual(
+                    {o["value"]: o["count"] for o in self.facets.options(qs, key)},
+                    dict(counts),
+                )
+
+                for label in counts:
+                    self.assertEqual(
+                        set(
+                            self.facets.filter(qs, {key: {label}}).values_list(
+                                "pk", flat=True
+                            )
+                        ),
+                        {pk for pk, labels in expected.items() if label in labels[key]},
+                    )
+
+
+class CartolaFacetsTests(FacetParityMixin, TestCase):
+    """
+    Filtros tipo Excel de Cartola (CARTOLA_FACETS).
+    """
+
+    facets = CARTOLA_FACETS
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+
+        ana = User.objects.create(username="ana", first_name="Ana", last_name="Díaz")
+        luis = User.objects.create(username="luis")
+
+        proyecto = Proyecto.objects.create(
+            codigo="CX",
+            nombre="Project X",
+            mandante="Client X",
+            ciudad="City X",
+            estado="ST",
+            oficina="Office X",
+        )
+        tipo = TipoGasto.objects.create(nombre="Fuel", categoria="gasto")
+
+        m1 = CartolaMovimiento.objects.create(
+            usuario=ana,
+            proyecto=proyecto,
+            tipo=tipo,
+            rut_factura=" 11.111.111-1 ",
+            tipo_doc="factura",
+            numero_doc="F-1",
+            observaciones="  Road trip ",
+            cargos=Decimal("15000.00"),
+            status="aprobado_pm",
+        )
+        m2 = CartolaMovimiento.objects.create(
+            usuario=luis,
+            abonos=Decimal("2500.50"),
+        )
+        CartolaMovimiento.objects.create(
+            usuario=ana,
+            tipo=tipo,
+            numero_transferencia="T-9",
+            comprobante="cartola/comprobante.pdf",
+            cargos=Decimal("15000.00"),
+        )
+
+        CartolaMovimiento.objects.filter(pk=m1.pk).update(
+            fecha=datetime(2026, 3, 2, 23, 30, tzinfo=dt_timezone.utc),
+        )
+        CartolaMovimiento.objects.filter(pk=m2.pk).update(
+            fecha=datetime(2026, 3, 3, 0, 30, tzinfo=dt_timezone.utc),
+        )
+
+    @staticmethod
+    def _dash(value):
+        return (value or "—").strip() or "—"
+
+    def _previous_labels(self):
+        labels = {}
+
+        for m in CartolaMovimiento.objects.select_related("usuario", "proyecto", "tipo"):
+            fecha = m.fecha.strftime("%d-%m-%Y")
+
+            labels[m.pk] = {
+                "0": [str(m.usuario)],
+                "1": [fecha],
+                "2": [fecha],
+                "3": [str(m.proyecto) if m.proyecto else ""],
+                "4": [(m.tipo.categoria or "").title() if m.tipo else ""],
+                "5": [str(m.tipo) if m.tipo else ""],
+                "6": [self._dash(m.rut_factura)],
+                "7": [self._dash(m.tipo_doc)],
+                "8": [self._dash(m.numero_doc)],
+                "9": [(m.observaciones or "").strip()],
+                "10": [self._dash(m.numero_transferencia)],
+                "11": ["Ver" if m.comprobante else "—"],
+                "12": [format_clp(m.cargos)],
+                "13": [format_clp(m.abonos)],
+                "14": [m.get_status_display()],
+            }
+
+        return labels
+
+    def test_options_and_filters_match_previous_labels(self):
+        self.assertFacetsMatch(CartolaMovimiento.objects.all(), self._previous_labels())
+
+    def test_labels_for_known_rows(self):
+        qs = CartolaMovimiento.objects.all()
+
+        def values(key):
+            return [o["value"] for o in CARTOLA_FACETS.options(qs, key)]
+
+        self.assertIn("02-03-2026", values("1"))
+        self.assertIn("03-03-2026", values("1"))
+        self.assertEqual(values("4"), ["Gasto"])
+        self.assertEqual(values("12"), ["$0", "$15.000"])
+        self.assertEqual(values("13"), ["$0", "$2.500"])
+        self.assertEqual(values("11"), ["Ver", "—"])
+
+
+class InvoiceFacetsTests(FacetParityMixin, TestCase):
+    """
+    Filtros tipo Excel de Invoices (INVOICE_FACETS), con técnicos y
+    comentarios como columnas multivalor.
+    """
+
+    facets = INVOICE_FACETS
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+
+        ana = User.objects.create(username="ana", first_name="Ana", last_name="Díaz")
+        luis = User.objects.create(username="luis")
+
+        Proyecto.objects.create(
+            codigo="CX",
+            nombre="Project X",
+            mandante="Client X",
+            ciudad="City X",
+            estado="ST",
+            oficina="Office X",
+        )
+
+        s1 = SesionBilling.objects.create(
+            proyecto_id="CX",
+            estado="aprobado_pm",
+            semana_pago_proyectada="2026-W10",
+            discount_week="2026-W11",
+            subtotal_empresa=Decimal("100.00"),
+            real_company_billing=Decimal("90.00"),
+            finance_status="invoiced",
+            finance_daily_number="D-1",
+            finance_finish_date=date(2026, 3, 4),
+            finance_note="Check PO",
+        )
+        s2 = SesionBilling.objects.create(
+            proyecto_id="HN-2",
+            is_direct_discount=True,
+            finance_status="paid",
+        )
+        SesionBilling.objects.create(proyecto_id="")
+
+        SesionBillingTecnico.objects.create(
+            sesion=s1,
+            tecnico=ana,
+            porcentaje=Decimal("60.00"),
+            tecnico_comentario="Done",
+        )
+        SesionBillingTecnico.objects.create(
+            sesion=s1,
+            tecnico=luis,
+            porcentaje=Decimal("40.00"),
+            tecnico_comentario=" \n",
+        )
+        SesionBillingTecnico.objects.create(
+            sesion=s2,
+            tecnico=luis,
+            tecnico_comentario="Redo\t\n",
+        )
+
+    @staticmethod
+    def _money_diff(subtotal, real):
+        if subtotal is None or real is None:
+            return "—"
+
+        diff = float(subtotal) - float(real)
+
+        if diff > 0:
+            return f"+ ${abs(diff):.2f}"
+
+        if diff < 0:
+            return f"- ${abs(diff):.2f}"
+
+        return "$0.00"
+
+    def _previous_labels(self):
+        sessions = list(SesionBilling.objects.prefetch_related("tecnicos_sesion__tecnico"))
+        resolve_project_labels_for_sessions(sessions)
+
+        labels = {}
+
+        for s in sessions:
+            techs = []
+            comments = []
+
+            for a in s.tecnicos_sesion.all():
+                name = a.tecnico.get_full_name().strip() or a.tecnico.username
+                techs.append(f"{name} ({a.porcentaje:.2f}%)")
+
+                if (a.tecnico_comentario or "").strip():
+                    comments.append(f"{name}: {a.tecnico_comentario.strip()}")
+
+            if (s.finance_note or "").strip():
+                comments.append(f"Finance note: {s.finance_note.strip()}")
+
+            row = {
+                "0": s.creado_en.strftime("%Y-%m-%d %H:%M"),
+                "1": s.proyecto_id or "",
+                "2": s.direccion_proyecto or "",
+                "3": s.semana_pago_proyectada or "—",
+                "4": status_label(s.is_direct_discount, s.estado),
+                "6": s.cliente or "",
+                "7": s.ciudad or "",
+                "8": s.project_label or "",
+                "9": s.oficina or "",
+                "10": invoice_money_label(s.subtotal_tecnico),
+                "11": invoice_money_label(s.subtotal_empresa),
+                "12": s.finance_daily_number or "—",
+                "13": (
+                    s.finance_finish_date.strftime("%Y-%m-%d")
+                    if s.finance_finish_date
+                    else "—"
+                ),
+                "14": (
+                    "—"
+                    if s.real_company_billing is None
+                    else invoice_money_label(s.real_company_billing)
+                ),
+                "15": self._money_diff(s.subtotal_empresa, s.real_company_billing),
+                "16": INVOICE_FINANCE_STATUS_LABELS.get(s.finance_status, "—"),
+                "17": (
+                    (s.semana_pago_real or "").strip()
+                    or (s.discount_week or "").strip()
+                    or (s.semana_pago_proyectada or "").strip()
+                    or "—"
+                ),
+            }
+
+            labels[s.pk] = {key: [value or VACIAS] for key, value in row.items()}
+            labels[s.pk]["5"] = techs or ["—"]
+            labels[s.pk]["18"] = comments or ["—"]
+
+        return labels
+
+    def test_options_and_filters_match_previous_labels(self):
+        self.assertFacetsMatch(SesionBilling.objects.all(), self._previous_labels())
+
+    def test_multivalue_columns(self):
+        qs = SesionBilling.objects.all()
+
+        techs = {o["value"]: o["count"] for o in INVOICE_FACETS.options(qs, "5")}
+
+        self.assertEqual(
+            techs,
+            {"Ana Díaz (60.00%)": 1, "luis (40.00%)": 1, "luis (100.00%)": 1, "—": 1},
+        )
+        self.assertEqual(
+            INVOICE_FACETS.filter(qs, {"18": {"Finance note: Check PO", "luis: Redo"}}).count(),
+            2,
+        )
+        self.assertEqual(
+            INVOICE_FACETS.filter(qs, {"1": {VACIAS}}).get().proyecto_id,
+            "",
+        )
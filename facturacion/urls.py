@@ -6,6 +6,11 @@ app_name = 'facturacion'
 
 urlpatterns = [
     path("cartola/", views.listar_cartola, name="listar_cartola"),
+    path(
+        "cartola/excel-options/",
+        views.cartola_excel_options,
+        name="cartola_excel_options",
+    ),
     path("cartola/registrar/", views.registrar_abono, name="registrar_abono"),
     path("cartola/crear-tipo/", views.crear_tipo, name="crear_tipo"),
     path("cartola/editar-tipo/<int:pk>/", views.editar_tipo, name="editar_tipo"),
@@ -38,6 +43,11 @@ urlpatterns = [
     path("cartola/exportar/", views.exportar_cartola, name="exportar_cartola"),
     path("balances/exportar/", views.exportar_saldos, name="exportar_saldos"),
     path("invoices/", views.invoices_list, name="invoices"),
+    path(
+        "invoices/excel-options/",
+        views.invoices_excel_options,
+        name="invoices_excel_options",
+    ),
     path(
         "invoices/<int:pk>/update-real/",
         views.invoice_update_real,
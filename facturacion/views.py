@@ -43,6 +43,7 @@ from operaciones.forms import MovimientoUsuarioForm
 from operaciones.models import (EvidenciaFotoBilling, ItemBilling,
                                 ItemBillingTecnico, SesionBilling,
                                 SesionBillingTecnico)
+from operaciones.services.billing_search import filter_by_technician
 from usuarios.decoradores import rol_requerido
 from usuarios.models import ProyectoAsignacion
 
@@ -64,8 +65,9 @@ from django.urls import reverse
 
 # ⬇️ agrega junto a tus imports
 from core.decorators import project_object_access_required
-from core.permissions import (filter_queryset_by_access, projects_ids_for_user,
-                              user_has_project_access)
+from core.permissions import (filter_queryset_by_access,
+                              filter_queryset_by_project_window,
+                              projects_ids_for_user, user_has_project_access)
 
 from .models import CartolaMovimiento, Proyecto
 
@@ -91,39 +93,21 @@ def _next_project_code():
     last = qs.first().n if qs.exists() else 0
     return f"PRJ-{last + 1:06d}"
 
-@login_required
-@rol_requerido('facturacion', 'admin')
-def listar_cartola(request):
-    import json
+
+def _cartola_queryset(request, warn=True):
+    """
+    Movimientos de la cartola con los filtros rápidos del GET, ya
+    ordenados. Devuelve (queryset, filtros).
+
+    No aplica excel_filters: lo comparten listar_cartola y
+    cartola_excel_options. Con warn=False no agrega mensajes (AJAX).
+    """
     import re
-    from datetime import datetime as py_datetime
 
     from django.contrib import messages
-    from django.core.paginator import Paginator
     from django.db.models import Case, CharField, IntegerField, Q, Value, When
     from django.db.models.functions import Cast
 
-    # --- Cantidad/paginación (mantén string para la UI)
-    cantidad_param = request.GET.get('cantidad', '10')
-
-    # Limitamos a máx. 100 (y "todos" también se interpreta como 100)
-    if cantidad_param == 'todos':
-        page_size = 100
-    else:
-        try:
-            page_size = max(5, min(int(cantidad_param), 100))
-        except ValueError:
-            page_size = 10
-            cantidad_param = '10'
-
-    # ---------- Filtros tipo Excel recibidos por GET ----------
-    params = request.GET.copy()
-    excel_filters_raw = (params.get('excel_filters') or '').strip()
-    try:
-        excel_filters = json.loads(excel_filters_raw) if excel_filters_raw else {}
-    except json.JSONDecodeError:
-        excel_filters = {}
-
     # --- Filtros (string trimming)
     usuario = (request.GET.get('usuario') or '').strip()
     fecha_txt = (request.GET.get('fecha') or '').strip()
@@ -191,11 +175,12 @@ def listar_cartola(request):
                 movimientos = movimientos.filter(q_fecha)
 
             except ValueError:
-                messages.warning(
-                    request,
-                    "Formato de fecha inválido. Use DD, DD-MM o DD-MM-YYYY."
-                )
-        else:
+                if warn:
+                    messages.warning(
+                        request,
+                        "Formato de fecha inválido. Use DD, DD-MM o DD-MM-YYYY."
+                    )
+        elif warn:
             messages.warning(
                 request,
                 "Formato de fecha inválido. Use DD, DD-MM o DD-MM-YYYY."
@@ -228,211 +213,61 @@ def listar_cartola(request):
         )
     ).order_by('prioridad', '-fecha')
 
-    # ============================================================
-    #  Traemos TODO a memoria:
-    #  - aplicar filtros Excel (Python)
-    #  - construir excel_global (todos los registros filtrados)
-    #  - luego paginar
-    # ============================================================
-    movimientos_list = list(movimientos)
-
-    # Helpers de formato CLP (para que los valores del panel se vean igual que la tabla)
-    def format_clp(n):
-        try:
-            n = 0 if n is None else n
-            n_int = int(n)
-            return f"${n_int:,}".replace(",", ".")
-        except Exception:
-            return "$0"
-
-    # ---------- Aplicar filtros Excel ----------
-    if excel_filters:
-        def matches_excel_filters(m):
-            for col, values in excel_filters.items():
-                if not values:
-                    continue
-                values_set = set(values)
-
-                # índices según tabla GZ:
-                # 0 Usuario
-                # 1 Fecha
-                # 2 Fecha real del gasto
-                # 3 Proyecto
-                # 4 Categoría
-                # 5 Tipo
-                # 6 RUT factura
-                # 7 Tipo de documento
-                # 8 N° Documento
-                # 9 Observaciones
-                # 10 N° Transferencia
-                # 11 Comprobante
-                # 12 Cargos
-                # 13 Abonos
-                # 14 Status
-                if col == "0":
-                    label = str(m.usuario) if m.usuario else ""
-
-                elif col == "1":
-                    d = getattr(m, "fecha", None)
-                    label = d.strftime("%d-%m-%Y") if d else ""
-
-                elif col == "2":
-                    d = getattr(m, "fecha_transaccion", None) or getattr(m, "fecha", None)
-                    label = d.strftime("%d-%m-%Y") if d else ""
-
-                elif col == "3":
-                    label = str(m.proyecto) if m.proyecto else ""
-
-                elif col == "4":
-                    if m.tipo and getattr(m.tipo, "categoria", None):
-                        label = (m.tipo.categoria or "").title()
-                    else:
-                        label = ""
-
-                elif col == "5":
-                    label = str(m.tipo) if m.tipo else ""
-
-                elif col == "6":
-                    label = (getattr(m, "rut_factura", None) or "—").strip() or "—"
-
-                elif col == "7":
-                    label = (getattr(m, "tipo_doc", None) or "—").strip() or "—"
-
-                elif col == "8":
-                    label = (getattr(m, "numero_doc", None) or "—").strip() or "—"
-
-                elif col == "9":
-                    label = (getattr(m, "observaciones", None) or "").strip()
-
-                elif col == "10":
-                    label = (getattr(m, "numero_transferencia", None) or "—").strip() or "—"
-
-                elif col == "11":
-                    label = "Ver" if getattr(m, "comprobante", None) else "—"
-
-                elif col == "12":
-                    label = format_clp(getattr(m, "cargos", 0) or 0)
-
-                elif col == "13":
-                    label = format_clp(getattr(m, "abonos", 0) or 0)
-
-                elif col == "14":
-                    label = m.get_status_display() if getattr(m, "status", None) else ""
-
-                else:
-                    continue
-
-                if label not in values_set:
-                    return False
-
-            return True
-
-        movimientos_list = [m for m in movimientos_list if matches_excel_filters(m)]
-
-    # ---------- Distinct globales para filtros tipo Excel ----------
-    excel_global = {}
-
-    # 0 Usuario
-    excel_global[0] = sorted({str(m.usuario) for m in movimientos_list if m.usuario})
-
-    # 1 Fecha
-    excel_global[1] = sorted({
-        m.fecha.strftime("%d-%m-%Y")
-        for m in movimientos_list
-        if getattr(m, "fecha", None)
-    })
-
-    # 2 Fecha real del gasto
-    excel_global[2] = sorted({
-        (getattr(m, "fecha_transaccion", None) or getattr(m, "fecha", None)).strftime("%d-%m-%Y")
-        for m in movimientos_list
-        if (getattr(m, "fecha_transaccion", None) or getattr(m, "fecha", None))
-    })
-
-    # 3 Proyecto
-    excel_global[3] = sorted({str(m.proyecto) for m in movimientos_list if m.proyecto})
-
-    # 4 Categoría
-    excel_global[4] = sorted({
-        (m.tipo.categoria or "").title()
-        for m in movimientos_list
-        if m.tipo and getattr(m.tipo, "categoria", None)
-    })
-
-    # 5 Tipo
-    excel_global[5] = sorted({str(m.tipo) for m in movimientos_list if m.tipo})
+    filtros = {
+        'usuario': usuario,
+        'fecha': fecha_txt,
+        'proyecto': proyecto,
+        'categoria': categoria,
+        'tipo': tipo,
+        'rut_factura': rut_factura,
+        'estado': estado,
+    }
 
-    # 6 RUT factura
-    excel_global[6] = sorted({
-        (getattr(m, "rut_factura", None) or "—").strip() or "—"
-        for m in movimientos_list
-    })
+    return movimientos, filtros
 
-    # 7 Tipo doc
-    excel_global[7] = sorted({
-        (getattr(m, "tipo_doc", None) or "—").strip() or "—"
-        for m in movimientos_list
-    })
 
-    # 8 N° doc
-    excel_global[8] = sorted({
-        (getattr(m, "numero_doc", None) or "—").strip() or "—"
-        for m in movimientos_list
-    })
+@login_required
+@rol_requerido('facturacion', 'admin')
+def listar_cartola(request):
+    from django.core.paginator import Paginator
 
-    # 9 Observaciones
-    excel_global[9] = sorted({
-        (getattr(m, "observaciones", None) or "").strip()
-        for m in movimientos_list
-    })
+    from core.facets import parse_excel_filters
+    from facturacion.facets import CARTOLA_FACETS
 
-    # 10 N° transferencia
-    excel_global[10] = sorted({
-        (getattr(m, "numero_transferencia", None) or "—").strip() or "—"
-        for m in movimientos_list
-    })
+    # --- Cantidad/paginación (mantén string para la UI)
+    cantidad_param = request.GET.get('cantidad', '10')
 
-    # 11 Comprobante
-    excel_global[11] = sorted({
-        "Ver" if getattr(m, "comprobante", None) else "—"
-        for m in movimientos_list
-    })
+    # Limitamos a máx. 100 (y "todos" también se interpreta como 100)
+    if cantidad_param == 'todos':
+        page_size = 100
+    else:
+        try:
+            page_size = max(5, min(int(cantidad_param), 100))
+        except ValueError:
+            page_size = 10
+            cantidad_param = '10'
 
-    # 12 Cargos
-    excel_global[12] = sorted({
-        format_clp(getattr(m, "cargos", 0) or 0)
-        for m in movimientos_list
-    })
+    # ---------- Filtros tipo Excel recibidos por GET ----------
+    params = request.GET.copy()
+    excel_filters_raw = (params.get('excel_filters') or '').strip()
+    excel_filters = parse_excel_filters(excel_filters_raw)
 
-    # 13 Abonos
-    excel_global[13] = sorted({
-        format_clp(getattr(m, "abonos", 0) or 0)
-        for m in movimientos_list
-    })
+    movimientos, filtros = _cartola_queryset(request)
 
-    # 14 Status (display)
-    estado_map = dict(CartolaMovimiento.ESTADOS)
-    status_codes = {m.status for m in movimientos_list if getattr(m, "status", None)}
-    excel_global[14] = sorted(estado_map.get(c, c) for c in status_codes)
+    # ---------- Aplicar filtros Excel (SQL, CARTOLA_FACETS) ----------
+    movimientos = CARTOLA_FACETS.filter(movimientos, excel_filters)
 
-    excel_global_json = json.dumps(excel_global)
+    # Las opciones de cada columna se piden por AJAX al abrir su filtro
+    # (cartola_excel_options).
+    excel_global_json = "{}"
 
     # --- Paginación (después de filtros Excel)
-    paginator = Paginator(movimientos_list, page_size)
+    paginator = Paginator(movimientos, page_size)
     page_number = request.GET.get('page')
     pagina = paginator.get_page(page_number)
 
     # --- Estado choices y eco de filtros a la plantilla
     estado_choices = CartolaMovimiento.ESTADOS
-    filtros = {
-        'usuario': usuario,
-        'fecha': fecha_txt,
-        'proyecto': proyecto,
-        'categoria': categoria,
-        'tipo': tipo,
-        'rut_factura': rut_factura,
-        'estado': estado,
-    }
 
     # qs helpers (igual estilo Hyperlink, por si luego quieres usar)
     params_no_page = params.copy()
@@ -455,6 +290,26 @@ def listar_cartola(request):
     )
 
 
+@login_required
+@rol_requerido('facturacion', 'admin')
+def cartola_excel_options(request):
+    """
+    Opciones de los filtros tipo Excel de la cartola (AJAX, ?col=N),
+    con cuántos movimientos tiene cada una. Respeta los filtros rápidos
+    pero no los excel_filters, para no perder opciones al cambiarlos.
+    """
+    from facturacion.facets import CARTOLA_FACETS
+
+    movimientos, _filtros = _cartola_queryset(request, warn=False)
+
+    col = (request.GET.get('col') or '').strip()
+
+    if col and not CARTOLA_FACETS.has_column(col):
+        return JsonResponse({'ok': False, 'error': 'Unknown column.'}, status=400)
+
+    return JsonResponse(CARTOLA_FACETS.payload(movimientos, [col] if col else None))
+
+
 @login_required
 @rol_requerido('facturacion', 'admin')
 def registrar_abono(request):
@@ -1764,34 +1619,19 @@ def _attach_project_label(page_obj):
     return page_obj
 
 
-@login_required
-@rol_requerido("facturacion", "admin")
-def invoices_list(request):
+def _invoices_queryset(request):
     """
-    Finanzas:
-      - 'open': todo lo que realmente está en Finanzas
-      - 'paid': solo cobrados
-      - 'all': todo lo de Finanzas
+    Sesiones en Finanzas visibles para el usuario, con el scope y los
+    filtros rápidos del GET. Devuelve (queryset, filtros, scope).
 
-    PERFORMANCE:
-      - Primero filtra con queryset liviano.
-      - Luego pagina IDs.
-      - Solo carga relaciones pesadas para la página visible.
+    No aplica excel_filters: lo comparten invoices_list e
+    invoices_excel_options.
     """
-    import json
     from datetime import date as _date
-    from datetime import datetime
-    from urllib.parse import urlencode
 
-    from django.core.paginator import Paginator
-    from django.db.models import Prefetch, Q
-    from django.utils import timezone
+    from django.db.models import Q
 
-    from facturacion.models import Proyecto
-    from operaciones.models import (BillingPayWeekSnapshot,
-                                    EvidenciaFotoBilling, ItemBilling,
-                                    ItemBillingTecnico, SesionBilling,
-                                    SesionBillingTecnico)
+    from operaciones.models import SesionBilling
 
     user = request.user
     scope = (request.GET.get("scope") or "open").strip()
@@ -1802,33 +1642,6 @@ def invoices_list(request):
         False,
     )
 
-    try:
-        proyectos_user = filter_queryset_by_access(
-            Proyecto.objects.all(),
-            user,
-            "id",
-        )
-    except Exception:
-        proyectos_user = Proyecto.objects.none()
-
-    if proyectos_user.exists():
-        allowed_keys = set()
-
-        for p in proyectos_user:
-            nombre = (getattr(p, "nombre", "") or "").strip()
-
-            if nombre:
-                allowed_keys.add(nombre)
-
-            codigo = getattr(p, "codigo", None)
-
-            if codigo:
-                allowed_keys.add(str(codigo).strip())
-
-            allowed_keys.add(str(p.id).strip())
-    else:
-        allowed_keys = set()
-
     # ============================================================
     # Query base liviana.
     # NO hacemos prefetch_related aquí para no cargar todo antes
@@ -1887,111 +1700,17 @@ def invoices_list(request):
         | Q(is_direct_discount=True)
     )
 
-    if not can_view_legacy_history:
-        if allowed_keys:
-            qs = qs.filter(proyecto__in=allowed_keys)
-        else:
-            qs = SesionBilling.objects.none()
-
     # ============================================================
-    # Limitar por historial de ProyectoAsignacion
+    # Acceso por proyecto + ventana de ProyectoAsignacion (SQL)
     # ============================================================
-    try:
-        from usuarios.models import ProyectoAsignacion
-    except Exception:
-        ProyectoAsignacion = None
-
-    if ProyectoAsignacion is not None and not can_view_legacy_history:
-        try:
-            asignaciones = list(
-                ProyectoAsignacion.objects.filter(
-                    usuario=user,
-                    proyecto__in=proyectos_user,
-                ).select_related("proyecto")
-            )
-        except Exception:
-            asignaciones = []
-
-        if asignaciones:
-            access_by_key = {}
-
-            for a in asignaciones:
-                p = getattr(a, "proyecto", None)
-
-                if not p:
-                    continue
-
-                if getattr(a, "include_history", False) or not getattr(
-                    a,
-                    "start_at",
-                    None,
-                ):
-                    access = {
-                        "include_history": True,
-                        "start_at": None,
-                    }
-                else:
-                    access = {
-                        "include_history": False,
-                        "start_at": a.start_at,
-                    }
-
-                for k in (
-                    getattr(p, "nombre", None),
-                    getattr(p, "codigo", None),
-                    getattr(p, "id", None),
-                ):
-                    if k is None:
-                        continue
-
-                    ks = str(k).strip()
-
-                    if ks:
-                        access_by_key[ks.lower()] = access
-
-            ids_ok = []
-
-            for sid, proj_txt, creado_en in qs.values_list(
-                "id",
-                "proyecto",
-                "creado_en",
-            ):
-                key = str(proj_txt).strip().lower() if proj_txt else ""
-
-                if not key:
-                    continue
-
-                access = access_by_key.get(key)
-
-                if not access:
-                    continue
-
-                if access["include_history"] or access["start_at"] is None:
-                    ids_ok.append(sid)
-                    continue
-
-                if not creado_en:
-                    continue
-
-                start_at = access["start_at"]
-
-                start_date = (
-                    start_at.date() if isinstance(start_at, datetime) else start_at
-                )
-
-                if isinstance(creado_en, datetime):
-                    creado_date = (
-                        timezone.localtime(creado_en).date()
-                        if timezone.is_aware(creado_en)
-                        else creado_en.date()
-                    )
-                else:
-                    creado_date = creado_en
-
-                if creado_date >= start_date:
-                    ids_ok.append(sid)
-
-            qs = qs.filter(id__in=ids_ok)
+    if not can_view_legacy_history:
+        qs = filter_queryset_by_project_window(
+            qs,
+            user,
+            "proyecto_ref",
+            "creado_en",
+            by_date=True,
+        )
 
     # ============================================================
     # Filtros rápidos
@@ -2019,14 +1738,8 @@ def invoices_list(request):
         )
 
     if f["tech"]:
-        qs_filtered = qs_filtered.filter(
-            Q(tecnicos_sesion__tecnico__first_name__icontains=f["tech"])
-            | Q(tecnicos_sesion__tecnico__last_name__icontains=f["tech"])
-            | Q(tecnicos_sesion__tecnico__username__icontains=f["tech"])
-            | Q(pay_week_snapshots__tecnico__first_name__icontains=f["tech"])
-            | Q(pay_week_snapshots__tecnico__last_name__icontains=f["tech"])
-            | Q(pay_week_snapshots__tecnico__username__icontains=f["tech"])
-        )
+        # Índice de búsqueda: técnicos asignados y de snapshots, sin joins.
+        qs_filtered = filter_by_technician(qs_filtered, f["tech"])
 
     if f["client"]:
         qs_filtered = qs_filtered.filter(cliente__icontains=f["client"])
@@ -2040,75 +1753,41 @@ def invoices_list(request):
 
     qs_filtered = qs_filtered.distinct()
 
-    # ============================================================
-    # Helpers livianos para labels
-    # ============================================================
-    def money_label(n):
-        try:
-            return f"${float(n or 0):.2f}"
-        except Exception:
-            return "$0.00"
-
-    def session_status_label_light(s):
-        if getattr(s, "is_direct_discount", False):
-            return "Direct discount"
-
-        if s.estado == "aprobado_pm":
-            return "Approved by PM"
-
-        if s.estado == "rechazado_pm":
-            return "Rejected by PM"
-
-        if s.estado == "aprobado_supervisor":
-            return "Approved by supervisor"
-
-        if s.estado == "rechazado_supervisor":
-            return "Rejected by supervisor"
+    return qs_filtered, f, scope
 
-        if s.estado == "en_revision_supervisor":
-            return "In supervisor review"
 
-        if s.estado == "finalizado":
-            return "Finished (pending review)"
-
-        if s.estado == "en_proceso":
-            return "In progress"
-
-        return "Assigned"
-
-    def finance_status_label_light(s):
-        if s.finance_status == "review_discount":
-            return "Review discount"
-
-        if s.finance_status == "discount_applied":
-            return "Discount applied"
-
-        if s.finance_status == "sent":
-            return "Pending to send to client"
-
-        if s.finance_status == "sent_to_client":
-            return "Sent to client"
-
-        if s.finance_status == "pending_invoice":
-            return "Pending invoicing"
-
-        if s.finance_status == "invoiced":
-            return "Invoiced"
-
-        if s.finance_status == "in_review":
-            return "In review"
+@login_required
+@rol_requerido("facturacion", "admin")
+def invoices_list(request):
+    """
+    Finanzas:
+      - 'open': todo lo que realmente está en Finanzas
+      - 'paid': solo cobrados
+      - 'all': todo lo de Finanzas
 
-        if s.finance_status == "rejected":
-            return "Rejected"
+    PERFORMANCE:
+      - Filtros rápidos y filtros Excel en SQL (INVOICE_FACETS).
+      - Luego pagina IDs.
+      - Solo carga relaciones pesadas para la página visible.
+    """
+    from urllib.parse import urlencode
 
-        if s.finance_status == "pending":
-            return "Pending payment"
+    from django.core.paginator import Paginator
+    from django.db.models import Prefetch, Q
 
-        if s.finance_status == "paid":
-            return "Collected"
+    from core.facets import parse_excel_filters
+    from facturacion.facets import INVOICE_FACETS
+    from facturacion.models import Proyecto
+    from operaciones.models import (BillingPayWeekSnapshot,
+                                    EvidenciaFotoBilling, ItemBilling,
+                                    ItemBillingTecnico, SesionBilling,
+                                    SesionBillingTecnico)
 
-        return "—"
+    qs_filtered, f, scope = _invoices_queryset(request)
 
+    # ============================================================
+    # Proyecto visible (página)
+    # ============================================================
     def resolve_project_labels_for_sessions(sessions):
         proj_ids = set()
         proj_texts = set()
@@ -2203,359 +1882,18 @@ def invoices_list(request):
         return sessions
 
     # ============================================================
-    # Query liviana para filtros Excel y paginación
-    # ============================================================
-    light_qs = qs_filtered.only(
-        "id",
-        "creado_en",
-        "proyecto_id",
-        "direccion_proyecto",
-        "semana_pago_proyectada",
-        "estado",
-        "is_direct_discount",
-        "cliente",
-        "ciudad",
-        "proyecto",
-        "oficina",
-        "subtotal_tecnico",
-        "subtotal_empresa",
-        "finance_daily_number",
-        "finance_finish_date",
-        "real_company_billing",
-        "finance_status",
-        "semana_pago_real",
-        "discount_week",
-        "finance_note",
-    )
-
-    light_rows = list(light_qs)
-
-    resolve_project_labels_for_sessions(light_rows)
-
-    light_ids = [s.id for s in light_rows]
-
-    technicians_by_session = {}
-    comments_by_session = {}
-
-    assignments_light = (
-        SesionBillingTecnico.objects.filter(
-            sesion_id__in=light_ids,
-        )
-        .select_related("tecnico")
-        .only(
-            "sesion_id",
-            "porcentaje",
-            "tecnico_comentario",
-            "tecnico__first_name",
-            "tecnico__last_name",
-            "tecnico__username",
-        )
-    )
-
-    for assignment in assignments_light:
-        technician = assignment.tecnico
-
-        technician_name = technician.get_full_name().strip() or technician.username
-
-        technician_label = f"{technician_name} " f"({assignment.porcentaje:.2f}%)"
-
-        technicians_by_session.setdefault(
-            assignment.sesion_id,
-            [],
-        ).append(technician_label)
-
-        comment = (assignment.tecnico_comentario or "").strip()
-
-        if comment:
-            comments_by_session.setdefault(
-                assignment.sesion_id,
-                [],
-            ).append(f"{technician_name}: {comment}")
-
-    for s in light_rows:
-        s.excel_technicians = technicians_by_session.get(
-            s.id,
-            [],
-        )
-
-        s.excel_comments = comments_by_session.get(
-            s.id,
-            [],
-        )
-
-        finance_note = (getattr(s, "finance_note", "") or "").strip()
-
-        if finance_note:
-            s.excel_comments = list(s.excel_comments)
-
-            s.excel_comments.append(f"Finance note: {finance_note}")
-
-    def excel_value_for_invoice_light(s, col):
-        if col == "0":
-            d = getattr(s, "creado_en", None)
-
-            return d.strftime("%Y-%m-%d %H:%M") if d else ""
-
-        if col == "1":
-            return str(getattr(s, "proyecto_id", "") or "")
-
-        if col == "2":
-            return str(
-                getattr(
-                    s,
-                    "direccion_proyecto",
-                    "",
-                )
-                or ""
-            )
-
-        if col == "3":
-            return str(
-                getattr(
-                    s,
-                    "semana_pago_proyectada",
-                    "",
-                )
-                or "—"
-            )
-
-        if col == "4":
-            return session_status_label_light(s)
-
-        if col == "5":
-            values = (
-                getattr(
-                    s,
-                    "excel_technicians",
-                    [],
-                )
-                or []
-            )
-
-            return " | ".join(values) if values else "—"
-
-        if col == "6":
-            return str(getattr(s, "cliente", "") or "")
-
-        if col == "7":
-            return str(getattr(s, "ciudad", "") or "")
-
-        if col == "8":
-            return str(
-                getattr(
-                    s,
-                    "project_label",
-                    "",
-                )
-                or ""
-            )
-
-        if col == "9":
-            return str(getattr(s, "oficina", "") or "")
-
-        if col == "10":
-            return money_label(
-                getattr(
-                    s,
-                    "subtotal_tecnico",
-                    0,
-                )
-            )
-
-        if col == "11":
-            return money_label(
-                getattr(
-                    s,
-                    "subtotal_empresa",
-                    0,
-                )
-            )
-
-        if col == "12":
-            return str(
-                getattr(
-                    s,
-                    "finance_daily_number",
-                    "",
-                )
-                or "—"
-            )
-
-        if col == "13":
-            d = getattr(
-                s,
-                "finance_finish_date",
-                None,
-            )
-
-            return d.strftime("%Y-%m-%d") if d else "—"
-
-        if col == "14":
-            real = getattr(
-                s,
-                "real_company_billing",
-                None,
-            )
-
-            return "—" if real is None else money_label(real)
-
-        if col == "15":
-            real = getattr(
-                s,
-                "real_company_billing",
-                None,
-            )
-
-            subtotal = getattr(
-                s,
-                "subtotal_empresa",
-                None,
-            )
-
-            if real is None or subtotal is None:
-                return "—"
-
-            try:
-                diff = float(subtotal or 0) - float(real or 0)
-            except Exception:
-                return "—"
-
-            if diff > 0:
-                return f"+ ${abs(diff):.2f}"
-
-            if diff < 0:
-                return f"- ${abs(diff):.2f}"
-
-            return "$0.00"
-
-        if col == "16":
-            return finance_status_label_light(s)
-
-        if col == "17":
-            week = (
-                (
-                    getattr(
-                        s,
-                        "semana_pago_real",
-                        "",
-                    )
-                    or ""
-                ).strip()
-                or (
-                    getattr(
-                        s,
-                        "discount_week",
-                        "",
-                    )
-                    or ""
-                ).strip()
-                or (
-                    getattr(
-                        s,
-                        "semana_pago_proyectada",
-                        "",
-                    )
-                    or ""
-                ).strip()
-                or "—"
-            )
-
-            return week
-
-        if col == "18":
-            values = (
-                getattr(
-                    s,
-                    "excel_comments",
-                    [],
-                )
-                or []
-            )
-
-            return " | ".join(values) if values else "—"
-
-        return ""
-
-    def excel_values_for_invoice_light(s, col):
-        if col == "5":
-            return getattr(
-                s,
-                "excel_technicians",
-                [],
-            ) or ["—"]
-
-        if col == "18":
-            return getattr(
-                s,
-                "excel_comments",
-                [],
-            ) or ["—"]
-
-        return [
-            excel_value_for_invoice_light(
-                s,
-                col,
-            )
-        ]
-
-    # ============================================================
-    # Filtros Excel
+    # Filtros Excel (SQL, INVOICE_FACETS)
     # ============================================================
     excel_filters_raw = (request.GET.get("excel_filters") or "").strip()
 
-    try:
-        excel_filters = json.loads(excel_filters_raw) if excel_filters_raw else {}
-    except json.JSONDecodeError:
-        excel_filters = {}
-
-    if excel_filters:
-        filtered_light_rows = []
-
-        for s in light_rows:
-            ok = True
-
-            for col, values in excel_filters.items():
-                values_set = set(values or [])
-
-                if not values_set:
-                    continue
-
-                invoice_values = set(
-                    excel_values_for_invoice_light(
-                        s,
-                        col,
-                    )
-                )
-
-                if values_set.isdisjoint(invoice_values):
-                    ok = False
-                    break
-
-            if ok:
-                filtered_light_rows.append(s)
-
-        light_rows = filtered_light_rows
-
-    # ============================================================
-    # Opciones globales para filtros Excel
-    # ============================================================
-    excel_global = {}
-
-    for col in range(19):
-        vals = set()
-
-        for s in light_rows:
-            invoice_values = excel_values_for_invoice_light(
-                s,
-                str(col),
-            )
-
-            for value in invoice_values:
-                vals.add(value or "(Vacías)")
-
-        excel_global[col] = sorted(vals)
+    qs_filtered = INVOICE_FACETS.filter(
+        qs_filtered,
+        parse_excel_filters(excel_filters_raw),
+    )
 
-    excel_global_json = json.dumps(excel_global)
+    # Las opciones de cada columna se piden por AJAX al abrir su filtro
+    # (invoices_excel_options).
+    excel_global_json = "{}"
 
     # ============================================================
     # Paginación sobre IDs
@@ -2578,7 +1916,7 @@ def invoices_list(request):
 
     cantidad = str(per_page)
 
-    filtered_ids = [s.id for s in light_rows]
+    filtered_ids = qs_filtered.values_list("id", flat=True)
 
     paginator = Paginator(
         filtered_ids,
@@ -3030,6 +2368,26 @@ def invoices_list(request):
     )
 
 
+@login_required
+@rol_requerido("facturacion", "admin")
+def invoices_excel_options(request):
+    """
+    Opciones de los filtros tipo Excel de Invoices (AJAX, ?col=N), con
+    cuántas sesiones tiene cada una. Respeta scope y filtros rápidos
+    pero no los excel_filters, para no perder opciones al cambiarlos.
+    """
+    from facturacion.facets import INVOICE_FACETS
+
+    qs_filtered, _f, _scope = _invoices_queryset(request)
+
+    col = (request.GET.get("col") or "").strip()
+
+    if col and not INVOICE_FACETS.has_column(col):
+        return JsonResponse({"ok": False, "error": "Unknown column."}, status=400)
+
+    return JsonResponse(INVOICE_FACETS.payload(qs_filtered, [col] if col else None))
+
+
 @login_required
 @rol_requerido("facturacion", "admin")
 @require_POST
@@ -3460,7 +2818,6 @@ Exporta a Excel los invoices de Finanzas.
     5. Otros estados
 
     """
-    from datetime import datetime
     from decimal import Decimal
 
     from django.db.models import Case, IntegerField, Prefetch, Q, When
@@ -3485,37 +2842,6 @@ Exporta a Excel los invoices de Finanzas.
         False,
     )
 
-    # ============================================================
-    # Proyectos visibles para el usuario
-    # Misma lógica utilizada por invoices_list
-    # ============================================================
-    try:
-        proyectos_user = filter_queryset_by_access(
-            Proyecto.objects.all(),
-            user,
-            "id",
-        )
-    except Exception:
-        proyectos_user = Proyecto.objects.none()
-
-    proyectos_list = list(proyectos_user)
-
-    if proyectos_list:
-        allowed_keys = set()
-
-        for p in proyectos_list:
-            nombre = (getattr(p, "nombre", "") or "").strip()
-            if nombre:
-                allowed_keys.add(nombre)
-
-            codigo = getattr(p, "codigo", None)
-            if codigo:
-                allowed_keys.add(str(codigo).strip())
-
-            allowed_keys.add(str(p.id).strip())
-    else:
-        allowed_keys = set()
-
     # ============================================================
     # Query base
     #
@@ -3617,131 +2943,24 @@ Exporta a Excel los invoices de Finanzas.
     )
 
     # ============================================================
-    # Limitar por proyectos asignados para usuarios sin historial
+    # Acceso por proyecto + ventana de ProyectoAsignacion (SQL)
+    # Misma lógica utilizada por invoices_list
     # ============================================================
     if not can_view_legacy_history:
-        if allowed_keys:
-            qs = qs.filter(proyecto__in=allowed_keys)
-        else:
-            qs = SesionBilling.objects.none()
-
-    # ============================================================
-    # Limitar también por ventana histórica de ProyectoAsignacion
-    #
-    # include_history=True:
-    #   ve todo el historial del proyecto.
-    #
-    # start_at:
-    #   ve registros desde la fecha de asignación.
-    # ============================================================
-    try:
-        from usuarios.models import ProyectoAsignacion
-    except Exception:
-        ProyectoAsignacion = None
-
-    if ProyectoAsignacion is not None and not can_view_legacy_history:
-        try:
-            asignaciones = list(
-                ProyectoAsignacion.objects.filter(
-                    usuario=user,
-                    proyecto__in=proyectos_user,
-                ).select_related("proyecto")
-            )
-        except Exception:
-            asignaciones = []
-
-        if asignaciones:
-            access_by_key = {}
-
-            for asignacion in asignaciones:
-                proyecto = getattr(asignacion, "proyecto", None)
-
-                if not proyecto:
-                    continue
-
-                if getattr(asignacion, "include_history", False) or not getattr(
-                    asignacion,
-                    "start_at",
-                    None,
-                ):
-                    access = {
-                        "include_history": True,
-                        "start_at": None,
-                    }
-                else:
-                    access = {
-                        "include_history": False,
-                        "start_at": asignacion.start_at,
-                    }
-
-                project_keys = (
-                    getattr(proyecto, "nombre", None),
-                    getattr(proyecto, "codigo", None),
-                    getattr(proyecto, "id", None),
-                )
-
-                for key in project_keys:
-                    if key is None:
-                        continue
-
-                    normalized_key = str(key).strip()
-
-                    if normalized_key:
-                        access_by_key[normalized_key.lower()] = access
-
-            ids_ok = []
-
-            for session_id, proyecto_texto, creado_en in qs.values_list(
-                "id",
-                "proyecto",
-                "creado_en",
-            ):
-                project_key = (
-                    str(proyecto_texto).strip().lower() if proyecto_texto else ""
-                )
-
-                if not project_key:
-                    continue
-
-                access = access_by_key.get(project_key)
-
-                if not access:
-                    continue
-
-                if access["include_history"] or access["start_at"] is None:
-                    ids_ok.append(session_id)
-                    continue
-
-                if not creado_en:
-                    continue
-
-                start_at = access["start_at"]
-
-                if isinstance(start_at, datetime):
-                    start_date = start_at.date()
-                else:
-                    start_date = start_at
-
-                if isinstance(creado_en, datetime):
-                    if timezone.is_aware(creado_en):
-                        creado_date = timezone.localtime(creado_en).date()
-                    else:
-                        creado_date = creado_en.date()
-                else:
-                    creado_date = creado_en
-
-                if creado_date >= start_date:
-                    ids_ok.append(session_id)
-
-            qs = qs.filter(id__in=ids_ok)
+        qs = filter_queryset_by_project_window(
+            qs,
+            user,
+            "proyecto_ref",
+            "creado_en",
+            by_date=True,
+        )
 
     qs = qs.distinct()
 
     # ============================================================
     # Mapas para resolver el nombre de Proyecto
     # ============================================================
-    if can_view_legacy_history:
-        proyectos_list = list(Proyecto.objects.all())
+    proyectos_list = list(Proyecto.objects.all())
 
     by_id = {p.id: p for p in proyectos_list}
 
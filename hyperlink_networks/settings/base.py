@@ -114,6 +114,9 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
 
+    # 👇 Roles / asignaciones del usuario, una vez por request
+    'core.principal.PrincipalMiddleware',
+
     # 👇 El mensaje flash necesita que este middleware vaya antes
     'django.contrib.messages.middleware.MessageMiddleware',
 
@@ -175,6 +178,32 @@ PLAN_READER_USE_OPENAI = os.getenv(
 
 PLAN_READER_MODEL = os.getenv("PLAN_READER_MODEL", "gpt-5.2")
 PLAN_READER_RENDER_ZOOM = os.getenv("PLAN_READER_RENDER_ZOOM", "3")
+
+# Perfil de render de las páginas enviadas al modelo (legacy, palette,
+# grayscale, jpeg, webp) y recorte opcional "x0,y0,x1,y1" en fracciones
+# de página. Ver plan_reader/services/render_profiles.py.
+PLAN_READER_RENDER_PROFILE = os.getenv("PLAN_READER_RENDER_PROFILE", "legacy")
+PLAN_READER_RENDER_CLIP = os.getenv("PLAN_READER_RENDER_CLIP", "")
+
+# Páginas enviadas al modelo en paralelo por cada PlanReaderJob.
+PLAN_READER_PAGE_CONCURRENCY = int(os.getenv("PLAN_READER_PAGE_CONCURRENCY", "4"))
+
+# Intervalo mínimo entre consultas de Stop (cancelación) a la DB
+# mientras se procesa un PlanReaderJob.
+PLAN_READER_CANCEL_CHECK_INTERVAL_MS = int(
+    os.getenv("PLAN_READER_CANCEL_CHECK_INTERVAL_MS", "500")
+)
+
+# Reutiliza extracciones IA de páginas idénticas (mismo raster, modelo,
+# zoom y versión de prompt) en lugar de volver a llamar al modelo.
+PLAN_READER_EXTRACTION_CACHE = os.getenv(
+    "PLAN_READER_EXTRACTION_CACHE", "True"
+).strip().lower() in [
+    "1",
+    "true",
+    "yes",
+    "y",
+]
 # ==============================
 # TEMPLATES
 # ==============================
@@ -385,6 +414,64 @@ WASABI_REGION_NAME = AWS_S3_REGION_NAME
 WASABI_ACCESS_KEY_ID = AWS_ACCESS_KEY_ID
 WASABI_SECRET_ACCESS_KEY = AWS_SECRET_ACCESS_KEY
 
+# Descargas simultáneas de evidencias desde Wasabi al armar ZIPs
+# (core/evidence_fetcher.py).
+EVIDENCE_FETCH_WORKERS = int(os.getenv("EVIDENCE_FETCH_WORKERS", "8"))
+
+# Cliente S3 compartido y reintentos de lectura (core/storage_gateway.py).
+STORAGE_GATEWAY_MAX_ATTEMPTS = int(os.getenv("STORAGE_GATEWAY_MAX_ATTEMPTS", "4"))
+STORAGE_GATEWAY_BACKOFF_BASE = float(os.getenv("STORAGE_GATEWAY_BACKOFF_BASE", "0.5"))
+STORAGE_GATEWAY_MAX_POOL_CONNECTIONS = int(
+    os.getenv("STORAGE_GATEWAY_MAX_POOL_CONNECTIONS", "32")
+)
+
+# Caché en disco de derivados de imágenes para reportes
+# (core/derivative_cache.py). 0 = sin límite.
+DERIVATIVE_CACHE_DIR = os.getenv("DERIVATIVE_CACHE_DIR", "")
+DERIVATIVE_CACHE_MAX_BYTES = int(
+    os.getenv("DERIVATIVE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024))
+)
+
+# Caché en disco de ZIP de fotografías ya generados
+# (core/zip_artifact_cache.py). 0 desactiva el caché.
+ZIP_ARTIFACT_CACHE_DIR = os.getenv("ZIP_ARTIFACT_CACHE_DIR", "")
+ZIP_ARTIFACT_CACHE_MAX_BYTES = int(
+    os.getenv("ZIP_ARTIFACT_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024))
+)
+
+# Cola durable de tareas en segundo plano (core/task_queue.py).
+# "queue": las ejecuta `manage.py run_task_worker` fuera del proceso web.
+# "scheduler": APScheduler/hilos dentro del proceso web (solo desarrollo).
+BACKGROUND_TASKS_MODE = os.getenv("BACKGROUND_TASKS_MODE", "queue")
+TASK_QUEUE_LEASE_SECONDS = int(os.getenv("TASK_QUEUE_LEASE_SECONDS", "120"))
+TASK_QUEUE_MAX_ATTEMPTS = int(os.getenv("TASK_QUEUE_MAX_ATTEMPTS", "3"))
+TASK_QUEUE_RETRY_BACKOFF = float(os.getenv("TASK_QUEUE_RETRY_BACKOFF", "30"))
+
+# Caché compartido entre procesos (core/shared_cache.py): L1 en memoria
+# del proceso (CACHE_L1_TIMEOUT segundos) delante de una tabla de la base
+# (core_cache) que ven todos los workers web y run_task_worker.
+CACHE_L1_TIMEOUT = float(os.getenv("CACHE_L1_TIMEOUT", "5"))
+CACHES = {
+    "default": {
+        "BACKEND": "core.shared_cache.TieredCache",
+        "LOCATION": "default",
+        "TIMEOUT": 300,
+        "OPTIONS": {
+            "L2": "shared",
+            "L1_TIMEOUT": CACHE_L1_TIMEOUT,
+        },
+    },
+    "shared": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "core_cache",
+        "TIMEOUT": 300,
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", "50000")),
+            "CULL_FREQUENCY": 4,
+        },
+    },
+}
+
 # ==============================
 # EMAIL (SMTP)
 # ==============================
@@ -6,7 +6,6 @@ optimizado para insertar en Excel. NO omite fotos: si no logra descargar, levant
 
 import io
 import os
-import time
 from tempfile import NamedTemporaryFile
 
 from PIL import Image, ImageOps
@@ -18,83 +17,40 @@ try:
 except Exception:
     pass
 
-import boto3
-from botocore.config import Config as BotoConfig
+from core.derivative_cache import get_derivative_cache
+from core.storage_gateway import read_fieldfile_bytes
 
 # === Parámetros ajustables por ENV ===
 MAX_PX = int(os.getenv("REPORT_IMG_MAX_PX", "1600")
              )              # tamaño máx. lado largo
 JPG_QUALITY = int(os.getenv("REPORT_IMG_JPG_QUALITY", "82"))      # calidad JPG
-# timeout connect (s)
-DL_CONNECT_TO = int(os.getenv("REPORT_IMG_CONNECT_TIMEOUT", "5"))
-DL_READ_TO = int(os.getenv("REPORT_IMG_READ_TIMEOUT", "30")
-                 )      # timeout read (s)
 # intentos por imagen
 DL_MAX_ATTEMPTS = int(os.getenv("REPORT_IMG_MAX_ATTEMPTS", "12"))
 DL_BACKOFF_BASE = float(
     os.getenv("REPORT_IMG_BACKOFF_BASE", "0.8"))  # base exponencial
 
-# Reutiliza endpoint/region de django-storages si están en ENV
-_S3_ENDPOINT = os.getenv(
-    "AWS_S3_ENDPOINT_URL") or os.getenv("AWS_ENDPOINT_URL")
-_S3_REGION = os.getenv("AWS_S3_REGION_NAME") or os.getenv("AWS_REGION")
-
-_BOTO_CFG = BotoConfig(
-    connect_timeout=DL_CONNECT_TO,
-    read_timeout=DL_READ_TO,
-    retries={"max_attempts": 5, "mode": "standard"},
-    max_pool_connections=10,
-)
+# JPEG de reporte (el que se precalcula al subir la evidencia)
+REPORT_JPEG_MAX_SIDE_PX = 1600
+REPORT_JPEG_QUALITY = 75
 
 
 def _download_fieldfile_bytes_strict(fieldfile) -> bytes:
     """
     Descarga el FieldFile desde Wasabi/S3 con reintentos exponenciales.
-    - Obtiene bucket y key desde el storage de django-storages.
-    - Si no hay bucket/key, usa .open()/.read() del propio FieldFile.
+    - Usa el cliente S3 compartido de core.storage_gateway (un solo
+      pool de conexiones por proceso).
+    - Si el storage no es S3, usa .open()/.read() del storage.
     - Si agota intentos, levanta RuntimeError (para NO omitir la foto).
     """
-    storage = getattr(fieldfile, "storage", None)
-    bucket = getattr(storage, "bucket_name", None)
-    key = fieldfile.name
-
-    # Fallback genérico (puede bloquear más, pero mantiene compatibilidad)
-    if not bucket or not key:
-        fieldfile.open("rb")
-        data = fieldfile.read()
-        fieldfile.close()
-        return data
-
-    # Cliente S3 apuntando al endpoint de Wasabi (o el que definas en ENV)
-    client_kwargs = {"config": _BOTO_CFG}
-    if _S3_ENDPOINT:
-        client_kwargs["endpoint_url"] = _S3_ENDPOINT
-    if _S3_REGION:
-        client_kwargs["region_name"] = _S3_REGION
-
-    client = boto3.client("s3", **client_kwargs)
-
-    delay = DL_BACKOFF_BASE
-    last_err = None
-    for attempt in range(1, DL_MAX_ATTEMPTS + 1):
-        try:
-            obj = client.get_object(Bucket=bucket, Key=key)
-            body = obj["Body"]  # botocore.response.StreamingBody
-            chunks = []
-            while True:
-                chunk = body.read(1024 * 1024)  # 1MB
-                if not chunk:
-                    break
-                chunks.append(chunk)
-            return b"".join(chunks)
-        except Exception as e:
-            last_err = e
-            # Backoff exponencial con tope de 60s por espera
-            time.sleep(min(60, delay))
-            delay *= 2.0
-
-    raise RuntimeError(
-        f"No se pudo descargar la imagen tras {DL_MAX_ATTEMPTS} intentos: {last_err}")
+    try:
+        return read_fieldfile_bytes(
+            fieldfile,
+            attempts=DL_MAX_ATTEMPTS,
+            backoff_base=DL_BACKOFF_BASE,
+        )
+    except Exception as e:
+        raise RuntimeError(
+            f"No se pudo descargar la imagen tras {DL_MAX_ATTEMPTS} intentos: {e}") from e
 
 
 def tmp_jpeg_from_filefield(fieldfile, max_px=MAX_PX, quality=JPG_QUALITY):
@@ -124,3 +80,74 @@ def tmp_jpeg_from_filefield(fieldfile, max_px=MAX_PX, quality=JPG_QUALITY):
                 optimize=True, progressive=True)
 
     return tmp_path, w, h
+
+
+def encode_jpeg_derivative(raw, max_side_px, quality, exif_transpose=False):
+    """
+    Reduce la imagen raw (bytes) a lado largo max_side_px y la codifica
+    como JPEG progresivo. Devuelve (bytes, width, height).
+
+    exif_transpose aplica la orientación EXIF (el JPEG resultante no
+    lleva EXIF); las miniaturas lo necesitan para verse derechas.
+    """
+    im = Image.open(io.BytesIO(raw))
+    if exif_transpose:
+        im = ImageOps.exif_transpose(im)
+    im = im.convert("RGB")
+    im.draft("RGB", (max_side_px, max_side_px))  # acelera decode de JPEG
+    im.thumbnail((max_side_px, max_side_px), Image.LANCZOS)
+
+    out = io.BytesIO()
+    im.save(out, "JPEG", quality=quality, optimize=True,
+            progressive=True, subsampling="4:2:0")
+
+    return out.getvalue(), im.size[0], im.size[1]
+
+
+def report_jpeg_from_filefield(fieldfile, max_side_px=REPORT_JPEG_MAX_SIDE_PX,
+                               quality=REPORT_JPEG_QUALITY, derivative=None):
+    """
+    JPEG de reporte (lado largo max_side_px) desde el caché de derivados
+    compartido (core.derivative_cache). Si no está, descarga el original
+    con el cliente S3 compartido, lo reduce y lo guarda en el caché.
+    Devuelve (path, width, height). El path es del caché: no borrarlo.
+
+    derivative: FieldFile del JPEG de reporte generado al subir la
+    evidencia (operaciones.services.evidence_derivatives). Si existe y
+    los parámetros son los de ese JPEG, se descarga tal cual en vez del
+    original y no se reconvierte.
+    """
+    use_derivative = (
+        bool(derivative)
+        and max_side_px == REPORT_JPEG_MAX_SIDE_PX
+        and quality == REPORT_JPEG_QUALITY
+    )
+
+    def _build(tmp_path):
+        if use_derivative:
+            try:
+                raw = read_fieldfile_bytes(derivative)
+                with Image.open(io.BytesIO(raw)) as im:
+                    w, h = im.size
+                with open(tmp_path, "wb") as fh:
+                    fh.write(raw)
+                return {"width": w, "height": h}
+            except Exception:
+                # Derivado perdido o corrupto: se genera desde el original.
+                pass
+
+        data, w, h = encode_jpeg_derivative(
+            read_fieldfile_bytes(fieldfile), max_side_px, quality)
+
+        with open(tmp_path, "wb") as fh:
+            fh.write(data)
+
+        return {"width": w, "height": h}
+
+    path, meta = get_derivative_cache().get_or_create(
+        fieldfile.name,
+        f"report-jpeg:{max_side_px}:q{quality}",
+        _build,
+    )
+
+    return str(path), meta["width"], meta["height"]
@@ -0,0 +1,120 @@
+import time
+import zipfile
+from tempfile import SpooledTemporaryFile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from operaciones.models import SesionBilling
+from operaciones.views_fotos_zip import (ZIP_SPOOL_MEMORY_LIMIT,
+                                         _build_spooled_zip_from_entries,
+                                         _collect_photo_entries_for_zip,
+                                         _zip_size_bytes)
+
+
+def _build_deflate_all(entries):
+    """
+    Comportamiento anterior: todas las entradas con DEFLATE nivel 6.
+    """
+    spooled = SpooledTemporaryFile(
+        max_size=ZIP_SPOOL_MEMORY_LIMIT,
+    )
+
+    with zipfile.ZipFile(
+        spooled,
+        mode="w",
+        compression=zipfile.ZIP_DEFLATED,
+        compresslevel=6,
+    ) as zf:
+        for arcname, data in entries:
+            zf.writestr(
+                arcname,
+                data,
+            )
+
+    return spooled
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the billing session photo ZIP: DEFLATE on every entry "
+        "versus the per-entry compression policy (ZIP_STORED for already "
+        "compressed media). Photos are downloaded once; only the ZIP "
+        "build is measured."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "sesion_id",
+            type=int,
+            help="SesionBilling id used for the benchmark.",
+        )
+
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Builds per mode. The best run is reported. Default: 3.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sesion = SesionBilling.objects.get(pk=options["sesion_id"])
+        except SesionBilling.DoesNotExist as exc:
+            raise CommandError("Billing session not found.") from exc
+
+        started = time.perf_counter()
+        entries, stats = _collect_photo_entries_for_zip(sesion)
+        fetch_seconds = time.perf_counter() - started
+
+        if not entries:
+            raise CommandError("No photos available for this billing session.")
+
+        raw_bytes = sum(len(data) for _, data in entries)
+
+        self.stdout.write(
+            f"Session {sesion.id}: {len(entries)} photos, "
+            f"{raw_bytes / 1_000_000:.1f} MB, "
+            f"{stats['total_fallidas']} failed, "
+            f"download {fetch_seconds:.2f}s."
+        )
+
+        modes = [
+            ("deflate-all", _build_deflate_all),
+            ("policy", _build_spooled_zip_from_entries),
+        ]
+
+        results = {}
+
+        for name, build in modes:
+            best = None
+
+            for _ in range(max(options["repeat"], 1)):
+                wall_started = time.perf_counter()
+                cpu_started = time.process_time()
+
+                spooled = build(entries)
+
+                cpu_seconds = time.process_time() - cpu_started
+                wall_seconds = time.perf_counter() - wall_started
+
+                size = _zip_size_bytes(spooled)
+                spooled.close()
+
+                if best is None or wall_seconds < best[1]:
+                    best = (cpu_seconds, wall_seconds, size)
+
+            results[name] = best
+
+        base_cpu, base_wall, base_size = results["deflate-all"]
+
+        for name, (cpu_seconds, wall_seconds, size) in results.items():
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{name}: cpu {cpu_seconds:.3f}s "
+                    f"({cpu_seconds / (base_cpu or 1):.0%}), "
+                    f"wall {wall_seconds:.3f}s "
+                    f"({wall_seconds / (base_wall or 1):.0%}), "
+                    f"size {size / 1_000_000:.2f} MB "
+                    f"({size / (base_size or 1):.1%})"
+                )
+            )
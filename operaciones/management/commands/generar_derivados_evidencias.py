@@ -0,0 +1,71 @@
+# operaciones/management/commands/generar_derivados_evidencias.py
+
+from django.core.management.base import BaseCommand
+
+from cable_installation.models import CableEvidence
+from operaciones.models import EvidenciaFotoBilling
+from operaciones.services.evidence_derivatives import \
+    generate_evidence_derivatives
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates the report JPEG and thumbnail of photo evidence uploaded "
+        "before upload-time derivatives existed (or whose background job failed)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sesion",
+            type=int,
+            help="Only billing evidence of this SesionBilling id.",
+        )
+        parser.add_argument(
+            "--skip-cable",
+            action="store_true",
+            help="Do not process cable installation evidence.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=0,
+            help="Maximum evidences per model (0 = no limit).",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate derivatives that already exist.",
+        )
+
+    def handle(self, *args, **opts):
+        billing_qs = EvidenciaFotoBilling.objects.exclude(imagen="")
+        if opts["sesion"]:
+            billing_qs = billing_qs.filter(tecnico_sesion__sesion_id=opts["sesion"])
+        if not opts["force"]:
+            billing_qs = billing_qs.filter(imagen_thumb="")
+
+        querysets = [billing_qs]
+
+        if not opts["skip_cable"] and not opts["sesion"]:
+            cable_qs = CableEvidence.objects.exclude(image="")
+            if not opts["force"]:
+                cable_qs = cable_qs.filter(image_thumb="")
+            querysets.append(cable_qs)
+
+        for qs in querysets:
+            qs = qs.order_by("id")
+            if opts["limit"]:
+                qs = qs[: opts["limit"]]
+
+            done = failed = 0
+            for ev in qs.iterator(chunk_size=200):
+                try:
+                    if generate_evidence_derivatives(ev, force=opts["force"]):
+                        done += 1
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"{qs.model.__name__} #{ev.pk}: {e}")
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{qs.model.__name__}: {done} generated, {failed} failed."
+            ))
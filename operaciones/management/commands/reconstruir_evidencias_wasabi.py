@@ -3,8 +3,8 @@
 from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
 from django.utils.text import slugify
+from core.storage_gateway import get_s3_client
 from operaciones.models import SesionBilling, SesionBillingTecnico, EvidenciaFotoBilling
-import boto3
 
 
 def _is_safe_key(k: str) -> bool:
@@ -30,16 +30,8 @@ class Command(BaseCommand):
 
         proj_slug = slugify(s.proyecto_id or "project") or "project"
 
-        # Configuración de conexión a Wasabi usando boto3
-        session = boto3.session.Session(
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_S3_REGION_NAME,
-        )
-        s3 = session.client(
-            "s3",
-            endpoint_url=getattr(settings, "AWS_S3_ENDPOINT_URL", None),
-        )
+        # Cliente compartido de Wasabi (core.storage_gateway)
+        s3 = get_s3_client()
         bucket = settings.AWS_STORAGE_BUCKET_NAME
 
         creadas = 0
@@ -0,0 +1,40 @@
+# operaciones/management/commands/reconstruir_indice_busqueda_billing.py
+
+from django.core.management.base import BaseCommand
+
+from operaciones.models import SesionBilling
+from operaciones.services.billing_search import (REFRESH_BATCH_SIZE,
+                                                 refresh_search_documents)
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the billing search index (SesionBillingSearch). Needed only "
+        "after bulk changes that skip model signals (queryset.update(), raw SQL)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Only index sessions that have no search row yet.",
+        )
+
+    def handle(self, *args, **opts):
+        qs = SesionBilling.objects.order_by("id")
+        if opts["missing"]:
+            qs = qs.filter(search__isnull=True)
+
+        written = 0
+        batch = []
+
+        for pk in qs.values_list("id", flat=True).iterator(chunk_size=REFRESH_BATCH_SIZE):
+            batch.append(pk)
+            if len(batch) >= REFRESH_BATCH_SIZE:
+                written += refresh_search_documents(batch)
+                batch.clear()
+
+        if batch:
+            written += refresh_search_documents(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"{written} billing sessions indexed."))
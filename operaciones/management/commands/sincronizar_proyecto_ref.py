@@ -0,0 +1,51 @@
+# operaciones/management/commands/sincronizar_proyecto_ref.py
+
+from django.core.management.base import BaseCommand
+
+from operaciones.models import SesionBilling, build_proyecto_ref_resolver
+
+
+class Command(BaseCommand):
+    help = (
+        "Resolves SesionBilling.proyecto_ref from the project code/name text "
+        "(sessions created before the field existed or whose project was "
+        "created later)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Re-resolve every session, not only those without proyecto_ref.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many sessions would change.",
+        )
+
+    def handle(self, *args, **opts):
+        resolve = build_proyecto_ref_resolver()
+
+        qs = SesionBilling.objects.only("id", "proyecto_id", "proyecto", "proyecto_ref")
+        if not opts["all"]:
+            qs = qs.filter(proyecto_ref__isnull=True)
+
+        changed = []
+        unresolved = 0
+
+        for s in qs.order_by("id").iterator(chunk_size=1000):
+            ref = resolve(s.proyecto_id, s.proyecto)
+            if ref is None:
+                unresolved += 1
+            if ref != s.proyecto_ref_id:
+                s.proyecto_ref_id = ref
+                changed.append(s)
+
+        if changed and not opts["dry_run"]:
+            SesionBilling.objects.bulk_update(changed, ["proyecto_ref"], batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(changed)} sessions updated, {unresolved} without a matching project."
+            + (" (dry run)" if opts["dry_run"] else "")
+        ))
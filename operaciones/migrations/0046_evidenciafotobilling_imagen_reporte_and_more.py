@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:32
+
+import storages.backends.s3
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('operaciones', '0045_alter_sesionbilling_finance_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evidenciafotobilling',
+            name='imagen_reporte',
+            field=models.ImageField(blank=True, editable=False, max_length=1024, storage=storages.backends.s3.S3Storage(), upload_to=''),
+        ),
+        migrations.AddField(
+            model_name='evidenciafotobilling',
+            name='imagen_thumb',
+            field=models.ImageField(blank=True, editable=False, max_length=1024, storage=storages.backends.s3.S3Storage(), upload_to=''),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('operaciones', '0046_evidenciafotobilling_imagen_reporte_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evidenciafotobilling',
+            name='imagen_sha256',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=64),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facturacion', '0019_alter_tipogasto_options'),
+        ('operaciones', '0047_evidenciafotobilling_imagen_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sesionbilling',
+            name='proyecto_ref',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sesiones_billing', to='facturacion.proyecto'),
+        ),
+        migrations.AddIndex(
+            model_name='sesionbilling',
+            index=models.Index(fields=['proyecto_ref', 'creado_en'], name='operaciones_proyect_40bdb8_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+from django.db import migrations
+
+
+def backfill_proyecto_ref(apps, schema_editor):
+    Proyecto = apps.get_model("facturacion", "Proyecto")
+    SesionBilling = apps.get_model("operaciones", "SesionBilling")
+
+    # Mismas claves que SesionBilling.sync_from_proyecto_codigo y
+    # match_proyecto_for_text: código, ID y nombre (sin mayúsculas).
+    by_id = {}
+    by_codigo = {}
+    by_nombre = {}
+    for p in Proyecto.objects.only("id", "codigo", "nombre").order_by("id"):
+        by_id[str(p.id)] = p.id
+        for index, key in ((by_codigo, p.codigo), (by_nombre, p.nombre)):
+            key = (key or "").strip().lower()
+            if key:
+                index.setdefault(key, p.id)
+
+    def _resolve(codigo, texto):
+        codigo = (codigo or "").strip().lower()
+        texto = (texto or "").strip().lower()
+
+        # Filas antiguas pueden no tener código: se resuelven por texto.
+        return (
+            (codigo and (by_codigo.get(codigo) or by_id.get(codigo)))
+            or by_id.get(texto)
+            or by_codigo.get(texto)
+            or by_nombre.get(texto)
+        )
+
+    batch = []
+    BATCH = 1000
+    qs = SesionBilling.objects.filter(proyecto_ref__isnull=True).only(
+        "id", "proyecto_id", "proyecto"
+    )
+    for s in qs.iterator(chunk_size=BATCH):
+        ref = _resolve(s.proyecto_id, s.proyecto)
+        if ref is None:
+            continue
+
+        s.proyecto_ref_id = ref
+        batch.append(s)
+
+        if len(batch) >= BATCH:
+            SesionBilling.objects.bulk_update(batch, ["proyecto_ref"])
+            batch.clear()
+
+    if batch:
+        SesionBilling.objects.bulk_update(batch, ["proyecto_ref"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("operaciones", "0048_sesionbilling_proyecto_ref"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_proyecto_ref, migrations.RunPython.noop),
+    ]
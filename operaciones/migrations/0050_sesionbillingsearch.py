@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('operaciones', '0049_backfill_sesionbilling_proyecto_ref'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SesionBillingSearch',
+            fields=[
+                ('sesion', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search', serialize=False, to='operaciones.sesionbilling')),
+                ('documento', models.TextField(blank=True, default='')),
+                ('tecnicos', models.TextField(blank=True, default='')),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,153 @@
+import logging
+import unicodedata
+
+from django.db import migrations, transaction
+
+logger = logging.getLogger(__name__)
+
+TABLE = "operaciones_sesionbillingsearch"
+FTS_TABLE = "operaciones_sesionbillingsearch_fts"
+
+# Copia de operaciones.services.billing_search al crear esta migración
+# (las migraciones no deben depender del código vivo de la app).
+SEARCH_SOURCE_FIELDS = (
+    "proyecto_id",
+    "cliente",
+    "ciudad",
+    "proyecto",
+    "oficina",
+    "direccion_proyecto",
+)
+
+
+def _normalize(value):
+    text = unicodedata.normalize("NFKD", str(value or ""))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+
+    return " ".join(text.lower().split())
+
+
+def _search_texts(sesion, tech_names):
+    tecnicos = _normalize(" ".join(n for n in tech_names if n))
+
+    partes = [getattr(sesion, f, "") or "" for f in SEARCH_SOURCE_FIELDS]
+    documento = _normalize(" ".join([*partes, tecnicos]))
+
+    return documento, tecnicos
+
+PG_TSV = [
+    f"ALTER TABLE {TABLE} ADD COLUMN documento_tsv tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', documento)) STORED",
+    f"CREATE INDEX {TABLE}_tsv_gin ON {TABLE} USING gin (documento_tsv)",
+]
+
+PG_TRGM = [
+    f"CREATE INDEX {TABLE}_doc_trgm ON {TABLE} USING gin (documento gin_trgm_ops)",
+    f"CREATE INDEX {TABLE}_tec_trgm ON {TABLE} USING gin (tecnicos gin_trgm_ops)",
+]
+
+# Tabla FTS5 propia (rowid = sesion_id) mantenida por triggers.
+SQLITE_FTS = [
+    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(documento, tokenize='trigram')",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, documento) VALUES (new.sesion_id, new.documento);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.sesion_id;
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {TABLE} BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.sesion_id;
+        INSERT INTO {FTS_TABLE}(rowid, documento) VALUES (new.sesion_id, new.documento);
+    END""",
+]
+
+SQLITE_FTS_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == "postgresql":
+        for sql in PG_TSV:
+            schema_editor.execute(sql)
+
+        # pg_trgm puede requerir permisos: sin él la búsqueda funciona
+        # igual, solo que sin índice para los LIKE.
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                for sql in PG_TRGM:
+                    schema_editor.execute(sql)
+        except Exception as e:
+            logger.warning("pg_trgm not available, trigram indexes skipped: %s", e)
+
+    elif vendor == "sqlite":
+        # Requiere FTS5 con tokenizer trigram (SQLite >= 3.34).
+        try:
+            with transaction.atomic(using=schema_editor.connection.alias):
+                for sql in SQLITE_FTS:
+                    schema_editor.execute(sql)
+        except Exception as e:
+            logger.warning("FTS5 trigram not available, search uses LIKE: %s", e)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for sql in SQLITE_FTS_DROP:
+            schema_editor.execute(sql)
+
+    # En PostgreSQL la columna y los índices se van con la tabla (0050).
+
+
+def backfill_search_documents(apps, schema_editor):
+    SesionBilling = apps.get_model("operaciones", "SesionBilling")
+    SesionBillingTecnico = apps.get_model("operaciones", "SesionBillingTecnico")
+    BillingPayWeekSnapshot = apps.get_model("operaciones", "BillingPayWeekSnapshot")
+    SesionBillingSearch = apps.get_model("operaciones", "SesionBillingSearch")
+
+    names = {}
+    for model in (SesionBillingTecnico, BillingPayWeekSnapshot):
+        rows = model.objects.values_list(
+            "sesion_id",
+            "tecnico__first_name",
+            "tecnico__last_name",
+            "tecnico__username",
+        ).distinct()
+
+        for sesion_id, first, last, username in rows.iterator(chunk_size=2000):
+            full = " ".join(x for x in (first, last, username) if x)
+            bucket = names.setdefault(sesion_id, [])
+            if full not in bucket:
+                bucket.append(full)
+
+    batch = []
+    BATCH = 1000
+    qs = SesionBilling.objects.only("id", *SEARCH_SOURCE_FIELDS)
+    for s in qs.iterator(chunk_size=BATCH):
+        documento, tecnicos = _search_texts(s, names.get(s.id, []))
+        batch.append(
+            SesionBillingSearch(sesion_id=s.id, documento=documento, tecnicos=tecnicos)
+        )
+
+        if len(batch) >= BATCH:
+            SesionBillingSearch.objects.bulk_create(batch, ignore_conflicts=True)
+            batch.clear()
+
+    if batch:
+        SesionBillingSearch.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("operaciones", "0050_sesionbillingsearch"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
@@ -5,6 +5,9 @@ from uuid import uuid4
 from django.conf import settings
 from django.core.validators import FileExtensionValidator
 from django.db import models
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.module_loading import import_string
 from django.utils.text import slugify
@@ -127,7 +130,77 @@ indexes = [
 ]
 
 
+# ----------------------- Proyecto de la sesión (texto) --------------------- #
+
+def match_proyecto_for_text(texto, proyectos=None):
+    """
+    Proyecto al que corresponde el texto guardado en SesionBilling.proyecto:
+    ID numérico, código o nombre (sin distinguir mayúsculas), las mismas
+    claves que comparaban antes los filtros de acceso.
+    """
+    texto = (texto or "").strip()
+    if not texto:
+        return None
+
+    if proyectos is None:
+        proyectos = Proyecto.objects.all()
+
+    if texto.isdigit():
+        p = proyectos.filter(pk=int(texto)).first()
+        if p is not None:
+            return p
+
+    p = proyectos.filter(codigo__iexact=texto).first()
+    if p is not None:
+        return p
+
+    return proyectos.filter(nombre__iexact=texto).order_by("id").first()
+
+
+def build_proyecto_ref_resolver():
+    """
+    Versión en memoria de la resolución de save() para procesos en lote
+    (sincronizar_proyecto_ref): resolve(proyecto_id, proyecto) -> id o None.
+    """
+    by_id = {}
+    by_codigo = {}
+    by_nombre = {}
+
+    for pid, codigo, nombre in Proyecto.objects.order_by("id").values_list(
+        "id", "codigo", "nombre"
+    ):
+        by_id[str(pid)] = pid
+        for index, key in ((by_codigo, codigo), (by_nombre, nombre)):
+            key = (key or "").strip().lower()
+            if key:
+                index.setdefault(key, pid)
+
+    def resolve(codigo, texto):
+        codigo = (codigo or "").strip().lower()
+        texto = (texto or "").strip().lower()
+
+        return (
+            (codigo and (by_codigo.get(codigo) or by_id.get(codigo)))
+            or by_id.get(texto)
+            or by_codigo.get(texto)
+            or by_nombre.get(texto)
+            or None
+        )
+
+    return resolve
+
+
 class SesionBilling(models.Model):
+    # Campos que sync_from_proyecto_codigo() escribe a partir del código.
+    PROYECTO_SYNC_FIELDS = (
+        "proyecto_id",
+        "proyecto_ref",
+        "cliente",
+        "ciudad",
+        "proyecto",
+        "oficina",
+    )
+
     creado_en = models.DateTimeField(default=timezone.now)
 
     # ----- Descuentos directos -----
@@ -178,6 +251,18 @@ class SesionBilling(models.Model):
     proyecto = models.CharField(max_length=120)
     oficina = models.CharField(max_length=120)
 
+    # Proyecto resuelto desde proyecto_id / proyecto en save()
+    # (desnormalizado): los filtros de acceso hacen join por FK en vez
+    # de comparar nombre, código o ID como texto.
+    proyecto_ref = models.ForeignKey(
+        "facturacion.Proyecto",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="sesiones_billing",
+    )
+
     # ----- Ubicación y semana proyectada de pago -----
     direccion_proyecto = models.CharField(
         "Project address / Google Maps link",
@@ -279,6 +364,7 @@ class SesionBilling(models.Model):
             models.Index(fields=["is_cable_installation"]),
             models.Index(fields=["is_split_child"]),
             models.Index(fields=["tech_payment_mode"]),  # ✅ nuevo
+            models.Index(fields=["proyecto_ref", "creado_en"]),
         ]
 
     def sync_from_proyecto_codigo(self):
@@ -294,6 +380,7 @@ class SesionBilling(models.Model):
             self.ciudad = ""
             self.proyecto = ""
             self.oficina = ""
+            self.proyecto_ref = None
             return
 
         p = None
@@ -309,6 +396,9 @@ class SesionBilling(models.Model):
                 p = None
 
         if p is None:
+            # Código desconocido: se mantiene el texto y se intenta
+            # resolver por él (nombre, código o ID).
+            self.proyecto_ref = match_proyecto_for_text(self.proyecto)
             return
 
         self.proyecto_id = p.codigo
@@ -316,6 +406,7 @@ class SesionBilling(models.Model):
         self.ciudad = p.ciudad
         self.proyecto = p.nombre
         self.oficina = p.oficina
+        self.proyecto_ref = p
 
     @property
     def diferencia(self):
@@ -434,6 +525,14 @@ class SesionBilling(models.Model):
     def save(self, *args, **kwargs):
         self.sync_from_proyecto_codigo()
 
+        # Un save parcial que cambia el proyecto debe guardar también lo
+        # sincronizado (proyecto_ref define el acceso en los listados).
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and not {"proyecto_id", "proyecto"}.isdisjoint(
+            update_fields
+        ):
+            kwargs["update_fields"] = {*update_fields, *self.PROYECTO_SYNC_FIELDS}
+
         if self.is_direct_discount and self.finance_status in ("none", "", "sent"):
             self.finance_status = "review_discount"
 
@@ -444,6 +543,20 @@ class SesionBilling(models.Model):
         super().save(*args, **kwargs)
 
 
+@receiver(post_save, sender=Proyecto)
+def _proyecto_link_orphan_sessions(sender, instance, **kwargs):
+    """
+    Un proyecto nuevo (o renombrado) toma las sesiones que apuntaban a
+    él solo por texto y aún no tenían proyecto_ref.
+    """
+    keys = Q(proyecto__iexact=instance.nombre) | Q(proyecto__iexact=instance.codigo)
+    keys |= Q(proyecto_id__iexact=instance.codigo) | Q(proyecto=str(instance.pk))
+
+    SesionBilling.objects.filter(proyecto_ref__isnull=True).filter(keys).update(
+        proyecto_ref=instance
+    )
+
+
 class ReporteFotograficoJob(models.Model):
     ESTADOS = [
         ("pendiente",  "Pending"),
@@ -723,6 +836,33 @@ class EvidenciaFotoBilling(models.Model):
         max_length=1024,
     )
 
+    # Derivados generados al subir (services.evidence_derivatives),
+    # guardados junto al original. Vacíos mientras no se generan.
+
+    imagen_reporte = models.ImageField(
+        storage=wasabi_storage,
+        max_length=1024,
+        blank=True,
+        editable=False,
+    )
+
+    imagen_thumb = models.ImageField(
+        storage=wasabi_storage,
+        max_length=1024,
+        blank=True,
+        editable=False,
+    )
+
+    # SHA-256 del original: la misma foto subida dos veces se lee
+    # (light levels) una sola vez.
+    imagen_sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        db_index=True,
+        editable=False,
+    )
+
     nota = models.CharField("Note", max_length=255, blank=True)
 
     tomada_en = models.DateTimeField(default=timezone.now)
@@ -809,6 +949,11 @@ class EvidenciaFotoBilling(models.Model):
 
         return ""
 
+    @property
+    def thumb_url(self) -> str:
+
+        return (self.imagen_thumb or self.imagen).url
+
     @property
     def is_power_candidate(self) -> bool:
 
@@ -1523,3 +1668,76 @@ class RequirementListItem(models.Model):
             label = self.title or "Fiber requirement"
 
         return f"{self.requirement_list.name} — {self.order}. {label}"
+
+
+# ======================= ÍNDICE DE BÚSQUEDA BILLING ====================== #
+
+
+class SesionBillingSearch(models.Model):
+    """
+    Texto de búsqueda normalizado de una SesionBilling
+    (operaciones/services/billing_search.py). Los índices específicos de
+    cada motor (tsvector/pg_trgm o FTS5) se crean en la migración 0051.
+    """
+
+    sesion = models.OneToOneField(
+        SesionBilling,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search",
+    )
+    documento = models.TextField(blank=True, default="")
+    tecnicos = models.TextField(blank=True, default="")
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Search #{self.sesion_id}"
+
+
+def _search_fields_touched(update_fields, fields) -> bool:
+    return update_fields is None or not set(update_fields).isdisjoint(fields)
+
+
+@receiver(post_save, sender=SesionBilling)
+def _sesion_billing_refresh_search(sender, instance, created, update_fields=None, **kwargs):
+    from operaciones.services.billing_search import (SEARCH_SOURCE_FIELDS,
+                                                     schedule_search_refresh)
+
+    # Cambios de estado/finanzas (update_fields sin campos de texto) no
+    # tocan el documento.
+    if created or _search_fields_touched(update_fields, SEARCH_SOURCE_FIELDS):
+        schedule_search_refresh(instance.pk)
+
+
+@receiver(post_save, sender=SesionBillingTecnico)
+@receiver(post_delete, sender=SesionBillingTecnico)
+@receiver(post_save, sender=BillingPayWeekSnapshot)
+@receiver(post_delete, sender=BillingPayWeekSnapshot)
+def _billing_tecnico_refresh_search(sender, instance, update_fields=None, **kwargs):
+    from operaciones.services.billing_search import schedule_search_refresh
+
+    if _search_fields_touched(update_fields, ("tecnico", "tecnico_id", "sesion", "sesion_id")):
+        schedule_search_refresh(instance.sesion_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def _tecnico_rename_refresh_search(sender, instance, created, update_fields=None, **kwargs):
+    from operaciones.services.billing_search import (TECH_NAME_FIELDS,
+                                                     schedule_search_refresh)
+
+    # Logins (update_fields=["last_login"]) y usuarios nuevos no cambian
+    # ningún documento.
+    if created or not _search_fields_touched(update_fields, TECH_NAME_FIELDS):
+        return
+
+    ids = set(
+        SesionBillingTecnico.objects.filter(tecnico=instance).values_list(
+            "sesion_id", flat=True
+        )
+    )
+    ids.update(
+        BillingPayWeekSnapshot.objects.filter(tecnico=instance).values_list(
+            "sesion_id", flat=True
+        )
+    )
+    schedule_search_refresh(*ids)
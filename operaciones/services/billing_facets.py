@@ -0,0 +1,563 @@
+# operaciones/services/billing_facets.py
+"""
+Filtros tipo Excel de Billing List (columnas 0-16 de billing_listar.html).
+
+BILLING_FACETS (core.facets) resuelve en SQL, con GROUP BY sobre los
+campos de SesionBilling, las columnas que salen de la propia sesión:
+fecha, Project ID, dirección, semana, estado, cliente, ciudad,
+proyecto, oficina, montos, diferencia y estado en Finanzas.
+
+Técnicos (5) y comentarios (16) también: cada uno es una subconsulta
+que concatena las asignaciones de la sesión (GroupConcat) con el mismo
+texto de la tabla.
+
+Semanas de pago (15) es la excepción: la etiqueta sale de
+build_payweek_groups() sobre los snapshots y se arma por filas, solo
+cuando se pide o se filtra esa columna.
+
+Aquí viven también las etiquetas de la sesión que usa la tabla
+(técnicos, grupos de semanas de pago, proyecto) para que tabla y
+filtros muestren exactamente el mismo texto.
+"""
+
+from __future__ import annotations
+
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.db.models import OuterRef, Prefetch, Q, Subquery, TextField, Value
+from django.db.models.functions import Concat, TruncDate
+
+from core.facets import (EMPTY_LABEL, USER_NAME_FIELDS, FacetColumn, FacetSet,
+                         GroupConcat, StripText)
+from facturacion.models import Proyecto
+
+STATUS_LABELS = {
+    "aprobado_pm": "Approved by PM",
+    "rechazado_pm": "Rejected by PM",
+    "aprobado_supervisor": "Approved by supervisor",
+    "rechazado_supervisor": "Rejected by supervisor",
+    "en_revision_supervisor": "In supervisor review",
+    "finalizado": "Finished (pending review)",
+    "en_proceso": "In progress",
+    "asignado": "Assigned",
+}
+
+FINANCE_STATUS_LABELS = {
+    "sent": "Sent to Finance",
+    "in_review": "In review",
+    "rejected": "Rejected",
+    "pending": "Pending payment",
+    "paid": "Paid",
+    "review_discount": "Review discount",
+    "discount_applied": "Discount applied",
+}
+
+ROWS_CHUNK_SIZE = 500
+
+
+# ============================================================
+# Etiquetas por valor
+# ============================================================
+
+
+def money_label(value) -> str:
+    if value in (None, ""):
+        return EMPTY_LABEL
+
+    try:
+        return f"${Decimal(value):.2f}"
+    except Exception:
+        return str(value)
+
+
+def status_label(is_direct_discount, estado) -> str:
+    if is_direct_discount:
+        return "Direct discount"
+
+    return STATUS_LABELS.get(estado or "", "Assigned")
+
+
+def finance_status_label(finance_status) -> str:
+    return FINANCE_STATUS_LABELS.get(finance_status or "", EMPTY_LABEL)
+
+
+def diff_label(real, subtotal) -> str:
+    if real in (None, "") or subtotal in (None, ""):
+        return EMPTY_LABEL
+
+    try:
+        diff = Decimal(real) - Decimal(subtotal)
+    except Exception:
+        return EMPTY_LABEL
+
+    if diff == 0:
+        return "$0.00"
+
+    if diff < 0:
+        return f"- ${abs(diff):.2f}"
+
+    return f"+ ${diff:.2f}"
+
+
+def created_date_label(value) -> str:
+    return value.strftime("%Y-%m-%d") if value else EMPTY_LABEL
+
+
+# ============================================================
+# Etiquetas de la sesión (tabla y filtros)
+# ============================================================
+
+
+def techs_label(sesion):
+    """
+    Técnicos asignados ("Nombre Apellido, ..."), con tecnicos_sesion
+    precargado.
+    """
+    vals = []
+
+    try:
+        for st in sesion.tecnicos_sesion.all():
+            if not getattr(st, "tecnico", None):
+                continue
+
+            vals.append(st.tecnico.get_full_name() or st.tecnico.username)
+    except Exception:
+        pass
+
+    return ", ".join(v for v in vals if v) or "—"
+
+
+def legacy_paid_flag(s):
+    note = getattr(s, "finance_note", "") or ""
+
+    try:
+        tech_ids = list(
+            s.tecnicos_sesion.all().values_list("tecnico_id", flat=True)
+        )
+    except Exception:
+        tech_ids = []
+
+    possible_weeks = [
+        (getattr(s, "semana_pago_real", "") or "").strip().upper(),
+        (getattr(s, "semana_pago_proyectada", "") or "").strip().upper(),
+        (getattr(s, "discount_week", "") or "").strip().upper(),
+    ]
+    possible_weeks = [w for w in possible_weeks if w]
+
+    for tech_id in tech_ids:
+        for wk in possible_weeks:
+            marker = f"[TECH_WEEKLY_PAYMENT_PAID:{tech_id}:{wk}]"
+            if marker in note:
+                return True
+
+    return False
+
+
+def build_payweek_groups(s):
+    """
+    Semanas de pago por técnico desde los snapshots (o una línea Legacy
+    si la sesión no tiene), para la columna Pay week de la tabla.
+    """
+    groups_map = {}
+
+    snaps = (
+        list(getattr(s, "pay_week_snapshots", []).all())
+        if hasattr(s, "pay_week_snapshots")
+        else []
+    )
+
+    if snaps:
+        for snap in snaps:
+            tech_name = (
+                snap.tecnico.get_full_name().strip()
+                if getattr(snap, "tecnico", None) and snap.tecnico.get_full_name()
+                else getattr(snap.tecnico, "username", "")
+                or f"User {snap.tecnico_id}"
+            )
+
+            grp = groups_map.setdefault(
+                tech_name,
+                {
+                    "tech_name": tech_name,
+                    "weeks_summary": "",
+                    "lines": [],
+                },
+            )
+
+            work_type = (
+                (snap.tipo_trabajo or "").strip()
+                or (getattr(snap.item, "tipo_trabajo", "") or "").strip()
+                or "Legacy"
+            )
+
+            week = (
+                (getattr(snap, "semana_resultado", "") or "").strip()
+                or (getattr(snap, "semana_base", "") or "").strip()
+                or (getattr(s, "semana_pago_real", "") or "").strip()
+                or (getattr(s, "discount_week", "") or "").strip()
+                or (getattr(s, "semana_pago_proyectada", "") or "").strip()
+                or "—"
+            )
+
+            is_paid_line = (
+                getattr(snap, "payment_status", "") == "paid"
+                or bool(getattr(snap, "paid_at", None))
+                or (
+                    getattr(snap, "weekly_payment", None)
+                    and getattr(snap.weekly_payment, "status", "") == "paid"
+                )
+                or getattr(s, "finance_status", "") == "paid"
+            )
+
+            grp["lines"].append(
+                {
+                    "work_type": work_type,
+                    "codigo_trabajo": (snap.codigo_trabajo or "").strip(),
+                    "week": week,
+                    "is_legacy": False,
+                    "snapshot_id": snap.id,
+                    "is_paid": is_paid_line,
+                }
+            )
+
+        groups = list(groups_map.values())
+
+        for grp in groups:
+            weeks = []
+
+            for line in grp["lines"]:
+                wk = (line.get("week") or "").strip()
+
+                if wk and wk not in weeks:
+                    weeks.append(wk)
+
+            grp["weeks_summary"] = ", ".join(weeks) if weeks else "—"
+
+        return groups
+
+    asignaciones = (
+        list(s.tecnicos_sesion.all()) if hasattr(s, "tecnicos_sesion") else []
+    )
+
+    base_week = (
+        (getattr(s, "semana_pago_real", "") or "").strip()
+        or (getattr(s, "discount_week", "") or "").strip()
+        or (getattr(s, "semana_pago_proyectada", "") or "").strip()
+        or "—"
+    )
+
+    legacy_is_paid = legacy_paid_flag(s) or (
+        getattr(s, "finance_status", "") == "paid"
+    )
+
+    tech_names = []
+
+    for asig in asignaciones:
+        tech_name = (
+            asig.tecnico.get_full_name().strip()
+            if getattr(asig, "tecnico", None) and asig.tecnico.get_full_name()
+            else getattr(asig.tecnico, "username", "") or f"User {asig.tecnico_id}"
+        )
+
+        if tech_name and tech_name not in tech_names:
+            tech_names.append(tech_name)
+
+    tech_label = ", ".join(tech_names) if tech_names else "—"
+
+    return [
+        {
+            "tech_name": tech_label,
+            "weeks_summary": base_week,
+            "lines": [
+                {
+                    "work_type": "Legacy",
+                    "codigo_trabajo": "",
+                    "week": base_week,
+                    "is_legacy": True,
+                    "session_id": s.id,
+                    "dom_id": f"{s.id}-legacy",
+                    "is_paid": legacy_is_paid,
+                }
+            ],
+        }
+    ]
+
+
+def payweek_snapshot_label(sesion, groups=None):
+    groups = groups if groups is not None else build_payweek_groups(sesion)
+
+    if not groups:
+        return str(getattr(sesion, "semana_pago_real", "") or "—")
+
+    rows = []
+
+    for grp in groups:
+        tech_name = grp.get("tech_name") or "—"
+
+        for line in grp.get("lines", []):
+            work_type = (line.get("work_type") or "").strip() or "Work type"
+            week = (line.get("week") or "").strip() or "—"
+            suffix = " [Paid]" if line.get("is_paid") else ""
+            rows.append(f"{tech_name} — {work_type} → {week}{suffix}")
+
+    return (
+        " | ".join(rows)
+        if rows
+        else str(getattr(sesion, "semana_pago_real", "") or "—")
+    )
+
+
+def resolve_project_labels_for_sessions(sessions):
+    """
+    Deja en proyecto_nombre / project_label el nombre del Proyecto al que
+    apunta el texto de proyecto (id, código o nombre). Una consulta.
+    """
+    proj_ids = set()
+    proj_texts = set()
+
+    for s in sessions:
+        raw_proyecto = getattr(s, "proyecto", None)
+        if raw_proyecto not in (None, "", "-"):
+            txt = str(raw_proyecto).strip()
+            if txt:
+                proj_texts.add(txt)
+                try:
+                    proj_ids.add(int(txt))
+                except Exception:
+                    pass
+
+        raw_proyecto_id = getattr(s, "proyecto_id", None)
+        if raw_proyecto_id not in (None, "", "-"):
+            txt2 = str(raw_proyecto_id).strip()
+            if txt2:
+                proj_texts.add(txt2)
+                try:
+                    proj_ids.add(int(txt2))
+                except Exception:
+                    pass
+
+    proj_q = Q()
+
+    if proj_ids:
+        proj_q |= Q(id__in=proj_ids)
+
+    if proj_texts:
+        proj_q |= Q(nombre__in=proj_texts) | Q(codigo__in=proj_texts)
+
+    proyectos = (
+        Proyecto.objects.filter(proj_q).only("id", "nombre", "codigo")
+        if proj_q
+        else Proyecto.objects.none()
+    )
+
+    by_id = {str(p.id): p.nombre for p in proyectos}
+    by_code = {
+        (p.codigo or "").strip().lower(): p.nombre
+        for p in proyectos
+        if getattr(p, "codigo", None)
+    }
+    by_name = {
+        (p.nombre or "").strip().lower(): p.nombre
+        for p in proyectos
+        if getattr(p, "nombre", None)
+    }
+
+    for s in sessions:
+        raw = str(getattr(s, "proyecto", "") or "").strip()
+        raw_id = str(getattr(s, "proyecto_id", "") or "").strip()
+
+        label = ""
+
+        if raw:
+            label = (
+                by_id.get(raw)
+                or by_code.get(raw.lower())
+                or by_name.get(raw.lower())
+                or raw
+            )
+
+        if not label and raw_id:
+            label = (
+                by_id.get(raw_id)
+                or by_code.get(raw_id.lower())
+                or by_name.get(raw_id.lower())
+                or raw_id
+            )
+
+        s.proyecto_nombre = label
+        s.project_label = label
+
+    return sessions
+
+
+# ============================================================
+# Columnas de asignaciones (SQL)
+# ============================================================
+
+
+def _tech_name():
+    # CustomUser.get_full_name() (sin strip, como la tabla); nunca queda
+    # vacío, así que "or username" no aplica.
+    return Concat("tecnico__first_name", Value(" "), "tecnico__last_name")
+
+
+def _assignments_concat(label, delimiter, *, with_comment=False):
+    """
+    Subconsulta: etiquetas de las asignaciones de la sesión, en orden
+    de id, unidas por `delimiter` (NULL si no hay ninguna).
+    """
+    from operaciones.models import SesionBillingTecnico
+
+    assignments = SesionBillingTecnico.objects.filter(sesion=OuterRef("pk"))
+
+    if with_comment:
+        assignments = assignments.annotate(
+            excel_comment=StripText("tecnico_comentario"),
+        ).exclude(excel_comment="")
+
+    return Subquery(
+        assignments.order_by()
+        .values("sesion")
+        .annotate(excel_label=GroupConcat(label, delimiter, ordering="id"))
+        .values("excel_label"),
+        output_field=TextField(),
+    )
+
+
+TECHS_ANNOTATION = {
+    # Como techs_label().
+    "excel_techs": _assignments_concat(_tech_name(), ", "),
+}
+
+COMMENTS_ANNOTATION = {
+    # Como comments_label(): "Nombre: comentario" | ...
+    "excel_comments": _assignments_concat(
+        Concat(
+            _tech_name(),
+            Value(": "),
+            "excel_comment",
+            output_field=TextField(),
+        ),
+        " | ",
+        with_comment=True,
+    ),
+}
+
+
+# ============================================================
+# Columnas por filas
+# ============================================================
+
+
+def payweek_rows(qs):
+    """
+    (pk, semanas de pago) como payweek_snapshot_label() de la tabla.
+    """
+    from operaciones.models import (BillingPayWeekSnapshot, SesionBilling,
+                                    SesionBillingTecnico)
+
+    sessions = (
+        SesionBilling.objects.filter(pk__in=qs.order_by().values("pk"))
+        .only(
+            "id",
+            "semana_pago_proyectada",
+            "semana_pago_real",
+            "discount_week",
+            "finance_status",
+            "finance_note",
+        )
+        .prefetch_related(
+            Prefetch(
+                "tecnicos_sesion",
+                queryset=SesionBillingTecnico.objects.select_related("tecnico"),
+            ),
+            Prefetch(
+                "pay_week_snapshots",
+                queryset=BillingPayWeekSnapshot.objects.select_related(
+                    "tecnico",
+                    "item",
+                    "weekly_payment",
+                )
+                .filter(is_adjustment=False)
+                .order_by(
+                    "tecnico__first_name",
+                    "tecnico__last_name",
+                    "tecnico__username",
+                    "tipo_trabajo",
+                    "codigo_trabajo",
+                    "id",
+                ),
+            ),
+        )
+        .order_by()
+    )
+
+    for s in sessions.iterator(chunk_size=ROWS_CHUNK_SIZE):
+        yield s.pk, payweek_snapshot_label(s, build_payweek_groups(s))
+
+
+def project_labels(raw_values, empty=EMPTY_LABEL) -> list[str]:
+    """
+    Etiquetas de proyecto para pares (proyecto, proyecto_id) distintos.
+    """
+    sessions = [
+        SimpleNamespace(proyecto=proyecto, proyecto_id=proyecto_id)
+        for proyecto, proyecto_id in raw_values
+    ]
+
+    resolve_project_labels_for_sessions(sessions)
+
+    return [s.proyecto_nombre or s.proyecto or empty for s in sessions]
+
+
+# ============================================================
+# Facetas
+# ============================================================
+
+
+BILLING_FACETS = FacetSet(
+    "operaciones_billing",
+    [
+        FacetColumn(
+            "0",
+            "excel_created_date",
+            annotations={
+                "excel_created_date": TruncDate(
+                    "creado_en",
+                    tzinfo=dt_timezone.utc,
+                ),
+            },
+            label=created_date_label,
+        ),
+        FacetColumn("1", "proyecto_id"),
+        FacetColumn("2", "direccion_proyecto"),
+        FacetColumn("3", "semana_pago_proyectada"),
+        FacetColumn("4", ("is_direct_discount", "estado"), label=status_label),
+        FacetColumn("5", "excel_techs", annotations=TECHS_ANNOTATION),
+        FacetColumn("6", "cliente"),
+        FacetColumn("7", "ciudad"),
+        FacetColumn("8", ("proyecto", "proyecto_id"), labels=project_labels),
+        FacetColumn("9", "oficina"),
+        FacetColumn("10", "subtotal_tecnico", label=money_label),
+        FacetColumn("11", "subtotal_empresa", label=money_label),
+        FacetColumn("12", "real_company_billing", label=money_label),
+        FacetColumn(
+            "13",
+            ("real_company_billing", "subtotal_empresa"),
+            label=diff_label,
+        ),
+        FacetColumn("14", "finance_status", label=finance_status_label),
+        FacetColumn("15", rows=payweek_rows),
+        FacetColumn("16", "excel_comments", annotations=COMMENTS_ANNOTATION),
+    ],
+    models=[
+        "operaciones.SesionBilling",
+        "operaciones.SesionBillingTecnico",
+        "operaciones.BillingPayWeekSnapshot",
+        "operaciones.WeeklyPayment",
+        "facturacion.Proyecto",
+        ("usuarios.CustomUser", USER_NAME_FIELDS),
+    ],
+)
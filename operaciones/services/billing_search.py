@@ -0,0 +1,314 @@
+# operaciones/services/billing_search.py
+"""
+Índice de búsqueda de SesionBilling.
+
+Cada sesión tiene una fila SesionBillingSearch con su texto de búsqueda
+ya normalizado (minúsculas, sin acentos):
+
+- documento: proyecto_id, cliente, ciudad, proyecto, oficina,
+  direccion_proyecto y nombres de técnicos.
+- tecnicos:  solo los nombres de técnicos (asignados y de snapshots de
+  pago), para el filtro rápido "tech" sin joins ni distinct().
+
+Índices por motor (migración 0051):
+
+- PostgreSQL: columna generada documento_tsv (tsvector 'simple') con GIN
+  para el ranking, e índices GIN pg_trgm sobre documento y tecnicos para
+  que los LIKE '%texto%' no recorran la tabla.
+- SQLite: tabla FTS5 operaciones_sesionbillingsearch_fts (tokenizer
+  trigram) sincronizada con triggers; MATCH por subcadena y bm25().
+
+La fila se actualiza al guardar la sesión, al cambiar sus técnicos o
+snapshots y al renombrar un técnico (receivers en operaciones.models),
+una vez por transacción. `manage.py reconstruir_indice_busqueda_billing`
+la reconstruye completa.
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import unicodedata
+
+from django.db import connection, transaction
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+# Campos de SesionBilling que forman parte del documento.
+SEARCH_SOURCE_FIELDS = (
+    "proyecto_id",
+    "cliente",
+    "ciudad",
+    "proyecto",
+    "oficina",
+    "direccion_proyecto",
+)
+
+# Campos del usuario que forman parte del nombre de un técnico.
+TECH_NAME_FIELDS = ("first_name", "last_name", "username")
+
+FTS_TABLE = "operaciones_sesionbillingsearch_fts"
+
+# El tokenizer trigram de FTS5 no encuentra términos de menos de 3
+# caracteres: esos se filtran con LIKE.
+FTS_MIN_TOKEN_LEN = 3
+
+REFRESH_BATCH_SIZE = 500
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_fts_available = None
+_pending = threading.local()
+
+
+# ============================================================
+# Texto
+# ============================================================
+
+
+def normalize_search_text(value) -> str:
+    """
+    Minúsculas, sin acentos y con espacios simples.
+    """
+    text = unicodedata.normalize("NFKD", str(value or ""))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+
+    return " ".join(text.lower().split())
+
+
+def search_terms(query) -> list[str]:
+    """
+    Términos de una búsqueda, en el mismo formato que el documento.
+    """
+    return [t for t in normalize_search_text(query).split(" ") if t]
+
+
+def build_search_texts(sesion, tech_names) -> tuple[str, str]:
+    """
+    (documento, tecnicos) de una sesión.
+    """
+    tecnicos = normalize_search_text(" ".join(n for n in tech_names if n))
+
+    partes = [getattr(sesion, f, "") or "" for f in SEARCH_SOURCE_FIELDS]
+    documento = normalize_search_text(" ".join([*partes, tecnicos]))
+
+    return documento, tecnicos
+
+
+# ============================================================
+# Mantenimiento del índice
+# ============================================================
+
+
+def _tech_names_by_session(sesion_ids) -> dict[int, list[str]]:
+    from operaciones.models import BillingPayWeekSnapshot, SesionBillingTecnico
+
+    names = {}
+
+    for model in (SesionBillingTecnico, BillingPayWeekSnapshot):
+        rows = (
+            model.objects.filter(sesion_id__in=sesion_ids)
+            .values_list(
+                "sesion_id",
+                "tecnico__first_name",
+                "tecnico__last_name",
+                "tecnico__username",
+            )
+            .distinct()
+        )
+
+        for sesion_id, first, last, username in rows:
+            full = " ".join(x for x in (first, last, username) if x)
+            bucket = names.setdefault(sesion_id, [])
+            if full not in bucket:
+                bucket.append(full)
+
+    return names
+
+
+def refresh_search_documents(sesion_ids) -> int:
+    """
+    Recalcula las filas de búsqueda de las sesiones indicadas (upsert en
+    lotes). Devuelve cuántas se escribieron.
+    """
+    from operaciones.models import SesionBilling, SesionBillingSearch
+
+    ids = sorted({int(i) for i in sesion_ids if i})
+    written = 0
+
+    for start in range(0, len(ids), REFRESH_BATCH_SIZE):
+        chunk = ids[start:start + REFRESH_BATCH_SIZE]
+
+        sesiones = SesionBilling.objects.filter(pk__in=chunk).only(
+            "id",
+            *SEARCH_SOURCE_FIELDS,
+        )
+        names = _tech_names_by_session(chunk)
+
+        rows = []
+        for sesion in sesiones:
+            documento, tecnicos = build_search_texts(sesion, names.get(sesion.pk, []))
+            rows.append(
+                SesionBillingSearch(
+                    sesion_id=sesion.pk,
+                    documento=documento,
+                    tecnicos=tecnicos,
+                )
+            )
+
+        if rows:
+            SesionBillingSearch.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=["sesion"],
+                update_fields=["documento", "tecnicos", "actualizado_en"],
+            )
+            written += len(rows)
+
+    return written
+
+
+def schedule_search_refresh(*sesion_ids):
+    """
+    Encola sesiones para recalcular al confirmar la transacción actual.
+
+    Varias señales dentro de la misma transacción (guardar la sesión,
+    sus técnicos y snapshots) terminan en un solo refresh: el primer
+    callback procesa todo lo encolado y los siguientes no hacen nada.
+    Fuera de una transacción se ejecuta de inmediato.
+    """
+    ids = {int(i) for i in sesion_ids if i}
+    if not ids:
+        return
+
+    pending = getattr(_pending, "ids", None)
+    if pending is None:
+        pending = _pending.ids = set()
+
+    pending.update(ids)
+
+    transaction.on_commit(_flush_pending)
+
+
+def _flush_pending():
+    batch = getattr(_pending, "ids", None)
+    if not batch:
+        return
+
+    _pending.ids = set()
+
+    try:
+        refresh_search_documents(batch)
+    except Exception:
+        logger.exception("Could not refresh billing search documents.")
+
+
+# ============================================================
+# Consultas
+# ============================================================
+
+
+def fts_available() -> bool:
+    """
+    True si la tabla FTS5 existe (SQLite con FTS5 habilitado).
+    """
+    global _fts_available
+
+    if connection.vendor != "sqlite":
+        return False
+
+    if _fts_available is None:
+        with connection.cursor() as cursor:
+            _fts_available = FTS_TABLE in connection.introspection.table_names(cursor)
+
+    return _fts_available
+
+
+def _fts_match_expression(terms) -> str:
+    # Cada término entre comillas (las comillas internas se duplican).
+    return " AND ".join('"{}"'.format(t.replace('"', '""')) for t in terms)
+
+
+def _pg_tsquery(terms) -> str:
+    # Prefijos por palabra ('hn:* & 1234:*'); solo [a-z0-9], sin sintaxis.
+    words = [w for t in terms for w in _TOKEN_RE.findall(t)]
+    return " & ".join(f"{w}:*" for w in words)
+
+
+def filter_by_technician(qs, text):
+    """
+    Sesiones con algún técnico (asignado o en snapshots) cuyo nombre,
+    apellido o usuario contiene el texto. Reemplaza el OR sobre
+    tecnicos_sesion y pay_week_snapshots (sin joins ni distinct()).
+    """
+    terms = search_terms(text)
+    if not terms:
+        return qs
+
+    cond = Q()
+    for term in terms:
+        cond &= Q(search__tecnicos__contains=term)
+
+    return qs.filter(cond)
+
+
+def search_billing(qs, query, ranked: bool = True):
+    """
+    Filtra un queryset de SesionBilling por la búsqueda y, con
+    ranked=True, lo anota con search_rank y lo ordena por relevancia
+    (luego por más reciente).
+
+    Todos los términos deben aparecer (por subcadena) en el documento,
+    igual que los icontains de antes.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return qs
+
+    if fts_available() and all(len(t) >= FTS_MIN_TOKEN_LEN for t in terms):
+        match = _fts_match_expression(terms)
+
+        qs = qs.filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                (match,),
+            )
+        )
+
+        if not ranked:
+            return qs
+
+        # bm25: menor es mejor.
+        rank = RawSQL(
+            f"SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = operaciones_sesionbilling.id",
+            (match,),
+            output_field=FloatField(),
+        )
+        return qs.annotate(search_rank=rank).order_by("-search_rank", "-creado_en")
+
+    cond = Q()
+    for term in terms:
+        cond &= Q(search__documento__contains=term)
+
+    qs = qs.filter(cond)
+
+    if not ranked:
+        return qs
+
+    tsquery = _pg_tsquery(terms) if connection.vendor == "postgresql" else ""
+
+    if tsquery:
+        rank = RawSQL(
+            "SELECT ts_rank_cd(s.documento_tsv, to_tsquery('simple', %s)) "
+            "FROM operaciones_sesionbillingsearch s "
+            "WHERE s.sesion_id = operaciones_sesionbilling.id",
+            (tsquery,),
+            output_field=FloatField(),
+        )
+        return qs.annotate(search_rank=rank).order_by("-search_rank", "-creado_en")
+
+    return qs.order_by("-creado_en")
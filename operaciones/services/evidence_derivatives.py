@@ -0,0 +1,111 @@
+# operaciones/services/evidence_derivatives.py
+"""
+Derivados de las fotos de evidencia, generados una vez al subirlas:
+
+- JPEG de reporte (lado largo 1600 px, q75): lo que insertan los
+  reportes fotográficos, en vez de reducir el original en cada
+  regeneración.
+- Miniatura (lado largo 320 px) para las galerías.
+
+Se guardan en el mismo storage, junto al original
+(<original>__report.jpg / <original>__thumb.jpg), y quedan registrados
+en los campos del modelo (DERIVATIVE_FIELDS). Mientras no existan,
+reportes y galerías usan el original.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from core.storage_gateway import read_fieldfile_bytes
+from operaciones.excel_images import (REPORT_JPEG_MAX_SIDE_PX,
+                                      REPORT_JPEG_QUALITY,
+                                      encode_jpeg_derivative)
+
+logger = logging.getLogger(__name__)
+
+THUMB_MAX_SIDE_PX = 320
+THUMB_QUALITY = 70
+
+# Modelo -> (campo original, campo JPEG de reporte, campo miniatura)
+DERIVATIVE_FIELDS = {
+    "operaciones.EvidenciaFotoBilling": ("imagen", "imagen_reporte", "imagen_thumb"),
+    "cable_installation.CableEvidence": ("image", "image_report", "image_thumb"),
+}
+
+
+def derivative_name(original_name: str, variant: str) -> str:
+    base, _ = os.path.splitext(original_name)
+    return f"{base}__{variant}.jpg"
+
+
+def generate_evidence_derivatives(instance, force: bool = False) -> bool:
+    """
+    Genera y guarda los derivados de una evidencia.
+
+    Una sola descarga del original para ambos derivados. Devuelve True
+    si guardó algo; False si no hay original o ya estaban generados
+    (salvo force=True).
+    """
+    source_field, report_field, thumb_field = DERIVATIVE_FIELDS[instance._meta.label]
+
+    source = getattr(instance, source_field)
+
+    if not source or not source.name:
+        return False
+
+    if not force and getattr(instance, report_field) and getattr(instance, thumb_field):
+        return False
+
+    raw = read_fieldfile_bytes(source)
+    storage = source.storage
+
+    updates = {}
+
+    for field_name, variant, max_side_px, quality, exif_transpose in (
+        (report_field, "report", REPORT_JPEG_MAX_SIDE_PX, REPORT_JPEG_QUALITY, False),
+        (thumb_field, "thumb", THUMB_MAX_SIDE_PX, THUMB_QUALITY, True),
+    ):
+        data, _, _ = encode_jpeg_derivative(
+            raw,
+            max_side_px,
+            quality,
+            exif_transpose=exif_transpose,
+        )
+
+        updates[field_name] = storage.save(
+            derivative_name(source.name, variant),
+            ContentFile(data),
+        )
+
+    # Ya con los bytes en mano: hash para reutilizar lecturas de light
+    # levels de fotos repetidas (operaciones.services.light_levels).
+    if hasattr(instance, "imagen_sha256"):
+        updates["imagen_sha256"] = hashlib.sha256(raw).hexdigest()
+
+    # update() y no save(): no pisa cambios hechos a la fila mientras
+    # se generaban los derivados (revisión, lecturas de potencia...).
+    type(instance).objects.filter(pk=instance.pk).update(**updates)
+
+    for field_name, name in updates.items():
+        setattr(instance, field_name, name)
+
+    return True
+
+
+def schedule_evidence_derivatives(instance):
+    """
+    Encola la generación de derivados al confirmarse la transacción
+    que creó la evidencia; la subida responde sin esperar.
+    """
+    from usuarios.schedulers import enqueue_evidence_derivatives
+
+    model_label = instance._meta.label
+    pk = instance.pk
+
+    transaction.on_commit(lambda: enqueue_evidence_derivatives(model_label, pk))
@@ -0,0 +1,419 @@
+# operaciones/services/light_levels.py
+"""
+Extracción de light levels (POWER PORT / LIGHT SOURCE) en lote.
+
+run_light_levels_backfill() procesa todas las evidencias de un billing:
+
+1. Selecciona las fotos candidatas (mismas reglas de siempre).
+2. Descarga en paralelo las que no tienen hash, calcula su SHA-256
+   y las reduce al tamaño de reporte (1600 px) antes de enviarlas.
+3. Agrupa por hash: la misma foto subida varias veces se lee una sola
+   vez, y si ya existe una lectura para ese hash se reutiliza sin IA.
+4. Llama al modelo de visión con concurrencia acotada y un único
+   cliente OpenAI compartido.
+5. Guarda todo con bulk_update.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from core.derivative_cache import get_derivative_cache
+from core.storage_gateway import read_fieldfile_bytes
+from operaciones.excel_images import (REPORT_JPEG_MAX_SIDE_PX,
+                                      REPORT_JPEG_QUALITY,
+                                      encode_jpeg_derivative,
+                                      report_jpeg_from_filefield)
+from operaciones.models import EvidenciaFotoBilling
+
+logger = logging.getLogger(__name__)
+
+# Llamadas simultáneas al modelo de visión por backfill.
+LIGHT_LEVELS_CONCURRENCY = int(os.getenv("LIGHT_LEVELS_CONCURRENCY", "6"))
+
+RESULT_FIELDS = [
+    "power_dbm",
+    "light_source_dbm",
+    "power_extracted_at",
+    "power_extracted_by",
+    "power_extract_note",
+    "imagen_sha256",
+]
+
+_client = None
+_client_lock = threading.Lock()
+
+
+# ============================================================
+# Cliente y payload
+# ============================================================
+
+
+def get_vision_client():
+    """
+    Cliente OpenAI compartido por el proceso (thread-safe): un solo
+    pool de conexiones HTTP para todas las extracciones.
+    """
+    global _client
+
+    if _client is not None:
+        return _client
+
+    api_key = getattr(settings, "OPENAI_API_KEY", "") or os.getenv("OPENAI_API_KEY", "")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY is not configured on the server.")
+
+    try:
+        from openai import OpenAI
+    except Exception:
+        raise ValueError("openai package is not installed. Run: pip install openai")
+
+    with _client_lock:
+        if _client is None:
+            _client = OpenAI(api_key=api_key)
+
+    return _client
+
+
+def vision_image_bytes(raw: bytes, name: str = ""):
+    """
+    (bytes, mime) a enviar al modelo de visión: el JPEG de reporte
+    (lado largo 1600 px). Con detail=high la API reduce igual la
+    imagen a 2048 px / 768 px de lado corto, así que enviar el
+    original solo agrega bytes.
+
+    Si Pillow no puede abrir la imagen se envía tal cual.
+    """
+    try:
+        data, _, _ = encode_jpeg_derivative(
+            raw,
+            REPORT_JPEG_MAX_SIDE_PX,
+            REPORT_JPEG_QUALITY,
+        )
+        return data, "image/jpeg"
+    except Exception:
+        pass
+
+    name = (name or "").lower()
+    if name.endswith(".png"):
+        return raw, "image/png"
+    if name.endswith(".webp"):
+        return raw, "image/webp"
+    return raw, "image/jpeg"
+
+
+def _cached_report_jpeg(ev) -> bytes:
+    """
+    JPEG de reporte desde el caché de derivados compartido (o el
+    derivado generado al subir), sin descargar el original.
+    """
+    path, _, _ = report_jpeg_from_filefield(ev.imagen, derivative=ev.imagen_reporte)
+
+    with open(path, "rb") as fh:
+        return fh.read()
+
+
+# ============================================================
+# Selección
+# ============================================================
+
+
+def _backfill_flags(ev):
+    """
+    (is_light_source, is_power_port) para decidir si la foto se procesa.
+    """
+    from operaciones.views_billing_exec import (_light_source_meta_from_title,
+                                                _power_meta_from_title,
+                                                _power_port_no_from_evidence)
+
+    note = (ev.power_extract_note or "").lower()
+
+    if ev.requisito_id:
+        titulo_req = (ev.requisito.titulo or "").strip()
+        titulo_req_upper = titulo_req.upper()
+
+        needs_power, _port_no = _power_meta_from_title(titulo_req)
+
+        is_light_source = (
+            bool(getattr(ev.requisito, "needs_light_source_reading", False))
+            or _light_source_meta_from_title(titulo_req)
+            or titulo_req_upper.startswith("LIGHT SOURCE")
+            or ev.light_source_dbm is not None
+            or "type=light_source" in note
+        )
+
+        is_power_port = (
+            bool(getattr(ev.requisito, "needs_power_reading", False))
+            or needs_power
+            or titulo_req_upper.startswith("POWER PORT")
+            or ev.power_dbm is not None
+            or _power_port_no_from_evidence(ev)
+            or "type=power_port" in note
+        )
+
+    else:
+        titulo_manual = (ev.titulo_manual or "").strip()
+        nota = (ev.nota or "").strip()
+        hint = f"{titulo_manual} {nota}".lower()
+
+        needs_power, _port_no = _power_meta_from_title(titulo_manual)
+
+        is_light_source = (
+            _light_source_meta_from_title(titulo_manual)
+            or titulo_manual.upper().startswith("LIGHT SOURCE")
+            or ev.light_source_dbm is not None
+            or "type=light_source" in note
+        )
+
+        is_power_port = (
+            needs_power
+            or ev.power_dbm is not None
+            or _power_port_no_from_evidence(ev)
+            or "type=power_port" in note
+            or titulo_manual.lower() in {"", "extra"}
+            or any(
+                x in hint
+                for x in ["power", "port", "dbm", "opm", "light level", "light"]
+            )
+        )
+
+    return bool(is_light_source), bool(is_power_port)
+
+
+def _needs_extraction(ev, force: bool) -> bool:
+    from operaciones.views_billing_exec import _power_port_no_from_evidence
+
+    is_light_source, is_power_port = _backfill_flags(ev)
+
+    if not (force or is_light_source or is_power_port):
+        return False
+
+    # Si ya está completo, no gastar IA salvo force=True
+    if not force:
+        if is_light_source and ev.light_source_dbm is not None:
+            return False
+
+        if (
+            is_power_port
+            and ev.power_dbm is not None
+            and _power_port_no_from_evidence(ev)
+        ):
+            return False
+
+    return True
+
+
+# ============================================================
+# Lecturas reutilizables
+# ============================================================
+
+
+def _reading_kind(ev) -> str:
+    from operaciones.views_billing_exec import _power_extraction_target
+
+    _titulo, _port, is_light_source = _power_extraction_target(ev)
+
+    return "light_source" if is_light_source else "power_port"
+
+
+def _has_reading(ev, kind: str) -> bool:
+    if kind == "light_source":
+        return ev.light_source_dbm is not None
+
+    return ev.power_dbm is not None
+
+
+def _copy_reading(target, source, kind: str, user, now):
+    if kind == "light_source":
+        target.light_source_dbm = source.light_source_dbm
+    else:
+        target.power_dbm = source.power_dbm
+
+    target.power_extracted_at = now
+    target.power_extracted_by = user
+    target.power_extract_note = (
+        f"{source.power_extract_note or ''} | same_image_as={source.pk}"
+    )[:255]
+
+
+# ============================================================
+# Backfill
+# ============================================================
+
+
+def _in_worker(fn, *args):
+    """
+    Los hilos no consultan la base; si algo abrió conexión, se cierra.
+    """
+    try:
+        return fn(*args)
+    except Exception as e:
+        return e
+    finally:
+        connection.close()
+
+
+def run_light_levels_backfill(sesion, user=None, force=False, max_workers=None) -> dict:
+    """
+    Extrae light levels de todas las fotos candidatas del billing.
+
+    Devuelve contadores: total, procesadas, extraidas, reutilizadas
+    (misma foto ya leída), omitidas, errores y llamadas a la API.
+    """
+    from operaciones.views_billing_exec import _extract_power_dbm_for_evidence
+
+    evidencias = list(
+        EvidenciaFotoBilling.objects.filter(tecnico_sesion__sesion=sesion)
+        .select_related("requisito", "tecnico_sesion", "tecnico_sesion__sesion")
+        .order_by("id")
+    )
+
+    stats = {
+        "total": len(evidencias),
+        "procesadas": 0,
+        "extraidas": 0,
+        "reutilizadas": 0,
+        "omitidas": 0,
+        "errores": 0,
+        "api_calls": 0,
+    }
+
+    candidates = [ev for ev in evidencias if _needs_extraction(ev, force)]
+
+    stats["omitidas"] = len(evidencias) - len(candidates)
+    stats["procesadas"] = len(candidates)
+
+    if not candidates:
+        return stats
+
+    workers = max(int(max_workers or LIGHT_LEVELS_CONCURRENCY), 1)
+    payloads = {}
+
+    # Se crea antes de abrir hilos (y falla temprano sin API key).
+    client = get_vision_client()
+    get_derivative_cache()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="light_levels") as pool:
+        # ======================================================
+        # 1) Hash + JPEG reducido de las fotos sin hash
+        # ======================================================
+        def _download(ev):
+            raw = read_fieldfile_bytes(ev.imagen)
+            if not raw:
+                raise ValueError("Image file is empty.")
+            # Si Pillow no abre la foto va el original: se guarda su mime.
+            data, mime = vision_image_bytes(raw, ev.imagen.name)
+            return hashlib.sha256(raw).hexdigest(), (data, mime)
+
+        sin_hash = [ev for ev in candidates if not ev.imagen_sha256]
+
+        for ev, result in zip(
+            sin_hash,
+            pool.map(lambda ev: _in_worker(_download, ev), sin_hash),
+        ):
+            if isinstance(result, Exception):
+                stats["errores"] += 1
+                logger.warning("Light levels: evidence #%s unreadable: %s", ev.pk, result)
+                continue
+
+            ev.imagen_sha256, payloads[ev.pk] = result
+
+        # ======================================================
+        # 2) Agrupar por (hash, tipo) y reutilizar lecturas
+        # ======================================================
+        groups = {}
+        for ev in candidates:
+            if ev.imagen_sha256:
+                groups.setdefault((ev.imagen_sha256, _reading_kind(ev)), []).append(ev)
+
+        known = {}
+        if not force:
+            candidate_ids = [ev.pk for ev in candidates]
+            for src in (
+                EvidenciaFotoBilling.objects.filter(
+                    imagen_sha256__in={h for h, _ in groups},
+                )
+                .exclude(pk__in=candidate_ids)
+                .order_by("-power_extracted_at", "-id")
+            ):
+                for kind in ("light_source", "power_port"):
+                    if _has_reading(src, kind):
+                        known.setdefault((src.imagen_sha256, kind), src)
+
+        now = timezone.now()
+        changed = {}
+        leaders = []
+
+        for key, group in groups.items():
+            source = known.get(key)
+
+            if source is not None:
+                for ev in group:
+                    _copy_reading(ev, source, key[1], user, now)
+                    changed[ev.pk] = ev
+                stats["reutilizadas"] += len(group)
+                continue
+
+            leaders.append((group[0], group[1:]))
+
+        # ======================================================
+        # 3) Visión en paralelo: una llamada por foto distinta
+        # ======================================================
+        def _extract(ev):
+            image_bytes, image_mime = payloads.get(ev.pk) or (None, None)
+            if image_bytes is None:
+                image_bytes, image_mime = _cached_report_jpeg(ev), "image/jpeg"
+
+            return _extract_power_dbm_for_evidence(
+                ev,
+                user=user,
+                allow_extra=True,
+                allow_locked=True,
+                client=client,
+                image_bytes=image_bytes,
+                image_mime=image_mime,
+                commit=False,
+            )
+
+        stats["api_calls"] = len(leaders)
+
+        results = pool.map(lambda item: _in_worker(_extract, item[0]), leaders)
+
+        for (leader, followers), result in zip(leaders, results):
+            if isinstance(result, Exception):
+                stats["errores"] += 1 + len(followers)
+                logger.info("Light levels: evidence #%s: %s", leader.pk, result)
+                # El hash calculado se guarda igual.
+                changed.setdefault(leader.pk, leader)
+                continue
+
+            changed[leader.pk] = leader
+            stats["extraidas"] += 1
+
+            kind = result.get("kind", "power_port")
+            for ev in followers:
+                _copy_reading(ev, leader, kind, user, now)
+                changed[ev.pk] = ev
+                stats["extraidas"] += 1
+
+    # Fotos sin lectura pero con hash recién calculado
+    for ev in candidates:
+        if ev.imagen_sha256 and ev.pk in payloads:
+            changed.setdefault(ev.pk, ev)
+
+    if changed:
+        EvidenciaFotoBilling.objects.bulk_update(
+            list(changed.values()),
+            RESULT_FIELDS,
+            batch_size=200,
+        )
+
+    return stats
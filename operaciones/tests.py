@@ -1,3 +1,478 @@
-from django.test import TestCase
+import io
+import tempfile
+import zipfile
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.evidence_fetcher import EvidenceFetcher, EvidenceFetchResult
+from core.permissions import filter_queryset_by_project_window
+from facturacion.models import Proyecto
+from operaciones.models import (
+    EvidenciaFotoBilling,
+    SesionBilling,
+    SesionBillingSearch,
+    SesionBillingTecnico,
+)
+from operaciones.services.billing_facets import (BILLING_FACETS, diff_label,
+                                                 finance_status_label,
+                                                 money_label,
+                                                 payweek_snapshot_label,
+                                                 resolve_project_labels_for_sessions,
+                                                 status_label, techs_label)
+from operaciones.services.billing_search import filter_by_technician, search_billing
+from operaciones.views_fotos_zip import generar_fotos_zip_partes_smartsheet_sin_cache
+from usuarios.models import ProyectoAsignacion
+
+
+class ProyectoRefSyncTests(TestCase):
+    """
+    proyecto_ref (el FK que usan los filtros de acceso) debe seguir al
+    código del proyecto, también en los saves parciales.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+
+        cls.pa = Proyecto.objects.create(
+            codigo="CA",
+            nombre="Project A",
+            mandante="Client A",
+            ciudad="City A",
+            estado="ST",
+            oficina="Office A",
+        )
+        cls.pb = Proyecto.objects.create(
+            codigo="CB",
+            nombre="Project B",
+            mandante="Client B",
+            ciudad="City B",
+            estado="ST",
+            oficina="Office B",
+        )
+
+        cls.admin = User.objects.create(username="ref-admin", is_superuser=True)
+        cls.viewer = User.objects.create(username="ref-viewer")
+
+        ProyectoAsignacion.objects.create(
+            usuario=cls.viewer,
+            proyecto=cls.pa,
+            include_history=True,
+        )
+
+    def _visible_ids(self):
+        # Usuario recién cargado: el principal memoizado es por request.
+        viewer = get_user_model().objects.get(pk=self.viewer.pk)
+
+        return set(
+            filter_queryset_by_project_window(
+                SesionBilling.objects.all(),
+                viewer,
+                "proyecto_ref",
+                "creado_en",
+                by_date=True,
+            ).values_list("id", flat=True)
+        )
+
+    def test_save_resolves_project_fields(self):
+        sesion = SesionBilling.objects.create(proyecto_id="ca")
+
+        sesion.refresh_from_db()
+
+        self.assertEqual(sesion.proyecto_ref_id, self.pa.pk)
+        self.assertEqual(sesion.proyecto_id, "CA")
+        self.assertEqual(sesion.cliente, "Client A")
+        self.assertEqual(sesion.proyecto, "Project A")
+        self.assertEqual(sesion.oficina, "Office A")
+
+    def test_partial_save_updates_project_ref(self):
+        sesion = SesionBilling.objects.create(proyecto_id="CA")
+        self.assertIn(sesion.pk, self._visible_ids())
+
+        sesion.proyecto_id = "CB"
+        sesion.save(update_fields=["proyecto_id"])
+
+        sesion.refresh_from_db()
+
+        self.assertEqual(sesion.proyecto_ref_id, self.pb.pk)
+        self.assertEqual(sesion.cliente, "Client B")
+        self.assertEqual(sesion.ciudad, "City B")
+        self.assertNotIn(sesion.pk, self._visible_ids())
+
+    def test_update_project_id_view_moves_access(self):
+        sesion = SesionBilling.objects.create(proyecto_id="CA")
+
+        self.client.force_login(self.admin)
+        response = self.client.post(
+            reverse("operaciones:billing_update_project_id", args=[sesion.pk]),
+            {"proyecto_id": "CB"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+        sesion.refresh_from_db()
+
+        self.assertEqual(sesion.proyecto_ref_id, self.pb.pk)
+        self.assertEqual(sesion.proyecto, "Project B")
+        self.assertNotIn(sesion.pk, self._visible_ids())
+
+    def test_unknown_code_keeps_text_resolution(self):
+        sesion = SesionBilling.objects.create(proyecto_id="ZZ", proyecto="Project A")
+
+        sesion.refresh_from_db()
+
+        self.assertEqual(sesion.proyecto_ref_id, self.pa.pk)
+        self.assertIn(sesion.pk, self._visible_ids())
+
+
+class DescargarFotosZipTests(TestCase):
+    """
+    La descarga en streaming no debe entregar un ZIP vacío cuando
+    ninguna fotografía se pudo descargar.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+
+        cls.admin = User.objects.create(username="zip-admin", is_superuser=True)
+        cls.tecnico = User.objects.create(username="zip-tecnico")
+
+        cls.sesion = SesionBilling.objects.create(proyecto_id="ZIP-1")
+
+        asignacion = SesionBillingTecnico.objects.create(
+            sesion=cls.sesion,
+            tecnico=cls.tecnico,
+        )
+
+        EvidenciaFotoBilling.objects.create(
+            tecnico_sesion=asignacion,
+            imagen="evidencias/foto.jpg",
+            titulo_manual="Front",
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+        self.url = reverse(
+            "operaciones:descargar_fotos_zip",
+            args=[self.sesion.pk],
+        )
+
+    def _fetch(self, data):
+        def _iter_fetch(fetcher, sources):
+            for source in sources:
+                if data is None:
+                    yield EvidenceFetchResult(
+                        source=source,
+                        error=OSError("unreachable"),
+                    )
+
+                else:
+                    yield EvidenceFetchResult(source=source, data=data)
+
+        return mock.patch.object(EvidenceFetcher, "iter_fetch", _iter_fetch)
+
+    def test_all_fetches_failing_redirects(self):
+        for cache_bytes in (0, 1024 * 1024):
+            with self.subTest(cache_bytes=cache_bytes), \
+                    tempfile.TemporaryDirectory() as cache_dir, \
+                    override_settings(
+                        ZIP_ARTIFACT_CACHE_DIR=cache_dir,
+                        ZIP_ARTIFACT_CACHE_MAX_BYTES=cache_bytes,
+                    ), self._fetch(None):
+                resp = self.client.get(self.url)
+
+                self.assertRedirects(
+                    resp,
+                    reverse(
+                        "operaciones:revisar_sesion",
+                        args=[self.sesion.pk],
+                    ),
+                    fetch_redirect_response=False,
+                )
+
+    @override_settings(ZIP_ARTIFACT_CACHE_MAX_BYTES=0)
+    def test_streams_fetched_photos(self):
+        with self._fetch(b"jpeg-bytes"):
+            resp = self.client.get(self.url)
+
+            body = b"".join(resp.streaming_content)
+
+        with zipfile.ZipFile(io.BytesIO(body)) as zf:
+            self.assertEqual(len(zf.namelist()), 1)
+            self.assertEqual(zf.read(zf.namelist()[0]), b"jpeg-bytes")
+
+    def test_smartsheet_parts_write_fetched_photos(self):
+        with self._fetch(b"jpeg-bytes"):
+            parts, stats = generar_fotos_zip_partes_smartsheet_sin_cache(self.sesion)
+
+        self.assertEqual(len(parts), 1)
+        self.assertEqual(parts[0]["filename"], "ZIP-1.zip")
+        self.assertEqual(stats["total_agregadas"], 1)
+
+        with parts[0]["file"] as part_file, zipfile.ZipFile(part_file) as zf:
+            self.assertEqual(len(zf.namelist()), 1)
+            self.assertEqual(zf.read(zf.namelist()[0]), b"jpeg-bytes")
+
+    def test_smartsheet_parts_without_photos_raise(self):
+        with self._fetch(None), self.assertRaisesMessage(
+            RuntimeError,
+            "No photos available",
+        ):
+            generar_fotos_zip_partes_smartsheet_sin_cache(self.sesion)
+
+
+class BillingSearchIndexTests(TestCase):
+    """
+    SesionBillingSearch se mantiene al guardar/borrar sesiones y al
+    cambiar sus técnicos, y search_billing / filter_by_technician lo usan.
+    """
+
+    def _create_sesion(self, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return SesionBilling.objects.create(**fields)
+
+    def _found(self, query):
+        return set(
+            search_billing(SesionBilling.objects.all(), query).values_list(
+                "id", flat=True
+            )
+        )
+
+    def _by_tech(self, text):
+        return set(
+            filter_by_technician(SesionBilling.objects.all(), text).values_list(
+                "id", flat=True
+            )
+        )
+
+    def test_save_indexes_normalized_text(self):
+        sesion = self._create_sesion(
+            proyecto_id="HN-1234",
+            cliente="Café Norte",
+            ciudad="Bogotá",
+            direccion_proyecto="Main St 10",
+        )
+        other = self._create_sesion(proyecto_id="HN-9999", cliente="Other")
+
+        documento = SesionBillingSearch.objects.get(sesion=sesion).documento
+
+        self.assertIn("cafe norte", documento)
+        self.assertIn("bogota", documento)
+        self.assertEqual(self._found("CAFÉ hn-12"), {sesion.pk})
+        self.assertEqual(self._found("hn"), {sesion.pk, other.pk})
+        self.assertEqual(self._found("main st"), {sesion.pk})
+        self.assertEqual(self._found("missing"), set())
+
+    def test_text_update_refreshes_and_status_update_skips(self):
+        sesion = self._create_sesion(proyecto_id="HN-1", cliente="Alpha")
+
+        with mock.patch(
+            "operaciones.services.billing_search.schedule_search_refresh",
+        ) as schedule:
+            sesion.estado = "en_revision_supervisor"
+            sesion.save(update_fields=["estado"])
+
+        schedule.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sesion.cliente = "Beta"
+            sesion.save(update_fields=["cliente"])
+
+        self.assertEqual(self._found("beta"), {sesion.pk})
+        self.assertEqual(self._found("alpha"), set())
+
+    def test_technician_changes_refresh_index(self):
+        sesion = self._create_sesion(proyecto_id="HN-2")
+        tecnico = get_user_model().objects.create(
+            username="jperez",
+            first_name="José",
+            last_name="Pérez",
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            asignacion = SesionBillingTecnico.objects.create(
+                sesion=sesion,
+                tecnico=tecnico,
+            )
+
+        self.assertEqual(self._by_tech("jose perez"), {sesion.pk})
+        self.assertEqual(self._found("perez"), {sesion.pk})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tecnico.first_name = "Joaquín"
+            tecnico.save()
+
+        self.assertEqual(self._by_tech("joaquin"), {sesion.pk})
+        self.assertEqual(self._by_tech("jose"), set())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            asignacion.delete()
+
+        self.assertEqual(self._by_tech("joaquin"), set())
+
+    def test_delete_removes_index_row(self):
+        sesion = self._create_sesion(proyecto_id="HN-3")
+
+        sesion.delete()
+
+        self.assertFalse(SesionBillingSearch.objects.filter(sesion_id=sesion.pk).exists())
+
+
+class BillingFacetsTests(TestCase):
+    """
+    Opciones y filtros de BILLING_FACETS deben coincidir con las
+    etiquetas que armaba Billing List fila por fila.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+
+        Proyecto.objects.create(
+            codigo="CX",
+            nombre="Project X",
+            mandante="Client X",
+            ciudad="City X",
+            estado="ST",
+            oficina="Office X",
+        )
+
+        ana = User.objects.create(username="ana", first_name="Ana", last_name="Díaz")
+        sin_nombre = User.objects.create(username="sin-nombre")
+
+        def _at(day):
+            return datetime(2026, 3, day, 15, 30, tzinfo=dt_timezone.utc)
+
+        s1 = SesionBilling.objects.create(
+            proyecto_id="CX",
+            creado_en=_at(2),
+            estado="aprobado_pm",
+            semana_pago_proyectada="2026-W10",
+            subtotal_tecnico=Decimal("40.00"),
+            subtotal_empresa=Decimal("100.00"),
+            real_company_billing=Decimal("90.50"),
+            finance_status="paid",
+        )
+        s2 = SesionBilling.objects.create(
+            proyecto_id="",
+            creado_en=_at(2),
+            cliente="Other",
+            is_direct_discount=True,
+            subtotal_empresa=Decimal("100.00"),
+            real_company_billing=Decimal("100.00"),
+        )
+        s3 = SesionBilling.objects.create(
+            proyecto_id="HN-3",
+            creado_en=_at(5),
+            proyecto="Free text",
+            estado="en_proceso",
+            semana_pago_proyectada="2026-W10",
+        )
+
+        SesionBillingTecnico.objects.create(
+            sesion=s1,
+            tecnico=ana,
+            tecnico_comentario="Done",
+        )
+        SesionBillingTecnico.objects.create(sesion=s1, tecnico=sin_nombre)
+        SesionBillingTecnico.objects.create(
+            sesion=s3,
+            tecnico=sin_nombre,
+            tecnico_comentario="  Pending splice\n",
+        )
+
+        cls.sesion_ids = {s1.pk, s2.pk, s3.pk}
+
+    def setUp(self):
+        BILLING_FACETS.invalidate()
+
+    @staticmethod
+    def _comments_label(s):
+        vals = []
+
+        for a in s.tecnicos_sesion.all():
+            txt = (a.tecnico_comentario or "").strip()
+
+            if txt:
+                name = a.tecnico.get_full_name() or a.tecnico.username
+                vals.append(f"{name}: {txt}")
+
+        return " | ".join(vals) or "—"
+
+    def _previous_labels(self):
+        sessions = list(SesionBilling.objects.all())
+        resolve_project_labels_for_sessions(sessions)
+
+        return {
+            s.pk: {
+                "0": s.creado_en.strftime("%Y-%m-%d"),
+                "1": s.proyecto_id or "—",
+                "2": s.direccion_proyecto or "—",
+                "3": s.semana_pago_proyectada or "—",
+                "4": status_label(s.is_direct_discount, s.estado),
+                "5": techs_label(s),
+                "6": s.cliente or "—",
+                "7": s.ciudad or "—",
+                "8": s.proyecto_nombre or s.proyecto or "—",
+                "9": s.oficina or "—",
+                "10": money_label(s.subtotal_tecnico),
+                "11": money_label(s.subtotal_empresa),
+                "12": money_label(s.real_company_billing),
+                "13": diff_label(s.real_company_billing, s.subtotal_empresa),
+                "14": finance_status_label(s.finance_status),
+                "15": payweek_snapshot_label(s),
+                "16": self._comments_label(s),
+            }
+            for s in sessions
+        }
+
+    def test_options_and_filters_match_previous_labels(self):
+        expected = self._previous_labels()
+        qs = SesionBilling.objects.all()
+
+        self.assertEqual(set(expected), self.sesion_ids)
+
+        for key in BILLING_FACETS.columns:
+            with self.subTest(column=key):
+                counts = Counter(labels[key] for labels in expected.values())
+
+                self.assertEqual(
+                    {o["value"]: o["count"] for o in BILLING_FACETS.options(qs, key)},
+                    dict(counts),
+                )
+
+                for label in counts:
+                    self.assertEqual(
+                        set(
+                            BILLING_FACETS.filter(qs, {key: {label}}).values_list(
+                                "pk", flat=True
+                            )
+                        ),
+                        {pk for pk, labels in expected.items() if labels[key] == label},
+                    )
+
+    def test_labels_for_known_rows(self):
+        options = {
+            key: [o["value"] for o in BILLING_FACETS.options(SesionBilling.objects.all(), key)]
+            for key in ("0", "4", "8", "13", "16")
+        }
+
+        self.assertEqual(options["0"], ["2026-03-02", "2026-03-05"])
+        self.assertIn("Direct discount", options["4"])
+        self.assertEqual(options["8"], ["Free text", "Project X", "—"])
+        self.assertIn("- $9.50", options["13"])
+        self.assertIn("Ana Díaz: Done", options["16"])
+
+    def test_unknown_value_filters_everything_out(self):
+        qs = SesionBilling.objects.all()
+
+        self.assertFalse(BILLING_FACETS.filter(qs, {"1": {"NOPE"}}).exists())
+        self.assertEqual(BILLING_FACETS.filter(qs, {"99": {"x"}}).count(), 3)
@@ -1,9 +1,9 @@
 # utils/rehidratacion.py (por ejemplo)
 from utils.rehidratacion import backfill_from_s3_metadata
 from django.core.management.base import BaseCommand
-import boto3
 from django.conf import settings
 from django.utils.dateparse import parse_datetime
+from core.storage_gateway import get_s3_client
 from operaciones.models import EvidenciaFotoBilling
 
 
@@ -16,14 +16,7 @@ def backfill_from_s3_metadata(ev: EvidenciaFotoBilling) -> bool:
     if not ev or not getattr(ev.imagen, "name", ""):
         return False
 
-    s3 = boto3.client(
-        "s3",
-        endpoint_url=getattr(settings, "WASABI_ENDPOINT_URL",
-                             "https://s3.us-east-1.wasabisys.com"),
-        region_name=getattr(settings, "WASABI_REGION_NAME", "us-east-1"),
-        aws_access_key_id=getattr(settings, "WASABI_ACCESS_KEY_ID"),
-        aws_secret_access_key=getattr(settings, "WASABI_SECRET_ACCESS_KEY"),
-    )
+    s3 = get_s3_client()
     bucket = getattr(settings, "WASABI_BUCKET_NAME")
     key = ev.imagen.name
 
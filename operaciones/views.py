@@ -22,12 +22,10 @@ from typing import Optional
 from urllib.parse import urlencode
 from uuid import uuid4
 
-import boto3
 import pandas as pd
 import requests
 import xlsxwriter
 import xlwt
-from botocore.client import Config
 from botocore.exceptions import ClientError
 from django.conf import settings
 from django.contrib import messages
@@ -77,6 +75,7 @@ from core.decorators import project_object_access_required
 from core.download_helpers import smart_download_response
 from core.permissions import (filter_queryset_by_access, projects_ids_for_user,
                               user_has_project_access)
+from core.storage_gateway import get_s3_client, read_fieldfile_bytes
 from facturacion.models import CartolaMovimiento, Proyecto
 from fleet.models import VehicleOdometerEvent, VehicleService
 from operaciones.forms import PaymentApproveForm, PaymentRejectForm
@@ -99,6 +98,7 @@ from .models import SesionBilling  # ajusta a tu ruta real
 from .models import (AdjustmentEntry, BillingPayWeekSnapshot,
                      EvidenciaFotoBilling, ItemBilling, ItemBillingTecnico,
                      RequisitoFotoBilling, SesionBillingTecnico, WeeklyPayment)
+from .services.billing_search import filter_by_technician
 from .services.weekly import \
     materialize_week_for_payments  # crea/actualiza solo la semana indicada
 from .services.weekly import \
@@ -6298,673 +6298,20 @@ def billing_reopen_asignado(request, pk):
         request.META.get("HTTP_REFERER", "/operaciones/billing/listar/")
     )
 
-@login_required
-def billing_excel_options(request):
-    """
-    Devuelve los valores de filtros tipo Excel para Billing List.
 
-    Esta vista se llama por AJAX después de cargar la tabla.
-    No renderiza template.
-    Respeta los filtros rápidos normales:
-      - date
-      - projid
-      - week
-      - tech
-      - client
-      - status
-
-    Importante:
-      - NO aplica excel_filters para construir las opciones.
-      - Así el usuario puede cambiar filtros Excel sin perder opciones.
+def _billing_list_queryset(request):
     """
-    import json
-    from datetime import date as _date
-    from decimal import Decimal
-
-    from django.db.models import Prefetch, Q
-    from django.http import JsonResponse
-
-    from core.permissions import filter_queryset_by_access
-    from facturacion.models import Proyecto
-    from operaciones.models import (BillingPayWeekSnapshot, SesionBilling,
-                                    SesionBillingTecnico)
-
-    try:
-        from usuarios.models import ProyectoAsignacion
-    except Exception:
-        ProyectoAsignacion = None
-
-    user = request.user
-
-    can_view_legacy_history = user.is_superuser or getattr(
-        user, "es_usuario_historial", False
-    )
-
-    visible_filter = (Q(finance_sent_at__isnull=True)& ~Q(finance_status="paid"))
-
-    qs = (SesionBilling.objects.filter(visible_filter).order_by("-creado_en"))
-
-    # ============================================================
-    # Restricción por proyectos
-    # ============================================================
-    if not can_view_legacy_history:
-        try:
-            proyectos_user = filter_queryset_by_access(
-                Proyecto.objects.all(),
-                user,
-                "id",
-            )
-        except Exception:
-            proyectos_user = Proyecto.objects.none()
-
-        proyectos_user_list = list(proyectos_user)
-
-        if proyectos_user_list:
-            allowed_keys = set()
-
-            for p in proyectos_user_list:
-                nombre = (getattr(p, "nombre", "") or "").strip()
-                if nombre:
-                    allowed_keys.add(nombre)
-
-                codigo = getattr(p, "codigo", None)
-                if codigo:
-                    allowed_keys.add(str(codigo).strip())
-
-                allowed_keys.add(str(p.id).strip())
-
-            qs = qs.filter(proyecto__in=allowed_keys)
-
-            asignaciones = []
-
-            if ProyectoAsignacion is not None:
-                try:
-                    asignaciones = list(
-                        ProyectoAsignacion.objects.filter(
-                            usuario=user,
-                            proyecto__in=proyectos_user_list,
-                        ).select_related("proyecto")
-                    )
-                except Exception:
-                    asignaciones = []
-
-            if asignaciones:
-                window_q = Q()
-                has_window_q = False
-
-                for a in asignaciones:
-                    p = getattr(a, "proyecto", None)
-                    if not p:
-                        continue
-
-                    keys = set()
-
-                    nombre = (getattr(p, "nombre", "") or "").strip()
-                    if nombre:
-                        keys.add(nombre)
-
-                    codigo = getattr(p, "codigo", None)
-                    if codigo:
-                        keys.add(str(codigo).strip())
-
-                    keys.add(str(p.id).strip())
-
-                    if not keys:
-                        continue
-
-                    if getattr(a, "include_history", False) or not getattr(
-                        a, "start_at", None
-                    ):
-                        window_q |= Q(proyecto__in=keys)
-                    else:
-                        window_q |= Q(proyecto__in=keys, creado_en__gte=a.start_at)
-
-                    has_window_q = True
-
-                qs = qs.filter(window_q) if has_window_q else qs.none()
-        else:
-            qs = qs.none()
-
-    # ============================================================
-    # Filtros rápidos normales
-    # ============================================================
-    f = {
-        "date": (request.GET.get("date") or "").strip(),
-        "projid": (request.GET.get("projid") or "").strip(),
-        "week": (request.GET.get("week") or "").strip(),
-        "tech": (request.GET.get("tech") or "").strip(),
-        "client": (request.GET.get("client") or "").strip(),
-        "status": (request.GET.get("status") or "").strip(),
-    }
-
-    qs_filtered = qs
-
-    if f["date"]:
-        try:
-            d = _date.fromisoformat(f["date"])
-            qs_filtered = qs_filtered.filter(creado_en__date=d)
-        except ValueError:
-            pass
-
-    if f["projid"]:
-        qs_filtered = qs_filtered.filter(proyecto_id__icontains=f["projid"])
-
-    if f["week"]:
-        qs_filtered = qs_filtered.filter(
-            Q(semana_pago_proyectada__icontains=f["week"])
-            | Q(semana_pago_real__icontains=f["week"])
-            | Q(discount_week__icontains=f["week"])
-            | Q(pay_week_snapshots__semana_resultado__icontains=f["week"])
-            | Q(pay_week_snapshots__semana_base__icontains=f["week"])
-        )
-
-    if f["tech"]:
-        qs_filtered = qs_filtered.filter(
-            Q(tecnicos_sesion__tecnico__first_name__icontains=f["tech"])
-            | Q(tecnicos_sesion__tecnico__last_name__icontains=f["tech"])
-            | Q(tecnicos_sesion__tecnico__username__icontains=f["tech"])
-            | Q(pay_week_snapshots__tecnico__first_name__icontains=f["tech"])
-            | Q(pay_week_snapshots__tecnico__last_name__icontains=f["tech"])
-            | Q(pay_week_snapshots__tecnico__username__icontains=f["tech"])
-        )
-
-    if f["client"]:
-        qs_filtered = qs_filtered.filter(cliente__icontains=f["client"])
-
-    if f["status"]:
-        status_txt = f["status"].lower().strip()
-
-        if any(k in status_txt for k in ("direct", "descuento", "discount")):
-            qs_filtered = qs_filtered.filter(is_direct_discount=True)
-        else:
-            mapping = [
-                (
-                    ("aprobado supervisor", "approved by supervisor"),
-                    Q(estado="aprobado_supervisor"),
-                ),
-                (
-                    ("rechazado supervisor", "rejected by supervisor"),
-                    Q(estado="rechazado_supervisor"),
-                ),
-                (
-                    ("en revision", "supervisor review", "in supervisor review"),
-                    Q(estado="en_revision_supervisor"),
-                ),
-                (("finalizado", "finished"), Q(estado="finalizado")),
-                (("en proceso", "in progress"), Q(estado="en_proceso")),
-                (("asignado", "assigned"), Q(estado="asignado")),
-                (("aprobado pm", "approved by pm"), Q(estado="aprobado_pm")),
-                (("rechazado pm", "rejected by pm"), Q(estado="rechazado_pm")),
-            ]
-
-            applied = False
-
-            for keys, cond in mapping:
-                if any(k in status_txt for k in keys):
-                    qs_filtered = qs_filtered.filter(cond)
-                    applied = True
-                    break
-
-            if not applied:
-                if "aprobado" in status_txt or "approved" in status_txt:
-                    qs_filtered = qs_filtered.filter(
-                        estado__in=["aprobado_supervisor", "aprobado_pm"]
-                    )
-                elif "rechazado" in status_txt or "rejected" in status_txt:
-                    qs_filtered = qs_filtered.filter(
-                        estado__in=["rechazado_supervisor", "rechazado_pm"]
-                    )
+    Sesiones visibles en Billing List para el usuario, con los filtros
+    rápidos del GET (date, projid, week, tech, client, status).
 
-    qs_filtered = qs_filtered.distinct()
-
-    # ============================================================
-    # Helpers para valores Excel
-    # ============================================================
-    def money_value(value):
-        if value in (None, ""):
-            return "—"
-
-        try:
-            return f"${Decimal(value):.2f}"
-        except Exception:
-            return str(value)
-
-    def status_label(s):
-        if getattr(s, "is_direct_discount", False):
-            return "Direct discount"
-
-        estado = getattr(s, "estado", "") or ""
-
-        labels = {
-            "aprobado_pm": "Approved by PM",
-            "rechazado_pm": "Rejected by PM",
-            "aprobado_supervisor": "Approved by supervisor",
-            "rechazado_supervisor": "Rejected by supervisor",
-            "en_revision_supervisor": "In supervisor review",
-            "finalizado": "Finished (pending review)",
-            "en_proceso": "In progress",
-            "asignado": "Assigned",
-        }
-
-        return labels.get(estado, "Assigned")
-
-    def finance_status_label(s):
-        finance_status = getattr(s, "finance_status", "") or ""
-
-        labels = {
-            "sent": "Sent to Finance",
-            "in_review": "In review",
-            "rejected": "Rejected",
-            "pending": "Pending payment",
-            "paid": "Paid",
-            "review_discount": "Review discount",
-            "discount_applied": "Discount applied",
-            "none": "—",
-            "": "—",
-            None: "—",
-        }
-
-        return labels.get(finance_status, "—")
-
-    def diff_label(s):
-        real = getattr(s, "real_company_billing", None)
-        subtotal = getattr(s, "subtotal_empresa", None)
-
-        if real in (None, "") or subtotal in (None, ""):
-            return "—"
-
-        try:
-            real_d = Decimal(real)
-            sub_d = Decimal(subtotal)
-            diff = real_d - sub_d
-        except Exception:
-            return "—"
-
-        if diff == 0:
-            return "$0.00"
-
-        if diff < 0:
-            return f"- ${abs(diff):.2f}"
-
-        return f"+ ${diff:.2f}"
-
-    def techs_label(sesion):
-        vals = []
-
-        try:
-            for st in sesion.tecnicos_sesion.all():
-                if not getattr(st, "tecnico", None):
-                    continue
-
-                vals.append(st.tecnico.get_full_name() or st.tecnico.username)
-        except Exception:
-            pass
-
-        return ", ".join(v for v in vals if v) or "—"
-
-    def comments_label(s):
-        vals = []
-
-        try:
-            for a in s.tecnicos_sesion.all():
-                txt = (getattr(a, "tecnico_comentario", "") or "").strip()
-
-                if not txt:
-                    continue
-
-                tech_name = (
-                    a.tecnico.get_full_name() if getattr(a, "tecnico", None) else ""
-                ) or (
-                    getattr(a.tecnico, "username", "")
-                    if getattr(a, "tecnico", None)
-                    else ""
-                )
-
-                if tech_name:
-                    vals.append(f"{tech_name}: {txt}")
-                else:
-                    vals.append(txt)
-        except Exception:
-            pass
-
-        return " | ".join(vals) if vals else "—"
-
-    def build_payweek_label(s):
-        vals = []
-
-        try:
-            snaps = list(s.pay_week_snapshots.all())
-        except Exception:
-            snaps = []
-
-        if snaps:
-            for snap in snaps:
-                tech_name = (
-                    snap.tecnico.get_full_name().strip()
-                    if getattr(snap, "tecnico", None) and snap.tecnico.get_full_name()
-                    else getattr(snap.tecnico, "username", "")
-                    or f"User {snap.tecnico_id}"
-                )
-
-                work_type = (
-                    (snap.tipo_trabajo or "").strip()
-                    or (getattr(snap.item, "tipo_trabajo", "") or "").strip()
-                    or "Legacy"
-                )
-
-                week = (
-                    (getattr(snap, "semana_resultado", "") or "").strip()
-                    or (getattr(snap, "semana_base", "") or "").strip()
-                    or (getattr(s, "semana_pago_real", "") or "").strip()
-                    or (getattr(s, "discount_week", "") or "").strip()
-                    or (getattr(s, "semana_pago_proyectada", "") or "").strip()
-                    or "—"
-                )
-
-                vals.append(f"{tech_name} — {work_type} → {week}")
-
-        if vals:
-            return " | ".join(vals)
-
-        return (
-            (getattr(s, "semana_pago_real", "") or "").strip()
-            or (getattr(s, "discount_week", "") or "").strip()
-            or (getattr(s, "semana_pago_proyectada", "") or "").strip()
-            or "—"
-        )
-
-    def resolve_project_labels_for_sessions(sessions):
-        proj_ids = set()
-        proj_texts = set()
-
-        for s in sessions:
-            raw_proyecto = getattr(s, "proyecto", None)
-            if raw_proyecto not in (None, "", "-"):
-                txt = str(raw_proyecto).strip()
-                if txt:
-                    proj_texts.add(txt)
-                    try:
-                        proj_ids.add(int(txt))
-                    except Exception:
-                        pass
-
-            raw_proyecto_id = getattr(s, "proyecto_id", None)
-            if raw_proyecto_id not in (None, "", "-"):
-                txt2 = str(raw_proyecto_id).strip()
-                if txt2:
-                    proj_texts.add(txt2)
-                    try:
-                        proj_ids.add(int(txt2))
-                    except Exception:
-                        pass
-
-        proj_q = Q()
-
-        if proj_ids:
-            proj_q |= Q(id__in=proj_ids)
-
-        if proj_texts:
-            proj_q |= Q(nombre__in=proj_texts) | Q(codigo__in=proj_texts)
-
-        proyectos = (
-            Proyecto.objects.filter(proj_q).only("id", "nombre", "codigo")
-            if proj_q
-            else Proyecto.objects.none()
-        )
-
-        by_id = {str(p.id): p.nombre for p in proyectos}
-        by_code = {
-            (p.codigo or "").strip().lower(): p.nombre
-            for p in proyectos
-            if getattr(p, "codigo", None)
-        }
-        by_name = {
-            (p.nombre or "").strip().lower(): p.nombre
-            for p in proyectos
-            if getattr(p, "nombre", None)
-        }
-
-        for s in sessions:
-            raw = str(getattr(s, "proyecto", "") or "").strip()
-            raw_id = str(getattr(s, "proyecto_id", "") or "").strip()
-
-            label = ""
-
-            if raw:
-                label = (
-                    by_id.get(raw)
-                    or by_code.get(raw.lower())
-                    or by_name.get(raw.lower())
-                    or raw
-                )
-
-            if not label and raw_id:
-                label = (
-                    by_id.get(raw_id)
-                    or by_code.get(raw_id.lower())
-                    or by_name.get(raw_id.lower())
-                    or raw_id
-                )
-
-            s.proyecto_nombre = label
-            s.project_label = label
-
-        return sessions
-
-    def excel_value_for_session(s, key):
-        key = str(key)
-
-        if key == "0":
-            return (
-                s.creado_en.strftime("%Y-%m-%d")
-                if getattr(s, "creado_en", None)
-                else "—"
-            )
-
-        if key == "1":
-            return str(getattr(s, "proyecto_id", "") or "—")
-
-        if key == "2":
-            return str(getattr(s, "direccion_proyecto", "") or "—")
-
-        if key == "3":
-            return str(getattr(s, "semana_pago_proyectada", "") or "—")
-
-        if key == "4":
-            return status_label(s)
-
-        if key == "5":
-            return techs_label(s)
-
-        if key == "6":
-            return str(getattr(s, "cliente", "") or "—")
-
-        if key == "7":
-            return str(getattr(s, "ciudad", "") or "—")
-
-        if key == "8":
-            return str(
-                getattr(s, "proyecto_nombre", "")
-                or getattr(s, "project_label", "")
-                or getattr(s, "proyecto", "")
-                or "—"
-            )
-
-        if key == "9":
-            return str(getattr(s, "oficina", "") or "—")
-
-        if key == "10":
-            return money_value(getattr(s, "subtotal_tecnico", None))
-
-        if key == "11":
-            return money_value(getattr(s, "subtotal_empresa", None))
-
-        if key == "12":
-            return money_value(getattr(s, "real_company_billing", None))
-
-        if key == "13":
-            return diff_label(s)
-
-        if key == "14":
-            return finance_status_label(s)
-
-        if key == "15":
-            return build_payweek_label(s)
-
-        if key == "16":
-            return comments_label(s)
-
-        return "—"
-
-    # ============================================================
-    # Construcción de opciones
-    # ============================================================
-    excel_qs = qs_filtered.only(
-        "id",
-        "creado_en",
-        "proyecto_id",
-        "direccion_proyecto",
-        "semana_pago_proyectada",
-        "semana_pago_real",
-        "discount_week",
-        "estado",
-        "is_direct_discount",
-        "cliente",
-        "ciudad",
-        "proyecto",
-        "oficina",
-        "subtotal_tecnico",
-        "subtotal_empresa",
-        "real_company_billing",
-        "finance_status",
-        "finance_note",
-    ).prefetch_related(
-        Prefetch(
-            "tecnicos_sesion",
-            queryset=SesionBillingTecnico.objects.select_related("tecnico"),
-        ),
-        Prefetch(
-            "pay_week_snapshots",
-            queryset=BillingPayWeekSnapshot.objects.select_related(
-                "tecnico",
-                "item",
-                "weekly_payment",
-            )
-            .filter(is_adjustment=False)
-            .order_by(
-                "tecnico__first_name",
-                "tecnico__last_name",
-                "tecnico__username",
-                "tipo_trabajo",
-                "codigo_trabajo",
-                "id",
-            ),
-        ),
-    )
-
-    sessions = list(excel_qs)
-    resolve_project_labels_for_sessions(sessions)
-
-    excel_global = {str(i): set() for i in range(17)}
-
-    for s in sessions:
-        for key in excel_global.keys():
-            val = excel_value_for_session(s, key)
-            excel_global[key].add(str(val or "—"))
-
-    data = {
-        k: sorted(list(v), key=lambda x: x.lower())
-        for k, v in excel_global.items()
-    }
-
-    return JsonResponse(
-        {
-            "ok": True,
-            "excel_global": data,
-        }
-    )
-
-
-@login_required
-def listar_billing(request):
-    """
-    Visibilidad en Operaciones:
-      - Descuento directo (is_direct_discount=True):
-          mostrar SOLO si AÚN NO se ha enviado -> finance_sent_at IS NULL.
-      - Resto:
-          ocultar si finance_status ∈ {'sent','pending','paid','in_review'}.
-
-    Mantiene filtros Excel del template:
-      - NO construye excel_global_json pesado en la carga inicial.
-      - Lee excel_filters desde GET.
-      - Aplica filtros Excel antes de paginar solo cuando existen.
-      - Mantiene paginación AJAX.
+    Devuelve (queryset, filtros). No aplica excel_filters: lo comparten
+    listar_billing y billing_excel_options.
     """
-    import json
-    from datetime import date as _date
-    from decimal import Decimal
-    from urllib.parse import urlencode
-
-    from django.core.paginator import Paginator
-    from django.db.models import Prefetch, Q
-    from django.http import HttpResponseRedirect
-
-    from core.permissions import filter_queryset_by_access
-    from facturacion.models import Proyecto
-    from operaciones.models import (BillingPayWeekSnapshot, ItemBilling,
-                                    ItemBillingTecnico, SesionBilling,
-                                    SesionBillingTecnico)
-
-    try:
-        from usuarios.models import ProyectoAsignacion
-    except Exception:
-        ProyectoAsignacion = None
-
-    user = request.user
-
-        # ============================================================
-
-    # Persistencia server-side de filtros Excel
-
-    # Evita parpadeo al volver desde Review/Edit/Actions.
-
-    # ============================================================
-
-    BILLING_EXCEL_SESSION_KEY = "billing_list_excel_filters"
+    from core.permissions import filter_queryset_by_project_window
 
-    clear_excel_filters = request.GET.get("clear_excel_filters") == "1"
-
-    excel_filters_raw_request = (request.GET.get("excel_filters") or "").strip()
-
-    if clear_excel_filters:
-
-        request.session.pop(BILLING_EXCEL_SESSION_KEY, None)
-
-    elif excel_filters_raw_request:
-
-        request.session[BILLING_EXCEL_SESSION_KEY] = excel_filters_raw_request
-
-    else:
-
-        stored_excel_filters = (
-
-            request.session.get(BILLING_EXCEL_SESSION_KEY) or ""
-
-        ).strip()
-
-        if stored_excel_filters:
-
-            params = request.GET.copy()
-
-            params["excel_filters"] = stored_excel_filters
-
-            params["page"] = "1"
-
-            return HttpResponseRedirect(
+    user = request.user
 
-                f"{request.path}?{params.urlencode()}"
 
-            )
     # ============================================================
     # Usuarios privilegiados
     # ============================================================
@@ -6982,98 +6329,23 @@ def listar_billing(request):
         | Q(finance_status="review_discount")
         | Q(finance_status="rejected")
     )
-    
+
     visible_filter = (
         Q(finance_sent_at__isnull=True)
         & operations_status_filter
     )
 
     qs = (
-        SesionBilling.objects 
+        SesionBilling.objects
         .filter(visible_filter)
         .order_by("-creado_en")
     )
 
     # ============================================================
-    # Restricción por proyectos
+    # Restricción por proyectos (+ ventana de ProyectoAsignacion)
     # ============================================================
     if not can_view_legacy_history:
-        try:
-            proyectos_user = filter_queryset_by_access(
-                Proyecto.objects.all(),
-                user,
-                "id",
-            )
-        except Exception:
-            proyectos_user = Proyecto.objects.none()
-
-        proyectos_user_list = list(proyectos_user)
-
-        if proyectos_user_list:
-            allowed_keys = set()
-
-            for p in proyectos_user_list:
-                nombre = (getattr(p, "nombre", "") or "").strip()
-                if nombre:
-                    allowed_keys.add(nombre)
-
-                codigo = getattr(p, "codigo", None)
-                if codigo:
-                    allowed_keys.add(str(codigo).strip())
-
-                allowed_keys.add(str(p.id).strip())
-
-            qs = qs.filter(proyecto__in=allowed_keys)
-
-            asignaciones = []
-
-            if ProyectoAsignacion is not None:
-                try:
-                    asignaciones = list(
-                        ProyectoAsignacion.objects.filter(
-                            usuario=user,
-                            proyecto__in=proyectos_user_list,
-                        ).select_related("proyecto")
-                    )
-                except Exception:
-                    asignaciones = []
-
-            if asignaciones:
-                window_q = Q()
-                has_window_q = False
-
-                for a in asignaciones:
-                    p = getattr(a, "proyecto", None)
-                    if not p:
-                        continue
-
-                    keys = set()
-
-                    nombre = (getattr(p, "nombre", "") or "").strip()
-                    if nombre:
-                        keys.add(nombre)
-
-                    codigo = getattr(p, "codigo", None)
-                    if codigo:
-                        keys.add(str(codigo).strip())
-
-                    keys.add(str(p.id).strip())
-
-                    if not keys:
-                        continue
-
-                    if getattr(a, "include_history", False) or not getattr(
-                        a, "start_at", None
-                    ):
-                        window_q |= Q(proyecto__in=keys)
-                    else:
-                        window_q |= Q(proyecto__in=keys, creado_en__gte=a.start_at)
-
-                    has_window_q = True
-
-                qs = qs.filter(window_q) if has_window_q else qs.none()
-        else:
-            qs = qs.none()
+        qs = filter_queryset_by_project_window(qs, user, "proyecto_ref", "creado_en")
 
     # ============================================================
     # Filtros rápidos normales
@@ -7085,615 +6357,210 @@ def listar_billing(request):
         "tech": (request.GET.get("tech") or "").strip(),
         "client": (request.GET.get("client") or "").strip(),
         "status": (request.GET.get("status") or "").strip(),
-    }
-
-    qs_filtered = qs
-
-    if f["date"]:
-        try:
-            d = _date.fromisoformat(f["date"])
-            qs_filtered = qs_filtered.filter(creado_en__date=d)
-        except ValueError:
-            pass
-
-    if f["projid"]:
-        qs_filtered = qs_filtered.filter(proyecto_id__icontains=f["projid"])
-
-    if f["week"]:
-        qs_filtered = qs_filtered.filter(
-            Q(semana_pago_proyectada__icontains=f["week"])
-            | Q(semana_pago_real__icontains=f["week"])
-            | Q(discount_week__icontains=f["week"])
-            | Q(pay_week_snapshots__semana_resultado__icontains=f["week"])
-            | Q(pay_week_snapshots__semana_base__icontains=f["week"])
-        )
-
-    if f["tech"]:
-        qs_filtered = qs_filtered.filter(
-            Q(tecnicos_sesion__tecnico__first_name__icontains=f["tech"])
-            | Q(tecnicos_sesion__tecnico__last_name__icontains=f["tech"])
-            | Q(tecnicos_sesion__tecnico__username__icontains=f["tech"])
-            | Q(pay_week_snapshots__tecnico__first_name__icontains=f["tech"])
-            | Q(pay_week_snapshots__tecnico__last_name__icontains=f["tech"])
-            | Q(pay_week_snapshots__tecnico__username__icontains=f["tech"])
-        )
-
-    if f["client"]:
-        qs_filtered = qs_filtered.filter(cliente__icontains=f["client"])
-
-    if f["status"]:
-        status_txt = f["status"].lower().strip()
-
-        if any(k in status_txt for k in ("direct", "descuento", "discount")):
-            qs_filtered = qs_filtered.filter(is_direct_discount=True)
-        else:
-            mapping = [
-                (
-                    ("aprobado supervisor", "approved by supervisor"),
-                    Q(estado="aprobado_supervisor"),
-                ),
-                (
-                    ("rechazado supervisor", "rejected by supervisor"),
-                    Q(estado="rechazado_supervisor"),
-                ),
-                (
-                    ("en revision", "supervisor review", "in supervisor review"),
-                    Q(estado="en_revision_supervisor"),
-                ),
-                (("finalizado", "finished"), Q(estado="finalizado")),
-                (("en proceso", "in progress"), Q(estado="en_proceso")),
-                (("asignado", "assigned"), Q(estado="asignado")),
-                (("aprobado pm", "approved by pm"), Q(estado="aprobado_pm")),
-                (("rechazado pm", "rejected by pm"), Q(estado="rechazado_pm")),
-            ]
-
-            applied = False
-
-            for keys, cond in mapping:
-                if any(k in status_txt for k in keys):
-                    qs_filtered = qs_filtered.filter(cond)
-                    applied = True
-                    break
-
-            if not applied:
-                if "aprobado" in status_txt or "approved" in status_txt:
-                    qs_filtered = qs_filtered.filter(
-                        estado__in=["aprobado_supervisor", "aprobado_pm"]
-                    )
-                elif "rechazado" in status_txt or "rejected" in status_txt:
-                    qs_filtered = qs_filtered.filter(
-                        estado__in=["rechazado_supervisor", "rechazado_pm"]
-                    )
-
-    qs_filtered = qs_filtered.distinct()
-
-    # ============================================================
-    # Helpers generales
-    # ============================================================
-    def money_value(value):
-        if value in (None, ""):
-            return "—"
-
-        try:
-            return f"${Decimal(value):.2f}"
-        except Exception:
-            return str(value)
-
-    def status_label(s):
-        if getattr(s, "is_direct_discount", False):
-            return "Direct discount"
-
-        estado = getattr(s, "estado", "") or ""
-
-        labels = {
-            "aprobado_pm": "Approved by PM",
-            "rechazado_pm": "Rejected by PM",
-            "aprobado_supervisor": "Approved by supervisor",
-            "rechazado_supervisor": "Rejected by supervisor",
-            "en_revision_supervisor": "In supervisor review",
-            "finalizado": "Finished (pending review)",
-            "en_proceso": "In progress",
-            "asignado": "Assigned",
-        }
-
-        return labels.get(estado, "Assigned")
-
-    def finance_status_label(s):
-        finance_status = getattr(s, "finance_status", "") or ""
-
-        labels = {
-            "sent": "Sent to Finance",
-            "in_review": "In review",
-            "rejected": "Rejected",
-            "pending": "Pending payment",
-            "paid": "Paid",
-            "review_discount": "Review discount",
-            "discount_applied": "Discount applied",
-            "none": "—",
-            "": "—",
-            None: "—",
-        }
-
-        return labels.get(finance_status, "—")
-
-    def diff_label(s):
-        real = getattr(s, "real_company_billing", None)
-        subtotal = getattr(s, "subtotal_empresa", None)
-
-        if real in (None, "") or subtotal in (None, ""):
-            return "—"
-
-        try:
-            real_d = Decimal(real)
-            sub_d = Decimal(subtotal)
-            diff = real_d - sub_d
-        except Exception:
-            return "—"
-
-        if diff == 0:
-            return "$0.00"
-
-        if diff < 0:
-            return f"- ${abs(diff):.2f}"
-
-        return f"+ ${diff:.2f}"
-
-    def techs_label(sesion):
-        vals = []
-
-        try:
-            for st in sesion.tecnicos_sesion.all():
-                if not getattr(st, "tecnico", None):
-                    continue
-
-                vals.append(st.tecnico.get_full_name() or st.tecnico.username)
-        except Exception:
-            pass
-
-        return ", ".join(v for v in vals if v) or "—"
-
-    def legacy_paid_flag(s):
-        note = getattr(s, "finance_note", "") or ""
-
-        try:
-            tech_ids = list(
-                s.tecnicos_sesion.all().values_list("tecnico_id", flat=True)
-            )
-        except Exception:
-            tech_ids = []
-
-        possible_weeks = [
-            (getattr(s, "semana_pago_real", "") or "").strip().upper(),
-            (getattr(s, "semana_pago_proyectada", "") or "").strip().upper(),
-            (getattr(s, "discount_week", "") or "").strip().upper(),
-        ]
-        possible_weeks = [w for w in possible_weeks if w]
-
-        for tech_id in tech_ids:
-            for wk in possible_weeks:
-                marker = f"[TECH_WEEKLY_PAYMENT_PAID:{tech_id}:{wk}]"
-                if marker in note:
-                    return True
-
-        return False
-
-    def build_payweek_groups(s):
-        groups_map = {}
-
-        snaps = (
-            list(getattr(s, "pay_week_snapshots", []).all())
-            if hasattr(s, "pay_week_snapshots")
-            else []
-        )
-
-        if snaps:
-            for snap in snaps:
-                tech_name = (
-                    snap.tecnico.get_full_name().strip()
-                    if getattr(snap, "tecnico", None) and snap.tecnico.get_full_name()
-                    else getattr(snap.tecnico, "username", "")
-                    or f"User {snap.tecnico_id}"
-                )
-
-                grp = groups_map.setdefault(
-                    tech_name,
-                    {
-                        "tech_name": tech_name,
-                        "weeks_summary": "",
-                        "lines": [],
-                    },
-                )
-
-                work_type = (
-                    (snap.tipo_trabajo or "").strip()
-                    or (getattr(snap.item, "tipo_trabajo", "") or "").strip()
-                    or "Legacy"
-                )
-
-                week = (
-                    (getattr(snap, "semana_resultado", "") or "").strip()
-                    or (getattr(snap, "semana_base", "") or "").strip()
-                    or (getattr(s, "semana_pago_real", "") or "").strip()
-                    or (getattr(s, "discount_week", "") or "").strip()
-                    or (getattr(s, "semana_pago_proyectada", "") or "").strip()
-                    or "—"
-                )
-
-                is_paid_line = (
-                    getattr(snap, "payment_status", "") == "paid"
-                    or bool(getattr(snap, "paid_at", None))
-                    or (
-                        getattr(snap, "weekly_payment", None)
-                        and getattr(snap.weekly_payment, "status", "") == "paid"
-                    )
-                    or getattr(s, "finance_status", "") == "paid"
-                )
-
-                grp["lines"].append(
-                    {
-                        "work_type": work_type,
-                        "codigo_trabajo": (snap.codigo_trabajo or "").strip(),
-                        "week": week,
-                        "is_legacy": False,
-                        "snapshot_id": snap.id,
-                        "is_paid": is_paid_line,
-                    }
-                )
-
-            groups = list(groups_map.values())
-
-            for grp in groups:
-                weeks = []
-
-                for line in grp["lines"]:
-                    wk = (line.get("week") or "").strip()
-
-                    if wk and wk not in weeks:
-                        weeks.append(wk)
-
-                grp["weeks_summary"] = ", ".join(weeks) if weeks else "—"
-
-            return groups
-
-        asignaciones = (
-            list(s.tecnicos_sesion.all()) if hasattr(s, "tecnicos_sesion") else []
-        )
-
-        base_week = (
-            (getattr(s, "semana_pago_real", "") or "").strip()
-            or (getattr(s, "discount_week", "") or "").strip()
-            or (getattr(s, "semana_pago_proyectada", "") or "").strip()
-            or "—"
-        )
-
-        legacy_is_paid = legacy_paid_flag(s) or (
-            getattr(s, "finance_status", "") == "paid"
-        )
-
-        tech_names = []
-
-        for asig in asignaciones:
-            tech_name = (
-                asig.tecnico.get_full_name().strip()
-                if getattr(asig, "tecnico", None) and asig.tecnico.get_full_name()
-                else getattr(asig.tecnico, "username", "") or f"User {asig.tecnico_id}"
-            )
-
-            if tech_name and tech_name not in tech_names:
-                tech_names.append(tech_name)
-
-        tech_label = ", ".join(tech_names) if tech_names else "—"
-
-        return [
-            {
-                "tech_name": tech_label,
-                "weeks_summary": base_week,
-                "lines": [
-                    {
-                        "work_type": "Legacy",
-                        "codigo_trabajo": "",
-                        "week": base_week,
-                        "is_legacy": True,
-                        "session_id": s.id,
-                        "dom_id": f"{s.id}-legacy",
-                        "is_paid": legacy_is_paid,
-                    }
-                ],
-            }
-        ]
-
-    def payweek_snapshot_label(sesion, groups=None):
-        groups = groups if groups is not None else build_payweek_groups(sesion)
-
-        if not groups:
-            return str(getattr(sesion, "semana_pago_real", "") or "—")
-
-        rows = []
-
-        for grp in groups:
-            tech_name = grp.get("tech_name") or "—"
-
-            for line in grp.get("lines", []):
-                work_type = (line.get("work_type") or "").strip() or "Work type"
-                week = (line.get("week") or "").strip() or "—"
-                suffix = " [Paid]" if line.get("is_paid") else ""
-                rows.append(f"{tech_name} — {work_type} → {week}{suffix}")
-
-        return (
-            " | ".join(rows)
-            if rows
-            else str(getattr(sesion, "semana_pago_real", "") or "—")
-        )
+    }
 
-    def comments_label(s):
-        vals = []
+    qs_filtered = qs
 
+    if f["date"]:
         try:
-            for a in s.tecnicos_sesion.all():
-                txt = (getattr(a, "tecnico_comentario", "") or "").strip()
-
-                if not txt:
-                    continue
+            d = _date.fromisoformat(f["date"])
+            qs_filtered = qs_filtered.filter(creado_en__date=d)
+        except ValueError:
+            pass
 
-                tech_name = (
-                    a.tecnico.get_full_name() if getattr(a, "tecnico", None) else ""
-                ) or (
-                    getattr(a.tecnico, "username", "")
-                    if getattr(a, "tecnico", None)
-                    else ""
-                )
+    if f["projid"]:
+        qs_filtered = qs_filtered.filter(proyecto_id__icontains=f["projid"])
 
-                if tech_name:
-                    vals.append(f"{tech_name}: {txt}")
-                else:
-                    vals.append(txt)
-        except Exception:
-            pass
+    if f["week"]:
+        qs_filtered = qs_filtered.filter(
+            Q(semana_pago_proyectada__icontains=f["week"])
+            | Q(semana_pago_real__icontains=f["week"])
+            | Q(discount_week__icontains=f["week"])
+            | Q(pay_week_snapshots__semana_resultado__icontains=f["week"])
+            | Q(pay_week_snapshots__semana_base__icontains=f["week"])
+        )
 
-        return " | ".join(vals) if vals else "—"
+    if f["tech"]:
+        # Índice de búsqueda: técnicos asignados y de snapshots, sin joins.
+        qs_filtered = filter_by_technician(qs_filtered, f["tech"])
 
-    def resolve_project_labels_for_sessions(sessions):
-        proj_ids = set()
-        proj_texts = set()
+    if f["client"]:
+        qs_filtered = qs_filtered.filter(cliente__icontains=f["client"])
 
-        for s in sessions:
-            raw_proyecto = getattr(s, "proyecto", None)
-            if raw_proyecto not in (None, "", "-"):
-                txt = str(raw_proyecto).strip()
-                if txt:
-                    proj_texts.add(txt)
-                    try:
-                        proj_ids.add(int(txt))
-                    except Exception:
-                        pass
+    if f["status"]:
+        status_txt = f["status"].lower().strip()
 
-            raw_proyecto_id = getattr(s, "proyecto_id", None)
-            if raw_proyecto_id not in (None, "", "-"):
-                txt2 = str(raw_proyecto_id).strip()
-                if txt2:
-                    proj_texts.add(txt2)
-                    try:
-                        proj_ids.add(int(txt2))
-                    except Exception:
-                        pass
+        if any(k in status_txt for k in ("direct", "descuento", "discount")):
+            qs_filtered = qs_filtered.filter(is_direct_discount=True)
+        else:
+            mapping = [
+                (
+                    ("aprobado supervisor", "approved by supervisor"),
+                    Q(estado="aprobado_supervisor"),
+                ),
+                (
+                    ("rechazado supervisor", "rejected by supervisor"),
+                    Q(estado="rechazado_supervisor"),
+                ),
+                (
+                    ("en revision", "supervisor review", "in supervisor review"),
+                    Q(estado="en_revision_supervisor"),
+                ),
+                (("finalizado", "finished"), Q(estado="finalizado")),
+                (("en proceso", "in progress"), Q(estado="en_proceso")),
+                (("asignado", "assigned"), Q(estado="asignado")),
+                (("aprobado pm", "approved by pm"), Q(estado="aprobado_pm")),
+                (("rechazado pm", "rejected by pm"), Q(estado="rechazado_pm")),
+            ]
 
-        proj_q = Q()
+            applied = False
 
-        if proj_ids:
-            proj_q |= Q(id__in=proj_ids)
+            for keys, cond in mapping:
+                if any(k in status_txt for k in keys):
+                    qs_filtered = qs_filtered.filter(cond)
+                    applied = True
+                    break
 
-        if proj_texts:
-            proj_q |= Q(nombre__in=proj_texts) | Q(codigo__in=proj_texts)
+            if not applied:
+                if "aprobado" in status_txt or "approved" in status_txt:
+                    qs_filtered = qs_filtered.filter(
+                        estado__in=["aprobado_supervisor", "aprobado_pm"]
+                    )
+                elif "rechazado" in status_txt or "rejected" in status_txt:
+                    qs_filtered = qs_filtered.filter(
+                        estado__in=["rechazado_supervisor", "rechazado_pm"]
+                    )
 
-        proyectos = (
-            Proyecto.objects.filter(proj_q).only("id", "nombre", "codigo")
-            if proj_q
-            else Proyecto.objects.none()
-        )
+    qs_filtered = qs_filtered.distinct()
 
-        by_id = {str(p.id): p.nombre for p in proyectos}
-        by_code = {
-            (p.codigo or "").strip().lower(): p.nombre
-            for p in proyectos
-            if getattr(p, "codigo", None)
-        }
-        by_name = {
-            (p.nombre or "").strip().lower(): p.nombre
-            for p in proyectos
-            if getattr(p, "nombre", None)
-        }
+    return qs_filtered, f
 
-        for s in sessions:
-            raw = str(getattr(s, "proyecto", "") or "").strip()
-            raw_id = str(getattr(s, "proyecto_id", "") or "").strip()
 
-            label = ""
+@login_required
+def billing_excel_options(request):
+    """
+    Devuelve los valores de filtros tipo Excel para Billing List.
 
-            if raw:
-                label = (
-                    by_id.get(raw)
-                    or by_code.get(raw.lower())
-                    or by_name.get(raw.lower())
-                    or raw
-                )
+    Esta vista se llama por AJAX al abrir el filtro de una columna
+    (?col=N); sin col devuelve todas. No renderiza template.
+    Respeta los filtros rápidos normales (date, projid, week, tech,
+    client, status) y, con cada opción, cuántas filas la tienen.
 
-            if not label and raw_id:
-                label = (
-                    by_id.get(raw_id)
-                    or by_code.get(raw_id.lower())
-                    or by_name.get(raw_id.lower())
-                    or raw_id
-                )
+    Importante:
+      - NO aplica excel_filters para construir las opciones.
+      - Así el usuario puede cambiar filtros Excel sin perder opciones.
+    """
+    from django.http import JsonResponse
 
-            s.proyecto_nombre = label
-            s.project_label = label
+    from operaciones.services.billing_facets import BILLING_FACETS
 
-        return sessions
+    qs_filtered, _f = _billing_list_queryset(request)
 
-    def excel_value_for_session(s, key):
-        key = str(key)
+    col = (request.GET.get("col") or "").strip()
 
-        if key == "0":
-            return (
-                s.creado_en.strftime("%Y-%m-%d")
-                if getattr(s, "creado_en", None)
-                else "—"
-            )
+    if col and not BILLING_FACETS.has_column(col):
+        return JsonResponse(
+            {
+                "ok": False,
+                "error": "Unknown column.",
+            },
+            status=400,
+        )
 
-        if key == "1":
-            return str(getattr(s, "proyecto_id", "") or "—")
+    return JsonResponse(BILLING_FACETS.payload(qs_filtered, [col] if col else None))
 
-        if key == "2":
-            return str(getattr(s, "direccion_proyecto", "") or "—")
 
-        if key == "3":
-            return str(getattr(s, "semana_pago_proyectada", "") or "—")
 
-        if key == "4":
-            return status_label(s)
+@login_required
+def listar_billing(request):
+    """
+    Visibilidad en Operaciones:
+      - Descuento directo (is_direct_discount=True):
+          mostrar SOLO si AÚN NO se ha enviado -> finance_sent_at IS NULL.
+      - Resto:
+          ocultar si finance_status ∈ {'sent','pending','paid','in_review'}.
 
-        if key == "5":
-            return techs_label(s)
+    Mantiene filtros Excel del template:
+      - NO construye excel_global_json pesado en la carga inicial.
+      - Lee excel_filters desde GET.
+      - Aplica filtros Excel antes de paginar solo cuando existen.
+      - Mantiene paginación AJAX.
+    """
+    from urllib.parse import urlencode
 
-        if key == "6":
-            return str(getattr(s, "cliente", "") or "—")
+    from django.core.paginator import Paginator
+    from django.db.models import Prefetch
+    from django.http import HttpResponseRedirect
 
-        if key == "7":
-            return str(getattr(s, "ciudad", "") or "—")
+    from core.facets import parse_excel_filters
+    from operaciones.models import (BillingPayWeekSnapshot, ItemBilling,
+                                    ItemBillingTecnico, SesionBilling,
+                                    SesionBillingTecnico)
+    from operaciones.services.billing_facets import (
+        BILLING_FACETS, build_payweek_groups, payweek_snapshot_label,
+        resolve_project_labels_for_sessions, techs_label)
 
-        if key == "8":
-            return str(
-                getattr(s, "proyecto_nombre", "")
-                or getattr(s, "project_label", "")
-                or getattr(s, "proyecto", "")
-                or "—"
-            )
+        # ============================================================
 
-        if key == "9":
-            return str(getattr(s, "oficina", "") or "—")
+    # Persistencia server-side de filtros Excel
 
-        if key == "10":
-            return money_value(getattr(s, "subtotal_tecnico", None))
+    # Evita parpadeo al volver desde Review/Edit/Actions.
 
-        if key == "11":
-            return money_value(getattr(s, "subtotal_empresa", None))
+    # ============================================================
 
-        if key == "12":
-            return money_value(getattr(s, "real_company_billing", None))
+    BILLING_EXCEL_SESSION_KEY = "billing_list_excel_filters"
 
-        if key == "13":
-            return diff_label(s)
+    clear_excel_filters = request.GET.get("clear_excel_filters") == "1"
 
-        if key == "14":
-            return finance_status_label(s)
+    excel_filters_raw_request = (request.GET.get("excel_filters") or "").strip()
 
-        if key == "15":
-            groups = getattr(s, "payweek_groups", None)
-            return payweek_snapshot_label(s, groups)
+    if clear_excel_filters:
 
-        if key == "16":
-            return comments_label(s)
+        request.session.pop(BILLING_EXCEL_SESSION_KEY, None)
 
-        return "—"
+    elif excel_filters_raw_request:
 
-    # ============================================================
-    # Filtros Excel
-    # ============================================================
-    excel_filters_raw = (request.GET.get("excel_filters") or "").strip()
+        request.session[BILLING_EXCEL_SESSION_KEY] = excel_filters_raw_request
 
-    try:
-        parsed_excel_filters = (
-            json.loads(excel_filters_raw) if excel_filters_raw else {}
-        )
-    except Exception:
-        parsed_excel_filters = {}
+    else:
 
-    excel_filters = {}
+        stored_excel_filters = (
 
-    if isinstance(parsed_excel_filters, dict):
-        for k, vals in parsed_excel_filters.items():
-            if isinstance(vals, list):
-                clean_vals = set(str(v) for v in vals if str(v).strip() != "")
-                if clean_vals:
-                    excel_filters[str(k)] = clean_vals
+            request.session.get(BILLING_EXCEL_SESSION_KEY) or ""
 
-    # Carga inicial liviana:
-    # los valores globales de filtros Excel se cargan después por AJAX.
-    excel_global_json = "{}"
+        ).strip()
 
-    # Solo hacemos el cálculo pesado si YA hay filtros Excel aplicados.
-    # Esto permite que el filtro siga funcionando al paginar o recargar,
-    # pero evita cargar todo en la primera apertura de la vista.
-    if excel_filters:
-        excel_qs = qs_filtered.only(
-            "id",
-            "creado_en",
-            "proyecto_id",
-            "direccion_proyecto",
-            "semana_pago_proyectada",
-            "semana_pago_real",
-            "discount_week",
-            "estado",
-            "is_direct_discount",
-            "cliente",
-            "ciudad",
-            "proyecto",
-            "oficina",
-            "subtotal_tecnico",
-            "subtotal_empresa",
-            "real_company_billing",
-            "finance_status",
-            "finance_note",
-        ).prefetch_related(
-            Prefetch(
-                "tecnicos_sesion",
-                queryset=SesionBillingTecnico.objects.select_related("tecnico"),
-            ),
-            Prefetch(
-                "pay_week_snapshots",
-                queryset=BillingPayWeekSnapshot.objects.select_related(
-                    "tecnico",
-                    "item",
-                    "weekly_payment",
-                )
-                .filter(is_adjustment=False)
-                .order_by(
-                    "tecnico__first_name",
-                    "tecnico__last_name",
-                    "tecnico__username",
-                    "tipo_trabajo",
-                    "codigo_trabajo",
-                    "id",
-                ),
-            ),
-        )
+        if stored_excel_filters:
 
-        excel_sessions = list(excel_qs)
-        resolve_project_labels_for_sessions(excel_sessions)
+            params = request.GET.copy()
 
-        for s in excel_sessions:
-            s.payweek_groups = build_payweek_groups(s)
-            s.payweek_snapshot_label = payweek_snapshot_label(s, s.payweek_groups)
-            s.techs_label = techs_label(s)
+            params["excel_filters"] = stored_excel_filters
 
-        allowed_ids = []
+            params["page"] = "1"
 
-        for s in excel_sessions:
-            keep = True
+            return HttpResponseRedirect(
 
-            for key, allowed_values in excel_filters.items():
-                current_value = str(excel_value_for_session(s, key) or "—")
+                f"{request.path}?{params.urlencode()}"
 
-                if current_value not in allowed_values:
-                    keep = False
-                    break
+            )
+    # ============================================================
+    # Queryset base + filtros rápidos
+    # ============================================================
+    qs_filtered, f = _billing_list_queryset(request)
 
-            if keep:
-                allowed_ids.append(s.id)
+    # ============================================================
+    # Filtros Excel
+    # ============================================================
+    excel_filters_raw = (request.GET.get("excel_filters") or "").strip()
+    excel_filters = parse_excel_filters(excel_filters_raw)
 
-        qs_filtered = qs_filtered.filter(id__in=allowed_ids)
+    # Carga inicial liviana: las opciones de cada columna se piden por
+    # AJAX al abrir su filtro (billing_excel_options).
+    excel_global_json = "{}"
 
-    qs_filtered = qs_filtered.distinct()
+    # En SQL (BILLING_FACETS); las columnas compuestas se resuelven
+    # con consultas acotadas solo si están filtradas.
+    qs_filtered = BILLING_FACETS.filter(qs_filtered, excel_filters)
 
     # ============================================================
     # Query liviana para paginar
@@ -11881,18 +10748,11 @@ def _s3_client():
     """
     Wasabi S3 en path-style para evitar problemas de CORS/SSL.
     Usa el endpoint REGIONAL del bucket (p.ej. us-east-1).
+
+    Devuelve el cliente compartido de core.storage_gateway (uno por
+    proceso, con pool de conexiones keep-alive).
     """
-    return boto3.client(
-        "s3",
-        endpoint_url=getattr(settings, "AWS_S3_ENDPOINT_URL",
-                             "https://s3.us-east-1.wasabisys.com"),
-        region_name=getattr(settings, "AWS_S3_REGION_NAME", "us-east-1"),
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        config=Config(signature_version="s3v4", s3={
-                      "addressing_style": "path"}),
-        verify=getattr(settings, "AWS_S3_VERIFY", True),
-    )
+    return get_s3_client()
 
 
 ESTADOS_OK = {"aprobado_supervisor", "aprobado_pm", "aprobado_finanzas"}
@@ -13304,10 +12164,10 @@ def _write_xml(zf: zipfile.ZipFile, path: str, root: ET.Element):
 
 
 def _fetch_to_temp(django_filefield) -> str:
+    data = read_fieldfile_bytes(django_filefield)
     tmp = NamedTemporaryFile(delete=False, suffix=".xlsx")
-    tmp.close()
-    with django_filefield.open("rb") as fsrc, open(tmp.name, "wb") as fdst:
-        shutil.copyfileobj(fsrc, fdst, length=1024*1024)
+    with tmp:
+        tmp.write(data)
     return tmp.name
 
 
@@ -13912,12 +12772,6 @@ def billing_merge_excel(request):
         if not rf:
             skipped.append(str(s.id))
             continue
-        try:
-            rf.open("rb")
-            rf.close()
-        except Exception:
-            skipped.append(str(s.id))
-            continue
         try:
             tmp = _fetch_to_temp(rf)
             src_paths.append(tmp)
@@ -14183,7 +13037,7 @@ def billing_update_project_id(request, sesion_id: int):
         return JsonResponse({"ok": False, "error": "Project ID is required."}, status=400)
 
     s.proyecto_id = proyecto_id
-    s.save(update_fields=["proyecto_id"])
+    s.save(update_fields=SesionBilling.PROYECTO_SYNC_FIELDS)
 
     return JsonResponse({
         "ok": True,
@@ -18,6 +18,7 @@ from usuarios.decoradores import rol_requerido
 
 from .models import (EvidenciaFotoBilling, RequisitoFotoBilling,
                      SesionBillingTecnico)
+from .services.evidence_derivatives import schedule_evidence_derivatives
 
 SAFE_PREFIX = getattr(settings, "DIRECT_UPLOADS_SAFE_PREFIX", "operaciones/reporte_fotografico/").rstrip("/") + "/"
 
@@ -89,6 +90,7 @@ def _create_evidencia_from_key(
     )
     ev.imagen.name = key.strip()
     ev.save()
+    schedule_evidence_derivatives(ev)
     return ev
 
 
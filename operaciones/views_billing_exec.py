@@ -1,29 +1,26 @@
 import csv
-import hashlib
 import io
 import json
 import logging
 import os
 import re
-import tempfile
 import time
 import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 from decimal import Decimal
 from io import BytesIO
 from tempfile import NamedTemporaryFile
 from urllib.parse import urlencode
 
-import boto3
 import xlsxwriter
-from botocore.client import Config
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import redirect_to_login
 from django.core.files import File
 from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage as storage
 from django.core.paginator import Paginator
 from django.db import transaction
 from django.db.models import (Case, Count, DecimalField, Exists, F, FloatField,
@@ -54,9 +51,15 @@ from cable_installation.models import CableAssignmentRequirement, CableEvidence
 from core.decorators import project_object_access_required
 from core.permissions import (filter_queryset_by_access, projects_ids_for_user,
                               user_has_project_access)
+from core.storage_gateway import get_s3_client, read_fieldfile_bytes
 from facturacion.models import CartolaMovimiento, Proyecto
-from operaciones.excel_images import tmp_jpeg_from_filefield
+from operaciones.excel_images import report_jpeg_from_filefield
 from operaciones.models import RequisitoFotoBillingPlantilla
+from operaciones.services.evidence_derivatives import \
+    schedule_evidence_derivatives
+from operaciones.services.light_levels import (get_vision_client,
+                                              run_light_levels_backfill,
+                                              vision_image_bytes)
 from usuarios.decoradores import rol_requerido
 
 from .models import (EvidenciaFotoBilling, ItemBillingTecnico,
@@ -1083,7 +1086,7 @@ def upload_evidencias(request, pk):
         req_id, key, nota, lat, lng, acc, taken_dt,
         titulo_manual: str = "", direccion_manual: str = ""
     ):
-        return EvidenciaFotoBilling.objects.create(
+        ev = EvidenciaFotoBilling.objects.create(
             tecnico_sesion=a,
             requisito_id=req_id,
             imagen=key,
@@ -1095,6 +1098,8 @@ def upload_evidencias(request, pk):
             titulo_manual=titulo_manual or "",
             direccion_manual=direccion_manual or "",
         )
+        schedule_evidence_derivatives(ev)
+        return ev
 
     def _boolish(v):
         if isinstance(v, bool):
@@ -1244,7 +1249,7 @@ def upload_evidencias(request, pk):
             use_lng = lng or exif_lng
             use_taken = taken_dt or exif_dt
 
-            EvidenciaFotoBilling.objects.create(
+            ev = EvidenciaFotoBilling.objects.create(
                 tecnico_sesion=a,
                 requisito_id=req_id,
                 imagen=f_conv,
@@ -1256,6 +1261,7 @@ def upload_evidencias(request, pk):
                 titulo_manual=titulo_manual,
                 direccion_manual=direccion_manual,
             )
+            schedule_evidence_derivatives(ev)
             n += 1
 
         messages.success(request, f"{n} photo(s) uploaded.") if n else messages.info(
@@ -1488,6 +1494,7 @@ def upload_evidencias_ajax(request, pk):
         titulo_manual=titulo_manual,
         direccion_manual=direccion_manual or "",
     )
+    schedule_evidence_derivatives(ev)
 
     auto_power = {
         "attempted": False,
@@ -1907,15 +1914,7 @@ def presign_wasabi(request):
 
     key = _build_key(folder, filename)
 
-    s3 = boto3.client(
-        "s3",
-        endpoint_url=getattr(settings, "WASABI_ENDPOINT_URL", "https://s3.us-east-1.wasabisys.com"),
-        region_name=getattr(settings, "WASABI_REGION_NAME", "us-east-1"),
-        aws_access_key_id=getattr(settings, "WASABI_ACCESS_KEY_ID"),
-        aws_secret_access_key=getattr(settings, "WASABI_SECRET_ACCESS_KEY"),
-        config=Config(signature_version="s3v4", s3={"addressing_style": "path"}),
-        verify=getattr(settings, "AWS_S3_VERIFY", True),
-    )
+    s3 = get_s3_client()
 
     bucket = getattr(settings, "WASABI_BUCKET_NAME")
 
@@ -1967,6 +1966,7 @@ def _create_evidencia_from_key(a, req_id, key, nota, lat, lng, acc, taken_dt,
     """
     Create EvidenciaFotoBilling pointing to an object ALREADY uploaded to Wasabi.
     Doesn't re-upload bytes: assigns .name to the FileField and saves.
+    Report/thumbnail derivatives are generated in background.
     """
     ev = EvidenciaFotoBilling(
         tecnico_sesion=a,
@@ -1979,6 +1979,7 @@ def _create_evidencia_from_key(a, req_id, key, nota, lat, lng, acc, taken_dt,
     )
     ev.imagen.name = key.strip()
     ev.save()
+    schedule_evidence_derivatives(ev)
     return ev
 
 
@@ -2290,9 +2291,58 @@ def project_report_status(request, sesion_id: int):
 
 
 # --- helper: construir XLSX a DISCO desde un queryset de evidencias ---
+# Prefetch de imágenes del reporte fotográfico (ENV)
+REPORT_IMG_PREFETCH = int(os.getenv("REPORT_IMG_PREFETCH", "8"))  # imágenes adelantadas
+REPORT_IMG_WORKERS = int(os.getenv("REPORT_IMG_WORKERS", "4"))    # hilos de transcode
+
+
+def _iter_report_images(evs, max_side_px=1600, quality=75):
+    """
+    Etapa de prefetch del reporte fotográfico.
+
+    Recorre evs en orden y entrega (ev, imagen), donde imagen es el
+    (path, w, h) de tmp_jpeg_from_filefield o la excepción que lanzó.
+    Las próximas REPORT_IMG_PREFETCH imágenes se descargan y
+    transcodifican en un pool de REPORT_IMG_WORKERS hilos (PIL libera
+    el GIL al decodificar, reducir y codificar) mientras el caller
+    escribe las anteriores en el workbook.
+
+    Los hilos solo tocan ev.imagen; la consulta y todo lo demás sigue
+    en el hilo del caller. Cerrar el generador (cancelación o error)
+    descarta lo pendiente.
+    """
+    def _transcode(ev):
+        try:
+            return tmp_jpeg_from_filefield(
+                ev.imagen, max_side_px=max_side_px, quality=quality,
+                derivative=ev.imagen_reporte)
+        except Exception as e:
+            return e
+
+    window = max(REPORT_IMG_PREFETCH, 1)
+    pending = deque()
+    executor = ThreadPoolExecutor(
+        max_workers=max(REPORT_IMG_WORKERS, 1),
+        thread_name_prefix="report_img",
+    )
+    try:
+        for ev in evs:
+            while len(pending) >= window:
+                done_ev, future = pending.popleft()
+                yield done_ev, future.result()
+            pending.append((ev, executor.submit(_transcode, ev)))
+
+        while pending:
+            done_ev, future = pending.popleft()
+            yield done_ev, future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
 def _xlsx_path_from_evqs(sesion: SesionBilling, ev_qs, progress_cb=None, should_cancel=None):
     """
     Construye XLSX en disco (streaming) con progreso y cancelación opcional.
+    Las imágenes llegan ya transcodificadas desde _iter_report_images.
     """
     from tempfile import NamedTemporaryFile
 
@@ -2339,7 +2389,7 @@ def _xlsx_path_from_evqs(sesion: SesionBilling, ev_qs, progress_cb=None, should_
                    f"ID PROJECT: {sesion.proyecto_id}", fmt_title)
     cur_row = 2
 
-    def draw_block(r, c, ev):
+    def draw_block(r, c, ev, image):
         # header
         if sesion.proyecto_especial and ev.requisito_id is None:
             titulo_req = (ev.titulo_manual or "").strip() or "Title (missing)"
@@ -2360,8 +2410,9 @@ def _xlsx_path_from_evqs(sesion: SesionBilling, ev_qs, progress_cb=None, should_
 
         # image
         try:
-            tmp_img_path, w, h = tmp_jpeg_from_filefield(
-                ev.imagen, max_side_px=1600, quality=75)
+            if isinstance(image, Exception):
+                raise image
+            tmp_img_path, w, h = image
             sx = max_w_px / float(w)
             sy = max_h_px / float(h)
             scale = min(sx, sy, 1.0)
@@ -2401,25 +2452,29 @@ def _xlsx_path_from_evqs(sesion: SesionBilling, ev_qs, progress_cb=None, should_
 
     # iteración + progreso + cancelación
     idx = 0
-    for ev in ev_qs.iterator(chunk_size=100):
-        # cancel?
-        if callable(should_cancel) and should_cancel(idx):
-            raise ReportCancelled()
+    images = _iter_report_images(ev_qs.iterator(chunk_size=100))
+    try:
+        for ev, image in images:
+            # cancel?
+            if callable(should_cancel) and should_cancel(idx):
+                raise ReportCancelled()
 
-        if idx % 2 == 0:
-            draw_block(cur_row, LEFT_COL, ev)
-        else:
-            draw_block(cur_row, RIGHT_COL, ev)
-            cur_row += BLOCK_ROWS + ROW_SPACE
-        idx += 1
+            if idx % 2 == 0:
+                draw_block(cur_row, LEFT_COL, ev, image)
+            else:
+                draw_block(cur_row, RIGHT_COL, ev, image)
+                cur_row += BLOCK_ROWS + ROW_SPACE
+            idx += 1
 
-        if callable(progress_cb):
-            try:
-                progress_cb(idx)
-            except ReportCancelled:
-                raise
-            except Exception:
-                pass
+            if callable(progress_cb):
+                try:
+                    progress_cb(idx)
+                except ReportCancelled:
+                    raise
+                except Exception:
+                    pass
+    finally:
+        images.close()
 
     if idx % 2 == 1:
         cur_row += BLOCK_ROWS + ROW_SPACE
@@ -2514,52 +2569,19 @@ class ReportCancelled(Exception):
     pass
 
 
-def _cache_key_for_ff(ff) -> str:
-    """
-    Intenta generar un key de cache estable por archivo + last_modified.
-    Si el storage no soporta get_modified_time, usamos el nombre.
-    """
-    base = getattr(ff, "name", str(ff))
-    try:
-        mtime = storage.get_modified_time(ff.name)
-        base = f"{base}:{int(mtime.timestamp())}"
-    except Exception:
-        pass
-    return hashlib.sha1(base.encode("utf-8")).hexdigest()
-
-
-def tmp_jpeg_from_filefield(ff, max_side_px=1600, quality=75):
+def tmp_jpeg_from_filefield(ff, max_side_px=1600, quality=75, derivative=None):
     """
     Descarga/convierte a JPEG optimizado y devuelve (path, width, height).
     - Usa thumbnail() que es muy rápida y conserva proporción.
     - Progressive + optimize para tamaño/velocidad.
-    - Cache local en /tmp/reporte_cache para no reconvertir en regeneraciones.
+    - Cache de derivados compartido (core.derivative_cache) para no
+      reconvertir en regeneraciones; el key es el nombre en storage,
+      sin consultar el storage.
+    - derivative: JPEG de reporte generado al subir (si existe se usa
+      en vez de reducir el original).
     """
-    cache_dir = os.path.join(tempfile.gettempdir(), "reporte_cache")
-    os.makedirs(cache_dir, exist_ok=True)
-    key = _cache_key_for_ff(ff)
-    cached_path = os.path.join(cache_dir, f"{key}.jpg")
-    if os.path.exists(cached_path):
-        with Image.open(cached_path) as im:
-            w, h = im.size
-        return cached_path, w, h
-
-    # leer datos del storage
-    ff.open("rb")
-    raw = ff.read()
-    ff.close()
-
-    im = Image.open(io.BytesIO(raw))
-    im = im.convert("RGB")
-    im.draft("RGB", (max_side_px, max_side_px))  # acelera decode de JPEG
-    im.thumbnail((max_side_px, max_side_px), Image.LANCZOS)
-
-    tmp_path = cached_path  # guardamos directo en cache
-    im.save(tmp_path, "JPEG", quality=quality, optimize=True,
-            progressive=True, subsampling="4:2:0")
-
-    w, h = im.size
-    return tmp_path, w, h
+    return report_jpeg_from_filefield(
+        ff, max_side_px=max_side_px, quality=quality, derivative=derivative)
 
 
 @login_required
@@ -2741,8 +2763,8 @@ def _bytes_excel_reporte_fotografico_qs(sesion: SesionBilling, ev_qs=None) -> by
         scaled_w = scaled_h = None
         try:
             from PIL import Image
-            ev.imagen.open("rb")
-            raw = ev.imagen.read()
+            # JPEG de reporte precalculado al subir; si aún no existe, el original
+            raw = read_fieldfile_bytes(ev.imagen_reporte or ev.imagen)
             image_data = io.BytesIO(raw)
             with Image.open(io.BytesIO(raw)) as im:
                 w, h = im.size
@@ -2754,8 +2776,8 @@ def _bytes_excel_reporte_fotografico_qs(sesion: SesionBilling, ev_qs=None) -> by
             scaled_h = int(h * scale)
         except Exception:
             try:
-                ev.imagen.open("rb")
-                image_data = io.BytesIO(ev.imagen.read())
+                image_data = io.BytesIO(
+                    read_fieldfile_bytes(ev.imagen_reporte or ev.imagen))
                 scaled_w = max_w_px
                 scaled_h = max_h_px
             except Exception:
@@ -2894,8 +2916,8 @@ def _bytes_excel_reporte_fotografico(sesion: SesionBilling) -> bytes:
         scaled_w = scaled_h = None
         try:
             from PIL import Image
-            ev.imagen.open("rb")
-            raw = ev.imagen.read()
+            # JPEG de reporte precalculado al subir; si aún no existe, el original
+            raw = read_fieldfile_bytes(ev.imagen_reporte or ev.imagen)
             image_data = io.BytesIO(raw)
             with Image.open(io.BytesIO(raw)) as im:
                 w, h = im.size
@@ -2907,8 +2929,8 @@ def _bytes_excel_reporte_fotografico(sesion: SesionBilling) -> bytes:
             scaled_h = int(h * scale)
         except Exception:
             try:
-                ev.imagen.open("rb")
-                image_data = io.BytesIO(ev.imagen.read())
+                image_data = io.BytesIO(
+                    read_fieldfile_bytes(ev.imagen_reporte or ev.imagen))
                 scaled_w = max_w_px
                 scaled_h = max_h_px
             except Exception:
@@ -3433,118 +3455,18 @@ def backfill_light_levels_project(request, sesion_id):
         "sí",
     }
 
-    evidencias = (
-        EvidenciaFotoBilling.objects.filter(
-            tecnico_sesion__sesion=s,
-        )
-        .select_related("requisito", "tecnico_sesion", "tecnico_sesion__sesion")
-        .order_by("id")
-    )
-
-    total = 0
-    procesadas = 0
-    extraidas = 0
-    omitidas = 0
-    errores = 0
-
-    for ev in evidencias:
-        total += 1
-
-        # ==========================================================
-        # Detectar si es LIGHT SOURCE o POWER PORT
-        # ==========================================================
-        is_light_source = False
-        is_power_port = False
-
-        if ev.requisito_id:
-            titulo_req = (ev.requisito.titulo or "").strip()
-            needs_power, _port_no = _power_meta_from_title(titulo_req)
-
-            is_light_source = (
-                bool(getattr(ev.requisito, "needs_light_source_reading", False))
-                or _light_source_meta_from_title(titulo_req)
-                or ev.light_source_dbm is not None
-                or "type=light_source" in ((ev.power_extract_note or "").lower())
-            )
-
-            is_power_port = (
-                bool(getattr(ev.requisito, "needs_power_reading", False))
-                or needs_power
-                or titulo_req.upper().startswith("POWER PORT")
-                or ev.power_dbm is not None
-                or _power_port_no_from_evidence(ev)
-                or "type=power_port" in ((ev.power_extract_note or "").lower())
-            )
-
-        else:
-            titulo_manual = (ev.titulo_manual or "").strip()
-            nota = (ev.nota or "").strip()
-            hint = f"{titulo_manual} {nota}".lower()
-
-            needs_power, _port_no = _power_meta_from_title(titulo_manual)
-
-            is_light_source = (
-                _light_source_meta_from_title(titulo_manual)
-                or ev.light_source_dbm is not None
-                or "type=light_source" in ((ev.power_extract_note or "").lower())
-            )
-
-            is_power_port = (
-                needs_power
-                or ev.power_dbm is not None
-                or _power_port_no_from_evidence(ev)
-                or "type=power_port" in ((ev.power_extract_note or "").lower())
-                or titulo_manual.lower() in {"", "extra"}
-                or any(
-                    x in hint
-                    for x in ["power", "port", "dbm", "opm", "light level", "light"]
-                )
-            )
-
-        should_try = force or is_light_source or is_power_port
-
-        if not should_try:
-            omitidas += 1
-            continue
-
-        # ==========================================================
-        # Omitir si ya está completo y no viene force=1
-        # ==========================================================
-        if not force:
-            if is_light_source and ev.light_source_dbm is not None:
-                omitidas += 1
-                continue
-
-            if is_power_port and ev.power_dbm is not None and _power_port_no_from_evidence(ev):
-                omitidas += 1
-                continue
-
-        procesadas += 1
-
-        try:
-            result = _extract_power_dbm_for_evidence(
-                ev,
-                user=request.user,
-                allow_extra=True,
-                allow_locked=True,
-            )
-
-            kind = result.get("kind", "")
-
-            if kind == "light_source":
-                if result.get("light_source_dbm") or result.get("power_dbm"):
-                    extraidas += 1
-                else:
-                    errores += 1
-            else:
-                if result.get("power_dbm"):
-                    extraidas += 1
-                else:
-                    errores += 1
+    try:
+        stats = run_light_levels_backfill(s, user=request.user, force=force)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect("operaciones:revisar_sesion", sesion_id=s.id)
 
-        except Exception:
-            errores += 1
-            continue
+    total = stats["total"]
+    procesadas = stats["procesadas"]
+    extraidas = stats["extraidas"]
+    reutilizadas = stats["reutilizadas"]
+    omitidas = stats["omitidas"]
+    errores = stats["errores"]
 
     if procesadas == 0 and omitidas > 0:
         messages.info(
@@ -3554,6 +3476,7 @@ def backfill_light_levels_project(request, sesion_id):
                 f"Total photos: {total}. "
                 f"Processed: {procesadas}. "
                 f"Extracted: {extraidas}. "
+                f"Reused (same photo): {reutilizadas}. "
                 f"Skipped: {omitidas}. "
                 f"Errors: {errores}."
             ),
@@ -3566,6 +3489,7 @@ def backfill_light_levels_project(request, sesion_id):
                 f"Total photos: {total}. "
                 f"Processed: {procesadas}. "
                 f"Extracted: {extraidas}. "
+                f"Reused (same photo): {reutilizadas}. "
                 f"Skipped: {omitidas}. "
                 f"Errors: {errores}."
             ),
@@ -3574,8 +3498,48 @@ def backfill_light_levels_project(request, sesion_id):
     return redirect("operaciones:revisar_sesion", sesion_id=s.id)
 
 
+def _power_extraction_target(ev):
+    """
+    (titulo, known_port, is_light_source) de una evidencia para la
+    extracción de potencia. Sin consultas: usa requisito ya cargado.
+    """
+    known_port = None
+
+    if ev.requisito_id:
+        titulo = ev.requisito.titulo or ""
+
+        is_light_source = (
+            bool(getattr(ev.requisito, "needs_light_source_reading", False))
+            or _light_source_meta_from_title(titulo)
+            or ev.light_source_dbm is not None
+            or "type=light_source" in ((ev.power_extract_note or "").lower())
+        )
+
+        known_port = getattr(ev.requisito, "power_port_no", None)
+        if not known_port:
+            _needs_power, known_port = _power_meta_from_title(titulo)
+
+        try:
+            known_port = int(known_port) if known_port else None
+        except Exception:
+            known_port = None
+
+        if known_port and not (1 <= known_port <= 8):
+            known_port = None
+    else:
+        titulo = ev.titulo_manual or "Extra"
+        is_light_source = (
+            _light_source_meta_from_title(titulo)
+            or ev.light_source_dbm is not None
+            or "type=light_source" in ((ev.power_extract_note or "").lower())
+        )
+
+    return titulo, known_port, bool(is_light_source)
+
+
 def _extract_power_dbm_for_evidence(
-    ev, user=None, allow_extra=True, allow_locked=False
+    ev, user=None, allow_extra=True, allow_locked=False,
+    client=None, image_bytes=None, image_mime="image/jpeg", commit=True,
 ):
     """
     Extrae automáticamente:
@@ -3585,10 +3549,18 @@ def _extract_power_dbm_for_evidence(
     Regla:
     - POWER PORT debe ser negativo: -60.00 a 0.00 dBm
     - LIGHT SOURCE puede ser positivo o negativo
+
+    Para procesar en lote (operaciones.services.light_levels):
+    - client: cliente OpenAI compartido (por defecto, el del proceso).
+    - image_bytes: JPEG ya reducido para enviar (por defecto se descarga
+      el original y se reduce al tamaño de reporte).
+    - image_mime: tipo de image_bytes (vision_image_bytes() envía el
+      original tal cual, p.ej. PNG, si Pillow no lo puede abrir).
+    - commit=False: deja los campos asignados en ev sin guardar
+      (el caller hace bulk_update). No toca la base de datos.
     """
     import base64
     import json
-    import os
     import re
     from decimal import Decimal, InvalidOperation
 
@@ -3606,62 +3578,15 @@ def _extract_power_dbm_for_evidence(
     if not ev.requisito_id and not allow_extra:
         raise ValueError("This evidence has no requirement.")
 
-    api_key = getattr(settings, "OPENAI_API_KEY", "") or os.getenv("OPENAI_API_KEY", "")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY is not configured on the server.")
-
     model_name = getattr(settings, "OPENAI_VISION_MODEL", "gpt-4o-mini")
 
-    try:
-        from openai import OpenAI
-    except Exception:
-        raise ValueError("openai package is not installed. Run: pip install openai")
-
-    def _read_image_bytes(evidence):
-        try:
-            evidence.imagen.open("rb")
-            return evidence.imagen.read()
-        finally:
-            try:
-                evidence.imagen.close()
-            except Exception:
-                pass
+    if client is None:
+        client = get_vision_client()
 
     # ==========================================================
     # Detectar tipo de evidencia
     # ==========================================================
-    titulo = ""
-    known_port = None
-    is_light_source = False
-
-    if ev.requisito_id:
-        titulo = ev.requisito.titulo or ""
-
-        is_light_source = (
-            bool(getattr(ev.requisito, "needs_light_source_reading", False))
-            or _light_source_meta_from_title(titulo)
-            or ev.light_source_dbm is not None
-            or "type=light_source" in ((ev.power_extract_note or "").lower())
-        )
-
-        known_port = getattr(ev.requisito, "power_port_no", None)
-        if not known_port:
-            _needs_power, known_port = _power_meta_from_title(titulo)
-
-        try:
-            known_port = int(known_port) if known_port else None
-        except Exception:
-            known_port = None
-
-        if known_port and not (1 <= known_port <= 8):
-            known_port = None
-    else:
-        titulo = ev.titulo_manual or "Extra"
-        is_light_source = (
-            _light_source_meta_from_title(titulo)
-            or ev.light_source_dbm is not None
-            or "type=light_source" in ((ev.power_extract_note or "").lower())
-        )
+    titulo, known_port, is_light_source = _power_extraction_target(ev)
 
     def _normalize_dbm_value(raw, allow_positive=False):
         """
@@ -3721,19 +3646,16 @@ def _extract_power_dbm_for_evidence(
 
         return None
 
-    raw_bytes = _read_image_bytes(ev)
-    if not raw_bytes:
-        raise ValueError("Image file is empty.")
-
-    image_b64 = base64.b64encode(raw_bytes).decode("utf-8")
-
-    name = (getattr(ev.imagen, "name", "") or "").lower()
-    if name.endswith(".png"):
-        mime = "image/png"
-    elif name.endswith(".webp"):
-        mime = "image/webp"
+    if image_bytes is None:
+        raw_bytes = read_fieldfile_bytes(ev.imagen)
+        if not raw_bytes:
+            raise ValueError("Image file is empty.")
+        image_bytes, mime = vision_image_bytes(
+            raw_bytes, getattr(ev.imagen, "name", ""))
     else:
-        mime = "image/jpeg"
+        mime = image_mime or "image/jpeg"
+
+    image_b64 = base64.b64encode(image_bytes).decode("utf-8")
 
     # ==========================================================
     # PROMPT SEGÚN TIPO
@@ -3817,8 +3739,6 @@ Respond ONLY as strict JSON:
 }}
 """
 
-    client = OpenAI(api_key=api_key)
-
     resp = client.responses.create(
         model=model_name,
         input=[
@@ -3910,14 +3830,15 @@ Respond ONLY as strict JSON:
 
         ev.power_extract_note = " | ".join(note_parts)[:255]
 
-        ev.save(
-            update_fields=[
-                "light_source_dbm",
-                "power_extracted_at",
-                "power_extracted_by",
-                "power_extract_note",
-            ]
-        )
+        if commit:
+            ev.save(
+                update_fields=[
+                    "light_source_dbm",
+                    "power_extracted_at",
+                    "power_extracted_by",
+                    "power_extract_note",
+                ]
+            )
 
         return {
             "power_dbm": f"{val:.2f}",
@@ -3972,14 +3893,15 @@ Respond ONLY as strict JSON:
 
     ev.power_extract_note = " | ".join(note_parts)[:255]
 
-    ev.save(
-        update_fields=[
-            "power_dbm",
-            "power_extracted_at",
-            "power_extracted_by",
-            "power_extract_note",
-        ]
-    )
+    if commit:
+        ev.save(
+            update_fields=[
+                "power_dbm",
+                "power_extracted_at",
+                "power_extracted_by",
+                "power_extract_note",
+            ]
+        )
 
     return {
         "power_dbm": f"{val:.2f}",
@@ -5781,11 +5703,13 @@ def eliminar_evidencia(request, pk, evidencia_id):
     ev = get_object_or_404(EvidenciaFotoBilling,
                            pk=evidencia_id, tecnico_sesion=a)
 
-    # Eliminar archivo físico si existe (ignorar errores del storage)
-    try:
-        ev.imagen.delete(save=False)
-    except Exception:
-        pass
+    # Eliminar archivo físico y sus derivados si existen (ignorar errores del storage)
+    for ff in (ev.imagen, ev.imagen_reporte, ev.imagen_thumb):
+        try:
+            if ff:
+                ff.delete(save=False)
+        except Exception:
+            pass
 
     # Eliminar registro
     ev.delete()
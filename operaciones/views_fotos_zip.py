@@ -1,17 +1,24 @@
 # operaciones/views_fotos_zip.py
+import itertools
 import logging
 import os
 import re
+import time
 import zipfile
+import zlib
 from tempfile import SpooledTemporaryFile
 from urllib.parse import urlparse
 
 from django.contrib.auth.decorators import login_required
-from django.http import FileResponse, Http404
+from django.http import FileResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.http import content_disposition_header
 from django.utils.text import slugify
 
-from operaciones.models import SesionBilling
+from core.evidence_fetcher import EvidenceFetcher, EvidenceSource
+from core.zip_artifact_cache import ZipArtifactCache, zip_fingerprint
+from core.zip_policy import write_zip_entry, zip_compress_type
+from operaciones.models import EvidenciaFotoBilling, SesionBilling
 from usuarios.decoradores import rol_requerido  # ajusta el import si aplica
 
 logger = logging.getLogger(__name__)
@@ -30,6 +37,22 @@ SMARTSHEET_MAX_ZIP_PARTS = 10
 
 ZIP_SPOOL_MEMORY_LIMIT = 16 * 1024 * 1024
 
+# ============================================================
+# Descarga en streaming
+# ============================================================
+
+ZIP_STREAM_CHUNK_BYTES = 256 * 1024
+
+ZIP_STREAM_FETCH_WINDOW = 4
+
+# ============================================================
+# Caché de ZIP terminados (core/zip_artifact_cache.py)
+# ============================================================
+
+# Subir cuando cambie el contenido que generan los builders
+# (nombres internos, compresión...) para no servir ZIP viejos.
+ZIP_ARTIFACT_FORMAT_VERSION = 1
+
 
 def _zip_size_bytes(
     spooled_file,
@@ -88,7 +111,8 @@ def _build_spooled_zip_from_entries(
                 arcname,
                 data,
             ) in entries:
-                zf.writestr(
+                write_zip_entry(
+                    zf,
                     arcname,
                     data,
                 )
@@ -109,31 +133,209 @@ def _build_spooled_zip_from_entries(
         raise
 
 
-def _collect_photo_entries_for_zip(
+# Tamaños fijos del formato ZIP (sin zip64 ni comentarios).
+ZIP_LOCAL_HEADER_BYTES = 30
+ZIP_CENTRAL_DIRECTORY_RECORD_BYTES = 46
+ZIP_END_OF_CENTRAL_DIRECTORY_BYTES = 22
+
+
+class _SmartsheetZipPartWriter:
+    """
+    Parte de ZIP escrita de forma incremental.
+
+    Cada fotografía se agrega una sola vez con write_zip_entry(), igual
+    que _build_spooled_zip_from_entries, por lo que el contenido del ZIP
+    es el mismo que el del ZIP completo.
+
+    size_with() predice el tamaño final que tendría la parte si se
+    agregara la fotografía:
+
+        offset actual (headers locales + datos ya escritos)
+        + header local y datos comprimidos de la foto nueva
+        + central directory de todas las entradas
+        + end of central directory
+
+    Las entradas ZIP_STORED ocupan exactamente len(data); las
+    DEFLATE se calculan con el mismo compresor (nivel 6) que usa zipfile.
+    """
+
+    def __init__(self):
+        self.file = SpooledTemporaryFile(
+            max_size=ZIP_SPOOL_MEMORY_LIMIT,
+        )
+
+        self._zip = zipfile.ZipFile(
+            self.file,
+            mode="w",
+            compression=zipfile.ZIP_DEFLATED,
+            compresslevel=6,
+        )
+
+        self._central_directory_bytes = 0
+
+        self.photo_count = 0
+
+    @staticmethod
+    def _name_length(arcname: str) -> int:
+        return len(
+            zipfile.ZipInfo(
+                arcname,
+            ).filename.encode(
+                "utf-8",
+            )
+        )
+
+    @staticmethod
+    def _compressed_length(
+        arcname: str,
+        data: bytes,
+    ) -> int:
+        if zip_compress_type(arcname, data) == zipfile.ZIP_STORED:
+            return len(data)
+
+        compressor = zlib.compressobj(
+            6,
+            zlib.DEFLATED,
+            -15,
+        )
+
+        return len(compressor.compress(data)) + len(compressor.flush())
+
+    def size_with(
+        self,
+        arcname: str,
+        data: bytes,
+    ) -> int:
+        name_length = self._name_length(
+            arcname,
+        )
+
+        return (
+            self.file.tell()
+            + ZIP_LOCAL_HEADER_BYTES
+            + name_length
+            + self._compressed_length(arcname, data)
+            + self._central_directory_bytes
+            + ZIP_CENTRAL_DIRECTORY_RECORD_BYTES
+            + name_length
+            + ZIP_END_OF_CENTRAL_DIRECTORY_BYTES
+        )
+
+    def add(
+        self,
+        arcname: str,
+        data: bytes,
+    ):
+        write_zip_entry(
+            self._zip,
+            arcname,
+            data,
+        )
+
+        self._central_directory_bytes += (
+            ZIP_CENTRAL_DIRECTORY_RECORD_BYTES
+            + self._name_length(
+                arcname,
+            )
+        )
+
+        self.photo_count += 1
+
+    def finish(self) -> int:
+        """
+        Cierra el ZIP y devuelve su tamaño real.
+        El archivo queda posicionado al inicio.
+        """
+        self._zip.close()
+
+        return _zip_size_bytes(
+            self.file,
+        )
+
+    def discard(self):
+        try:
+            self._zip.close()
+        except Exception:
+            pass
+
+        try:
+            self.file.close()
+        except Exception:
+            pass
+
+
+def _evidence_title(
     sesion: SesionBilling,
-) -> tuple[
-    list[tuple[str, bytes]],
-    dict,
-]:
+    ev,
+) -> str:
+    """
+    Título de la evidencia usado como nombre del archivo dentro del ZIP.
     """
-    Recopila las fotografías de una SesionBilling utilizando
-    exactamente la misma estructura oficial del ZIP.
 
-    Devuelve:
+    if getattr(
+        sesion,
+        "proyecto_especial",
+        False,
+    ) and not getattr(
+        ev,
+        "requisito_id",
+        None,
+    ):
+        return (
+            getattr(
+                ev,
+                "titulo_manual",
+                "",
+            )
+            or "Extra"
+        )
 
-        (
-            entries,
-            stats,
+    req = getattr(
+        ev,
+        "requisito",
+        None,
+    )
+
+    return (
+        getattr(
+            req,
+            "titulo",
+            "",
         )
+        or "Extra"
+    )
 
-    entries:
 
-        [
-            (
-                "PROJECT_ID/Requirement.jpg",
-                b"...",
-            ),
-        ]
+def _field_url_getter(imagen_field):
+    """
+    La URL (firmada) solo se genera si la lectura desde storage falla.
+    """
+
+    def _url():
+        return imagen_field.url or ""
+
+    return _url
+
+
+def _iter_photo_entries_for_zip(
+    sesion: SesionBilling,
+    stats: dict,
+    *,
+    fetch_window: int | None = None,
+):
+    """
+    Genera (arcname, data) de las fotografías de una SesionBilling,
+    en el orden oficial del ZIP.
+
+    Las fotografías se descargan en paralelo con EvidenceFetcher
+    (un GET por foto, sin exists()/url previos) y se entregan en orden,
+    por lo que los nombres internos son los mismos que antes.
+
+    stats se actualiza a medida que avanza:
+    total_vistas, total_agregadas, total_fallidas.
+
+    fetch_window limita cuántas fotografías descargadas pueden estar
+    en memoria a la vez.
     """
 
     root_name = _safe_component_preserve(
@@ -151,175 +353,167 @@ def _collect_photo_entries_for_zip(
         .all()
     )
 
-    entries: list[tuple[str, bytes]] = []
+    stats.setdefault("total_vistas", 0)
+    stats.setdefault("total_agregadas", 0)
+    stats.setdefault("total_fallidas", 0)
 
-    total_agregadas = 0
-    total_fallidas = 0
-    total_vistas = 0
+    def _sources():
+        for asignacion in asignaciones:
+            evs_rel = getattr(
+                asignacion,
+                "evidencias",
+                None,
+            )
 
-    used_paths = set()
+            if not evs_rel:
+                continue
 
-    for asignacion in asignaciones:
-        evs_rel = getattr(
-            asignacion,
-            "evidencias",
-            None,
-        )
+            for ev in evs_rel.all():
+                stats["total_vistas"] += 1
 
-        if not evs_rel:
-            continue
+                imagen_field = getattr(
+                    ev,
+                    "imagen",
+                    None,
+                )
 
-        for ev in evs_rel.all():
-            total_vistas += 1
+                if not imagen_field:
+                    stats["total_fallidas"] += 1
 
-            imagen_field = getattr(
-                ev,
-                "imagen",
-                None,
-            )
+                    continue
 
-            if not imagen_field:
-                total_fallidas += 1
+                yield EvidenceSource(
+                    key=ev,
+                    storage=getattr(
+                        imagen_field,
+                        "storage",
+                        None,
+                    ),
+                    storage_name=(
+                        getattr(
+                            imagen_field,
+                            "name",
+                            "",
+                        )
+                        or ""
+                    ),
+                    url=_field_url_getter(imagen_field),
+                )
 
-                continue
+    used_paths = set()
 
-            field_storage = getattr(
-                imagen_field,
-                "storage",
-                None,
-            )
+    fetcher = EvidenceFetcher(
+        log_prefix="ZIP fotos",
+        window=fetch_window,
+    )
 
-            storage_name = (
-                getattr(
-                    imagen_field,
-                    "name",
-                    "",
-                )
-                or ""
-            )
+    for result in fetcher.iter_fetch(_sources()):
+        if not result.ok:
+            stats["total_fallidas"] += 1
 
-            public_url = ""
+            continue
 
-            try:
-                public_url = imagen_field.url or ""
+        ev = result.source.key
 
-            except Exception:
-                public_url = ""
+        storage_name = result.source.storage_name
 
-            # =================================================
-            # Título de la evidencia
-            # =================================================
+        extension = _guess_ext(
+            storage_name or result.source.resolve_url(),
+            default=".jpg",
+        )
 
-            if getattr(
+        file_title = _safe_component_preserve(
+            _evidence_title(
                 sesion,
-                "proyecto_especial",
-                False,
-            ) and not getattr(
                 ev,
-                "requisito_id",
-                None,
-            ):
-                req_title_raw = (
-                    getattr(
-                        ev,
-                        "titulo_manual",
-                        "",
-                    )
-                    or "Extra"
-                )
+            ),
+            max_len=120,
+        )
 
-            else:
-                req = getattr(
-                    ev,
-                    "requisito",
-                    None,
-                )
+        # =================================================
+        # Nombre interno inicial
+        # =================================================
 
-                req_title_raw = (
-                    getattr(
-                        req,
-                        "titulo",
-                        "",
-                    )
-                    or "Extra"
-                )
+        arcname = f"{root_name}/" f"{file_title}" f"{extension}"
 
-            # =================================================
-            # Leer archivo desde Wasabi/storage o URL
-            # =================================================
+        # =================================================
+        # Evitar nombres duplicados
+        # =================================================
 
-            data = _read_from_storage_or_url(
-                field_storage,
-                storage_name,
-                public_url,
-            )
+        if arcname in used_paths:
+            arcname = f"{root_name}/" f"{file_title} " f"({ev.id})" f"{extension}"
 
-            if data is None:
-                total_fallidas += 1
+            if arcname in used_paths:
+                counter = 2
+
+                while True:
+                    arcname_try = (
+                        f"{root_name}/"
+                        f"{file_title} "
+                        f"({ev.id})_"
+                        f"{counter}"
+                        f"{extension}"
+                    )
 
-                continue
+                    if arcname_try not in used_paths:
+                        arcname = arcname_try
 
-            extension = _guess_ext(
-                storage_name or public_url,
-                default=".jpg",
-            )
+                        break
 
-            file_title = _safe_component_preserve(
-                req_title_raw,
-                max_len=120,
-            )
-
-            # =================================================
-            # Nombre interno inicial
-            # =================================================
+                    counter += 1
 
-            arcname = f"{root_name}/" f"{file_title}" f"{extension}"
+        used_paths.add(
+            arcname,
+        )
 
-            # =================================================
-            # Evitar nombres duplicados
-            # =================================================
+        stats["total_agregadas"] += 1
 
-            if arcname in used_paths:
-                arcname = f"{root_name}/" f"{file_title} " f"({ev.id})" f"{extension}"
-
-                if arcname in used_paths:
-                    counter = 2
-
-                    while True:
-                        arcname_try = (
-                            f"{root_name}/"
-                            f"{file_title} "
-                            f"({ev.id})_"
-                            f"{counter}"
-                            f"{extension}"
-                        )
+        yield (
+            arcname,
+            result.data,
+        )
 
-                        if arcname_try not in used_paths:
-                            arcname = arcname_try
 
-                            break
+def _collect_photo_entries_for_zip(
+    sesion: SesionBilling,
+) -> tuple[
+    list[tuple[str, bytes]],
+    dict,
+]:
+    """
+    Recopila las fotografías de una SesionBilling utilizando
+    exactamente la misma estructura oficial del ZIP.
 
-                        counter += 1
+    Devuelve:
 
-            used_paths.add(
-                arcname,
-            )
+        (
+            entries,
+            stats,
+        )
 
-            entries.append(
-                (
-                    arcname,
-                    data,
-                )
-            )
+    entries:
 
-            total_agregadas += 1
+        [
+            (
+                "PROJECT_ID/Requirement.jpg",
+                b"...",
+            ),
+        ]
+    """
 
     stats = {
-        "total_vistas": total_vistas,
-        "total_agregadas": total_agregadas,
-        "total_fallidas": total_fallidas,
+        "total_vistas": 0,
+        "total_agregadas": 0,
+        "total_fallidas": 0,
     }
 
+    entries = list(
+        _iter_photo_entries_for_zip(
+            sesion,
+            stats,
+        )
+    )
+
     return (
         entries,
         stats,
@@ -354,21 +548,15 @@ def generar_fotos_zip_sesion(
         max_len=80,
     )
 
-    asignaciones = (
-        sesion.tecnicos_sesion.select_related("tecnico")
-        .prefetch_related("evidencias__requisito")
-        .all()
-    )
-
     spooled = SpooledTemporaryFile(
         max_size=100 * 1024 * 1024,
     )
 
-    total_agregadas = 0
-    total_fallidas = 0
-    total_vistas = 0
-
-    used_paths = set()
+    stats = {
+        "total_vistas": 0,
+        "total_agregadas": 0,
+        "total_fallidas": 0,
+    }
 
     try:
         with zipfile.ZipFile(
@@ -378,198 +566,448 @@ def generar_fotos_zip_sesion(
             compresslevel=6,
         ) as zf:
 
-            for asignacion in asignaciones:
-                evs_rel = getattr(
-                    asignacion,
-                    "evidencias",
-                    None,
-                )
-
-                if not evs_rel:
-                    continue
+            for arcname, data in _iter_photo_entries_for_zip(
+                sesion,
+                stats,
+            ):
+                try:
+                    write_zip_entry(
+                        zf,
+                        arcname,
+                        data,
+                    )
 
-                for ev in evs_rel.all():
-                    total_vistas += 1
+                except Exception as exc:
+                    stats["total_agregadas"] -= 1
+                    stats["total_fallidas"] += 1
 
-                    imagen_field = getattr(
-                        ev,
-                        "imagen",
-                        None,
+                    logger.warning(
+                        "ZIP fotos: fallo writestr '%s': %s",
+                        arcname,
+                        exc,
                     )
 
-                    if not imagen_field:
-                        total_fallidas += 1
-                        continue
+        logger.info(
+            ("ZIP fotos sesion=%s -> " "vistas=%s agregadas=%s fallidas=%s"),
+            sesion.id,
+            stats["total_vistas"],
+            stats["total_agregadas"],
+            stats["total_fallidas"],
+        )
 
-                    field_storage = getattr(
-                        imagen_field,
-                        "storage",
-                        None,
-                    )
+        if stats["total_agregadas"] == 0:
+            spooled.close()
 
-                    storage_name = (
-                        getattr(
-                            imagen_field,
-                            "name",
-                            "",
-                        )
-                        or ""
-                    )
+            raise RuntimeError("No photos available for this billing session.")
 
-                    public_url = ""
+        spooled.seek(0)
+
+        filename = f"{root_name}.zip"
 
-                    try:
-                        public_url = imagen_field.url or ""
-                    except Exception:
-                        public_url = ""
+        return (
+            spooled,
+            filename,
+            stats,
+        )
 
-                    # ----------------------------------------
-                    # Título de la evidencia
-                    # ----------------------------------------
+    except Exception:
+        try:
+            spooled.close()
+        except Exception:
+            pass
 
-                    if getattr(
-                        sesion,
-                        "proyecto_especial",
-                        False,
-                    ) and not getattr(
-                        ev,
-                        "requisito_id",
-                        None,
-                    ):
-                        req_title_raw = (
-                            getattr(
-                                ev,
-                                "titulo_manual",
-                                "",
-                            )
-                            or "Extra"
-                        )
+        raise
 
-                    else:
-                        req = getattr(
-                            ev,
-                            "requisito",
-                            None,
-                        )
 
-                        req_title_raw = (
-                            getattr(
-                                req,
-                                "titulo",
-                                "",
-                            )
-                            or "Extra"
-                        )
+class _ZipStreamBuffer:
+    """
+    Destino no seekable para zipfile.ZipFile.
+
+    Al no poder volver atrás, zipfile escribe cada entrada con data
+    descriptor (tamaños y CRC después de los datos) y agrega ZIP64
+    cuando hace falta. Lo escrito se acumula aquí hasta que el
+    generador lo retira con drain().
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+
+        self._chunks.append(data)
+        self._offset += len(data)
+
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
 
-                    # ----------------------------------------
-                    # Leer archivo
-                    # ----------------------------------------
+    def flush(self):
+        pass
 
-                    data = _read_from_storage_or_url(
-                        field_storage,
-                        storage_name,
-                        public_url,
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+
+        self._chunks = []
+
+        return data
+
+
+def iter_fotos_zip_stream(
+    sesion: SesionBilling,
+    stats: dict | None = None,
+    *,
+    chunk_size: int = ZIP_STREAM_CHUNK_BYTES,
+):
+    """
+    Genera el ZIP oficial de fotografías como una secuencia de bytes.
+
+    Mismas entradas y nombres que generar_fotos_zip_sesion, pero:
+
+    - el primer bloque sale apenas se descarga la primera fotografía;
+    - cada fotografía se comprime en bloques de chunk_size y lo escrito
+      se entrega de inmediato;
+    - solo ZIP_STREAM_FETCH_WINDOW fotografías descargadas esperan en
+      memoria a la vez.
+
+    Pensado para StreamingHttpResponse.
+    """
+
+    if stats is None:
+        stats = {}
+
+    buffer = _ZipStreamBuffer()
+
+    with zipfile.ZipFile(
+        buffer,
+        mode="w",
+        compression=zipfile.ZIP_DEFLATED,
+        compresslevel=6,
+    ) as zf:
+        for arcname, data in _iter_photo_entries_for_zip(
+            sesion,
+            stats,
+            fetch_window=ZIP_STREAM_FETCH_WINDOW,
+        ):
+            zinfo = zipfile.ZipInfo(
+                arcname,
+                date_time=time.localtime()[:6],
+            )
+
+            zinfo.compress_type = zip_compress_type(
+                arcname,
+                data,
+            )
+
+            with zf.open(
+                zinfo,
+                mode="w",
+            ) as dest:
+                for start in range(
+                    0,
+                    len(data),
+                    chunk_size,
+                ):
+                    dest.write(
+                        data[start : start + chunk_size],
                     )
 
-                    if data is None:
-                        total_fallidas += 1
-                        continue
+                    chunk = buffer.drain()
+
+                    if chunk:
+                        yield chunk
+
+            chunk = buffer.drain()
+
+            if chunk:
+                yield chunk
+
+    # Central directory
+    chunk = buffer.drain()
+
+    if chunk:
+        yield chunk
+
+    logger.info(
+        ("ZIP fotos stream sesion=%s -> " "vistas=%s agregadas=%s fallidas=%s"),
+        sesion.id,
+        stats.get("total_vistas", 0),
+        stats.get("total_agregadas", 0),
+        stats.get("total_fallidas", 0),
+    )
+
+
+def _sesion_zip_fingerprint(
+    sesion: SesionBilling,
+    layout: str,
+    **params,
+) -> str:
+    """
+    Fingerprint del set de evidencias de la sesión para el caché de ZIP.
+
+    Incluye todo lo que define el contenido del ZIP: IDs, storage names
+    y títulos de las evidencias en el orden del ZIP, carpeta raíz,
+    layout ("session", "smartsheet") y sus parámetros (tamaño de
+    parte...). Una sola consulta.
+    """
+
+    rows = list(
+        EvidenciaFotoBilling.objects.filter(
+            tecnico_sesion__sesion=sesion,
+        )
+        .order_by(
+            "tecnico_sesion_id",
+            "requisito__orden",
+            "tomada_en",
+            "id",
+        )
+        .values_list(
+            "id",
+            "imagen",
+            "requisito_id",
+            "requisito__titulo",
+            "titulo_manual",
+        )
+    )
+
+    return zip_fingerprint(
+        ZIP_ARTIFACT_FORMAT_VERSION,
+        layout,
+        params,
+        sesion.id,
+        sesion.proyecto_id or "",
+        bool(
+            getattr(
+                sesion,
+                "proyecto_especial",
+                False,
+            )
+        ),
+        rows,
+    )
+
+
+def _iter_fotos_zip_stream_cached(
+    sesion: SesionBilling,
+    cache: ZipArtifactCache,
+    fingerprint: str,
+    filename: str,
+    stats: dict | None = None,
+):
+    """
+    iter_fotos_zip_stream() que además guarda una copia en el caché.
+
+    La copia solo se publica si el ZIP se entregó completo y sin
+    fotografías fallidas; un error de disco desactiva la copia pero no
+    corta la descarga.
+    """
+
+    if stats is None:
+        stats = {}
+
+    writer = cache.writer(
+        fingerprint,
+    )
+
+    handle = None
+
+    if writer is not None:
+        try:
+            handle = writer.open_file(
+                filename,
+            )
+
+        except OSError:
+            writer.abort()
+
+            writer = None
+
+    completed = False
 
-                    ext = _guess_ext(
-                        storage_name or public_url,
-                        default=".jpg",
+    try:
+        for chunk in iter_fotos_zip_stream(
+            sesion,
+            stats,
+        ):
+            if handle is not None:
+                try:
+                    handle.write(
+                        chunk,
                     )
 
-                    file_title = _safe_component_preserve(
-                        req_title_raw,
-                        max_len=120,
+                except OSError as exc:
+                    logger.warning(
+                        "ZIP fotos: cache write failed sesion=%s: %s",
+                        sesion.id,
+                        exc,
                     )
 
-                    # ----------------------------------------
-                    # Evitar colisiones
-                    # ----------------------------------------
+                    handle.close()
 
-                    arcname = f"{root_name}/" f"{file_title}" f"{ext}"
+                    handle = None
 
-                    if arcname in used_paths:
-                        arcname = f"{root_name}/" f"{file_title} " f"({ev.id})" f"{ext}"
+                    writer.abort()
 
-                        if arcname in used_paths:
-                            n = 2
+                    writer = None
 
-                            while True:
-                                arcname_try = (
-                                    f"{root_name}/"
-                                    f"{file_title} "
-                                    f"({ev.id})_"
-                                    f"{n}"
-                                    f"{ext}"
-                                )
+            yield chunk
 
-                                if arcname_try not in used_paths:
-                                    arcname = arcname_try
-                                    break
+        completed = True
 
-                                n += 1
+    finally:
+        if handle is not None:
+            handle.close()
 
-                    used_paths.add(arcname)
+        if writer is not None:
+            if (
+                completed
+                and stats.get("total_agregadas")
+                and not stats.get("total_fallidas")
+            ):
+                writer.commit(
+                    **stats,
+                )
 
-                    try:
-                        zf.writestr(
-                            arcname,
-                            data,
-                        )
+            else:
+                writer.abort()
 
-                        total_agregadas += 1
 
-                    except Exception as exc:
-                        total_fallidas += 1
+def _prime_fotos_zip_stream(
+    stream,
+    stats: dict,
+):
+    """
+    Avanza el stream hasta su primer bloque, antes de responder.
 
-                        logger.warning(
-                            "ZIP fotos: fallo writestr '%s': %s",
-                            arcname,
-                            exc,
-                        )
+    El primer bloque sale recién con la primera fotografía agregada,
+    así que si todas fallan el stream ya terminó con un ZIP vacío:
+    en ese caso se cierra y se devuelve None para que la vista
+    redirija como antes. Si no, devuelve el stream completo.
+    """
 
-        logger.info(
-            ("ZIP fotos sesion=%s -> " "vistas=%s agregadas=%s fallidas=%s"),
-            sesion.id,
-            total_vistas,
-            total_agregadas,
-            total_fallidas,
+    first = next(
+        stream,
+        b"",
+    )
+
+    if not stats.get("total_agregadas"):
+        stream.close()
+
+        return None
+
+    return itertools.chain(
+        [first],
+        stream,
+    )
+
+
+def generar_fotos_zip_partes_smartsheet(
+    sesion: SesionBilling,
+    *,
+    max_part_bytes: int = SMARTSHEET_MAX_ZIP_PART_BYTES,
+    max_parts: int = SMARTSHEET_MAX_ZIP_PARTS,
+):
+    """
+    generar_fotos_zip_partes_smartsheet_sin_cache() con caché de
+    artefactos: si el set de evidencias y los límites no cambiaron,
+    las partes se leen del caché (stats["cached"] = True) sin descargar
+    ni comprimir nada.
+
+    Las partes solo se guardan si no hubo fotografías fallidas.
+    Mismo formato de retorno; "file" puede ser un archivo abierto del
+    caché en lugar de un SpooledTemporaryFile.
+    """
+
+    cache = ZipArtifactCache()
+
+    fingerprint = None
+
+    if cache.enabled:
+        fingerprint = _sesion_zip_fingerprint(
+            sesion,
+            "smartsheet",
+            max_part_bytes=max_part_bytes,
+            max_parts=max_parts,
         )
 
-        if total_agregadas == 0:
-            spooled.close()
+        artifact = cache.get(
+            fingerprint,
+        )
 
-            raise RuntimeError("No photos available for this billing session.")
+        if artifact is not None:
+            parts = [
+                {
+                    "file": file_meta["path"].open(
+                        "rb",
+                    ),
+                    "filename": file_meta["filename"],
+                    "size_bytes": file_meta.get("size_bytes"),
+                    "photo_count": file_meta.get("photo_count"),
+                    "part_number": file_meta.get("part_number"),
+                    "total_parts": file_meta.get("total_parts"),
+                }
+                for file_meta in artifact.files
+            ]
 
-        spooled.seek(0)
+            logger.info(
+                "Smartsheet ZIP parts sesion=%s -> served from cache (%s parts)",
+                sesion.id,
+                len(parts),
+            )
 
-        filename = f"{root_name}.zip"
+            return (
+                parts,
+                {
+                    **artifact.meta,
+                    "cached": True,
+                },
+            )
 
-        stats = {
-            "total_vistas": total_vistas,
-            "total_agregadas": total_agregadas,
-            "total_fallidas": total_fallidas,
-        }
+    parts, stats = generar_fotos_zip_partes_smartsheet_sin_cache(
+        sesion,
+        max_part_bytes=max_part_bytes,
+        max_parts=max_parts,
+    )
 
-        return (
-            spooled,
-            filename,
-            stats,
+    if fingerprint and not stats.get("total_fallidas"):
+        writer = cache.writer(
+            fingerprint,
         )
 
-    except Exception:
-        try:
-            spooled.close()
-        except Exception:
-            pass
+        if writer is not None:
+            try:
+                for part in parts:
+                    writer.add_file(
+                        part["filename"],
+                        part["file"],
+                        size_bytes=part["size_bytes"],
+                        photo_count=part["photo_count"],
+                        part_number=part["part_number"],
+                        total_parts=part["total_parts"],
+                    )
 
-        raise
+                writer.commit(
+                    **stats,
+                )
 
+            except OSError as exc:
+                logger.warning(
+                    "Smartsheet ZIP parts: cache write failed sesion=%s: %s",
+                    sesion.id,
+                    exc,
+                )
 
-def generar_fotos_zip_partes_smartsheet(
+                writer.abort()
+
+    return (
+        parts,
+        stats,
+    )
+
+
+def generar_fotos_zip_partes_smartsheet_sin_cache(
     sesion: SesionBilling,
     *,
     max_part_bytes: int = SMARTSHEET_MAX_ZIP_PART_BYTES,
@@ -588,6 +1026,10 @@ def generar_fotos_zip_partes_smartsheet(
     - Conserva los nombres y carpetas internas del ZIP oficial.
     - Si una sola fotografía produce un ZIP mayor al límite,
       genera un error claro.
+    - Cada fotografía se comprime y escribe una sola vez
+      (_SmartsheetZipPartWriter predice el tamaño final de la parte).
+    - Las fotografías se escriben a medida que se descargan: solo
+      ZIP_STREAM_FETCH_WINDOW esperan en memoria a la vez.
 
     Devuelve:
 
@@ -626,13 +1068,18 @@ def generar_fotos_zip_partes_smartsheet(
     if max_parts <= 0:
         raise ValueError("max_parts must be greater than zero.")
 
-    entries, stats = _collect_photo_entries_for_zip(
+    stats = {
+        "total_vistas": 0,
+        "total_agregadas": 0,
+        "total_fallidas": 0,
+    }
+
+    entries = _iter_photo_entries_for_zip(
         sesion,
+        stats,
+        fetch_window=ZIP_STREAM_FETCH_WINDOW,
     )
 
-    if not entries:
-        raise RuntimeError("No photos available for this billing session.")
-
     root_name = _safe_component_preserve(
         sesion.proyecto_id or f"Billing_{sesion.id}",
         max_len=80,
@@ -640,26 +1087,27 @@ def generar_fotos_zip_partes_smartsheet(
 
     completed_parts = []
 
-    current_entries = []
+    current_part = None
 
-    current_zip = None
+    def _single_file_too_large(arcname, size):
+        return RuntimeError(
+            (
+                "A single evidence file exceeds the "
+                "maximum Smartsheet ZIP size. "
+                f"Evidence: {arcname}. "
+                f"ZIP size: {size} bytes. "
+                f"Maximum: {max_part_bytes} bytes."
+            )
+        )
 
     try:
         for arcname, data in entries:
-            candidate_entries = [
-                *current_entries,
-                (
-                    arcname,
-                    data,
-                ),
-            ]
-
-            candidate_zip = _build_spooled_zip_from_entries(
-                candidate_entries,
-            )
+            if current_part is None:
+                current_part = _SmartsheetZipPartWriter()
 
-            candidate_size = _zip_size_bytes(
-                candidate_zip,
+            candidate_size = current_part.size_with(
+                arcname,
+                data,
             )
 
             # ================================================
@@ -667,15 +1115,10 @@ def generar_fotos_zip_partes_smartsheet(
             # ================================================
 
             if candidate_size <= max_part_bytes:
-                if current_zip is not None:
-                    try:
-                        current_zip.close()
-                    except Exception:
-                        pass
-
-                current_entries = candidate_entries
-
-                current_zip = candidate_zip
+                current_part.add(
+                    arcname,
+                    data,
+                )
 
                 continue
 
@@ -683,47 +1126,28 @@ def generar_fotos_zip_partes_smartsheet(
             # Una sola fotografía ya supera el límite
             # ================================================
 
-            if not current_entries:
-                try:
-                    candidate_zip.close()
-                except Exception:
-                    pass
-
-                raise RuntimeError(
-                    (
-                        "A single evidence file exceeds the "
-                        "maximum Smartsheet ZIP size. "
-                        f"Evidence: {arcname}. "
-                        f"ZIP size: {candidate_size} bytes. "
-                        f"Maximum: {max_part_bytes} bytes."
-                    )
+            if not current_part.photo_count:
+                raise _single_file_too_large(
+                    arcname,
+                    candidate_size,
                 )
 
             # ================================================
             # La foto nueva no cabe en la parte actual
             # ================================================
 
-            try:
-                candidate_zip.close()
-            except Exception:
-                pass
+            finished_part = current_part
+
+            current_part = None
 
             completed_parts.append(
                 {
-                    "file": current_zip,
-                    "size_bytes": _zip_size_bytes(
-                        current_zip,
-                    ),
-                    "photo_count": len(
-                        current_entries,
-                    ),
+                    "file": finished_part.file,
+                    "size_bytes": finished_part.finish(),
+                    "photo_count": finished_part.photo_count,
                 }
             )
 
-            current_zip = None
-
-            current_entries = []
-
             if len(completed_parts) >= max_parts:
                 raise RuntimeError(
                     (
@@ -737,52 +1161,43 @@ def generar_fotos_zip_partes_smartsheet(
             # Iniciar parte nueva con la foto pendiente
             # ================================================
 
-            current_entries = [
-                (
-                    arcname,
-                    data,
-                ),
-            ]
-
-            current_zip = _build_spooled_zip_from_entries(
-                current_entries,
-            )
+            current_part = _SmartsheetZipPartWriter()
 
-            current_size = _zip_size_bytes(
-                current_zip,
+            current_size = current_part.size_with(
+                arcname,
+                data,
             )
 
             if current_size > max_part_bytes:
-                raise RuntimeError(
-                    (
-                        "A single evidence file exceeds the "
-                        "maximum Smartsheet ZIP size. "
-                        f"Evidence: {arcname}. "
-                        f"ZIP size: {current_size} bytes. "
-                        f"Maximum: {max_part_bytes} bytes."
-                    )
+                raise _single_file_too_large(
+                    arcname,
+                    current_size,
                 )
 
+            current_part.add(
+                arcname,
+                data,
+            )
+
         # ================================================
         # Guardar última parte
         # ================================================
 
-        if current_zip is not None and current_entries:
+        if current_part is not None and current_part.photo_count:
+            finished_part = current_part
+
+            current_part = None
+
             completed_parts.append(
                 {
-                    "file": current_zip,
-                    "size_bytes": _zip_size_bytes(
-                        current_zip,
-                    ),
-                    "photo_count": len(
-                        current_entries,
-                    ),
+                    "file": finished_part.file,
+                    "size_bytes": finished_part.finish(),
+                    "photo_count": finished_part.photo_count,
                 }
             )
 
-            current_zip = None
-
-            current_entries = []
+        if not stats["total_agregadas"]:
+            raise RuntimeError("No photos available for this billing session.")
 
         if not completed_parts:
             raise RuntimeError("No Smartsheet ZIP parts could be generated.")
@@ -863,11 +1278,11 @@ def generar_fotos_zip_partes_smartsheet(
         )
 
     except Exception:
-        if current_zip is not None:
-            try:
-                current_zip.close()
-            except Exception:
-                pass
+        # Detiene las descargas pendientes.
+        entries.close()
+
+        if current_part is not None:
+            current_part.discard()
 
         for part in completed_parts:
             part_file = part.get(
@@ -883,7 +1298,6 @@ def generar_fotos_zip_partes_smartsheet(
         raise
 
 
-
 def _safe_component_preserve(s: str, fallback="(sin-titulo)", max_len=120) -> str:
     if not s:
         s = fallback
@@ -906,30 +1320,6 @@ def _guess_ext(name_or_url: str, default=".jpg") -> str:
     return ext if ext else default
 
 
-def _read_from_storage_or_url(storage_obj, storage_name: str, url: str):
-    # 1) Storage del field (S3/Wasabi asociado al FileField)
-    if storage_obj and storage_name:
-        try:
-            if storage_obj.exists(storage_name):
-                with storage_obj.open(storage_name, "rb") as fh:
-                    return fh.read()
-        except Exception as e:
-            logger.warning("ZIP fotos: fallo open storage '%s': %s", storage_name, e)
-
-    # 2) Fallback: URL pública
-    if url and (url.startswith("http://") or url.startswith("https://")):
-        try:
-            import requests
-            r = requests.get(url, timeout=15)
-            if r.ok:
-                return r.content
-            logger.warning("ZIP fotos: GET url %s -> status %s", url, r.status_code)
-        except Exception as e:
-            logger.warning("ZIP fotos: fallo GET url '%s': %s", url, e)
-
-    return None
-
-
 @login_required
 @rol_requerido("supervisor", "admin", "pm")
 def descargar_fotos_zip(
@@ -949,12 +1339,7 @@ def descargar_fotos_zip(
         pk=sesion_id,
     )
 
-    try:
-        spooled, filename, _stats = generar_fotos_zip_sesion(
-            s,
-        )
-
-    except RuntimeError:
+    def _no_photos():
         messages.warning(
             request,
             "No photos available for this billing session.",
@@ -965,13 +1350,92 @@ def descargar_fotos_zip(
             sesion_id=s.id,
         )
 
-    resp = FileResponse(
-        spooled,
-        as_attachment=True,
-        filename=filename,
-        content_type="application/zip",
+    has_photos = (
+        EvidenciaFotoBilling.objects.filter(
+            tecnico_sesion__sesion=s,
+        )
+        .exclude(
+            imagen="",
+        )
+        .exists()
     )
 
+    if not has_photos:
+        return _no_photos()
+
+    root_name = _safe_component_preserve(
+        s.proyecto_id or f"Billing_{s.id}",
+        max_len=80,
+    )
+
+    filename = f"{root_name}.zip"
+
+    # ========================================================
+    # ZIP ya generado para este mismo set de evidencias
+    # ========================================================
+
+    cache = ZipArtifactCache()
+
+    artifact = None
+
+    if cache.enabled:
+        fingerprint = _sesion_zip_fingerprint(
+            s,
+            "session",
+        )
+
+        artifact = cache.get(
+            fingerprint,
+        )
+
+    if artifact is not None:
+        resp = FileResponse(
+            artifact.files[0]["path"].open(
+                "rb",
+            ),
+            as_attachment=True,
+            filename=filename,
+            content_type="application/zip",
+        )
+
+    else:
+        stats = {}
+
+        if cache.enabled:
+            stream = _iter_fotos_zip_stream_cached(
+                s,
+                cache,
+                fingerprint,
+                filename,
+                stats,
+            )
+
+        else:
+            stream = iter_fotos_zip_stream(
+                s,
+                stats,
+            )
+
+        # Si no se pudo descargar ninguna fotografía no se entrega
+        # un ZIP vacío.
+        stream = _prime_fotos_zip_stream(
+            stream,
+            stats,
+        )
+
+        if stream is None:
+            return _no_photos()
+
+        resp = StreamingHttpResponse(
+            stream,
+            content_type="application/zip",
+        )
+
+        resp["Content-Disposition"] = content_disposition_header(
+            True,
+            filename,
+        )
+
     resp["Cache-Control"] = "no-store"
 
     return resp
@@ -10,16 +10,12 @@ from openpyxl import Workbook
 from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
 from openpyxl.utils import get_column_letter
 
-from core.permissions import filter_queryset_by_access
+from core.permissions import (filter_queryset_by_access,
+                              filter_queryset_by_project_window)
 from facturacion.models import Proyecto
 from operaciones.models import SesionBilling
 from usuarios.decoradores import rol_requerido
 
-try:
-    from usuarios.models import ProyectoAsignacion
-except Exception:
-    ProyectoAsignacion = None
-
 
 # ==========================================================
 # Configuración de estados del resumen operativo
@@ -150,69 +146,7 @@ def _base_resumen_qs(user):
     )
 
     if not can_view_legacy_history:
-        proyectos_user = filter_queryset_by_access(
-            Proyecto.objects.all(),
-            user,
-            "id",
-        )
-
-        if proyectos_user.exists():
-            allowed_keys = set()
-
-            for p in proyectos_user:
-                nombre = (getattr(p, "nombre", "") or "").strip()
-                if nombre:
-                    allowed_keys.add(nombre)
-
-                codigo = getattr(p, "codigo", None)
-                if codigo:
-                    allowed_keys.add(str(codigo).strip())
-
-                allowed_keys.add(str(p.id).strip())
-
-            qs = qs.filter(proyecto__in=allowed_keys)
-
-            if ProyectoAsignacion is not None:
-                try:
-                    asignaciones = list(
-                        ProyectoAsignacion.objects.filter(
-                            usuario=user, proyecto__in=proyectos_user
-                        ).select_related("proyecto")
-                    )
-                except Exception:
-                    asignaciones = []
-
-                if asignaciones:
-                    window_q = Q()
-
-                    for a in asignaciones:
-                        p = getattr(a, "proyecto", None)
-                        if not p:
-                            continue
-
-                        keys = set()
-                        nombre = (getattr(p, "nombre", "") or "").strip()
-                        if nombre:
-                            keys.add(nombre)
-
-                        codigo = getattr(p, "codigo", None)
-                        if codigo:
-                            keys.add(str(codigo).strip())
-
-                        keys.add(str(p.id).strip())
-
-                        if getattr(a, "include_history", False) or not getattr(
-                            a, "start_at", None
-                        ):
-                            window_q |= Q(proyecto__in=keys)
-                        else:
-                            window_q |= Q(proyecto__in=keys) & Q(
-                                creado_en__gte=a.start_at
-                            )
-
-                    qs = qs.filter(window_q) if window_q else qs.none()
-        else:
-            qs = qs.none()
+        qs = filter_queryset_by_project_window(qs, user, "proyecto_ref", "creado_en")
 
     return qs
 
@@ -1,8 +1,8 @@
 from django.contrib import admin
 
-from .models import (MaterialCatalogItem, PlanReaderItem, PlanReaderJob,
-                     PlanReaderMaterialRequest, PlanReaderMaterialRequestItem,
-                     PlanReaderPage)
+from .models import (MaterialCatalogItem, PlanReaderExtractionCache,
+                     PlanReaderItem, PlanReaderJob, PlanReaderMaterialRequest,
+                     PlanReaderMaterialRequestItem, PlanReaderPage)
 
 # =============================================================================
 # PLAN READER JOBS
@@ -100,6 +100,8 @@ class PlanReaderJobAdmin(admin.ModelAdmin):
                     "total_pages",
                     "processed_pages",
                     "failed_pages",
+                    "cache_hits",
+                    "cache_misses",
                     "progress_percent_display",
                     "error_message",
                 )
@@ -330,6 +332,46 @@ class PlanReaderItemAdmin(admin.ModelAdmin):
     )
 
 
+# =============================================================================
+# EXTRACTION CACHE
+# =============================================================================
+
+
+@admin.register(PlanReaderExtractionCache)
+class PlanReaderExtractionCacheAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "model_name",
+        "zoom",
+        "prompt_version",
+        "confidence",
+        "hit_count",
+        "created_at",
+        "last_used_at",
+    )
+
+    list_filter = (
+        "model_name",
+        "prompt_version",
+        "created_at",
+    )
+
+    search_fields = (
+        "cache_key",
+        "content_hash",
+    )
+
+    readonly_fields = (
+        "cache_key",
+        "content_hash",
+        "hit_count",
+        "created_at",
+        "last_used_at",
+    )
+
+    ordering = ("-created_at",)
+
+
 # =============================================================================
 # MATERIAL CATALOG
 # =============================================================================
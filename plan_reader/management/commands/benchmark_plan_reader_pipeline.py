@@ -0,0 +1,141 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from plan_reader.services.page_pipeline import PlanPageTask, iter_page_pipeline
+from plan_reader.services.pdf_service import (PlanDocument,
+                                              get_plan_reader_temp_dir)
+from plan_reader.services.stub_extractor import StubPlanPageExtractor
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the Plan Reader page pipeline offline using a local PDF "
+        "and a stubbed extractor. Does not touch the database or OpenAI."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "pdf_path",
+            help="Local PDF used for the benchmark.",
+        )
+
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=2.0,
+            help="Simulated model latency per page, in seconds. Default: 2.",
+        )
+
+        parser.add_argument(
+            "--concurrency",
+            default="1,4",
+            help="Comma separated concurrency levels to compare. Default: 1,4.",
+        )
+
+        parser.add_argument(
+            "--zoom",
+            type=float,
+            default=3.0,
+            help="Render zoom. Default: 3.",
+        )
+
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=0,
+            help="Limit the number of pages. Default: all pages.",
+        )
+
+    def handle(self, *args, **options):
+        pdf_path = options["pdf_path"]
+
+        try:
+            levels = [
+                max(int(value), 1)
+                for value in str(options["concurrency"]).split(",")
+                if value.strip()
+            ]
+        except ValueError as exc:
+            raise CommandError("--concurrency must be a list of integers.") from exc
+
+        if not levels:
+            raise CommandError("--concurrency must not be empty.")
+
+        with PlanDocument(pdf_path) as document:
+            total_pages = document.page_count
+
+        if options["pages"]:
+            total_pages = min(total_pages, options["pages"])
+
+        extractor = StubPlanPageExtractor(latency=options["latency"])
+        zoom = options["zoom"]
+
+        self.stdout.write(
+            f"PDF: {pdf_path}. Pages: {total_pages}. "
+            f"Simulated latency: {extractor.latency}s. Zoom: {zoom}."
+        )
+
+        baseline = None
+
+        for concurrency in levels:
+            with (
+                get_plan_reader_temp_dir("benchmark") as temp_dir,
+                PlanDocument(pdf_path) as document,
+            ):
+                sheet_names = document.sheet_names()
+
+                def prepare_page(page_number):
+                    task = PlanPageTask(
+                        page_number=page_number,
+                        sheet_name=sheet_names.get(page_number, ""),
+                    )
+
+                    task.image_path = document.render_page_to_image(
+                        page_number=page_number,
+                        output_dir=temp_dir,
+                        zoom=zoom,
+                    )
+
+                    return task
+
+                def extract_page(task):
+                    return extractor(
+                        image_path=task.image_path,
+                        page_number=task.page_number,
+                        known_sheet_name=task.sheet_name,
+                    )
+
+                started = time.perf_counter()
+                order = []
+
+                for result in iter_page_pipeline(
+                    range(1, total_pages + 1),
+                    prepare=prepare_page,
+                    extract=extract_page,
+                    concurrency=concurrency,
+                ):
+                    if not result.ok:
+                        raise CommandError(
+                            f"Page {result.task.page_number} failed: {result.error}"
+                        )
+
+                    order.append(result.task.page_number)
+
+                elapsed = time.perf_counter() - started
+
+            if order != list(range(1, total_pages + 1)):
+                raise CommandError("Pipeline returned pages out of order.")
+
+            if baseline is None:
+                baseline = elapsed
+
+            speedup = baseline / elapsed if elapsed else 0
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Concurrency {concurrency}: {elapsed:.2f}s "
+                    f"({elapsed / max(total_pages, 1):.2f}s/page, "
+                    f"x{speedup:.2f} vs first level)."
+                )
+            )
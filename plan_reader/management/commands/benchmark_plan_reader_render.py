@@ -0,0 +1,184 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from plan_reader.services.openai_service import (extract_plan_page_with_openai,
+                                                 image_to_data_url)
+from plan_reader.services.pdf_service import (PlanDocument,
+                                              get_plan_reader_temp_dir)
+from plan_reader.services.render_profiles import (RENDER_PROFILES,
+                                                  get_render_profile)
+
+
+def _item_key(raw_item):
+    try:
+        splice_count = int(raw_item.get("splice_count") or 0)
+    except Exception:
+        splice_count = 0
+
+    return (
+        str(raw_item.get("project_name") or "").strip().upper(),
+        str(raw_item.get("primary_feed") or "").strip().upper(),
+        splice_count,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks Plan Reader render profiles on a local PDF: render time, "
+        "encoding time and payload size per page. With --extract it also "
+        "calls OpenAI and measures extraction agreement against the first "
+        "profile."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "pdf_path",
+            help="Local PDF used for the benchmark.",
+        )
+
+        parser.add_argument(
+            "--profiles",
+            default=",".join(RENDER_PROFILES),
+            help=(
+                "Comma separated render profiles. The first one is the "
+                "reference. Default: all profiles, starting with legacy."
+            ),
+        )
+
+        parser.add_argument(
+            "--zoom",
+            type=float,
+            default=3.0,
+            help="Maximum render zoom. Default: 3.",
+        )
+
+        parser.add_argument(
+            "--clip",
+            default="",
+            help='Optional crop "x0,y0,x1,y1" as page fractions.',
+        )
+
+        parser.add_argument(
+            "--pages",
+            type=int,
+            default=0,
+            help="Limit the number of pages. Default: all pages.",
+        )
+
+        parser.add_argument(
+            "--extract",
+            action="store_true",
+            help="Call OpenAI for every page and profile (has a cost).",
+        )
+
+    def handle(self, *args, **options):
+        pdf_path = options["pdf_path"]
+
+        try:
+            profiles = [
+                get_render_profile(
+                    name,
+                    zoom=options["zoom"],
+                    clip=options["clip"] or None,
+                )
+                for name in str(options["profiles"]).split(",")
+                if name.strip()
+            ]
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        if not profiles:
+            raise CommandError("--profiles must not be empty.")
+
+        with PlanDocument(pdf_path) as document:
+            total_pages = document.page_count
+
+            if options["pages"]:
+                total_pages = min(total_pages, options["pages"])
+
+            sheet_names = document.sheet_names()
+
+            self.stdout.write(
+                f"PDF: {pdf_path}. Pages: {total_pages}. "
+                f"Zoom: {options['zoom']}. Clip: {options['clip'] or 'none'}."
+            )
+
+            reference_payload = None
+            reference_items = None
+
+            for profile in profiles:
+                render_seconds = 0.0
+                encode_seconds = 0.0
+                payload_bytes = 0
+                pixels = 0
+                page_items = {}
+
+                with get_plan_reader_temp_dir(f"render_{profile.name}") as temp_dir:
+                    for page_number in range(1, total_pages + 1):
+                        started = time.perf_counter()
+
+                        image_path = document.render_page_to_image(
+                            page_number=page_number,
+                            output_dir=temp_dir,
+                            profile=profile,
+                        )
+
+                        render_seconds += time.perf_counter() - started
+
+                        started = time.perf_counter()
+                        data_url = image_to_data_url(image_path)
+                        encode_seconds += time.perf_counter() - started
+
+                        payload_bytes += len(data_url)
+
+                        with Image.open(image_path) as image:
+                            width, height = image.size
+
+                        pixels += width * height
+
+                        if options["extract"]:
+                            data, _, _ = extract_plan_page_with_openai(
+                                image_path=image_path,
+                                page_number=page_number,
+                                known_sheet_name=sheet_names.get(page_number, ""),
+                            )
+
+                            page_items[page_number] = {
+                                _item_key(raw_item)
+                                for raw_item in data.get("items", [])
+                            }
+
+                pages = max(total_pages, 1)
+
+                if reference_payload is None:
+                    reference_payload = payload_bytes or 1
+
+                line = (
+                    f"{profile.name}: render {render_seconds / pages:.2f}s/page, "
+                    f"encode {encode_seconds / pages:.3f}s/page, "
+                    f"payload {payload_bytes / pages / 1_000_000:.2f} MB/page "
+                    f"({payload_bytes / reference_payload:.0%} of "
+                    f"{profiles[0].name}), "
+                    f"{pixels / pages / 1_000_000:.1f} MP/page"
+                )
+
+                if options["extract"]:
+                    if reference_items is None:
+                        reference_items = page_items
+
+                    matched = 0
+                    total = 0
+
+                    for page_number, expected in reference_items.items():
+                        found = page_items.get(page_number, set())
+
+                        matched += len(expected & found)
+                        total += len(expected | found)
+
+                    agreement = matched / total if total else 1.0
+
+                    line += f", agreement {agreement:.0%}"
+
+                self.stdout.write(self.style.SUCCESS(line))
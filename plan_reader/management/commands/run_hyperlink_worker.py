@@ -3,7 +3,6 @@
 from __future__ import annotations
 
 import logging
-import time
 
 from django.core.management.base import BaseCommand
 from django.db import close_old_connections, transaction
@@ -11,6 +10,8 @@ from django.utils import timezone
 
 from client_submissions.automation.worker import \
     run_once as run_client_submission_once
+from core.worker_wakeup import (QUEUE_CLIENT_SUBMISSIONS, QUEUE_PLAN_READER,
+                                WorkerWakeupListener)
 from plan_reader.models import PlanReaderJob
 from plan_reader.services.processor import process_plan_reader_job
 
@@ -116,6 +117,10 @@ class Command(BaseCommand):
             )
         )
 
+        wakeup = WorkerWakeupListener(
+            queues=[QUEUE_PLAN_READER, QUEUE_CLIENT_SUBMISSIONS],
+        ).start()
+
         try:
             while True:
                 processed_any = False
@@ -181,7 +186,8 @@ class Command(BaseCommand):
                     break
 
                 if not processed_any:
-                    time.sleep(
+                    # Una notificación de trabajo nuevo corta la espera.
+                    wakeup.wait(
                         sleep_seconds,
                     )
 
@@ -193,6 +199,8 @@ class Command(BaseCommand):
             )
 
         finally:
+            wakeup.close()
+
             close_old_connections()
 
     # ========================================================
@@ -2,8 +2,6 @@ from __future__ import annotations
 
 import logging
 import os
-import subprocess
-import sys
 import time
 
 from django.conf import settings
@@ -13,7 +11,12 @@ from django.utils import timezone
 
 from client_submissions.automation.worker import \
     run_once as run_client_submission_once
+from core.worker_wakeup import (QUEUE_CLIENT_SUBMISSIONS, QUEUE_PLAN_READER,
+                                WorkerWakeupListener)
 from plan_reader.models import PlanReaderJob
+from plan_reader.services.worker_pool import (RESULT_CANCELLED,
+                                              RESULT_FINISHED,
+                                              PlanReaderProcessPool)
 
 logger = logging.getLogger(__name__)
 
@@ -93,7 +96,9 @@ class Command(BaseCommand):
 
     2. Plan Reader
        - Busca PlanReaderJob pendientes.
-       - Procesa como máximo --limit jobs por ciclo.
+       - Reclama como máximo --limit jobs por ciclo.
+       - Los ejecuta en un pool de --concurrency procesos precargados,
+         por lo que varios planos pueden procesarse en paralelo.
 
     Una solicitud de Client Submission no activa una lectura
     de planos.
@@ -125,7 +130,9 @@ class Command(BaseCommand):
             type=float,
             default=10.0,
             help=(
-                "Seconds to wait when neither queue contains work. "
+                "Safety-net polling interval when neither queue contains "
+                "work. New work wakes the worker immediately through "
+                "LISTEN/NOTIFY (PostgreSQL) or a local socket (SQLite). "
                 "Default: 10 seconds."
             ),
         )
@@ -134,7 +141,20 @@ class Command(BaseCommand):
             "--limit",
             type=int,
             default=1,
-            help=("Maximum Plan Reader jobs processed per cycle. " "Default: 1."),
+            help=(
+                "Maximum Plan Reader jobs claimed per cycle, bounded by the "
+                "free pool processes. Default: 1."
+            ),
+        )
+
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help=(
+                "Number of warm Plan Reader processes. Each process runs "
+                "one job at a time. Default: 1."
+            ),
         )
 
         parser.add_argument(
@@ -174,6 +194,17 @@ class Command(BaseCommand):
             1,
         )
 
+        plan_concurrency = max(
+            int(
+                options.get(
+                    "concurrency",
+                    1,
+                )
+                or 1
+            ),
+            1,
+        )
+
         run_only_once = bool(
             options.get(
                 "once",
@@ -241,11 +272,31 @@ class Command(BaseCommand):
             (
                 f"Idle sleep: {sleep_seconds} second(s). "
                 f"Plan Reader limit: {plan_limit}. "
+                f"Plan Reader processes: {plan_concurrency}. "
                 f"Mode: "
                 f"{'single cycle' if run_only_once else 'continuous'}."
             )
         )
 
+        plan_pool = None
+
+        if plan_reader_enabled:
+            plan_pool = PlanReaderProcessPool(
+                size=plan_concurrency,
+            ).start()
+
+        wakeup_queues = []
+
+        if client_submission_enabled:
+            wakeup_queues.append(QUEUE_CLIENT_SUBMISSIONS)
+
+        if plan_reader_enabled:
+            wakeup_queues.append(QUEUE_PLAN_READER)
+
+        wakeup = WorkerWakeupListener(queues=wakeup_queues).start()
+
+        self.stdout.write(f"Wakeup mode: {wakeup.mode}.")
+
         try:
             while True:
                 processed_any = False
@@ -287,6 +338,7 @@ class Command(BaseCommand):
                 if plan_reader_enabled:
                     try:
                         plan_reader_processed = self._process_plan_reader_queue(
+                            pool=plan_pool,
                             limit=plan_limit,
                         )
 
@@ -313,16 +365,24 @@ class Command(BaseCommand):
                 # ====================================================
 
                 if run_only_once:
+                    self._wait_for_plan_reader_pool(plan_pool)
                     break
 
                 # ====================================================
                 # Esperar solamente cuando no hubo trabajo
+                #
+                # Una notificación de trabajo nuevo corta la espera.
+                # Con jobs en ejecución la espera es corta para
+                # detectar a tiempo las solicitudes de Stop.
                 # ====================================================
 
                 if not processed_any:
-                    time.sleep(
-                        sleep_seconds,
-                    )
+                    if plan_pool is not None and plan_pool.busy_count:
+                        wakeup.wait(0.5)
+                    else:
+                        wakeup.wait(
+                            sleep_seconds,
+                        )
 
         except KeyboardInterrupt:
             self.stdout.write("")
@@ -332,6 +392,11 @@ class Command(BaseCommand):
             )
 
         finally:
+            wakeup.close()
+
+            if plan_pool is not None:
+                plan_pool.shutdown()
+
             close_old_connections()
 
     # ========================================================
@@ -428,126 +493,55 @@ class Command(BaseCommand):
             return jobs
 
     # ========================================================
-    # Plan Reader — ejecutar subproceso
+    # Plan Reader — pool de procesos
     # ========================================================
 
-    def _run_plan_reader_subprocess(
+    def _report_plan_reader_events(
         self,
-        *,
-        job_id: int,
-    ) -> str:
-        """
-        Ejecuta un PlanReaderJob dentro de un subproceso independiente.
-
-        Mientras el subproceso está activo, el worker principal revisa
-        periódicamente el estado del job.
-
-        Si el estado cambia a CANCELLED:
-
-        - termina el subproceso;
-        - espera hasta 5 segundos;
-        - aplica kill() si sigue activo;
-        - conserva el job como CANCELLED;
-        - mantiene vivo el worker compartido.
-        """
-
-        manage_py_path = os.path.join(
-            str(settings.BASE_DIR),
-            "manage.py",
-        )
-
-        command = [
-            sys.executable,
-            manage_py_path,
-            "process_plan_reader_job",
-            str(job_id),
-            "--allow-processing",
-        ]
-
-        self.stdout.write(
-            self.style.WARNING(
-                (
-                    f"[{timezone.now()}] "
-                    f"Starting isolated process for PlanReaderJob #{job_id}."
-                )
-            )
-        )
-
-        process = subprocess.Popen(
-            command,
-            cwd=str(settings.BASE_DIR),
-        )
-
-        while True:
-            return_code = process.poll()
-
-            if return_code is not None:
-                if return_code == 0:
-                    return "finished"
-
-                return "failed"
-
-            close_old_connections()
-
-            current_status = (
-                PlanReaderJob.objects.filter(
-                    id=job_id,
-                )
-                .values_list(
-                    "status",
-                    flat=True,
-                )
-                .first()
-            )
-
-            if current_status is None:
-                process.terminate()
-
-                try:
-                    process.wait(timeout=5)
-
-                except subprocess.TimeoutExpired:
-                    process.kill()
-                    process.wait()
-
-                return "cancelled"
-
-            if current_status == PlanReaderJob.STATUS_CANCELLED:
+        events,
+    ) -> None:
+        for job_id, result, message in events:
+            if result == RESULT_FINISHED:
                 self.stdout.write(
-                    self.style.WARNING(
-                        (f"[{timezone.now()}] " f"Stopping PlanReaderJob #{job_id}.")
+                    self.style.SUCCESS(
+                        (f"[{timezone.now()}] " f"Finished PlanReaderJob #{job_id}.")
                     )
                 )
+                continue
 
-                process.terminate()
-
-                try:
-                    process.wait(timeout=5)
-
-                except subprocess.TimeoutExpired:
-                    process.kill()
-                    process.wait()
-
-                now = timezone.now()
-
-                PlanReaderJob.objects.filter(
-                    id=job_id,
-                ).update(
-                    status=PlanReaderJob.STATUS_CANCELLED,
-                    error_message="Processing stopped by user.",
-                    completed_at=now,
-                    updated_at=now,
-                )
-
+            if result == RESULT_CANCELLED:
                 self.stdout.write(
                     self.style.WARNING(
                         (f"[{timezone.now()}] " f"PlanReaderJob #{job_id} stopped.")
                     )
                 )
+                continue
+
+            self.stderr.write(
+                self.style.ERROR(
+                    (
+                        f"[{timezone.now()}] "
+                        f"PlanReaderJob #{job_id} ended with an error: "
+                        f"{message}"
+                    )
+                )
+            )
+
+    def _wait_for_plan_reader_pool(
+        self,
+        pool: PlanReaderProcessPool | None,
+    ) -> None:
+        """
+        Modo --once: espera a que terminen los jobs enviados al pool.
+        """
+        if pool is None:
+            return
 
-                return "cancelled"
+        while pool.busy_count:
+            self._report_plan_reader_events(pool.poll())
 
-            time.sleep(0.5)
+            if pool.busy_count:
+                time.sleep(0.5)
 
     # ========================================================
     # Plan Reader — procesar cola
@@ -556,25 +550,37 @@ class Command(BaseCommand):
     def _process_plan_reader_queue(
         self,
         *,
+        pool: PlanReaderProcessPool,
         limit: int,
     ) -> bool:
         """
-        Procesa los PlanReaderJob reclamados durante este ciclo.
+        Revisa el pool y reparte nuevos PlanReaderJob.
 
-        Cada job se ejecuta dentro de un subproceso independiente para
-        permitir detenerlo sin cerrar el worker compartido.
+        Cada job se ejecuta en un proceso precargado del pool. Stop
+        termina únicamente el proceso de ese job; el worker compartido
+        y los demás jobs siguen activos.
+
+        Solo se reclaman tantos jobs como procesos libres existan.
         """
 
+        self._report_plan_reader_events(pool.poll())
+
+        free_slots = min(
+            pool.idle_count,
+            limit,
+        )
+
+        if free_slots <= 0:
+            return False
+
         jobs = self._claim_pending_plan_reader_jobs(
-            limit=limit,
+            limit=free_slots,
         )
 
         if not jobs:
             return False
 
         for job in jobs:
-            close_old_connections()
-
             self.stdout.write(
                 self.style.WARNING(
                     (f"[{timezone.now()}] " f"Processing PlanReaderJob #{job.pk}.")
@@ -582,81 +588,25 @@ class Command(BaseCommand):
             )
 
             try:
-                result = self._run_plan_reader_subprocess(
-                    job_id=job.pk,
-                )
-
-                close_old_connections()
-
-                if result == "cancelled":
-                    continue
-
-                current_job = PlanReaderJob.objects.filter(
-                    id=job.pk,
-                ).first()
-
-                if result == "finished":
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            (
-                                f"[{timezone.now()}] "
-                                f"Finished PlanReaderJob #{job.pk}."
-                            )
-                        )
-                    )
-                    continue
-
-                if (
-                    current_job
-                    and current_job.status == PlanReaderJob.STATUS_PROCESSING
-                ):
-                    current_job.status = PlanReaderJob.STATUS_FAILED
-                    current_job.error_message = (
-                        "The isolated Plan Reader process ended unexpectedly."
-                    )
-                    current_job.completed_at = timezone.now()
-
-                    current_job.save(
-                        update_fields=[
-                            "status",
-                            "error_message",
-                            "completed_at",
-                            "updated_at",
-                        ]
-                    )
-
-                self.stderr.write(
-                    self.style.ERROR(
-                        (
-                            f"[{timezone.now()}] "
-                            f"PlanReaderJob #{job.pk} ended with an error."
-                        )
-                    )
-                )
+                pool.submit(job.pk)
 
             except Exception as exc:
                 logger.exception(
-                    "PlanReaderJob #%s subprocess failed.",
+                    "PlanReaderJob #%s could not be sent to the pool.",
                     job.pk,
                 )
 
-                current_job = PlanReaderJob.objects.filter(
+                close_old_connections()
+
+                PlanReaderJob.objects.filter(
                     id=job.pk,
-                ).first()
-
-                if current_job and current_job.status != PlanReaderJob.STATUS_CANCELLED:
-                    current_job.status = PlanReaderJob.STATUS_FAILED
-                    current_job.error_message = str(exc)
-                    current_job.completed_at = timezone.now()
-
-                    current_job.save(
-                        update_fields=[
-                            "status",
-                            "error_message",
-                            "completed_at",
-                            "updated_at",
-                        ]
-                    )
+                    status=PlanReaderJob.STATUS_PROCESSING,
+                ).update(
+                    status=PlanReaderJob.STATUS_FAILED,
+                    error_message=str(exc),
+                    completed_at=timezone.now(),
+                    updated_at=timezone.now(),
+                )
 
                 self.stderr.write(
                     self.style.ERROR(
@@ -668,7 +618,4 @@ class Command(BaseCommand):
                     )
                 )
 
-            finally:
-                close_old_connections()
-
         return True
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plan_reader', '0007_planreadermaterialrequest_request_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanReaderExtractionCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cache_key', models.CharField(max_length=64, unique=True)),
+                ('content_hash', models.CharField(db_index=True, max_length=64)),
+                ('model_name', models.CharField(max_length=120)),
+                ('zoom', models.CharField(max_length=20)),
+                ('prompt_version', models.CharField(max_length=30)),
+                ('extracted_json', models.JSONField(blank=True, null=True)),
+                ('raw_ai_response', models.TextField(blank=True)),
+                ('confidence', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('hit_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Plan Reader Extraction Cache',
+                'verbose_name_plural': 'Plan Reader Extraction Cache',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='planreaderjob',
+            name='cache_hits',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='planreaderjob',
+            name='cache_misses',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
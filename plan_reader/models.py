@@ -124,6 +124,16 @@ class PlanReaderJob(models.Model):
         default=0,
     )
 
+    # Páginas resueltas desde PlanReaderExtractionCache (hits) y
+    # páginas enviadas realmente al modelo (misses).
+    cache_hits = models.PositiveIntegerField(
+        default=0,
+    )
+
+    cache_misses = models.PositiveIntegerField(
+        default=0,
+    )
+
     generated_excel = models.FileField(
         upload_to=plan_reader_excel_upload_path,
         blank=True,
@@ -426,6 +436,90 @@ class PlanReaderItem(models.Model):
         return f"{project} - {feed}"
 
 
+# =============================================================================
+# PLAN READER — CACHE DE EXTRACCIONES IA
+# =============================================================================
+
+
+class PlanReaderExtractionCache(models.Model):
+    """
+    Resultado de extracción IA reutilizable entre jobs.
+
+    cache_key es un hash de:
+
+    - contenido del raster renderizado de la página;
+    - modelo;
+    - zoom;
+    - versión del prompt.
+
+    Si un cliente vuelve a subir el mismo plano con pocas hojas
+    modificadas, las páginas sin cambios reutilizan extracted_json
+    y confidence sin volver a llamar al modelo.
+    """
+
+    cache_key = models.CharField(
+        max_length=64,
+        unique=True,
+    )
+
+    content_hash = models.CharField(
+        max_length=64,
+        db_index=True,
+    )
+
+    model_name = models.CharField(
+        max_length=120,
+    )
+
+    zoom = models.CharField(
+        max_length=20,
+    )
+
+    prompt_version = models.CharField(
+        max_length=30,
+    )
+
+    extracted_json = models.JSONField(
+        blank=True,
+        null=True,
+    )
+
+    raw_ai_response = models.TextField(
+        blank=True,
+    )
+
+    confidence = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        blank=True,
+        null=True,
+    )
+
+    hit_count = models.PositiveIntegerField(
+        default=0,
+    )
+
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+    )
+
+    last_used_at = models.DateTimeField(
+        blank=True,
+        null=True,
+    )
+
+    class Meta:
+        ordering = [
+            "-created_at",
+        ]
+
+        verbose_name = "Plan Reader Extraction Cache"
+        verbose_name_plural = "Plan Reader Extraction Cache"
+
+    def __str__(self):
+        return f"{self.model_name} - {self.content_hash[:12]}"
+
+
 # =============================================================================
 # MATERIAL REQUEST — CATÁLOGO
 # =============================================================================
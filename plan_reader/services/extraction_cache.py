@@ -0,0 +1,99 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from plan_reader.models import PlanReaderExtractionCache
+
+
+def extraction_cache_enabled():
+    value = getattr(settings, "PLAN_READER_EXTRACTION_CACHE", None)
+
+    if value is None:
+        value = os.getenv("PLAN_READER_EXTRACTION_CACHE", "True")
+
+    return str(value).lower() in ["1", "true", "yes", "y"]
+
+
+def page_image_hash(image_path):
+    """
+    sha256 del raster renderizado de la página.
+    """
+    digest = hashlib.sha256()
+
+    with open(image_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def build_extraction_cache_key(content_hash, model_name, zoom, prompt_version):
+    raw_key = "|".join(
+        [
+            str(content_hash or ""),
+            str(model_name or ""),
+            format_zoom(zoom),
+            str(prompt_version or ""),
+        ]
+    )
+
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+
+def format_zoom(zoom):
+    try:
+        return f"{float(zoom):.2f}"
+    except Exception:
+        return str(zoom or "")
+
+
+def get_cached_extraction(cache_key):
+    """
+    Devuelve (data, raw_response, confidence) o None.
+    """
+    entry = (
+        PlanReaderExtractionCache.objects.filter(cache_key=cache_key)
+        .only("extracted_json", "raw_ai_response", "confidence")
+        .first()
+    )
+
+    if entry is None or not isinstance(entry.extracted_json, dict):
+        return None
+
+    return entry.extracted_json, entry.raw_ai_response, entry.confidence
+
+
+def touch_cached_extraction(cache_key):
+    PlanReaderExtractionCache.objects.filter(cache_key=cache_key).update(
+        hit_count=F("hit_count") + 1,
+        last_used_at=timezone.now(),
+    )
+
+
+def store_extraction(
+    *,
+    cache_key,
+    content_hash,
+    model_name,
+    zoom,
+    prompt_version,
+    data,
+    raw_response,
+    confidence,
+):
+    PlanReaderExtractionCache.objects.update_or_create(
+        cache_key=cache_key,
+        defaults={
+            "content_hash": content_hash,
+            "model_name": model_name,
+            "zoom": format_zoom(zoom),
+            "prompt_version": prompt_version,
+            "extracted_json": data,
+            "raw_ai_response": raw_response or "",
+            "confidence": confidence,
+            "last_used_at": timezone.now(),
+        },
+    )
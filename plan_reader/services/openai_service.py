@@ -6,6 +6,10 @@ from decimal import Decimal
 from django.conf import settings
 from openai import OpenAI
 
+# Incrementar cuando cambie el prompt o el schema: invalida el cache
+# de extracciones (PlanReaderExtractionCache) de las versiones anteriores.
+PLAN_READER_PROMPT_VERSION = "2026.07"
+
 PLAN_READER_JSON_SCHEMA = {
     "name": "plan_reader_page_extraction",
     "schema": {
@@ -170,11 +174,36 @@ PLAN_READER_JSON_SCHEMA = {
 }
 
 
+def plan_reader_model():
+    return (
+        getattr(settings, "PLAN_READER_MODEL", None)
+        or os.getenv("PLAN_READER_MODEL")
+        or "gpt-5.2"
+    )
+
+
+IMAGE_MIME_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+}
+
+
 def image_to_data_url(image_path):
+    """
+    Data URL de la imagen renderizada; el MIME sale de la extensión
+    (PNG, JPEG o WebP según el RenderProfile).
+    """
+    mime_type = IMAGE_MIME_TYPES.get(
+        os.path.splitext(str(image_path))[1].lower(),
+        "image/png",
+    )
+
     with open(image_path, "rb") as file:
         encoded = base64.b64encode(file.read()).decode("utf-8")
 
-    return f"data:image/png;base64,{encoded}"
+    return f"data:{mime_type};base64,{encoded}"
 
 
 def safe_decimal(value):
@@ -231,11 +260,7 @@ def extract_plan_page_with_openai(
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY is not configured.")
 
-    model = (
-        getattr(settings, "PLAN_READER_MODEL", None)
-        or os.getenv("PLAN_READER_MODEL")
-        or "gpt-5.2"
-    )
+    model = plan_reader_model()
 
     client = OpenAI(api_key=api_key)
     image_data_url = image_to_data_url(image_path)
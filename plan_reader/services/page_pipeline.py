@@ -0,0 +1,121 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+
+@dataclass
+class PlanPageTask:
+    """
+    Unidad de trabajo de una página dentro del pipeline.
+
+    page_number es 1-based.
+
+    error:
+        excepción ocurrida en la etapa de render. Si existe, la página
+        no se envía al extractor y se entrega directamente como fallida.
+
+    context:
+        datos propios de quien usa el pipeline, por ejemplo el
+        PlanReaderPage creado para la página.
+    """
+
+    page_number: int
+    sheet_name: str = ""
+    image_path: str = ""
+    error: Exception | None = None
+    context: dict = field(default_factory=dict)
+
+
+@dataclass
+class PlanPageResult:
+    task: PlanPageTask
+    value: object = None
+    error: Exception | None = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def iter_page_pipeline(
+    page_numbers,
+    *,
+    prepare,
+    extract=None,
+    concurrency=1,
+    before_prepare=None,
+):
+    """
+    Pipeline de páginas con concurrencia acotada.
+
+    - prepare(page_number) -> PlanPageTask
+        Etapa de render. Corre siempre en el hilo que consume el
+        generador, por lo que puede usar la base de datos y PyMuPDF.
+
+    - extract(task) -> valor
+        Etapa de extracción. Corre en un pool de hasta `concurrency`
+        hilos. No debe usar la base de datos.
+
+    - before_prepare()
+        Hook opcional antes de renderizar cada página. Se usa para la
+        cancelación cooperativa: si lanza una excepción, el pipeline
+        se detiene y descarta lo que estaba en vuelo.
+
+    Los resultados se entregan siempre en el orden de page_numbers,
+    aunque las extracciones terminen desordenadas. Nunca hay más de
+    `concurrency` páginas renderizadas pendientes de entregar.
+    """
+    concurrency = max(int(concurrency or 1), 1)
+
+    pending = deque()
+
+    executor = None
+
+    if extract is not None:
+        executor = ThreadPoolExecutor(
+            max_workers=concurrency,
+            thread_name_prefix="plan_reader_page",
+        )
+
+    def resolve(entry):
+        task, future = entry
+
+        if task.error is not None:
+            return PlanPageResult(task=task, error=task.error)
+
+        if future is None:
+            return PlanPageResult(task=task)
+
+        try:
+            return PlanPageResult(task=task, value=future.result())
+        except Exception as exc:
+            return PlanPageResult(task=task, error=exc)
+
+    try:
+        for page_number in page_numbers:
+            while len(pending) >= concurrency:
+                yield resolve(pending.popleft())
+
+            if before_prepare is not None:
+                before_prepare()
+
+            task = prepare(page_number)
+
+            future = None
+
+            if executor is not None and task.error is None:
+                future = executor.submit(extract, task)
+
+            pending.append((task, future))
+
+        while pending:
+            yield resolve(pending.popleft())
+
+    finally:
+        # Si el consumidor se detiene (Stop, error o GeneratorExit),
+        # las páginas que todavía no comenzaron se cancelan. Una llamada
+        # ya enviada al modelo no se puede interrumpir; su resultado
+        # simplemente se descarta.
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
@@ -6,6 +6,9 @@ from contextlib import contextmanager
 from pathlib import Path
 
 import fitz  # PyMuPDF
+from PIL import Image
+
+from plan_reader.services.render_profiles import RenderProfile
 
 SHEET_NAME_REGEX = re.compile(
     r"\bSheet\s+([A-Z]\d+)\b",
@@ -63,35 +66,175 @@ def get_plan_reader_temp_dir(job_id):
             pass
 
 
-def count_pdf_pages(pdf_path):
+class PlanDocument:
     """
-    Cuenta páginas del PDF.
-    """
-    if not pdf_path or not os.path.exists(pdf_path):
-        raise FileNotFoundError(f"PDF not found: {pdf_path}")
+    Handle de un PDF abierto una sola vez por job.
 
-    with fitz.open(pdf_path) as doc:
-        return doc.page_count
+    Mantiene un único fitz.Document y entrega desde él:
+    - cantidad de páginas;
+    - texto embebido;
+    - sheet names (todas las páginas en una sola pasada);
+    - imágenes de cada página (PNG o según RenderProfile).
 
+    page_number es siempre 1-based.
 
-def extract_sheet_name_from_page(pdf_path, page_number):
-    """
-    Intenta detectar el nombre de la hoja desde texto embebido.
-    page_number es 1-based.
+    Uso:
+
+        with PlanDocument(pdf_path) as document:
+            sheet_names = document.sheet_names()
+            image_path = document.render_page_to_image(1, temp_dir)
+
+    fitz.Document no es thread-safe: el handle debe usarse desde un
+    único hilo.
     """
-    if not pdf_path or not os.path.exists(pdf_path):
-        raise FileNotFoundError(f"PDF not found: {pdf_path}")
 
-    with fitz.open(pdf_path) as doc:
+    def __init__(self, pdf_path):
+        if not pdf_path or not os.path.exists(pdf_path):
+            raise FileNotFoundError(f"PDF not found: {pdf_path}")
+
+        self.pdf_path = pdf_path
+        self._doc = fitz.open(pdf_path)
+        self._sheet_names = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+
+    @property
+    def page_count(self):
+        return self._doc.page_count
+
+    def _load_page(self, page_number):
         index = page_number - 1
 
-        if index < 0 or index >= doc.page_count:
+        if index < 0 or index >= self._doc.page_count:
+            return None
+
+        return self._doc.load_page(index)
+
+    def page_text(self, page_number):
+        page = self._load_page(page_number)
+
+        if page is None:
             return ""
 
-        page = doc.load_page(index)
-        text = page.get_text("text") or ""
+        return page.get_text("text") or ""
+
+    def sheet_names(self):
+        """
+        Detecta el sheet name de todas las páginas en una sola pasada.
+
+        Devuelve {page_number: sheet_name}; "" si no se detecta.
+        """
+        if self._sheet_names is None:
+            self._sheet_names = {
+                index + 1: sheet_name_from_text(page.get_text("text") or "")
+                for index, page in enumerate(self._doc)
+            }
+
+        return self._sheet_names
+
+    def sheet_name(self, page_number):
+        return self.sheet_names().get(page_number, "")
+
+    def render_page_to_image(self, page_number, output_dir, zoom=3.0, profile=None):
+        """
+        Convierte una página en imagen dentro de output_dir.
+
+        Sin profile se genera un PNG RGB a `zoom` (comportamiento
+        original). Con un RenderProfile se aplican su presupuesto de
+        pixeles, color, formato y recorte.
+        """
+        page = self._load_page(page_number)
+
+        if page is None:
+            raise ValueError(f"Invalid page number: {page_number}")
+
+        if profile is None:
+            profile = RenderProfile(name="legacy", zoom=float(zoom))
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        image_path = output_dir / f"page_{page_number:03d}{profile.suffix}"
+
+        area = page.rect
+        clip = None
+
+        if profile.clip:
+            x0, y0, x1, y1 = profile.clip
+
+            clip = fitz.Rect(
+                area.x0 + area.width * x0,
+                area.y0 + area.height * y0,
+                area.x0 + area.width * x1,
+                area.y0 + area.height * y1,
+            )
+            area = clip
+
+        effective_zoom = profile.zoom_for(area.width, area.height)
+
+        pixmap = page.get_pixmap(
+            matrix=fitz.Matrix(effective_zoom, effective_zoom),
+            colorspace=fitz.csGRAY if profile.color == "gray" else fitz.csRGB,
+            clip=clip,
+            alpha=False,
+        )
 
-    match = SHEET_NAME_REGEX.search(text)
+        _save_pixmap(pixmap, image_path, profile)
+
+        return str(image_path)
+
+
+def _save_pixmap(pixmap, image_path, profile):
+    """
+    Guarda el pixmap según el formato del perfil.
+
+    PNG y JPEG los escribe PyMuPDF directamente; la paleta de 256
+    colores y WebP pasan por Pillow.
+    """
+    if profile.image_format == "png" and profile.color != "palette":
+        pixmap.save(str(image_path))
+        return
+
+    if profile.image_format == "jpeg" and profile.color != "palette":
+        pixmap.save(str(image_path), jpg_quality=profile.quality)
+        return
+
+    mode = "L" if pixmap.n == 1 else "RGB"
+
+    image = Image.frombytes(
+        mode,
+        (pixmap.width, pixmap.height),
+        pixmap.samples,
+    )
+
+    if profile.color == "palette":
+        image = image.quantize(
+            colors=256,
+            method=Image.Quantize.FASTOCTREE,
+        )
+
+        if profile.image_format != "png":
+            image = image.convert("RGB")
+
+    if profile.image_format == "webp":
+        image.save(str(image_path), "WEBP", quality=profile.quality, method=4)
+    elif profile.image_format == "jpeg":
+        image.save(str(image_path), "JPEG", quality=profile.quality)
+    else:
+        image.save(str(image_path), "PNG")
+
+
+def sheet_name_from_text(text):
+    match = SHEET_NAME_REGEX.search(text or "")
 
     if match:
         return match.group(1).upper().strip()
@@ -99,28 +242,33 @@ def extract_sheet_name_from_page(pdf_path, page_number):
     return ""
 
 
-def render_pdf_page_to_image(pdf_path, page_number, output_dir, zoom=3.0):
+def count_pdf_pages(pdf_path):
     """
-    Convierte una página del PDF en imagen PNG.
-    page_number es 1-based.
+    Cuenta páginas del PDF.
     """
-    if not pdf_path or not os.path.exists(pdf_path):
-        raise FileNotFoundError(f"PDF not found: {pdf_path}")
+    with PlanDocument(pdf_path) as document:
+        return document.page_count
 
-    output_dir = Path(output_dir)
-    output_dir.mkdir(parents=True, exist_ok=True)
 
-    image_path = output_dir / f"page_{page_number:03d}.png"
+def extract_sheet_name_from_page(pdf_path, page_number):
+    """
+    Intenta detectar el nombre de la hoja desde texto embebido.
+    page_number es 1-based.
 
-    with fitz.open(pdf_path) as doc:
-        index = page_number - 1
+    Abre el PDF en cada llamada; para procesar un job completo usar
+    PlanDocument.sheet_names().
+    """
+    with PlanDocument(pdf_path) as document:
+        return sheet_name_from_text(document.page_text(page_number))
 
-        if index < 0 or index >= doc.page_count:
-            raise ValueError(f"Invalid page number: {page_number}")
 
-        page = doc.load_page(index)
-        matrix = fitz.Matrix(float(zoom), float(zoom))
-        pixmap = page.get_pixmap(matrix=matrix, alpha=False)
-        pixmap.save(str(image_path))
+def render_pdf_page_to_image(pdf_path, page_number, output_dir, zoom=3.0):
+    """
+    Convierte una página del PDF en imagen PNG.
+    page_number es 1-based.
 
-    return str(image_path)
+    Abre el PDF en cada llamada; para procesar un job completo usar
+    PlanDocument.render_page_to_image().
+    """
+    with PlanDocument(pdf_path) as document:
+        return document.render_page_to_image(page_number, output_dir, zoom=zoom)
@@ -1,5 +1,6 @@
 import os
 import re
+import time
 from decimal import Decimal
 
 from django.conf import settings
@@ -7,12 +8,19 @@ from django.db import transaction
 from django.utils import timezone
 
 from plan_reader.models import PlanReaderItem, PlanReaderJob, PlanReaderPage
-from plan_reader.services.openai_service import extract_plan_page_with_openai
-from plan_reader.services.pdf_service import (count_pdf_pages,
-                                              extract_sheet_name_from_page,
-                                              get_pdf_temp_path,
-                                              get_plan_reader_temp_dir,
-                                              render_pdf_page_to_image)
+from plan_reader.services.extraction_cache import (build_extraction_cache_key,
+                                                   extraction_cache_enabled,
+                                                   get_cached_extraction,
+                                                   page_image_hash,
+                                                   store_extraction,
+                                                   touch_cached_extraction)
+from plan_reader.services.openai_service import (PLAN_READER_PROMPT_VERSION,
+                                                 extract_plan_page_with_openai,
+                                                 plan_reader_model)
+from plan_reader.services.page_pipeline import PlanPageTask, iter_page_pipeline
+from plan_reader.services.pdf_service import (PlanDocument, get_pdf_temp_path,
+                                              get_plan_reader_temp_dir)
+from plan_reader.services.render_profiles import get_render_profile
 from plan_reader.services.rules_engine import apply_box_rules
 
 
@@ -37,6 +45,45 @@ def render_zoom():
         return 3.0
 
 
+def render_profile():
+    """
+    RenderProfile usado para las imágenes enviadas al modelo.
+
+    PLAN_READER_RENDER_PROFILE elige un perfil de RENDER_PROFILES
+    (legacy por defecto); PLAN_READER_RENDER_ZOOM define su zoom máximo
+    y PLAN_READER_RENDER_CLIP ("x0,y0,x1,y1") un recorte opcional.
+    """
+    name = getattr(settings, "PLAN_READER_RENDER_PROFILE", None) or os.getenv(
+        "PLAN_READER_RENDER_PROFILE",
+        "legacy",
+    )
+
+    clip = getattr(settings, "PLAN_READER_RENDER_CLIP", None) or os.getenv(
+        "PLAN_READER_RENDER_CLIP",
+        "",
+    )
+
+    try:
+        return get_render_profile(name, zoom=render_zoom(), clip=clip)
+    except Exception:
+        return get_render_profile("legacy", zoom=render_zoom())
+
+
+def page_concurrency():
+    """
+    Cantidad máxima de páginas enviadas al modelo en paralelo.
+    """
+    value = getattr(settings, "PLAN_READER_PAGE_CONCURRENCY", None) or os.getenv(
+        "PLAN_READER_PAGE_CONCURRENCY",
+        "4",
+    )
+
+    try:
+        return max(int(value), 1)
+    except Exception:
+        return 4
+
+
 def safe_int(value, default=0):
     try:
         return int(value or default)
@@ -409,14 +456,14 @@ def _clean_ai_item(raw_item):
     return cleaned
 
 
-def create_item_from_extraction(
+def build_item_from_extraction(
     job,
     page_obj,
     page_data,
     raw_item,
 ):
     """
-    Crea un PlanReaderItem desde la extracción de OpenAI.
+    Construye (sin guardar) un PlanReaderItem desde la extracción de OpenAI.
 
     Fuente principal de splitters:
     - splitter_lines
@@ -436,6 +483,8 @@ def create_item_from_extraction(
     Importante:
     - No modifica la lógica de duplicados.
     - No modifica la exportación.
+    - No toca la base de datos; ver create_item_from_extraction y
+      create_items_from_extraction.
     """
     raw_item = _clean_ai_item(raw_item)
 
@@ -505,7 +554,7 @@ def create_item_from_extraction(
 
     item_confidence = safe_decimal(raw_item.get("confidence"))
 
-    return PlanReaderItem.objects.create(
+    return PlanReaderItem(
         job=job,
         page=page_obj,
         sheet=calculated.get(
@@ -578,6 +627,58 @@ def create_item_from_extraction(
     )
 
 
+def create_item_from_extraction(
+    job,
+    page_obj,
+    page_data,
+    raw_item,
+):
+    """
+    Crea un solo PlanReaderItem desde la extracción de OpenAI.
+    """
+    item = build_item_from_extraction(
+        job=job,
+        page_obj=page_obj,
+        page_data=page_data,
+        raw_item=raw_item,
+    )
+
+    item.save()
+
+    return item
+
+
+def create_items_from_extraction(
+    job,
+    page_obj,
+    page_data,
+):
+    """
+    Crea todos los PlanReaderItem de una página con un solo bulk_create.
+
+    Normaliza y aplica apply_box_rules a cada item en memoria, igual
+    que create_item_from_extraction, y los inserta en el orden en que
+    los devolvió el modelo.
+    """
+    items = [
+        build_item_from_extraction(
+            job=job,
+            page_obj=page_obj,
+            page_data=page_data,
+            raw_item=raw_item,
+        )
+        for raw_item in page_data.get(
+            "items",
+            [],
+        )
+    ]
+
+    if not items:
+        return []
+
+    return PlanReaderItem.objects.bulk_create(items)
+
+
 def _clean_key_text(value):
     text = str(value or "").strip().upper()
 
@@ -790,15 +891,34 @@ def _exact_duplicate_key(item):
 
 
 def _find_neighbor_components(group_items):
+    """
+    Agrupa items en componentes de hojas colindantes por frontera.
+
+    Indexa los items por coordenadas de hoja (_sheet_coordinates), por
+    lo que cada item solo revisa las cuatro celdas vecinas en lugar de
+    compararse contra todo el grupo.
+    """
     ids = [item.id for item in group_items]
     item_by_id = {item.id: item for item in group_items}
-    graph = {item.id: set() for item in group_items}
 
-    for i, item_a in enumerate(group_items):
-        for item_b in group_items[i + 1 :]:
-            if _are_border_neighbor_sheets(item_a, item_b):
-                graph[item_a.id].add(item_b.id)
-                graph[item_b.id].add(item_a.id)
+    by_coordinates = {}
+
+    for item in group_items:
+        coords = _sheet_coordinates(item.sheet)
+
+        if coords:
+            by_coordinates.setdefault(coords, []).append(item.id)
+
+    def neighbors(item_id):
+        coords = _sheet_coordinates(item_by_id[item_id].sheet)
+
+        if not coords:
+            return
+
+        col, row = coords
+
+        for offset_col, offset_row in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            yield from by_coordinates.get((col + offset_col, row + offset_row), [])
 
     visited = set()
     components = []
@@ -815,7 +935,7 @@ def _find_neighbor_components(group_items):
             current_id = stack.pop()
             component_ids.append(current_id)
 
-            for next_id in graph[current_id]:
+            for next_id in neighbors(current_id):
                 if next_id not in visited:
                     visited.add(next_id)
                     stack.append(next_id)
@@ -836,90 +956,122 @@ def _mark_item_as_auto_duplicate(item, keeper, reason):
             f"Kept item #{keeper.id}; this one is excluded from view and export."
         ),
     )
-    item.save(update_fields=["is_duplicate", "needs_review", "observation"])
 
 
 def _mark_item_as_review(item, text):
     item.needs_review = True
     item.observation = _append_observation(item, text)
-    item.save(update_fields=["needs_review", "observation"])
 
 
 def _mark_keeper_note(keeper, text):
     keeper.observation = _append_observation(keeper, text)
-    keeper.save(update_fields=["observation"])
 
 
-def mark_duplicates(job):
+DUPLICATE_UPDATE_FIELDS = [
+    "is_duplicate",
+    "needs_review",
+    "observation",
+]
+
+DUPLICATE_REVIEW_NOTE = (
+    "Duplicate review: same box number appears more than once, "
+    "but splice count or feed information is different. Kept included "
+    "and visible for manual decision."
+)
+
+
+def _border_keeper_sort(item):
     """
-    Reglas finales de duplicados:
+    Para duplicados de borde se conserva la lectura más completa.
 
-    1) Duplicado de borde por lectura parcial:
-       - mismo project_name
-       - mismo primary_feed
-       - hojas colindantes por frontera real
-       => se considera duplicado automático aunque cambien splices/type.
-       Se conserva la lectura más completa.
+    Prioridad:
+    - mayor cantidad de fusiones
+    - mejor score general
+    - orden natural por hoja/página/id
+    """
+    coords = _sheet_coordinates(item.sheet)
 
-       Ejemplo:
-       D1 7020-001 P0019 A4 1 splice
-       D2 7020-001 P0019 B8G 13 splices
-       => queda D2, D1 pasa a Duplicate detail.
+    if coords:
+        col, row = coords
+    else:
+        col, row = 999999, 999999
 
-    2) Duplicado automático normal:
-       - mismo project_name
-       - mismo splice_count
-       => se considera duplicado automático.
-       Se conserva una sola línea en la tabla principal.
+    page_number = item.page.page_number if item.page_id else 999999
 
-    3) Mismo número de caja con distinta cantidad de fusiones,
-       pero sin coincidir primary_feed o sin ser borde:
-       => NO se elimina automático.
-       => se marca needs_review=True para revisión manual.
+    return (
+        -safe_int(item.splice_count, 0),
+        -_item_score(item),
+        row,
+        col,
+        page_number,
+        item.id,
+    )
 
-    4) Si no tiene project_name:
-       => no se evalúa como duplicado automático.
+
+def _duplicate_state(item):
+    return (
+        item.is_duplicate,
+        item.needs_review,
+        item.observation,
+    )
+
+
+def _load_duplicate_items(job, project_names=None):
     """
+    Items del job a evaluar.
 
-    job.items.update(is_duplicate=False)
+    project_names limita la carga a los grupos indicados (comparados
+    con _clean_key_text, igual que el motor de duplicados).
+    """
+    queryset = job.items.select_related("page").order_by(
+        "project_name",
+        "primary_feed",
+        "splice_count",
+        "sheet",
+        "id",
+    )
 
-    items = list(
-        job.items.select_related("page").order_by(
-            "project_name",
-            "primary_feed",
-            "splice_count",
-            "sheet",
+    if project_names is None:
+        return list(queryset)
+
+    keys = {_clean_key_text(name) for name in project_names}
+    keys.discard("")
+
+    if not keys:
+        return []
+
+    ids = [
+        item_id
+        for item_id, project_name in job.items.values_list(
             "id",
+            "project_name",
         )
-    )
+        if _clean_key_text(project_name) in keys
+    ]
 
-    def _border_keeper_sort(item):
-        """
-        Para duplicados de borde se conserva la lectura más completa.
+    return list(queryset.filter(id__in=ids))
 
-        Prioridad:
-        - mayor cantidad de fusiones
-        - mejor score general
-        - orden natural por hoja/página/id
-        """
-        coords = _sheet_coordinates(item.sheet)
 
-        if coords:
-            col, row = coords
-        else:
-            col, row = 999999, 999999
-
-        page_number = item.page.page_number if item.page_id else 999999
-
-        return (
-            -safe_int(item.splice_count, 0),
-            -_item_score(item),
-            row,
-            col,
-            page_number,
-            item.id,
+def _save_duplicate_changes(items, original_states):
+    changed = [
+        item for item in items if _duplicate_state(item) != original_states[item.id]
+    ]
+
+    if changed:
+        PlanReaderItem.objects.bulk_update(
+            changed,
+            DUPLICATE_UPDATE_FIELDS,
+            batch_size=500,
         )
 
+    return len(changed)
+
+
+def _evaluate_duplicate_group(group_items):
+    """
+    Aplica las reglas de mark_duplicates a un grupo (mismo project_name)
+    en memoria. No guarda.
+    """
     # ==========================================================
     # PASO 1:
     # Duplicado de borde:
@@ -930,25 +1082,19 @@ def mark_duplicates(job):
     # caja y el mismo primary feed en hojas colindantes, se conserva
     # la lectura más completa.
     # ==========================================================
-    groups_by_box_and_feed = {}
+    by_feed = {}
 
-    for item in items:
-        project_name = _clean_key_text(item.project_name)
+    for item in group_items:
         primary_feed = _clean_key_text(item.primary_feed)
 
-        if not project_name or not primary_feed:
-            continue
+        if primary_feed:
+            by_feed.setdefault(primary_feed, []).append(item)
 
-        key = (project_name, primary_feed)
-        groups_by_box_and_feed.setdefault(key, []).append(item)
-
-    for key, group_items in groups_by_box_and_feed.items():
-        if len(group_items) <= 1:
+    for feed_items in by_feed.values():
+        if len(feed_items) <= 1:
             continue
 
-        components = _find_neighbor_components(group_items)
-
-        for component in components:
+        for component in _find_neighbor_components(feed_items):
             if len(component) <= 1:
                 continue
 
@@ -995,35 +1141,19 @@ def mark_duplicates(job):
     #
     # Se ejecuta después del borde, solo con items todavía incluidos.
     # ==========================================================
-    current_items = list(
-        job.items.select_related("page")
-        .filter(is_duplicate=False)
-        .order_by(
-            "project_name",
-            "splice_count",
-            "sheet",
-            "primary_feed",
-            "id",
-        )
-    )
-
-    groups_by_box_and_splices = {}
+    by_splices = {}
 
-    for item in current_items:
-        project_name = _clean_key_text(item.project_name)
-        splice_count = safe_int(item.splice_count, 0)
-
-        if not project_name:
+    for item in group_items:
+        if item.is_duplicate:
             continue
 
-        key = (project_name, splice_count)
-        groups_by_box_and_splices.setdefault(key, []).append(item)
+        by_splices.setdefault(safe_int(item.splice_count, 0), []).append(item)
 
-    for key, group_items in groups_by_box_and_splices.items():
-        if len(group_items) <= 1:
+    for splice_items in by_splices.values():
+        if len(splice_items) <= 1:
             continue
 
-        keeper = sorted(group_items, key=_sort_for_keeper)[0]
+        keeper = sorted(splice_items, key=_sort_for_keeper)[0]
 
         _mark_keeper_note(
             keeper,
@@ -1033,7 +1163,7 @@ def mark_duplicates(job):
             ),
         )
 
-        for item in group_items:
+        for item in splice_items:
             if item.id == keeper.id:
                 continue
 
@@ -1046,46 +1176,111 @@ def mark_duplicates(job):
     # ==========================================================
     # PASO 3:
     # Mismo número de caja con distinta cantidad de fusiones.
-    #
-    # Si llegó aquí, significa que:
-    # - no fue eliminado por borde con mismo primary_feed
-    # - no fue eliminado por mismo splice_count
-    #
-    # Entonces se deja visible en rojo para decisión manual.
     # ==========================================================
-    remaining_items = list(
-        job.items.select_related("page")
-        .filter(is_duplicate=False)
-        .order_by(
-            "project_name",
-            "sheet",
-            "id",
-        )
-    )
+    _evaluate_duplicate_review(group_items)
 
-    by_project = {}
+
+def _evaluate_duplicate_review(group_items):
+    """
+    Si llegó aquí, significa que:
+    - no fue eliminado por borde con mismo primary_feed
+    - no fue eliminado por mismo splice_count
+    - o fue restaurado manualmente
+
+    Entonces se deja visible en rojo para decisión manual.
+    """
+    remaining_items = [item for item in group_items if not item.is_duplicate]
+
+    if len(remaining_items) <= 1:
+        return
 
     for item in remaining_items:
+        _mark_item_as_review(item, DUPLICATE_REVIEW_NOTE)
+
+
+def _group_by_project(items):
+    groups = {}
+
+    for item in items:
         project_name = _clean_key_text(item.project_name)
 
-        if not project_name:
-            continue
+        # Sin project_name no se evalúa como duplicado automático.
+        if project_name:
+            groups.setdefault(project_name, []).append(item)
 
-        by_project.setdefault(project_name, []).append(item)
+    return groups
 
-    for project_name, group_items in by_project.items():
-        if len(group_items) <= 1:
-            continue
 
-        for item in group_items:
-            _mark_item_as_review(
-                item,
-                (
-                    "Duplicate review: same box number appears more than once, "
-                    "but splice count or feed information is different. Kept included "
-                    "and visible for manual decision."
-                ),
-            )
+def mark_duplicates(job, project_names=None):
+    """
+    Reglas finales de duplicados:
+
+    1) Duplicado de borde por lectura parcial:
+       - mismo project_name
+       - mismo primary_feed
+       - hojas colindantes por frontera real
+       => se considera duplicado automático aunque cambien splices/type.
+       Se conserva la lectura más completa.
+
+       Ejemplo:
+       D1 7020-001 P0019 A4 1 splice
+       D2 7020-001 P0019 B8G 13 splices
+       => queda D2, D1 pasa a Duplicate detail.
+
+    2) Duplicado automático normal:
+       - mismo project_name
+       - mismo splice_count
+       => se considera duplicado automático.
+       Se conserva una sola línea en la tabla principal.
+
+    3) Mismo número de caja con distinta cantidad de fusiones,
+       pero sin coincidir primary_feed o sin ser borde:
+       => NO se elimina automático.
+       => se marca needs_review=True para revisión manual.
+
+    4) Si no tiene project_name:
+       => no se evalúa como duplicado automático.
+
+    Todas las reglas dependen solo de items con el mismo project_name,
+    por lo que cada grupo se evalúa de forma independiente, en memoria:
+
+    - project_names=None evalúa el job completo;
+    - project_names=[...] reevalúa solo esos grupos.
+
+    Se guardan con bulk_update únicamente los items que cambiaron.
+    Retorna la cantidad de items actualizados.
+    """
+    items = _load_duplicate_items(job, project_names)
+
+    original_states = {item.id: _duplicate_state(item) for item in items}
+
+    for item in items:
+        item.is_duplicate = False
+
+    for group_items in _group_by_project(items).values():
+        if len(group_items) > 1:
+            _evaluate_duplicate_group(group_items)
+
+    return _save_duplicate_changes(items, original_states)
+
+
+def refresh_duplicate_review(job, project_names):
+    """
+    Reevalúa solo la revisión manual (PASO 3) de los grupos indicados,
+    respetando is_duplicate tal como lo dejó el revisor.
+
+    Se usa al marcar/desmarcar un item a mano: si un item vuelve a la
+    tabla principal junto a otro con el mismo project_name, ambos
+    quedan en revisión.
+    """
+    items = _load_duplicate_items(job, project_names)
+
+    original_states = {item.id: _duplicate_state(item) for item in items}
+
+    for group_items in _group_by_project(items).values():
+        _evaluate_duplicate_review(group_items)
+
+    return _save_duplicate_changes(items, original_states)
 
 
 class PlanReaderJobCancelled(Exception):
@@ -1125,6 +1320,76 @@ def _raise_if_plan_reader_cancelled(job_id):
         )
 
 
+def cancel_check_interval():
+    """
+    Segundos mínimos entre consultas de cancelación a la base de datos.
+    """
+    value = getattr(
+        settings, "PLAN_READER_CANCEL_CHECK_INTERVAL_MS", None
+    ) or os.getenv("PLAN_READER_CANCEL_CHECK_INTERVAL_MS", "500")
+
+    try:
+        return max(float(value), 0.0) / 1000
+    except Exception:
+        return 0.5
+
+
+class PlanReaderCancelToken:
+    """
+    Estado de cancelación de un PlanReaderJob revisado en memoria.
+
+    - Consulta la base de datos como máximo una vez cada
+      PLAN_READER_CANCEL_CHECK_INTERVAL_MS; entre consultas reutiliza
+      el último estado conocido.
+    - Si el worker comparte cancel_event (multiprocessing.Event), un Stop
+      empujado por el proceso padre se detecta sin consultar la DB.
+    - Una vez cancelado, queda cancelado.
+
+    force=True ignora el intervalo; se usa antes de registrar errores
+    para no convertir una cancelación en FAILED.
+    """
+
+    def __init__(self, job_id, refresh_interval=None, cancel_event=None):
+        self.job_id = job_id
+        self.refresh_interval = (
+            cancel_check_interval() if refresh_interval is None else refresh_interval
+        )
+        self.cancel_event = cancel_event
+        self.queries = 0
+
+        self._cancelled = False
+        self._checked_at = None
+
+    def is_cancelled(self, force=False):
+        if self._cancelled:
+            return True
+
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            self._cancelled = True
+            return True
+
+        now = time.monotonic()
+
+        if (
+            not force
+            and self._checked_at is not None
+            and now - self._checked_at < self.refresh_interval
+        ):
+            return False
+
+        self._checked_at = now
+        self.queries += 1
+        self._cancelled = _plan_reader_cancel_requested(self.job_id)
+
+        return self._cancelled
+
+    def raise_if_cancelled(self, force=False):
+        if self.is_cancelled(force=force):
+            raise PlanReaderJobCancelled(
+                f"PlanReaderJob #{self.job_id} was stopped by the user."
+            )
+
+
 def _finish_cancelled_plan_reader_job(job_id):
     """
     Confirma en la base de datos que el proceso fue detenido.
@@ -1149,7 +1414,44 @@ def _finish_cancelled_plan_reader_job(job_id):
     return PlanReaderJob.objects.get(id=job_id)
 
 
-def process_plan_reader_job(job_id, allow_processing=False):
+def _discard_open_pages(job_id, pages):
+    """
+    Elimina páginas todavía no confirmadas y sus items parciales.
+    """
+    page_ids = [page.id for page in pages if page.id]
+
+    if not page_ids:
+        return
+
+    PlanReaderItem.objects.filter(
+        job_id=job_id,
+        page_id__in=page_ids,
+    ).delete()
+
+    PlanReaderPage.objects.filter(
+        id__in=page_ids,
+    ).delete()
+
+
+def _remove_page_image(image_path):
+    """
+    Libera el PNG de una página apenas se confirma su resultado.
+    """
+    if not image_path:
+        return
+
+    try:
+        os.remove(image_path)
+    except OSError:
+        pass
+
+
+def process_plan_reader_job(
+    job_id,
+    allow_processing=False,
+    extractor=None,
+    cancel_event=None,
+):
     """
     Procesa un PlanReaderJob.
 
@@ -1164,23 +1466,56 @@ def process_plan_reader_job(job_id, allow_processing=False):
         se utiliza desde el worker porque el worker principal reclama
         primero el job y lo marca como PROCESSING.
 
+    extractor:
+        función con la misma firma que extract_plan_page_with_openai.
+        Por defecto se usa OpenAI; el benchmark usa un extractor simulado.
+
+    cancel_event:
+        multiprocessing.Event opcional que el worker activa al
+        solicitarse Stop (ver PlanReaderCancelToken).
+
+    Pipeline de páginas:
+
+    - El hilo principal detecta el sheet name y renderiza cada página.
+    - Hasta PLAN_READER_PAGE_CONCURRENCY páginas se extraen en paralelo.
+    - Los resultados se guardan siempre en orden de página.
+    - Una página con error queda FAILED sin detener las demás.
+
+    Cache de extracciones:
+
+    - Con PLAN_READER_EXTRACTION_CACHE activo, cada raster se identifica
+      por su hash + modelo + zoom + versión del prompt.
+    - Las páginas sin cambios reutilizan la extracción guardada y no
+      llaman a OpenAI. El job registra cache_hits y cache_misses.
+
     Cancelación cooperativa:
 
+    - Las revisiones usan PlanReaderCancelToken: en memoria, con una
+      consulta a la DB como máximo cada PLAN_READER_CANCEL_CHECK_INTERVAL_MS.
     - Revisa CANCELLED antes de comenzar cada página.
     - Revisa CANCELLED después de operaciones costosas.
-    - Revisa CANCELLED durante la creación de items.
+    - Revisa CANCELLED antes y después de crear los items de cada página.
+    - Al detenerse elimina todas las páginas que estaban en vuelo.
     - No convierte una cancelación en FAILED.
     - No convierte una cancelación en NEEDS_REVIEW.
     - Completa completed_at cuando confirma que el proceso se detuvo.
 
     Nota:
         Una solicitud que ya fue enviada a OpenAI no se puede interrumpir
-        a mitad de la respuesta. En ese caso, el proceso se detendrá
-        inmediatamente después de que termine la llamada actual.
+        a mitad de la respuesta. En ese caso, su resultado se descarta
+        y las páginas que aún no comenzaron se cancelan.
     """
 
-    run_openai = use_openai()
-    zoom = render_zoom()
+    run_openai = use_openai() or extractor is not None
+    profile = render_profile()
+    zoom = profile.zoom
+    concurrency = page_concurrency()
+
+    # El cache solo aplica a extracciones reales del modelo.
+    use_cache = run_openai and extractor is None and extraction_cache_enabled()
+    model_name = plan_reader_model()
+
+    extractor = extractor or extract_plan_page_with_openai
 
     # =========================================================
     # Preparación inicial protegida
@@ -1217,6 +1552,8 @@ def process_plan_reader_job(job_id, allow_processing=False):
         job.error_message = ""
         job.processed_pages = 0
         job.failed_pages = 0
+        job.cache_hits = 0
+        job.cache_misses = 0
 
         job.save(
             update_fields=[
@@ -1226,6 +1563,8 @@ def process_plan_reader_job(job_id, allow_processing=False):
                 "error_message",
                 "processed_pages",
                 "failed_pages",
+                "cache_hits",
+                "cache_misses",
                 "updated_at",
             ]
         )
@@ -1235,16 +1574,30 @@ def process_plan_reader_job(job_id, allow_processing=False):
 
     processed_pages = 0
     failed_pages = 0
+    cache_hits = 0
+    cache_misses = 0
+
+    cancel_token = PlanReaderCancelToken(
+        job_id,
+        cancel_event=cancel_event,
+    )
 
     try:
-        _raise_if_plan_reader_cancelled(job_id)
+        cancel_token.raise_if_cancelled()
+
+        # El PDF se abre una sola vez para todo el job.
+        with (
+            get_pdf_temp_path(job.pdf_file) as pdf_path,
+            PlanDocument(pdf_path) as document,
+        ):
+            cancel_token.raise_if_cancelled()
 
-        with get_pdf_temp_path(job.pdf_file) as pdf_path:
-            _raise_if_plan_reader_cancelled(job_id)
+            total_pages = document.page_count
 
-            total_pages = count_pdf_pages(pdf_path)
+            # Sheet names de todas las páginas en una sola pasada.
+            sheet_names = document.sheet_names()
 
-            _raise_if_plan_reader_cancelled(job_id)
+            cancel_token.raise_if_cancelled()
 
             PlanReaderJob.objects.filter(
                 id=job_id,
@@ -1254,172 +1607,236 @@ def process_plan_reader_job(job_id, allow_processing=False):
             )
 
             with get_plan_reader_temp_dir(job.id) as temp_dir:
-                for page_number in range(
-                    1,
-                    total_pages + 1,
-                ):
-                    # No iniciar una página nueva si el usuario
-                    # ya solicitó detener el proceso.
-                    _raise_if_plan_reader_cancelled(job_id)
+                # Páginas creadas en DB que todavía no fueron
+                # confirmadas (COMPLETED o FAILED). Si el usuario
+                # detiene el job, se eliminan como resultados parciales.
+                open_pages = {}
 
+                def prepare_page(page_number):
                     page_obj = PlanReaderPage.objects.create(
                         job_id=job_id,
                         page_number=page_number,
                         status=PlanReaderPage.STATUS_PROCESSING,
                     )
 
-                    try:
-                        _raise_if_plan_reader_cancelled(job_id)
+                    open_pages[page_number] = page_obj
 
-                        sheet_name = extract_sheet_name_from_page(
-                            pdf_path=pdf_path,
-                            page_number=page_number,
-                        )
+                    task = PlanPageTask(
+                        page_number=page_number,
+                        context={"page_obj": page_obj},
+                    )
 
-                        _raise_if_plan_reader_cancelled(job_id)
+                    try:
+                        task.sheet_name = sheet_names.get(page_number, "")
 
-                        page_obj.sheet_name = sheet_name
+                        cancel_token.raise_if_cancelled()
 
                         if run_openai:
-                            image_path = render_pdf_page_to_image(
-                                pdf_path=pdf_path,
+                            task.image_path = document.render_page_to_image(
                                 page_number=page_number,
                                 output_dir=temp_dir,
-                                zoom=zoom,
+                                profile=profile,
                             )
 
-                            _raise_if_plan_reader_cancelled(job_id)
+                        if use_cache:
+                            content_hash = page_image_hash(task.image_path)
 
-                            page_data, raw_response, confidence_decimal = (
-                                extract_plan_page_with_openai(
-                                    image_path=image_path,
-                                    page_number=page_number,
-                                    known_sheet_name=sheet_name,
-                                )
+                            cache_key = build_extraction_cache_key(
+                                content_hash=content_hash,
+                                model_name=model_name,
+                                zoom=zoom,
+                                prompt_version=PLAN_READER_PROMPT_VERSION,
+                            )
+
+                            task.context["content_hash"] = content_hash
+                            task.context["cache_key"] = cache_key
+                            task.context["cached"] = get_cached_extraction(
+                                cache_key
                             )
 
+                    except PlanReaderJobCancelled:
+                        raise
+
+                    except Exception as exc:
+                        task.error = exc
+
+                    return task
+
+                def extract_page(task):
+                    # Corre dentro del pool: no debe tocar la base de datos.
+                    cached = task.context.get("cached")
+
+                    if cached is not None:
+                        return cached
+
+                    return extractor(
+                        image_path=task.image_path,
+                        page_number=task.page_number,
+                        known_sheet_name=task.sheet_name,
+                    )
+
+                pipeline = iter_page_pipeline(
+                    range(1, total_pages + 1),
+                    prepare=prepare_page,
+                    extract=extract_page if run_openai else None,
+                    concurrency=concurrency if run_openai else 1,
+                    # No iniciar una página nueva si el usuario
+                    # ya solicitó detener el proceso.
+                    before_prepare=cancel_token.raise_if_cancelled,
+                )
+
+                try:
+                    for result in pipeline:
+                        task = result.task
+                        page_obj = task.context["page_obj"]
+
+                        try:
                             # Si Stop fue presionado mientras OpenAI
                             # respondía, se detiene aquí y no guarda
                             # resultados parciales de esta página.
-                            _raise_if_plan_reader_cancelled(job_id)
+                            cancel_token.raise_if_cancelled()
 
-                            extracted_sheet = str(
-                                page_data.get("sheet_name") or ""
-                            ).strip()
+                            if not result.ok:
+                                raise result.error
 
-                            if extracted_sheet:
-                                page_obj.sheet_name = extracted_sheet
+                            page_obj.sheet_name = task.sheet_name
 
-                            page_obj.extracted_json = page_data
-                            page_obj.raw_ai_response = raw_response
-                            page_obj.confidence = confidence_decimal
-                            page_obj.status = PlanReaderPage.STATUS_COMPLETED
-                            page_obj.processed_at = timezone.now()
-                            page_obj.error_message = ""
+                            if run_openai:
+                                page_data, raw_response, confidence_decimal = (
+                                    result.value
+                                )
 
-                            page_obj.save(
-                                update_fields=[
-                                    "sheet_name",
-                                    "extracted_json",
-                                    "raw_ai_response",
-                                    "confidence",
-                                    "status",
-                                    "processed_at",
-                                    "error_message",
-                                ]
-                            )
+                                if task.context.get("cached") is not None:
+                                    cache_hits += 1
+                                    touch_cached_extraction(
+                                        task.context["cache_key"]
+                                    )
+                                else:
+                                    cache_misses += 1
+
+                                    if use_cache:
+                                        store_extraction(
+                                            cache_key=task.context["cache_key"],
+                                            content_hash=task.context["content_hash"],
+                                            model_name=model_name,
+                                            zoom=zoom,
+                                            prompt_version=PLAN_READER_PROMPT_VERSION,
+                                            data=page_data,
+                                            raw_response=raw_response,
+                                            confidence=confidence_decimal,
+                                        )
+
+                                extracted_sheet = str(
+                                    page_data.get("sheet_name") or ""
+                                ).strip()
+
+                                if extracted_sheet:
+                                    page_obj.sheet_name = extracted_sheet
+
+                                page_obj.extracted_json = page_data
+                                page_obj.raw_ai_response = raw_response
+                                page_obj.confidence = confidence_decimal
+                                page_obj.status = PlanReaderPage.STATUS_COMPLETED
+                                page_obj.processed_at = timezone.now()
+                                page_obj.error_message = ""
+
+                                page_obj.save(
+                                    update_fields=[
+                                        "sheet_name",
+                                        "extracted_json",
+                                        "raw_ai_response",
+                                        "confidence",
+                                        "status",
+                                        "processed_at",
+                                        "error_message",
+                                    ]
+                                )
 
-                            for raw_item in page_data.get(
-                                "items",
-                                [],
-                            ):
-                                _raise_if_plan_reader_cancelled(job_id)
+                                cancel_token.raise_if_cancelled()
 
-                                create_item_from_extraction(
+                                create_items_from_extraction(
                                     job=job,
                                     page_obj=page_obj,
                                     page_data=page_data,
-                                    raw_item=raw_item,
                                 )
 
-                            _raise_if_plan_reader_cancelled(job_id)
+                                cancel_token.raise_if_cancelled()
+
+                            else:
+                                page_obj.status = PlanReaderPage.STATUS_COMPLETED
+                                page_obj.processed_at = timezone.now()
+                                page_obj.error_message = ""
+
+                                page_obj.save(
+                                    update_fields=[
+                                        "sheet_name",
+                                        "status",
+                                        "processed_at",
+                                        "error_message",
+                                    ]
+                                )
+
+                            processed_pages += 1
+
+                        except PlanReaderJobCancelled:
+                            raise
+
+                        except Exception as exc:
+                            # Antes de registrar un error debemos verificar
+                            # que realmente no haya sido una cancelación.
+                            if cancel_token.is_cancelled(force=True):
+                                raise PlanReaderJobCancelled(
+                                    (
+                                        f"PlanReaderJob #{job_id} "
+                                        "was stopped by the user."
+                                    )
+                                ) from exc
 
-                        else:
-                            _raise_if_plan_reader_cancelled(job_id)
+                            failed_pages += 1
 
-                            page_obj.status = PlanReaderPage.STATUS_COMPLETED
+                            page_obj.status = PlanReaderPage.STATUS_FAILED
+                            page_obj.error_message = str(exc)
                             page_obj.processed_at = timezone.now()
-                            page_obj.error_message = ""
 
                             page_obj.save(
                                 update_fields=[
-                                    "sheet_name",
                                     "status",
-                                    "processed_at",
                                     "error_message",
+                                    "processed_at",
                                 ]
                             )
 
-                        processed_pages += 1
-
-                    except PlanReaderJobCancelled:
-                        # Elimina solamente los resultados parciales
-                        # de la página que estaba en ejecución.
-                        PlanReaderItem.objects.filter(
-                            job_id=job_id,
-                            page_id=page_obj.id,
-                        ).delete()
-
-                        page_obj.delete()
-
-                        raise
-
-                    except Exception as exc:
-                        # Antes de registrar un error debemos verificar
-                        # que realmente no haya sido una cancelación.
-                        if _plan_reader_cancel_requested(job_id):
-                            PlanReaderItem.objects.filter(
-                                job_id=job_id,
-                                page_id=page_obj.id,
-                            ).delete()
-
-                            page_obj.delete()
-
-                            raise PlanReaderJobCancelled(
-                                (f"PlanReaderJob #{job_id} " "was stopped by the user.")
-                            ) from exc
-
-                        failed_pages += 1
-
-                        page_obj.status = PlanReaderPage.STATUS_FAILED
-                        page_obj.error_message = str(exc)
-                        page_obj.processed_at = timezone.now()
-
-                        page_obj.save(
-                            update_fields=[
-                                "status",
-                                "error_message",
-                                "processed_at",
-                            ]
+                        open_pages.pop(task.page_number, None)
+                        _remove_page_image(task.image_path)
+
+                        # Solo actualiza contadores; nunca toca status,
+                        # para no sobrescribir CANCELLED.
+                        PlanReaderJob.objects.filter(
+                            id=job_id,
+                        ).update(
+                            processed_pages=processed_pages,
+                            failed_pages=failed_pages,
+                            cache_hits=cache_hits,
+                            cache_misses=cache_misses,
+                            updated_at=timezone.now(),
                         )
 
-                    # Solo actualiza contadores; nunca toca status,
-                    # para no sobrescribir CANCELLED.
-                    PlanReaderJob.objects.filter(
-                        id=job_id,
-                    ).update(
-                        processed_pages=processed_pages,
-                        failed_pages=failed_pages,
-                        updated_at=timezone.now(),
-                    )
+                        cancel_token.raise_if_cancelled()
+
+                except PlanReaderJobCancelled:
+                    # Elimina solamente los resultados parciales de las
+                    # páginas que estaban en ejecución o en vuelo.
+                    _discard_open_pages(job_id, open_pages.values())
+                    raise
 
-                    _raise_if_plan_reader_cancelled(job_id)
+                finally:
+                    pipeline.close()
 
         # =====================================================
         # Finalización normal
         # =====================================================
 
-        _raise_if_plan_reader_cancelled(job_id)
+        cancel_token.raise_if_cancelled()
 
         job = PlanReaderJob.objects.get(
             id=job_id,
@@ -1427,7 +1844,7 @@ def process_plan_reader_job(job_id, allow_processing=False):
 
         mark_duplicates(job)
 
-        _raise_if_plan_reader_cancelled(job_id)
+        cancel_token.raise_if_cancelled()
 
         with transaction.atomic():
             job = PlanReaderJob.objects.select_for_update().get(
@@ -1480,7 +1897,7 @@ def process_plan_reader_job(job_id, allow_processing=False):
     except Exception as exc:
         # Si el usuario solicitó detenerlo mientras se producía
         # otra excepción, la cancelación tiene prioridad.
-        if _plan_reader_cancel_requested(job_id):
+        if cancel_token.is_cancelled(force=True):
             return _finish_cancelled_plan_reader_job(job_id)
 
         now = timezone.now()
@@ -0,0 +1,148 @@
+import math
+from dataclasses import dataclass, replace
+
+IMAGE_FORMATS = {
+    "png": (".png", "image/png"),
+    "jpeg": (".jpg", "image/jpeg"),
+    "webp": (".webp", "image/webp"),
+}
+
+COLOR_MODES = {"rgb", "gray", "palette"}
+
+
+@dataclass(frozen=True)
+class RenderProfile:
+    """
+    Cómo se convierte una página del plano en la imagen enviada al modelo.
+
+    zoom:
+        zoom máximo de PyMuPDF (1.0 = 72 dpi).
+
+    max_pixels:
+        presupuesto de pixeles por página. Si la página a `zoom` lo
+        supera, el zoom se reduce para respetarlo. 0 = sin límite.
+
+    color:
+        rgb, gray (escala de grises) o palette (PNG de 256 colores,
+        conserva las líneas rojas/rosadas del plano).
+
+    image_format:
+        png, jpeg o webp. quality aplica a jpeg y webp.
+
+    clip:
+        recorte opcional (x0, y0, x1, y1) en fracciones de la página.
+        Sirve para dejar fuera el cajetín/leyenda, por ejemplo
+        (0, 0, 0.85, 1) descarta el 15% derecho.
+    """
+
+    name: str
+    zoom: float = 3.0
+    max_pixels: int = 0
+    color: str = "rgb"
+    image_format: str = "png"
+    quality: int = 90
+    clip: tuple | None = None
+
+    def __post_init__(self):
+        if self.image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown image format: {self.image_format}")
+
+        if self.color not in COLOR_MODES:
+            raise ValueError(f"Unknown color mode: {self.color}")
+
+    @property
+    def suffix(self):
+        return IMAGE_FORMATS[self.image_format][0]
+
+    @property
+    def mime_type(self):
+        return IMAGE_FORMATS[self.image_format][1]
+
+    def zoom_for(self, width, height):
+        """
+        Zoom efectivo para un área de width x height puntos PDF.
+        """
+        zoom = float(self.zoom)
+
+        if self.max_pixels and width > 0 and height > 0:
+            zoom = min(zoom, math.sqrt(self.max_pixels / (width * height)))
+
+        return zoom
+
+    def with_options(self, **options):
+        return replace(self, **options)
+
+
+# Un plano ANSI D (34x22 in) a zoom 3 son ~35 MP; 16 MP equivale a
+# ~2x, suficiente para las etiquetas chicas de los planos DFN.
+RENDER_PROFILES = {
+    # Comportamiento original: PNG RGB sin límite de pixeles.
+    "legacy": RenderProfile(name="legacy"),
+    "palette": RenderProfile(
+        name="palette",
+        max_pixels=16_000_000,
+        color="palette",
+    ),
+    "grayscale": RenderProfile(
+        name="grayscale",
+        max_pixels=16_000_000,
+        color="gray",
+    ),
+    "jpeg": RenderProfile(
+        name="jpeg",
+        max_pixels=16_000_000,
+        image_format="jpeg",
+        quality=88,
+    ),
+    "webp": RenderProfile(
+        name="webp",
+        max_pixels=16_000_000,
+        image_format="webp",
+        quality=90,
+    ),
+}
+
+
+def parse_clip(value):
+    """
+    "x0,y0,x1,y1" en fracciones de página -> tupla, o None si está vacío.
+    """
+    text = str(value or "").strip()
+
+    if not text:
+        return None
+
+    try:
+        x0, y0, x1, y1 = [float(part) for part in text.split(",")]
+    except ValueError as exc:
+        raise ValueError(f"Invalid render clip: {value}") from exc
+
+    if not (0 <= x0 < x1 <= 1 and 0 <= y0 < y1 <= 1):
+        raise ValueError(f"Invalid render clip: {value}")
+
+    return x0, y0, x1, y1
+
+
+def get_render_profile(name, zoom=None, clip=None):
+    """
+    Perfil registrado en RENDER_PROFILES, con zoom y clip opcionales.
+    """
+    key = str(name or "legacy").strip().lower()
+
+    if key not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile: {name}")
+
+    profile = RENDER_PROFILES[key]
+
+    options = {}
+
+    if zoom is not None:
+        options["zoom"] = float(zoom)
+
+    if clip is not None:
+        options["clip"] = parse_clip(clip) if isinstance(clip, str) else clip
+
+    if options:
+        profile = profile.with_options(**options)
+
+    return profile
@@ -0,0 +1,37 @@
+import json
+import time
+
+from plan_reader.services.openai_service import safe_decimal
+
+
+class StubPlanPageExtractor:
+    """
+    Extractor simulado con la misma firma que
+    extract_plan_page_with_openai.
+
+    No llama a OpenAI: espera `latency` segundos para imitar el tiempo
+    de respuesta del modelo y devuelve una página sin items.
+
+    Se utiliza para medir el pipeline de páginas sin costo ni red.
+    """
+
+    def __init__(self, latency=2.0, confidence=90):
+        self.latency = max(float(latency or 0), 0.0)
+        self.confidence = confidence
+
+    def __call__(
+        self,
+        image_path,
+        page_number=None,
+        known_sheet_name="",
+    ):
+        if self.latency:
+            time.sleep(self.latency)
+
+        data = {
+            "sheet_name": known_sheet_name or "",
+            "confidence": self.confidence,
+            "items": [],
+        }
+
+        return data, json.dumps(data), safe_decimal(self.confidence)
@@ -0,0 +1,440 @@
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import signal
+import time
+from dataclasses import dataclass
+
+from django.db import close_old_connections, connections
+from django.utils import timezone
+
+from plan_reader.models import PlanReaderJob
+
+logger = logging.getLogger(__name__)
+
+RESULT_FINISHED = "finished"
+RESULT_FAILED = "failed"
+RESULT_CANCELLED = "cancelled"
+
+
+def _pool_worker_main(conn, cancel_event=None):
+    """
+    Bucle de un proceso del pool.
+
+    El proceso ya tiene Django, el registro de apps, PyMuPDF y OpenAI
+    cargados. Recibe IDs de PlanReaderJob por el pipe y responde:
+
+        (resultado, job_id, mensaje)
+
+    None o un pipe cerrado terminan el proceso.
+
+    cancel_event lo activa el proceso principal al detectar Stop; el
+    processor lo revisa en memoria (PlanReaderCancelToken).
+    """
+    # Ctrl+C lo maneja el worker principal, que detiene el pool.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Import local: en modo spawn django.setup() debe ocurrir antes.
+    from plan_reader.services.processor import process_plan_reader_job
+
+    while True:
+        try:
+            job_id = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        if job_id is None:
+            break
+
+        try:
+            close_old_connections()
+
+            process_plan_reader_job(
+                job_id,
+                allow_processing=True,
+                cancel_event=cancel_event,
+            )
+
+            conn.send((RESULT_FINISHED, job_id, ""))
+
+        except Exception as exc:
+            logger.exception(
+                "PlanReaderJob #%s failed inside the pool process.",
+                job_id,
+            )
+
+            conn.send((RESULT_FAILED, job_id, str(exc)))
+
+        finally:
+            close_old_connections()
+
+
+def _spawn_pool_worker_main(conn, cancel_event=None):
+    import django
+
+    django.setup()
+
+    _pool_worker_main(conn, cancel_event)
+
+
+@dataclass
+class _PoolSlot:
+    process: multiprocessing.Process
+    conn: object
+    cancel_event: object = None
+    job_id: int | None = None
+    jobs_done: int = 0
+    # time.monotonic() límite para que el job cancelado responda.
+    cancel_deadline: float | None = None
+
+    @property
+    def busy(self):
+        return self.job_id is not None
+
+
+class PlanReaderProcessPool:
+    """
+    Pool de procesos precargados para PlanReaderJob.
+
+    Reemplaza el subproceso `manage.py process_plan_reader_job` por job:
+    cada proceso arranca una sola vez y recibe IDs por un pipe propio.
+
+    - size procesos procesan jobs en paralelo.
+    - Cada proceso atiende un job a la vez. Ante Stop se activa el
+      cancel_event del proceso para que el job termine limpio; si no
+      responde dentro de cancel_grace_seconds, se termina
+      (terminate/kill) exactamente ese proceso y se repone. La espera
+      se revisa en cada poll(), sin bloquear a los demás procesos.
+    - Un proceso se recicla después de max_jobs_per_process jobs para
+      liberar la memoria acumulada por PyMuPDF.
+    """
+
+    def __init__(self, size=1, max_jobs_per_process=25, cancel_grace_seconds=5):
+        self.size = max(int(size or 1), 1)
+        self.max_jobs_per_process = max(int(max_jobs_per_process or 0), 0)
+        self.cancel_grace_seconds = max(float(cancel_grace_seconds or 0), 0.0)
+
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context(
+            "fork" if "fork" in methods else "spawn"
+        )
+
+        self._slots: list[_PoolSlot] = []
+
+    # ========================================================
+    # Ciclo de vida
+    # ========================================================
+
+    def start(self):
+        while len(self._slots) < self.size:
+            self._slots.append(self._spawn_slot())
+
+        return self
+
+    def _spawn_slot(self):
+        # Un proceso forkeado no debe heredar conexiones abiertas.
+        connections.close_all()
+
+        parent_conn, child_conn = self._context.Pipe()
+        cancel_event = self._context.Event()
+
+        target = (
+            _pool_worker_main
+            if self._context.get_start_method() == "fork"
+            else _spawn_pool_worker_main
+        )
+
+        process = self._context.Process(
+            target=target,
+            args=(child_conn, cancel_event),
+            name="plan_reader_pool",
+            daemon=True,
+        )
+        process.start()
+
+        child_conn.close()
+
+        return _PoolSlot(
+            process=process,
+            conn=parent_conn,
+            cancel_event=cancel_event,
+        )
+
+    def _stop_process(self, slot, timeout=5):
+        process = slot.process
+
+        if process.is_alive():
+            process.terminate()
+            process.join(timeout)
+
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+        try:
+            slot.conn.close()
+        except Exception:
+            pass
+
+    def _replace_slot(self, index):
+        self._stop_process(self._slots[index])
+        self._slots[index] = self._spawn_slot()
+
+    def shutdown(self, timeout=5):
+        for slot in self._slots:
+            if not slot.busy:
+                try:
+                    slot.conn.send(None)
+                except Exception:
+                    pass
+
+        for slot in self._slots:
+            if not slot.busy:
+                slot.process.join(timeout)
+
+            self._stop_process(slot)
+
+        self._slots = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+    # ========================================================
+    # Asignación de jobs
+    # ========================================================
+
+    @property
+    def idle_count(self):
+        return sum(1 for slot in self._slots if not slot.busy)
+
+    @property
+    def busy_count(self):
+        return sum(1 for slot in self._slots if slot.busy)
+
+    @property
+    def running_job_ids(self):
+        return [slot.job_id for slot in self._slots if slot.busy]
+
+    def submit(self, job_id):
+        """
+        Envía un job a un proceso libre. Retorna False si no hay.
+        """
+        for index, slot in enumerate(self._slots):
+            if slot.busy:
+                continue
+
+            if not slot.process.is_alive():
+                self._replace_slot(index)
+                slot = self._slots[index]
+
+            slot.cancel_event.clear()
+            slot.conn.send(int(job_id))
+            slot.job_id = int(job_id)
+
+            return True
+
+        return False
+
+    # ========================================================
+    # Seguimiento
+    # ========================================================
+
+    def poll(self):
+        """
+        Revisa resultados, procesos caídos y cancelaciones.
+
+        Retorna una lista de (job_id, resultado, mensaje) para los jobs
+        que terminaron desde la última llamada.
+        """
+        events = []
+
+        for index, slot in enumerate(self._slots):
+            if not slot.busy:
+                continue
+
+            if slot.cancel_deadline is not None:
+                event = self._poll_cancelling_slot(index)
+
+                if event is not None:
+                    events.append(event)
+
+                continue
+
+            if slot.conn.poll():
+                try:
+                    result, job_id, message = slot.conn.recv()
+                except (EOFError, OSError):
+                    result, job_id, message = (
+                        RESULT_FAILED,
+                        slot.job_id,
+                        "The Plan Reader pool process closed its pipe.",
+                    )
+
+                if result == RESULT_FAILED:
+                    self._mark_failed_job(job_id, message)
+
+                events.append((job_id, result, message))
+
+                slot.job_id = None
+                slot.jobs_done += 1
+
+                if (
+                    self.max_jobs_per_process
+                    and slot.jobs_done >= self.max_jobs_per_process
+                ):
+                    try:
+                        slot.conn.send(None)
+                    except Exception:
+                        pass
+
+                    self._replace_slot(index)
+
+                continue
+
+            if not slot.process.is_alive():
+                job_id = slot.job_id
+                message = "The isolated Plan Reader process ended unexpectedly."
+
+                self._mark_failed_job(job_id, message)
+
+                events.append((job_id, RESULT_FAILED, message))
+
+                self._replace_slot(index)
+
+        events.extend(self._stop_cancelled_jobs())
+
+        return events
+
+    def _stop_cancelled_jobs(self):
+        """
+        Detiene los jobs cancelados por el usuario.
+
+        Una sola consulta para todos los jobs en ejecución. Primero se
+        activa el cancel_event del proceso; el processor lo ve en la
+        siguiente revisión y cierra el job como CANCELLED. Solo si no
+        responde a tiempo se termina el proceso (ver
+        _poll_cancelling_slot).
+        """
+        running = {
+            slot.job_id: index
+            for index, slot in enumerate(self._slots)
+            if slot.busy and slot.cancel_deadline is None
+        }
+
+        if not running:
+            return []
+
+        close_old_connections()
+
+        statuses = dict(
+            PlanReaderJob.objects.filter(
+                id__in=list(running),
+            ).values_list(
+                "id",
+                "status",
+            )
+        )
+
+        events = []
+
+        for job_id, index in running.items():
+            current_status = statuses.get(job_id)
+
+            if current_status is None:
+                self._replace_slot(index)
+                events.append((job_id, RESULT_CANCELLED, "Job no longer exists."))
+                continue
+
+            if current_status != PlanReaderJob.STATUS_CANCELLED:
+                continue
+
+            slot = self._slots[index]
+
+            slot.cancel_event.set()
+            slot.cancel_deadline = time.monotonic() + self.cancel_grace_seconds
+
+        return events
+
+    def _poll_cancelling_slot(self, index):
+        """
+        Revisa, sin esperar, un proceso al que ya se le pidió cancelar.
+
+        - Si respondió y sigue vivo, queda libre para otro job.
+        - Si el pipe se cerró, el proceso murió o venció
+          cancel_grace_seconds, se termina y se repone.
+
+        Retorna el evento RESULT_CANCELLED cuando el job quedó detenido,
+        o None mientras siga dentro del plazo.
+        """
+        slot = self._slots[index]
+        job_id = slot.job_id
+
+        try:
+            answered = slot.conn.poll()
+
+            if answered:
+                slot.conn.recv()
+        except (EOFError, OSError):
+            self._replace_slot(index)
+
+            return self._finish_cancelled_job(job_id)
+
+        if answered and slot.process.is_alive():
+            slot.cancel_event.clear()
+            slot.cancel_deadline = None
+            slot.job_id = None
+            slot.jobs_done += 1
+
+        elif (
+            answered
+            or not slot.process.is_alive()
+            or time.monotonic() >= slot.cancel_deadline
+        ):
+            self._replace_slot(index)
+
+        else:
+            return None
+
+        return self._finish_cancelled_job(job_id)
+
+    def _finish_cancelled_job(self, job_id):
+        close_old_connections()
+
+        now = timezone.now()
+
+        PlanReaderJob.objects.filter(
+            id=job_id,
+        ).update(
+            status=PlanReaderJob.STATUS_CANCELLED,
+            error_message="Processing stopped by user.",
+            completed_at=now,
+            updated_at=now,
+        )
+
+        return (job_id, RESULT_CANCELLED, "Processing stopped by user.")
+
+    def _mark_failed_job(self, job_id, message):
+        """
+        Marca FAILED un job que quedó en PROCESSING. Nunca reemplaza
+        CANCELLED ni un estado final ya escrito por el processor.
+        """
+        if job_id is None:
+            return
+
+        close_old_connections()
+
+        now = timezone.now()
+
+        PlanReaderJob.objects.filter(
+            id=job_id,
+            status=PlanReaderJob.STATUS_PROCESSING,
+        ).update(
+            status=PlanReaderJob.STATUS_FAILED,
+            error_message=message,
+            completed_at=now,
+            updated_at=now,
+        )
@@ -1,3 +1,345 @@
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from plan_reader.models import PlanReaderItem, PlanReaderJob, PlanReaderPage
+from plan_reader.services.processor import (create_item_from_extraction,
+                                            create_items_from_extraction)
+from plan_reader.services.worker_pool import (RESULT_CANCELLED,
+                                              PlanReaderProcessPool, _PoolSlot)
+
+# Páginas de ejemplo con la forma que devuelve OpenAI.
+# Cubren splitter_lines, campos legacy, familias mal leídas y
+# project_name incompleto.
+GOLDEN_PAGES = [
+    {
+        "sheet_name": "12",
+        "confidence": 92,
+        "items": [
+            {
+                "project_name": "5000-039-1",
+                "raw_text": "5000-039-1-3 B8G P0049",
+                "primary_feed": "P0049",
+                "visible_type": "B8G",
+                "detected_box_type": "B8G",
+                "splitter_lines": [
+                    {"level": "P", "ratio": "1:8", "raw_text": "P-1:8(P0049)"},
+                    {"level": "S", "ratio": "1:2", "raw_text": "S-1:2(P0049:S3)"},
+                    {
+                        "level": "T",
+                        "ratio": "1:4",
+                        "raw_text": "T-1:4(P0049,S3:T1)",
+                    },
+                ],
+                "splice_count": 4,
+                "confidence": 88,
+            },
+            {
+                "project_name": "5000-040",
+                "primary_feed": "P 0049",
+                "visible_type": "BGP",
+                "detected_box_type": "",
+                "splitter_lines": [],
+                "has_p": True,
+                "s_splitter": "1:8",
+                "t_splitter": "",
+                "splice_count": "2",
+                "confidence": "75.5",
+            },
+            {
+                "project_name": "",
+                "primary_feed": "",
+                "visible_type": "",
+                "detected_box_type": "",
+                "splitter_lines": None,
+                "splice_count": None,
+            },
+        ],
+    },
+    {
+        "sheet_name": "",
+        "confidence": 60,
+        "items": [
+            {
+                "sheet": "14",
+                "project_name": "5000-041-2",
+                "primary_feed": "P0051",
+                "visible_type": "A4",
+                "detected_box_type": "A4",
+                "splitter_lines": [
+                    {"level": "P", "ratio": "1:4", "raw_text": "P-1:4(P0051)"},
+                ],
+                "splice_count": 1,
+                "confidence": 99,
+            },
+            {
+                "project_name": "0913RA_P0043:1-4;",
+                "primary_feed": "P0051",
+                "visible_type": "B86",
+                "detected_box_type": "BBG",
+                "splitter_lines": [
+                    {"level": "S", "ratio": "1:8", "raw_text": "S-1:8(P0051:S1)"},
+                ],
+                "splice_count": 0,
+            },
+        ],
+    },
+    {
+        "sheet_name": "15",
+        "confidence": 0,
+        "items": [],
+    },
+]
+
+# Resultado esperado por página (sheet, project_name, primary_feed,
+# calculated_box_type, c108_ug, c109_splices, c110_splitters,
+# needs_review). Si cambian las reglas, actualizar conscientemente.
+GOLDEN_RESULTS = [
+    [
+        ("12", "5000-039-1-3", "P0049", "B8G 1X4", 1, 4, 2, True),
+        ("12", "5000-040", "", "B8G 1X8", 1, 2, 1, True),
+        ("12", "", "", "UNKNOWN", 1, 0, 0, True),
+    ],
+    [
+        ("14", "5000-041-2", "P0051", "A4 1X4", 1, 1, 1, False),
+        ("S2", "", "P0051", "B8G 1X8", 1, 0, 0, True),
+    ],
+    [],
+]
+
+ITEM_FIELDS = [
+    "sheet",
+    "co",
+    "dfn",
+    "project_name",
+    "primary_feed",
+    "visible_type",
+    "detected_box_type",
+    "splitter_lines",
+    "has_p",
+    "s_splitter",
+    "t_splitter",
+    "splice_count",
+    "calculated_box_type",
+    "c108_ug",
+    "c109_splices",
+    "c110_splitters",
+    "observation",
+    "confidence",
+    "needs_review",
+    "is_duplicate",
+]
+
+
+class BulkItemCreationGoldenTests(TestCase):
+    """
+    create_items_from_extraction (bulk_create por página) debe producir
+    exactamente los mismos items que create_item_from_extraction.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create(username="plan-reader-golden")
+
+        # Un job por camino: (job, page_number) es único.
+        cls.single_job, cls.bulk_job = [
+            PlanReaderJob.objects.create(
+                uploaded_by=user,
+                pdf_file="plan_reader/golden.pdf",
+                co="CO-100",
+                dfn="DFN-200",
+            )
+            for _ in range(2)
+        ]
+
+    def _snapshot(self, items):
+        return [
+            [getattr(item, field) for field in ITEM_FIELDS] for item in items
+        ]
+
+    def test_bulk_path_matches_single_item_path(self):
+        for page_number, page_data in enumerate(GOLDEN_PAGES, start=1):
+            with self.subTest(page_number=page_number):
+                single_page = PlanReaderPage.objects.create(
+                    job=self.single_job,
+                    page_number=page_number,
+                    sheet_name=f"S{page_number}",
+                )
+
+                bulk_page = PlanReaderPage.objects.create(
+                    job=self.bulk_job,
+                    page_number=page_number,
+                    sheet_name=f"S{page_number}",
+                )
+
+                for raw_item in page_data["items"]:
+                    create_item_from_extraction(
+                        job=self.single_job,
+                        page_obj=single_page,
+                        page_data=page_data,
+                        raw_item=raw_item,
+                    )
+
+                created = create_items_from_extraction(
+                    job=self.bulk_job,
+                    page_obj=bulk_page,
+                    page_data=page_data,
+                )
+
+                self.assertEqual(len(created), len(page_data["items"]))
+
+                single_items = PlanReaderItem.objects.filter(
+                    page=single_page,
+                ).order_by("id")
+
+                bulk_items = PlanReaderItem.objects.filter(
+                    page=bulk_page,
+                ).order_by("id")
+
+                self.assertEqual(
+                    self._snapshot(bulk_items),
+                    self._snapshot(single_items),
+                )
+
+    def test_bulk_path_matches_golden_results(self):
+        for page_number, page_data in enumerate(GOLDEN_PAGES, start=1):
+            with self.subTest(page_number=page_number):
+                page = PlanReaderPage.objects.create(
+                    job=self.bulk_job,
+                    page_number=page_number,
+                    sheet_name=f"S{page_number}",
+                )
+
+                create_items_from_extraction(
+                    job=self.bulk_job,
+                    page_obj=page,
+                    page_data=page_data,
+                )
+
+                results = [
+                    (
+                        item.sheet,
+                        item.project_name,
+                        item.primary_feed,
+                        item.calculated_box_type,
+                        item.c108_ug,
+                        item.c109_splices,
+                        item.c110_splitters,
+                        item.needs_review,
+                    )
+                    for item in PlanReaderItem.objects.filter(
+                        page=page,
+                    ).order_by("id")
+                ]
+
+                self.assertEqual(results, GOLDEN_RESULTS[page_number - 1])
+
+
+class _FakeProcess:
+    def __init__(self):
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.alive = False
+
+    kill = terminate
+
+    def join(self, timeout=None):
+        pass
+
+
+class _FakeConn:
+    def __init__(self):
+        self.replies = []
+        self.sent = []
+
+    def poll(self, timeout=None):
+        # Un poll bloqueante congelaría el bucle del worker.
+        assert not timeout, "poll() must not block"
+
+        return bool(self.replies)
+
+    def recv(self):
+        return self.replies.pop(0)
+
+    def send(self, value):
+        self.sent.append(value)
+
+    def close(self):
+        pass
+
+
+def _fake_slot():
+    return _PoolSlot(
+        process=_FakeProcess(),
+        conn=_FakeConn(),
+        cancel_event=threading.Event(),
+    )
+
+
+class ProcessPoolCancelTests(TestCase):
+    """
+    Stop de un job no debe bloquear poll() mientras el proceso responde.
+    """
+
+    def setUp(self):
+        user = get_user_model().objects.create(username="plan-reader-pool")
+
+        self.job = PlanReaderJob.objects.create(
+            uploaded_by=user,
+            pdf_file="plan_reader/pool.pdf",
+            status=PlanReaderJob.STATUS_PROCESSING,
+        )
+
+        spawn = mock.patch.object(
+            PlanReaderProcessPool,
+            "_spawn_slot",
+            side_effect=lambda: _fake_slot(),
+        )
+        spawn.start()
+        self.addCleanup(spawn.stop)
+
+        self.pool = PlanReaderProcessPool(size=1, cancel_grace_seconds=60).start()
+        self.pool.submit(self.job.pk)
+        self.slot = self.pool._slots[0]
+
+        PlanReaderJob.objects.filter(pk=self.job.pk).update(
+            status=PlanReaderJob.STATUS_CANCELLED,
+        )
+
+    def test_cancel_waits_without_blocking(self):
+        self.assertEqual(self.pool.poll(), [])
+        self.assertTrue(self.slot.cancel_event.is_set())
+        self.assertEqual(self.pool.running_job_ids, [self.job.pk])
+
+        self.slot.conn.replies.append(("finished", self.job.pk, ""))
+
+        self.assertEqual(
+            self.pool.poll(),
+            [(self.job.pk, RESULT_CANCELLED, "Processing stopped by user.")],
+        )
+        self.assertIs(self.pool._slots[0], self.slot)
+        self.assertFalse(self.slot.busy)
+        self.assertFalse(self.slot.cancel_event.is_set())
+
+    def test_unresponsive_process_is_replaced_after_grace(self):
+        self.pool.poll()
+
+        self.slot.cancel_deadline = time.monotonic() - 1
+
+        events = self.pool.poll()
+
+        self.assertEqual([event[1] for event in events], [RESULT_CANCELLED])
+        self.assertFalse(self.slot.process.is_alive())
+        self.assertIsNot(self.pool._slots[0], self.slot)
+        self.assertEqual(self.pool.idle_count, 1)
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, PlanReaderJob.STATUS_CANCELLED)
+        self.assertEqual(self.job.error_message, "Processing stopped by user.")
@@ -1,16 +1,19 @@
-import json
+from datetime import timezone as dt_timezone
 from urllib.parse import urlencode
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.db import transaction
+from django.db.models.functions import TruncMinute
 from django.http import HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.views.decorators.http import require_POST
 
+from core.facets import FacetColumn, FacetSet, parse_excel_filters
+from core.worker_wakeup import QUEUE_PLAN_READER, notify_worker
 from plan_reader.forms import PlanReaderJobForm
 from plan_reader.models import PlanReaderJob
 from plan_reader.services.processor import mark_duplicates
@@ -144,123 +147,74 @@ def _item_payload(item, index, duplicate_project_names=None):
     }
 
 
-def _job_created_by_label(job):
-    user = getattr(job, "uploaded_by", None)
+def _job_progress_label(processed_pages, total_pages):
+    processed_pages = processed_pages or 0
+    total_pages = total_pages or 0
 
-    if not user:
-        return "—"
-
-    return user.get_full_name() or user.username or "—"
-
-
-def _job_progress_label(job):
-    return f"{job.processed_pages}/{job.total_pages} pages ({job.progress_percent}%)"
-
-
-def _excel_value_for_job(job, key):
-    key = str(key)
-
-    if key == "0":
-        return f"#{job.id}"
-
-    if key == "1":
-        return str(job.original_filename or "PDF")
-
-    if key == "2":
-        return str(job.client or "—")
-
-    if key == "3":
-        return str(job.city or "—")
-
-    if key == "4":
-        return str(job.project or "—")
-
-    if key == "5":
-        return str(job.office or "—")
-
-    if key == "6":
-        return str(job.co or "—")
-
-    if key == "7":
-        return str(job.dfn or "—")
-
-    if key == "8":
-        return str(job.get_status_display() or job.status or "—")
-
-    if key == "9":
-        return _job_progress_label(job)
-
-    if key == "10":
-        return _job_created_by_label(job)
-
-    if key == "11":
-        return job.created_at.strftime("%Y-%m-%d %H:%M") if job.created_at else "—"
-
-    return "—"
-
-
-def _parse_excel_filters(raw_value):
-    try:
-        parsed = json.loads(raw_value) if raw_value else {}
-    except Exception:
-        parsed = {}
-
-    excel_filters = {}
-
-    if isinstance(parsed, dict):
-        for key, values in parsed.items():
-            if not isinstance(values, list):
-                continue
-
-            clean_values = set(str(v) for v in values if str(v).strip() != "")
-
-            if clean_values:
-                excel_filters[str(key)] = clean_values
-
-    return excel_filters
-
-
-def _apply_job_excel_filters(qs, excel_filters):
-    if not excel_filters:
-        return qs
-
-    jobs = list(qs.select_related("uploaded_by"))
-    allowed_ids = []
-
-    for job in jobs:
-        keep = True
-
-        for key, allowed_values in excel_filters.items():
-            current_value = str(_excel_value_for_job(job, key) or "—")
-
-            if current_value not in allowed_values:
-                keep = False
-                break
-
-        if keep:
-            allowed_ids.append(job.id)
-
-    return qs.filter(id__in=allowed_ids)
-
-
-def _build_job_excel_global(qs):
-    excel_global = {str(i): [] for i in range(12)}
-    seen = {str(i): set() for i in range(12)}
-
-    jobs = list(qs.select_related("uploaded_by"))
+    percent = (
+        min(100, round((processed_pages / total_pages) * 100)) if total_pages else 0
+    )
 
-    for job in jobs:
-        for key in excel_global.keys():
-            value = str(_excel_value_for_job(job, key) or "—")
+    return f"{processed_pages}/{total_pages} pages ({percent}%)"
 
-            if value not in seen[key]:
-                seen[key].add(value)
-                excel_global[key].append(value)
 
-    for key in excel_global.keys():
-        excel_global[key].sort(key=lambda x: str(x).lower())
+def _job_created_by_label(user_id, first_name, last_name, username):
+    if not user_id:
+        return "—"
 
-    return excel_global
+    full_name = f"{first_name or ''} {last_name or ''}".strip()
+
+    return full_name or username or "—"
+
+
+# Columnas de la tabla (mismo orden que job_list.html).
+JOB_FACETS = FacetSet(
+    "plan_reader_jobs",
+    [
+        FacetColumn("0", "id", label=lambda pk: f"#{pk}"),
+        FacetColumn("1", "original_filename", label=lambda name: name or "PDF"),
+        FacetColumn("2", "client"),
+        FacetColumn("3", "city"),
+        FacetColumn("4", "project"),
+        FacetColumn("5", "office"),
+        FacetColumn("6", "co"),
+        FacetColumn("7", "dfn"),
+        FacetColumn(
+            "8",
+            "status",
+            label=lambda status: (
+                dict(PlanReaderJob.STATUS_CHOICES).get(status) or status or "—"
+            ),
+        ),
+        FacetColumn(
+            "9",
+            ("processed_pages", "total_pages"),
+            label=_job_progress_label,
+        ),
+        FacetColumn(
+            "10",
+            (
+                "uploaded_by",
+                "uploaded_by__first_name",
+                "uploaded_by__last_name",
+                "uploaded_by__username",
+            ),
+            label=_job_created_by_label,
+        ),
+        FacetColumn(
+            "11",
+            "excel_created_minute",
+            annotations={
+                "excel_created_minute": TruncMinute(
+                    "created_at",
+                    tzinfo=dt_timezone.utc,
+                ),
+            },
+            label=lambda d: d.strftime("%Y-%m-%d %H:%M") if d else "—",
+        ),
+    ],
+    models=["plan_reader.PlanReaderJob"],
+)
 
 
 @login_required
@@ -294,9 +248,9 @@ def job_list(request):
     )
 
     excel_filters_raw = (request.GET.get("excel_filters") or "").strip()
-    excel_filters = _parse_excel_filters(excel_filters_raw)
+    excel_filters = parse_excel_filters(excel_filters_raw)
 
-    qs_filtered = _apply_job_excel_filters(qs, excel_filters).distinct()
+    qs_filtered = JOB_FACETS.filter(qs, excel_filters)
 
     cantidad = request.GET.get("cantidad", "10")
 
@@ -350,20 +304,21 @@ def job_excel_options(request):
             status=403,
         )
 
-    qs = (
-        PlanReaderJob.objects.select_related("uploaded_by")
-        .all()
-        .order_by("-created_at")
-    )
+    qs = PlanReaderJob.objects.all()
 
-    excel_global = _build_job_excel_global(qs)
+    # ?col=N: solo esa columna (el panel la pide al abrirse).
+    col = (request.GET.get("col") or "").strip()
 
-    return JsonResponse(
-        {
-            "ok": True,
-            "excel_global": excel_global,
-        }
-    )
+    if col and not JOB_FACETS.has_column(col):
+        return JsonResponse(
+            {
+                "ok": False,
+                "error": "Unknown column.",
+            },
+            status=400,
+        )
+
+    return JsonResponse(JOB_FACETS.payload(qs, [col] if col else None))
 
 
 @login_required
@@ -383,6 +338,8 @@ def job_create(request):
 
             job.save()
 
+            notify_worker(QUEUE_PLAN_READER)
+
             messages.success(
                 request,
                 "Plan Reader job created and queued. The worker will process it automatically.",
@@ -460,6 +417,8 @@ def job_edit(request, job_id):
                 job.pages.all().delete()
                 job.items.all().delete()
 
+                notify_worker(QUEUE_PLAN_READER)
+
                 messages.success(
                     request,
                     "Plan Reader job updated and queued because the PDF was changed.",
@@ -624,6 +583,8 @@ def queue_job_processing(request, job_id):
             ]
         )
 
+        notify_worker(QUEUE_PLAN_READER)
+
     messages.success(
         request,
         "Job queued. The Render worker will process it automatically.",
@@ -640,6 +601,9 @@ def recalculate_job_duplicates(request, job_id):
 
     No llama OpenAI.
     No vuelve a leer el PDF.
+
+    POST project_name (opcional) reevalúa solo ese grupo de cajas
+    en lugar del job completo.
     """
     if not can_access_plan_reader(request.user):
         return deny_plan_reader_access(request)
@@ -660,7 +624,12 @@ def recalculate_job_duplicates(request, job_id):
         )
         return redirect("plan_reader:job_detail", job_id=job.id)
 
-    mark_duplicates(job)
+    project_name = (request.POST.get("project_name") or "").strip()
+
+    mark_duplicates(
+        job,
+        project_names=[project_name] if project_name else None,
+    )
 
     messages.success(
         request,
@@ -790,6 +759,8 @@ def job_status_json(request, job_id):
                 "processed_pages": job.processed_pages,
                 "total_pages": job.total_pages,
                 "failed_pages": job.failed_pages,
+                "cache_hits": job.cache_hits,
+                "cache_misses": job.cache_misses,
                 "progress_percent": job.progress_percent,
                 "items_count": included_items_count,
                 "included_items_count": included_items_count,
@@ -5,6 +5,7 @@ from django.shortcuts import get_object_or_404, redirect, render
 
 from plan_reader.forms import PlanReaderItemReviewForm
 from plan_reader.models import PlanReaderItem
+from plan_reader.services.processor import refresh_duplicate_review
 from plan_reader.views.job_views import (can_access_plan_reader,
                                          deny_plan_reader_access)
 
@@ -53,6 +54,9 @@ def toggle_item_duplicate(request, item_id):
     Si is_duplicate=False:
     - Vuelve a la tabla principal.
     - Vuelve al Excel final.
+
+    Después se reevalúa la revisión solo del grupo del item
+    (mismo project_name), no el job completo.
     """
 
     if not can_access_plan_reader(request.user):
@@ -108,6 +112,18 @@ def toggle_item_duplicate(request, item_id):
         ]
     )
 
+    refresh_duplicate_review(
+        item.job,
+        [item.project_name],
+    )
+
+    item.refresh_from_db(
+        fields=[
+            "needs_review",
+            "observation",
+        ]
+    )
+
     if request.headers.get("x-requested-with") == "XMLHttpRequest":
         return JsonResponse(
             {
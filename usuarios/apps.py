@@ -15,6 +15,12 @@ class UsuariosConfig(AppConfig):
         # Señales existentes
         import usuarios.signals  # noqa: F401
 
+        # Con la cola durable (BACKGROUND_TASKS_MODE="queue") los jobs
+        # los ejecuta run_task_worker: el proceso web no necesita scheduler.
+        from core.task_queue import task_queue_enabled
+        if task_queue_enabled():
+            return
+
         # Iniciar el scheduler SOLO una vez
         if 'runserver' in sys.argv:
             # Evita doble arranque con el autoreloader
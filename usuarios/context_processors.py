@@ -2,6 +2,8 @@ import json
 
 from django.db.models import Q  # ✅ Esto faltaba
 
+from core.principal import get_principal
+
 from .models import Notificacion
 
 
@@ -39,14 +41,8 @@ def ui_mode_context(request):
             "can_switch_ui_mode": False,
         }
 
-    roles_nombres = []
-    try:
-        if hasattr(user, "roles"):
-            roles_nombres = list(user.roles.values_list("nombre", flat=True))
-    except Exception:
-        roles_nombres = []
-
-    roles = {str(r).strip().lower() for r in roles_nombres if r}
+    # Roles memoizados por request (core.principal)
+    roles = get_principal(user).role_names
 
     has_user_role = ("usuario" in roles)
 
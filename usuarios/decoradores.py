@@ -2,6 +2,8 @@
 from functools import wraps
 from django.shortcuts import redirect
 
+from core.principal import get_principal
+
 
 def rol_requerido(*roles_esperados, url_redireccion='usuarios:no_autorizado'):
     def decorator(view_func):
@@ -11,7 +13,8 @@ def rol_requerido(*roles_esperados, url_redireccion='usuarios:no_autorizado'):
             if user.is_authenticated:
                 if user.is_superuser:
                     return view_func(request, *args, **kwargs)
-                if hasattr(user, 'roles') and user.roles.filter(nombre__in=roles_esperados).exists():
+                # Roles memoizados por request (core.principal)
+                if get_principal(user).has_role(roles_esperados):
                     return view_func(request, *args, **kwargs)
             return redirect(url_redireccion)
         return _wrapped_view
@@ -110,13 +110,11 @@ class CustomUser(AbstractUser):
         if len(roles) == 1 and isinstance(roles[0], (list, tuple, set)):
             roles = tuple(roles[0])
 
-        roles_busqueda = {str(r).strip().lower() for r in roles if r}
-        if not roles_busqueda:
-            return False
+        # Roles cargados una vez por request (core.principal): los es_*
+        # se consultan muchas veces por página.
+        from core.principal import get_principal
 
-        roles_usuario = {r.nombre.strip().lower() for r in self.roles.all()}
-        # Intersección no vacía => tiene algún rol solicitado
-        return not roles_usuario.isdisjoint(roles_busqueda)
+        return get_principal(self).has_role(roles, ignore_case=True)
 
     @property
     def es_usuario(self):
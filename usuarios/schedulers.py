@@ -1,4 +1,5 @@
 # usuarios/schedulers.py
+import logging
 import os
 import threading
 from datetime import timedelta
@@ -11,9 +12,14 @@ from django.db import connection, transaction
 from django.utils import timezone
 from django.utils.text import slugify
 
+from core.models import BackgroundTask
+from core.task_queue import (current_task, enqueue_task, is_task_retry,
+                              task_queue_enabled)
 from operaciones.models import (EvidenciaFotoBilling, ReporteFotograficoJob,
                                 SesionBilling)
 
+logger = logging.getLogger(__name__)
+
 # ---------------- Scheduler ----------------
 
 
@@ -80,7 +86,9 @@ def procesar_reporte_fotografico_job(job_id: int):
         _xlsx_path_reporte_fotografico_qs
 
     job = ReporteFotograficoJob.objects.select_related("sesion").get(pk=job_id)
-    if job.estado in ("procesando", "ok"):
+    # "procesando" = otro worker lo está generando, salvo que sea un
+    # reintento de la cola (el worker anterior murió a mitad).
+    if job.estado == "ok" or (job.estado == "procesando" and not is_task_retry()):
         return
 
     job.estado = "procesando"
@@ -164,6 +172,18 @@ def procesar_reporte_fotografico_job(job_id: int):
         job.estado = "error"
         job.terminado_en = timezone.now()
         job.save(update_fields=["error", "estado", "terminado_en"])
+        _raise_for_queue()
+
+
+def _raise_for_queue():
+    """
+    Llamar dentro de un except: con la cola durable vuelve a lanzar el
+    error para que execute_task reintente con backoff (o marque la tarea
+    como fallida al agotar intentos). Con APScheduler/hilo no hay
+    reintentos y basta con el error registrado en el job.
+    """
+    if current_task() is not None:
+        raise
 
 
 def _run_in_thread(fn, *args):
@@ -171,17 +191,28 @@ def _run_in_thread(fn, *args):
     t.start()
 
 
-def enqueue_reporte_fotografico(job_id: int):
+def _dispatch(fn, args, job_key: str, priority=None):
     """
-    Intenta APScheduler; si no hay, cae a un hilo en background.
-    Así el request responde de inmediato SIEMPRE.
+    Envía un job a segundo plano.
+
+    - BACKGROUND_TASKS_MODE="queue" (producción): cola durable
+      (core/task_queue.py), la ejecuta `manage.py run_task_worker` fuera
+      del proceso web y sobrevive a deploys y reinicios.
+    - "scheduler" (desarrollo): APScheduler del proceso web si está
+      iniciado; si no, un hilo daemon.
+
+    job_key evita duplicar un job que ya está pendiente.
     """
+    if task_queue_enabled():
+        enqueue_task(fn, *args, dedupe_key=job_key, priority=priority)
+        return
+
     scheduler = getattr(settings, "APP_SCHEDULER", None)
     if scheduler:
         scheduler.add_job(
-            func=procesar_reporte_fotografico_job,
-            args=[job_id],
-            id=f"repfoto-{job_id}",
+            func=fn,
+            args=list(args),
+            id=job_key,
             replace_existing=True,
             misfire_grace_time=300,
             max_instances=1,
@@ -189,7 +220,20 @@ def enqueue_reporte_fotografico(job_id: int):
             next_run_time=timezone.now(),
         )
     else:
-        _run_in_thread(procesar_reporte_fotografico_job, job_id)
+        _run_in_thread(fn, *args)
+
+
+def enqueue_reporte_fotografico(job_id: int):
+    """
+    Encola el reporte FINAL (ver _dispatch).
+    Así el request responde de inmediato SIEMPRE.
+    """
+    _dispatch(
+        procesar_reporte_fotografico_job,
+        [job_id],
+        f"repfoto-{job_id}",
+        priority=BackgroundTask.PRIORITY_HIGH,
+    )
 
 
 # ---------------- PARCIAL ----------------
@@ -205,7 +249,9 @@ def procesar_reporte_parcial_job(job_id: int):
         _xlsx_path_reporte_fotografico_qs
 
     job = ReporteFotograficoJob.objects.select_related("sesion").get(pk=job_id)
-    if job.estado in ("procesando", "ok"):
+    # "procesando" = otro worker lo está generando, salvo que sea un
+    # reintento de la cola (el worker anterior murió a mitad).
+    if job.estado == "ok" or (job.estado == "procesando" and not is_task_retry()):
         return
 
     job.estado = "procesando"
@@ -260,23 +306,16 @@ def procesar_reporte_parcial_job(job_id: int):
         job.terminado_en = timezone.now()
         job.log = (job.log or "") + f"[partial] error: {e}\n"
         job.save(update_fields=["error", "estado", "terminado_en", "log"])
+        _raise_for_queue()
 
 
 def enqueue_reporte_parcial(job_id: int):
-    scheduler = getattr(settings, "APP_SCHEDULER", None)
-    if scheduler:
-        scheduler.add_job(
-            func=procesar_reporte_parcial_job,
-            args=[job_id],
-            id=f"repfoto-partial-{job_id}",
-            replace_existing=True,
-            misfire_grace_time=300,
-            max_instances=1,
-            coalesce=True,
-            next_run_time=timezone.now(),
-        )
-    else:
-        _run_in_thread(procesar_reporte_parcial_job, job_id)
+    _dispatch(
+        procesar_reporte_parcial_job,
+        [job_id],
+        f"repfoto-partial-{job_id}",
+        priority=BackgroundTask.PRIORITY_HIGH,
+    )
 
 
 # ---------------- CABLE FINAL ----------------
@@ -297,7 +336,9 @@ def procesar_cable_photo_report_job(job_id: int):
             _cable_report_project_key, _xlsx_path_cable_photo_report)
 
         job = ReporteFotograficoJob.objects.select_related("sesion").get(pk=job_id)
-        if job.estado in ("procesando", "ok"):
+        # "procesando" = otro worker lo está generando, salvo que sea un
+        # reintento de la cola (el worker anterior murió a mitad).
+        if job.estado == "ok" or (job.estado == "procesando" and not is_task_retry()):
             return
 
         billing = job.sesion
@@ -392,6 +433,10 @@ def procesar_cable_photo_report_job(job_id: int):
             job.error = str(e)
             job.save(update_fields=["estado", "terminado_en", "error"])
 
+        # Cancelar no es un fallo: no se reintenta.
+        if type(e).__name__ != "CableReportCancelled":
+            _raise_for_queue()
+
     finally:
         try:
             if tmp_path and os.path.exists(tmp_path):
@@ -405,20 +450,12 @@ def procesar_cable_photo_report_job(job_id: int):
 
 
 def enqueue_cable_photo_report(job_id: int):
-    scheduler = getattr(settings, "APP_SCHEDULER", None)
-    if scheduler:
-        scheduler.add_job(
-            func=procesar_cable_photo_report_job,
-            args=[job_id],
-            id=f"cable-repfoto-{job_id}",
-            replace_existing=True,
-            misfire_grace_time=300,
-            max_instances=1,
-            coalesce=True,
-            next_run_time=timezone.now(),
-        )
-    else:
-        _run_in_thread(procesar_cable_photo_report_job, job_id)
+    _dispatch(
+        procesar_cable_photo_report_job,
+        [job_id],
+        f"cable-repfoto-{job_id}",
+        priority=BackgroundTask.PRIORITY_HIGH,
+    )
 
 
 def procesar_light_levels_backfill_job(sesion_id: int, user_id=None, force=False):
@@ -450,9 +487,8 @@ def procesar_light_levels_backfill_job(sesion_id: int, user_id=None, force=False
     try:
         from django.contrib.auth import get_user_model
 
-        from operaciones.views_billing_exec import (
-            _extract_power_dbm_for_evidence, _light_source_meta_from_title,
-            _power_meta_from_title, _power_port_no_from_evidence)
+        from operaciones.services.light_levels import \
+            run_light_levels_backfill
 
         user = None
         if user_id:
@@ -462,110 +498,19 @@ def procesar_light_levels_backfill_job(sesion_id: int, user_id=None, force=False
             except Exception:
                 user = None
 
-        s = SesionBilling.objects.get(pk=sesion_id)
+        s = SesionBilling.objects.filter(pk=sesion_id).first()
 
-        evidencias = (
-            EvidenciaFotoBilling.objects.filter(
-                tecnico_sesion__sesion=s,
-            )
-            .select_related("requisito", "tecnico_sesion", "tecnico_sesion__sesion")
-            .order_by("id")
-        )
+        # Puede haberse borrado antes de procesarse: nada que reintentar.
+        if s is None:
+            return
 
-        for ev in evidencias:
-            try:
-                # ==========================================================
-                # Detectar si la evidencia es LIGHT SOURCE o POWER PORT
-                # ==========================================================
-                is_light_source = False
-                is_power_port = False
-
-                if ev.requisito_id:
-                    titulo_req = (ev.requisito.titulo or "").strip()
-                    titulo_req_upper = titulo_req.upper()
-
-                    needs_power, _port_no = _power_meta_from_title(titulo_req)
-
-                    is_light_source = (
-                        bool(getattr(ev.requisito, "needs_light_source_reading", False))
-                        or _light_source_meta_from_title(titulo_req)
-                        or titulo_req_upper.startswith("LIGHT SOURCE")
-                        or ev.light_source_dbm is not None
-                        or "type=light_source"
-                        in ((ev.power_extract_note or "").lower())
-                    )
-
-                    is_power_port = (
-                        bool(getattr(ev.requisito, "needs_power_reading", False))
-                        or needs_power
-                        or titulo_req_upper.startswith("POWER PORT")
-                        or ev.power_dbm is not None
-                        or _power_port_no_from_evidence(ev)
-                        or "type=power_port" in ((ev.power_extract_note or "").lower())
-                    )
-
-                else:
-                    titulo_manual = (ev.titulo_manual or "").strip()
-                    nota = (ev.nota or "").strip()
-                    hint = f"{titulo_manual} {nota}".lower()
-
-                    needs_power, _port_no = _power_meta_from_title(titulo_manual)
-
-                    is_light_source = (
-                        _light_source_meta_from_title(titulo_manual)
-                        or titulo_manual.upper().startswith("LIGHT SOURCE")
-                        or ev.light_source_dbm is not None
-                        or "type=light_source"
-                        in ((ev.power_extract_note or "").lower())
-                    )
-
-                    is_power_port = (
-                        needs_power
-                        or ev.power_dbm is not None
-                        or _power_port_no_from_evidence(ev)
-                        or "type=power_port" in ((ev.power_extract_note or "").lower())
-                        or titulo_manual.lower() in {"", "extra"}
-                        or any(
-                            x in hint
-                            for x in [
-                                "power",
-                                "port",
-                                "dbm",
-                                "opm",
-                                "light level",
-                                "light",
-                            ]
-                        )
-                    )
-
-                should_try = bool(force or is_light_source or is_power_port)
-
-                if not should_try:
-                    continue
-
-                # ==========================================================
-                # Si ya está completo, no gastar IA salvo force=True
-                # ==========================================================
-                if not force:
-                    if is_light_source and ev.light_source_dbm is not None:
-                        continue
-
-                    if (
-                        is_power_port
-                        and ev.power_dbm is not None
-                        and _power_port_no_from_evidence(ev)
-                    ):
-                        continue
-
-                _extract_power_dbm_for_evidence(
-                    ev,
-                    user=user,
-                    allow_extra=True,
-                    allow_locked=True,
-                )
+        stats = run_light_levels_backfill(s, user=user, force=force)
 
-            except Exception:
-                continue
+        logger.info(
+            "Light levels backfill for SesionBilling %s: %s",
+            sesion_id,
+            stats,
+        )
 
     except Exception:
         try:
@@ -578,6 +523,8 @@ def procesar_light_levels_backfill_job(sesion_id: int, user_id=None, force=False
         except Exception:
             pass
 
+        _raise_for_queue()
+
     finally:
         try:
             connection.close()
@@ -587,24 +534,54 @@ def procesar_light_levels_backfill_job(sesion_id: int, user_id=None, force=False
 
 def enqueue_light_levels_backfill(sesion_id: int, user_id=None, force=False):
     """
-    Encola el backfill de light levels en background.
+    Encola el backfill de light levels en background (ver _dispatch).
 
     Se llama desde finish_assignment después del transaction.on_commit().
-    Si APScheduler está disponible, lo usa.
-    Si no, cae a un thread daemon para no bloquear el request.
+    Prioridad baja: no debe demorar reportes pedidos por usuarios.
     """
-    scheduler = getattr(settings, "APP_SCHEDULER", None)
+    _dispatch(
+        procesar_light_levels_backfill_job,
+        [sesion_id, user_id, force],
+        f"light-levels-backfill-{sesion_id}",
+        priority=BackgroundTask.PRIORITY_LOW,
+    )
 
-    if scheduler:
-        scheduler.add_job(
-            func=procesar_light_levels_backfill_job,
-            args=[sesion_id, user_id, force],
-            id=f"light-levels-backfill-{sesion_id}",
-            replace_existing=True,
-            misfire_grace_time=300,
-            max_instances=1,
-            coalesce=True,
-            next_run_time=timezone.now(),
-        )
-    else:
-        _run_in_thread(procesar_light_levels_backfill_job, sesion_id, user_id, force)
+
+# ---------------- DERIVADOS DE EVIDENCIAS ----------------
+
+
+def procesar_evidence_derivatives_job(model_label: str, pk: int):
+    """
+    Genera el JPEG de reporte y la miniatura de una evidencia recién
+    subida. Un fallo no afecta a la evidencia: reportes y galerías
+    siguen usando el original.
+    """
+    from django.apps import apps
+
+    from operaciones.services.evidence_derivatives import \
+        generate_evidence_derivatives
+
+    try:
+        instance = apps.get_model(model_label).objects.filter(pk=pk).first()
+
+        # Puede haberse borrado antes de procesarse.
+        if instance is not None:
+            generate_evidence_derivatives(instance)
+
+    except Exception:
+        logger.exception("Could not generate derivatives for %s #%s.", model_label, pk)
+        _raise_for_queue()
+
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+def enqueue_evidence_derivatives(model_label: str, pk: int):
+    _dispatch(
+        procesar_evidence_derivatives_job,
+        [model_label, pk],
+        f"evidence-derivatives-{model_label}-{pk}",
+    )
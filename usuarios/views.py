@@ -14,7 +14,6 @@ from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from django.contrib.auth.views import LoginView
-from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
@@ -27,6 +26,7 @@ from django.utils.crypto import get_random_string
 from django.utils.decorators import method_decorator
 from django.views.decorators.http import require_POST
 
+from core.shared_cache import shared_cache
 from hyperlink_networks.utils.email_utils import enviar_correo_manual
 from usuarios.decoradores import axes_dispatch, axes_post_only, ratelimit
 from usuarios.models import FirmaRepresentanteLegal  # 👈 importa el modelo
@@ -243,7 +243,9 @@ def recuperar_contraseña(request):
         if usuario:
             es_admin = usuario.is_staff or usuario.is_superuser or es_admin_param
             token = get_random_string(64)
-            cache.set(f"token_recuperacion_{usuario.id}", token, timeout=3600)
+            # Token de un solo uso: sin L1, para que un delete no deje
+            # copias vigentes en otros procesos.
+            shared_cache().set(f"token_recuperacion_{usuario.id}", token, timeout=3600)
 
             reset_url = request.build_absolute_uri(
                 reverse('usuarios:resetear_contraseña',
@@ -300,7 +302,7 @@ If you didn’t request this, please ignore this message.
 
 def resetear_contraseña(request, usuario_id, token):
     usuario = User.objects.filter(id=usuario_id).first()
-    token_guardado = cache.get(f"token_recuperacion_{usuario_id}")
+    token_guardado = shared_cache().get(f"token_recuperacion_{usuario_id}")
 
     if not usuario or token != token_guardado:
         messages.error(
@@ -316,7 +318,7 @@ def resetear_contraseña(request, usuario_id, token):
         else:
             usuario.set_password(nueva_contraseña)
             usuario.save()
-            cache.delete(f"token_recuperacion_{usuario_id}")
+            shared_cache().delete(f"token_recuperacion_{usuario_id}")
             messages.success(
                 request, "Your password has been successfully updated.")
             return redirect('usuarios:login')